@@ -0,0 +1,36 @@
+"""Add scheduled_job_runs table for background scheduler run history.
+
+Revision ID: 20261018_add_scheduled_job_runs
+Revises: 20251225164411
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_scheduled_job_runs'
+down_revision = '20251225164411'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_job_runs (
+            id SERIAL PRIMARY KEY,
+            job_name VARCHAR(100) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'running',
+            worker VARCHAR(255) DEFAULT NULL,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP DEFAULT NULL,
+            duration_ms INTEGER DEFAULT NULL,
+            result JSONB DEFAULT NULL,
+            error_message TEXT DEFAULT NULL
+        );
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_scheduled_job_runs_job_name ON scheduled_job_runs (job_name);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_scheduled_job_runs_started_at ON scheduled_job_runs (started_at);")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS scheduled_job_runs;")
@@ -0,0 +1,29 @@
+"""Add cache_versions table for shared public catalog cache invalidation.
+
+Revision ID: 20261019_add_cache_versions
+Revises: 20261018_add_scheduled_job_runs
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_add_cache_versions'
+down_revision = '20261018_add_scheduled_job_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name VARCHAR(64) PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    op.execute("INSERT INTO cache_versions (name, version) VALUES ('catalog', 0) ON CONFLICT (name) DO NOTHING;")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS cache_versions;")
@@ -0,0 +1,49 @@
+"""Add ticket holds and held-ticket counter for atomic event ticket inventory.
+
+Revision ID: 20261020_add_ticket_holds
+Revises: 20261019_add_cache_versions
+Create Date: 2026-10-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261020_add_ticket_holds'
+down_revision = '20261019_add_cache_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Event ticketing tables are created by migrations/001_event_ticketing_system.sql;
+    # skip quietly on databases where it hasn't been applied.
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('event_schedules') IS NOT NULL THEN
+                ALTER TABLE event_schedules ADD COLUMN IF NOT EXISTS tickets_held INT NOT NULL DEFAULT 0;
+
+                CREATE TABLE IF NOT EXISTS ticket_holds (
+                    id SERIAL PRIMARY KEY,
+                    schedule_id INT NOT NULL REFERENCES event_schedules(id) ON DELETE CASCADE,
+                    booking_id INT REFERENCES bookings(id) ON DELETE SET NULL,
+                    user_id INT REFERENCES users(id) ON DELETE SET NULL,
+                    quantity INT NOT NULL,
+                    status VARCHAR(20) DEFAULT 'active',
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS ix_ticket_holds_schedule_id ON ticket_holds (schedule_id);
+                CREATE INDEX IF NOT EXISTS ix_ticket_holds_booking_id ON ticket_holds (booking_id);
+                -- Expiry job scans active holds by expiry time
+                CREATE INDEX IF NOT EXISTS ix_ticket_holds_active_expires
+                    ON ticket_holds (expires_at) WHERE status = 'active';
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS ticket_holds;")
+    op.execute("ALTER TABLE IF EXISTS event_schedules DROP COLUMN IF EXISTS tickets_held;")
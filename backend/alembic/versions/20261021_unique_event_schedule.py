@@ -0,0 +1,44 @@
+"""Ensure the unique (definition, date, start_time) constraint on event_schedules.
+
+Bulk schedule generation relies on it for INSERT ... ON CONFLICT DO NOTHING.
+Databases created from migrations/001_event_ticketing_system.sql already have it.
+
+Revision ID: 20261021_unique_event_schedule
+Revises: 20261020_add_ticket_holds
+Create Date: 2026-10-21
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261021_unique_event_schedule'
+down_revision = '20261020_add_ticket_holds'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('event_schedules') IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'unique_event_schedule') THEN
+                IF EXISTS (
+                    SELECT 1 FROM event_schedules
+                    GROUP BY event_definition_id, schedule_date, start_time
+                    HAVING COUNT(*) > 1
+                ) THEN
+                    -- Duplicates may carry sold tickets; leave them for manual cleanup
+                    RAISE NOTICE 'event_schedules has duplicate schedules; unique_event_schedule not added';
+                ELSE
+                    ALTER TABLE event_schedules
+                        ADD CONSTRAINT unique_event_schedule UNIQUE (event_definition_id, schedule_date, start_time);
+                END IF;
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade():
+    # The constraint predates this migration on most databases; keep it
+    pass
@@ -0,0 +1,40 @@
+"""Unique inbound provider_message_id on whatsapp_messages.
+
+Removes duplicate inbound messages created by webhook retries (keeping the first copy)
+and adds a partial unique index so the ingestion consumer can drop retries with
+INSERT ... ON CONFLICT DO NOTHING.
+
+Revision ID: 20261022_whatsapp_inbound_dedupe
+Revises: 20261021_unique_event_schedule
+Create Date: 2026-10-22
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261022_whatsapp_inbound_dedupe'
+down_revision = '20261021_unique_event_schedule'
+branch_labels = None
+depends_on = None
+
+INBOUND_WITH_ID = "direction = 'inbound' AND provider_message_id IS NOT NULL AND provider_message_id <> ''"
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM whatsapp_messages m
+        USING whatsapp_messages keep
+        WHERE m.direction = 'inbound' AND keep.direction = 'inbound'
+          AND m.provider_message_id = keep.provider_message_id
+          AND m.provider_message_id <> ''
+          AND m.id > keep.id;
+    """)
+    op.execute(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_whatsapp_messages_inbound_provider_id
+            ON whatsapp_messages (provider_message_id)
+            WHERE {INBOUND_WITH_ID};
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_whatsapp_messages_inbound_provider_id;")
@@ -0,0 +1,92 @@
+"""Denormalized inbox summary columns on whatsapp_conversations.
+
+Adds message_count, unread_count, last_message_preview and last_direction, backfills
+them from whatsapp_messages, and adds the indexes the admin inbox needs:
+(status, last_message_at), last_message_at, a trigram index for phone search and
+(conversation_id, created_at) on messages.
+
+Revision ID: 20261023_whatsapp_conversation_summary
+Revises: 20261022_whatsapp_inbound_dedupe
+Create Date: 2026-10-23
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261023_whatsapp_conversation_summary'
+down_revision = '20261022_whatsapp_inbound_dedupe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        ALTER TABLE whatsapp_conversations
+            ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS last_message_preview VARCHAR(100),
+            ADD COLUMN IF NOT EXISTS last_direction VARCHAR(16);
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_whatsapp_messages_conversation_created
+            ON whatsapp_messages (conversation_id, created_at);
+    """)
+
+    # Backfill (unread_count starts at 0: there is no read-state history)
+    op.execute("""
+        UPDATE whatsapp_conversations c
+        SET message_count = s.message_count,
+            last_message_preview = LEFT(s.last_text, 100),
+            last_direction = s.last_direction,
+            last_message_at = COALESCE(s.last_at, c.last_message_at)
+        FROM (
+            SELECT DISTINCT ON (conversation_id)
+                conversation_id,
+                COUNT(*) OVER (PARTITION BY conversation_id) AS message_count,
+                text_content AS last_text,
+                direction AS last_direction,
+                created_at AS last_at
+            FROM whatsapp_messages
+            ORDER BY conversation_id, created_at DESC, id DESC
+        ) s
+        WHERE s.conversation_id = c.id;
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_whatsapp_conversations_status_last_message_at
+            ON whatsapp_conversations (status, last_message_at);
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_whatsapp_conversations_last_message_at
+            ON whatsapp_conversations (last_message_at);
+    """)
+
+    # Substring phone search (LIKE '%term%') needs a trigram index; fall back to a
+    # prefix-search index where the pg_trgm extension can't be created.
+    op.execute("""
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE INDEX IF NOT EXISTS ix_whatsapp_conversations_phone_trgm
+                ON whatsapp_conversations USING gin (phone_number gin_trgm_ops);
+        EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+            RAISE NOTICE 'pg_trgm unavailable; using prefix index for phone search';
+            CREATE INDEX IF NOT EXISTS ix_whatsapp_conversations_phone_prefix
+                ON whatsapp_conversations (phone_number varchar_pattern_ops);
+        END $$;
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_whatsapp_conversations_phone_trgm;")
+    op.execute("DROP INDEX IF EXISTS ix_whatsapp_conversations_phone_prefix;")
+    op.execute("DROP INDEX IF EXISTS ix_whatsapp_conversations_last_message_at;")
+    op.execute("DROP INDEX IF EXISTS ix_whatsapp_conversations_status_last_message_at;")
+    op.execute("DROP INDEX IF EXISTS ix_whatsapp_messages_conversation_created;")
+    op.execute("""
+        ALTER TABLE whatsapp_conversations
+            DROP COLUMN IF EXISTS message_count,
+            DROP COLUMN IF EXISTS unread_count,
+            DROP COLUMN IF EXISTS last_message_preview,
+            DROP COLUMN IF EXISTS last_direction;
+    """)
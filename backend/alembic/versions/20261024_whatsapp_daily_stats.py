@@ -0,0 +1,74 @@
+"""Daily WhatsApp statistics rollup.
+
+Creates whatsapp_daily_stats (one row per UTC day) and backfills it from
+whatsapp_conversations and whatsapp_messages. The admin stats endpoint sums this
+table instead of counting the source tables.
+
+Revision ID: 20261024_whatsapp_daily_stats
+Revises: 20261023_whatsapp_conversation_summary
+Create Date: 2026-10-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261024_whatsapp_daily_stats'
+down_revision = '20261023_whatsapp_conversation_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS whatsapp_daily_stats (
+            day DATE PRIMARY KEY,
+            conversations_created INTEGER NOT NULL DEFAULT 0,
+            conversations_inactive INTEGER NOT NULL DEFAULT 0,
+            messages_inbound INTEGER NOT NULL DEFAULT 0,
+            messages_outbound INTEGER NOT NULL DEFAULT 0,
+            auto_replies INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP
+        );
+    """)
+
+    # Backfill all history; rerunning the migration recomputes every day
+    op.execute("""
+        INSERT INTO whatsapp_daily_stats (
+            day, conversations_created, conversations_inactive,
+            messages_inbound, messages_outbound, auto_replies, updated_at
+        )
+        SELECT day,
+               SUM(conversations_created), SUM(conversations_inactive),
+               SUM(messages_inbound), SUM(messages_outbound), SUM(auto_replies),
+               NOW()
+        FROM (
+            SELECT created_at::date AS day,
+                   COUNT(*) AS conversations_created,
+                   COUNT(*) FILTER (WHERE status <> 'active') AS conversations_inactive,
+                   0 AS messages_inbound, 0 AS messages_outbound, 0 AS auto_replies
+            FROM whatsapp_conversations
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+            UNION ALL
+            SELECT created_at::date,
+                   0, 0,
+                   COUNT(*) FILTER (WHERE direction = 'inbound'),
+                   COUNT(*) FILTER (WHERE direction = 'outbound'),
+                   COUNT(*) FILTER (WHERE direction = 'outbound' AND message_metadata->>'auto' = 'true')
+            FROM whatsapp_messages
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+        ) s
+        GROUP BY day
+        ON CONFLICT (day) DO UPDATE SET
+            conversations_created = EXCLUDED.conversations_created,
+            conversations_inactive = EXCLUDED.conversations_inactive,
+            messages_inbound = EXCLUDED.messages_inbound,
+            messages_outbound = EXCLUDED.messages_outbound,
+            auto_replies = EXCLUDED.auto_replies,
+            updated_at = EXCLUDED.updated_at;
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS whatsapp_daily_stats;")
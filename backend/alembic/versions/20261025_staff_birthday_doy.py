@@ -0,0 +1,40 @@
+"""Birthday day-of-year column on staff.
+
+Adds staff.birthday_doy (day of year of date_of_birth on a leap-year calendar),
+backfills it and indexes (is_active, birthday_doy) so the HR dashboard can
+range-scan upcoming birthdays instead of loading every active staff row.
+
+Revision ID: 20261025_staff_birthday_doy
+Revises: 20261024_whatsapp_daily_stats
+Create Date: 2026-10-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261025_staff_birthday_doy'
+down_revision = '20261024_whatsapp_daily_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE staff ADD COLUMN IF NOT EXISTS birthday_doy INTEGER;")
+    op.execute("""
+        UPDATE staff
+        SET birthday_doy = EXTRACT(DOY FROM make_date(
+            2000,
+            EXTRACT(MONTH FROM date_of_birth)::int,
+            EXTRACT(DAY FROM date_of_birth)::int
+        ))::int
+        WHERE date_of_birth IS NOT NULL;
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_staff_active_birthday_doy
+            ON staff (is_active, birthday_doy);
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_staff_active_birthday_doy;")
+    op.execute("ALTER TABLE staff DROP COLUMN IF EXISTS birthday_doy;")
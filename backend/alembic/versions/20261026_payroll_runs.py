@@ -0,0 +1,67 @@
+"""Batch payroll runs.
+
+Creates payroll_runs (progress and errors of month-end batch runs) and makes
+(staff_id, month, year) unique on payroll so runs can bulk-upsert. Duplicate
+payroll rows are removed first, keeping the locked one, else the most recent.
+
+Revision ID: 20261026_payroll_runs
+Revises: 20261025_staff_birthday_doy
+Create Date: 2026-10-26
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261026_payroll_runs'
+down_revision = '20261025_staff_birthday_doy'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_runs (
+            id SERIAL PRIMARY KEY,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            total_staff INTEGER DEFAULT 0,
+            processed_count INTEGER DEFAULT 0,
+            succeeded_count INTEGER DEFAULT 0,
+            skipped_count INTEGER DEFAULT 0,
+            failed_count INTEGER DEFAULT 0,
+            errors JSON,
+            staff_ids JSON,
+            started_by_user_id INTEGER REFERENCES users(id),
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_payroll_runs_period ON payroll_runs (year, month);")
+
+    op.execute("""
+        DELETE FROM payroll p
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY staff_id, month, year
+                ORDER BY COALESCE(is_locked, false) DESC, updated_at DESC NULLS LAST, id DESC
+            ) AS rn
+            FROM payroll
+        ) d
+        WHERE p.id = d.id AND d.rn > 1;
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_payroll_staff_period') THEN
+                ALTER TABLE payroll ADD CONSTRAINT uq_payroll_staff_period UNIQUE (staff_id, month, year);
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade():
+    op.execute("ALTER TABLE payroll DROP CONSTRAINT IF EXISTS uq_payroll_staff_period;")
+    op.execute("DROP TABLE IF EXISTS payroll_runs;")
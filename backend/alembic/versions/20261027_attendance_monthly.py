@@ -0,0 +1,75 @@
+"""Monthly attendance rollups.
+
+Creates attendance_monthly (per-staff, per-month status counts and hour totals)
+and backfills it from attendance. Monthly summaries and payroll read this table
+instead of the raw attendance rows.
+
+Revision ID: 20261027_attendance_monthly
+Revises: 20261026_payroll_runs
+Create Date: 2026-10-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261027_attendance_monthly'
+down_revision = '20261026_payroll_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_monthly (
+            staff_id INTEGER NOT NULL REFERENCES staff(id) ON DELETE CASCADE,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            record_count INTEGER NOT NULL DEFAULT 0,
+            present_count INTEGER NOT NULL DEFAULT 0,
+            absent_count INTEGER NOT NULL DEFAULT 0,
+            half_day_count INTEGER NOT NULL DEFAULT 0,
+            leave_count INTEGER NOT NULL DEFAULT 0,
+            holiday_count INTEGER NOT NULL DEFAULT 0,
+            total_hours DOUBLE PRECISION NOT NULL DEFAULT 0,
+            overtime_hours DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (staff_id, year, month)
+        );
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_attendance_monthly_period ON attendance_monthly (year, month);")
+
+    # Backfill all history; rerunning the migration recomputes every month
+    op.execute("""
+        INSERT INTO attendance_monthly (
+            staff_id, year, month, record_count, present_count, absent_count,
+            half_day_count, leave_count, holiday_count, total_hours, overtime_hours, updated_at
+        )
+        SELECT staff_id,
+               EXTRACT(YEAR FROM attendance_date)::int,
+               EXTRACT(MONTH FROM attendance_date)::int,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'present'),
+               COUNT(*) FILTER (WHERE status = 'absent'),
+               COUNT(*) FILTER (WHERE status = 'half_day'),
+               COUNT(*) FILTER (WHERE status = 'leave'),
+               COUNT(*) FILTER (WHERE status = 'holiday'),
+               COALESCE(SUM(total_hours), 0),
+               COALESCE(SUM(overtime_hours), 0),
+               NOW()
+        FROM attendance
+        GROUP BY 1, 2, 3
+        ON CONFLICT (staff_id, year, month) DO UPDATE SET
+            record_count = EXCLUDED.record_count,
+            present_count = EXCLUDED.present_count,
+            absent_count = EXCLUDED.absent_count,
+            half_day_count = EXCLUDED.half_day_count,
+            leave_count = EXCLUDED.leave_count,
+            holiday_count = EXCLUDED.holiday_count,
+            total_hours = EXCLUDED.total_hours,
+            overtime_hours = EXCLUDED.overtime_hours,
+            updated_at = EXCLUDED.updated_at;
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS attendance_monthly;")
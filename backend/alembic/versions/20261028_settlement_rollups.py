@@ -0,0 +1,115 @@
+"""Daily vendor and broker settlement rollups.
+
+Creates vendor_settlement_daily (supplied booking items per vendor, day and item,
+by settlement state) and broker_settlement_daily (brokerage per broker and booking
+day), and backfills both. The vendor/broker payment summaries read these tables
+instead of every supplied item or brokered booking in the period.
+
+Revision ID: 20261028_settlement_rollups
+Revises: 20261027_attendance_monthly
+Create Date: 2026-10-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261028_settlement_rollups'
+down_revision = '20261027_attendance_monthly'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS vendor_settlement_daily (
+            vendor_id INTEGER NOT NULL REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+            settled_items INTEGER NOT NULL DEFAULT 0,
+            settled_quantity INTEGER NOT NULL DEFAULT 0,
+            verified_items INTEGER NOT NULL DEFAULT 0,
+            verified_quantity INTEGER NOT NULL DEFAULT 0,
+            unverified_items INTEGER NOT NULL DEFAULT 0,
+            unverified_quantity INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (vendor_id, day, item_id)
+        );
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_vendor_settlement_daily_day ON vendor_settlement_daily (day);")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS broker_settlement_daily (
+            broker_id INTEGER NOT NULL REFERENCES broker_profiles(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            brokerage DOUBLE PRECISION NOT NULL DEFAULT 0,
+            settled_bookings INTEGER NOT NULL DEFAULT 0,
+            settled_brokerage DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (broker_id, day)
+        );
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_broker_settlement_daily_day ON broker_settlement_daily (day);")
+
+    # Backfill all history; rerunning the migration recomputes every day.
+    # Settled items count on their settlement day, everything else on the supply day.
+    op.execute("""
+        INSERT INTO vendor_settlement_daily (
+            vendor_id, day, item_id, settled_items, settled_quantity, verified_items,
+            verified_quantity, unverified_items, unverified_quantity, updated_at
+        )
+        SELECT vendor_id, day, item_id,
+               COUNT(*) FILTER (WHERE state = 'settled'),
+               COALESCE(SUM(quantity) FILTER (WHERE state = 'settled'), 0),
+               COUNT(*) FILTER (WHERE state = 'verified'),
+               COALESCE(SUM(quantity) FILTER (WHERE state = 'verified'), 0),
+               COUNT(*) FILTER (WHERE state = 'unverified'),
+               COALESCE(SUM(quantity) FILTER (WHERE state = 'unverified'), 0),
+               NOW()
+        FROM (
+            SELECT vendor_id, item_id, COALESCE(quantity, 0) AS quantity,
+                   CASE WHEN payment_settled THEN COALESCE(payment_settled_at, supplied_at)
+                        ELSE supplied_at END::date AS day,
+                   CASE WHEN payment_settled THEN 'settled'
+                        WHEN supply_verified AND verified_at IS NOT NULL THEN 'verified'
+                        ELSE 'unverified' END AS state
+            FROM booking_items
+            WHERE vendor_id IS NOT NULL AND is_supplyed = true
+        ) s
+        WHERE day IS NOT NULL
+        GROUP BY vendor_id, day, item_id
+        ON CONFLICT (vendor_id, day, item_id) DO UPDATE SET
+            settled_items = EXCLUDED.settled_items,
+            settled_quantity = EXCLUDED.settled_quantity,
+            verified_items = EXCLUDED.verified_items,
+            verified_quantity = EXCLUDED.verified_quantity,
+            unverified_items = EXCLUDED.unverified_items,
+            unverified_quantity = EXCLUDED.unverified_quantity,
+            updated_at = EXCLUDED.updated_at;
+    """)
+    op.execute("""
+        INSERT INTO broker_settlement_daily (
+            broker_id, day, bookings, brokerage, settled_bookings, settled_brokerage, updated_at
+        )
+        SELECT broker_id,
+               created_at::date,
+               COUNT(*),
+               SUM(brokerage_amount),
+               COUNT(*) FILTER (WHERE broker_settled),
+               COALESCE(SUM(brokerage_amount) FILTER (WHERE broker_settled), 0),
+               NOW()
+        FROM bookings
+        WHERE broker_id IS NOT NULL AND brokerage_amount > 0 AND created_at IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (broker_id, day) DO UPDATE SET
+            bookings = EXCLUDED.bookings,
+            brokerage = EXCLUDED.brokerage,
+            settled_bookings = EXCLUDED.settled_bookings,
+            settled_brokerage = EXCLUDED.settled_brokerage,
+            updated_at = EXCLUDED.updated_at;
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS broker_settlement_daily;")
+    op.execute("DROP TABLE IF EXISTS vendor_settlement_daily;")
@@ -0,0 +1,30 @@
+"""Composite index for keyset-paginated "My bookings".
+
+Adds ix_bookings_user_start_id on bookings (user_id, start_datetime, id). The listing
+filters on user_id and a start_datetime range and pages with
+(start_datetime, id) < (cursor) ORDER BY start_datetime DESC, id DESC, which this
+index serves as one backward range scan.
+
+Revision ID: 20261029_bookings_user_start_index
+Revises: 20261028_settlement_rollups
+Create Date: 2026-10-29
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261029_bookings_user_start_index'
+down_revision = '20261028_settlement_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_bookings_user_start_id
+            ON bookings (user_id, start_datetime, id);
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_bookings_user_start_id;")
@@ -0,0 +1,47 @@
+"""Composite indexes for the hot booking queries.
+
+Replaces the hand-run add_memory_indexes.sql for the booking paths with indexes declared
+on the models:
+- bookings (space_id, status, start_datetime, end_datetime): slot conflict checks
+- booking_items (booking_id): items of a page of bookings
+- booking_items (vendor_id, event_date, is_supplyed): vendor order lists and counts
+- booking_items (event_date, is_supplyed): the supply reminder scan
+- payments (booking_id, status), refunds (booking_id, created_at),
+  booking_events (booking_id, to_status): per-booking lookups
+
+(user_id, start_datetime) is covered by ix_bookings_user_start_id from the previous
+revision. `python -m benchmarks.plans` checks the hot queries use these indexes.
+
+Revision ID: 20261030_hot_query_indexes
+Revises: 20261029_bookings_user_start_index
+Create Date: 2026-10-30
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261030_hot_query_indexes'
+down_revision = '20261029_bookings_user_start_index'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_bookings_space_status_start_end", "bookings", "space_id, status, start_datetime, end_datetime"),
+    ("ix_booking_items_booking_id", "booking_items", "booking_id"),
+    ("ix_booking_items_vendor_event_supplied", "booking_items", "vendor_id, event_date, is_supplyed"),
+    ("ix_booking_items_event_supplied", "booking_items", "event_date, is_supplyed"),
+    ("ix_payments_booking_status", "payments", "booking_id, status"),
+    ("ix_refunds_booking_created", "refunds", "booking_id, created_at"),
+    ("ix_booking_events_booking_to_status", "booking_events", "booking_id, to_status"),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});")
+    op.execute("ANALYZE bookings, booking_items, payments, refunds, booking_events;")
+
+
+def downgrade():
+    for name, _, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name};")
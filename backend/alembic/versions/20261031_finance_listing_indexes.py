@@ -0,0 +1,35 @@
+"""Indexes for the admin refund and invoice listings.
+
+The listings page newest-first by keyset on (created_at, id) and filter refunds by
+created_at window and status:
+- refunds (created_at, id) and (status, created_at, id)
+- bookings (created_at, id)
+
+Revision ID: 20261031_finance_listing_indexes
+Revises: 20261030_hot_query_indexes
+Create Date: 2026-10-31
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261031_finance_listing_indexes'
+down_revision = '20261030_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_refunds_created_id", "refunds", "created_at, id"),
+    ("ix_refunds_status_created_id", "refunds", "status, created_at, id"),
+    ("ix_bookings_created_id", "bookings", "created_at, id"),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});")
+
+
+def downgrade():
+    for name, _, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name};")
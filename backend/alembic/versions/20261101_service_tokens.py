@@ -0,0 +1,32 @@
+"""Add service_tokens table for third-party API tokens shared across workers.
+
+Revision ID: 20261101_service_tokens
+Revises: 20261031_finance_listing_indexes
+Create Date: 2026-11-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261101_service_tokens'
+down_revision = '20261031_finance_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS service_tokens (
+            name VARCHAR(64) PRIMARY KEY,
+            token TEXT,
+            issued_at TIMESTAMP,
+            expires_at TIMESTAMP,
+            lease_until TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    op.execute("INSERT INTO service_tokens (name) VALUES ('route_mobile') ON CONFLICT (name) DO NOTHING;")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS service_tokens;")
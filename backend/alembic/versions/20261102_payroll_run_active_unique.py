@@ -0,0 +1,40 @@
+"""One active payroll run per month.
+
+Adds a partial unique index on payroll_runs (year, month) for pending/running runs,
+so two concurrent starts can't both run the same month. Older duplicate active runs
+are marked failed first, keeping the most recent one.
+
+Revision ID: 20261102_payroll_run_active_unique
+Revises: 20261101_service_tokens
+Create Date: 2026-11-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261102_payroll_run_active_unique'
+down_revision = '20261101_service_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        UPDATE payroll_runs r
+        SET status = 'failed', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY year, month ORDER BY id DESC) AS rn
+            FROM payroll_runs
+            WHERE status IN ('pending', 'running')
+        ) d
+        WHERE r.id = d.id AND d.rn > 1;
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_payroll_runs_active_period
+        ON payroll_runs (year, month)
+        WHERE status IN ('pending', 'running');
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_payroll_runs_active_period;")
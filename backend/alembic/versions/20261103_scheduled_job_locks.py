@@ -0,0 +1,29 @@
+"""Add scheduled_job_locks table: per-job run leases for databases without advisory locks.
+
+Revision ID: 20261103_scheduled_job_locks
+Revises: 20261102_payroll_run_active_unique
+Create Date: 2026-11-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261103_scheduled_job_locks'
+down_revision = '20261102_payroll_run_active_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_job_locks (
+            job_name VARCHAR(100) PRIMARY KEY,
+            locked_by VARCHAR(255),
+            lease_until TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS scheduled_job_locks;")
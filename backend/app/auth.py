@@ -15,8 +15,16 @@ from .db import get_session
 from .models import User
 
 # Use pbkdf2_sha256 as the primary hashing scheme (no 72-byte limit). Keep bcrypt
-# as a fallback so existing bcrypt hashes still verify.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+# as a fallback so existing bcrypt hashes still verify. Pinning min/max rounds to the
+# configured work factor makes bcrypt hashes and hashes with other rounds "need update",
+# so logins rehash them (see app.services.auth_crypto).
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256", "bcrypt"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_PBKDF2_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_PBKDF2_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_PBKDF2_ROUNDS,
+)
 security = HTTPBearer()
 # Public security scheme (doesn't auto-error if no token provided)
 public_security = HTTPBearer(auto_error=False)
@@ -58,6 +66,11 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
 def hash_password(plain: str) -> str:
     # bcrypt has a 72-byte input limit. Truncate the UTF-8 bytes to 72 bytes
     # to avoid ValueError on very long passwords (seeded or from env).
@@ -11,6 +11,7 @@ import gc  # For garbage collection
 
 # Import settings from new settings module
 from app.settings import settings
+from app.utils.fast_json import FastJSONResponse
 # Try Starlette's proxy headers middleware first; fallback to Uvicorn's; else disable gracefully
 try:  # Starlette >=0.13
     from starlette.middleware.proxy_headers import ProxyHeadersMiddleware as _ProxyHeadersMiddleware  # type: ignore
@@ -42,6 +43,16 @@ def create_app() -> FastAPI:
         # The app will still serve all endpoints, it just won't initialize database or seed data
         # This allows the startup probe to succeed and the service to become active
         logging.info("[Lifespan] Skipping startup - Cloud Run needs fast startup")
+        # Periodic jobs only create asyncio tasks here (first run is delayed), so startup stays fast
+        if settings.SCHEDULER_ENABLED:
+            try:
+                from app.services.scheduler import get_scheduler
+                get_scheduler().start()
+            except Exception as e:
+                logging.warning(f"[Lifespan] Failed to start background scheduler: {e}")
+        # Fire-and-forget notification rows are group-committed on this loop
+        from app.services.notification_writer import notification_writer
+        notification_writer.start()
         yield
         # Shutdown
         try:
@@ -53,6 +64,8 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.APP_NAME,
         lifespan=lifespan,
+        # orjson rendering for all JSON responses (see app.utils.fast_json)
+        default_response_class=FastJSONResponse,
         # Limit request body size to prevent memory exhaustion
         # 50MB max body size (for file uploads)
         # This prevents large requests from consuming all memory
@@ -86,6 +99,15 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok"}
 
+    # Prometheus scrape endpoint (per-worker, in-process metrics)
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        from fastapi.responses import PlainTextResponse
+        from app.services.metrics import registry
+        if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     # Environment validation endpoint - verify env variables are loaded without exposing secrets
     @app.get("/env-test")
     async def env_test():
@@ -266,6 +288,11 @@ def create_app() -> FastAPI:
                 }
             )
 
+    # Per-route latency, SQL query counts, N+1 detection (registered after the timeout
+    # middleware so it wraps it and also records 504s)
+    from .middleware.instrumentation import instrumentation_middleware
+    app.middleware("http")(instrumentation_middleware)
+
     # Safety net: ensure CORS headers are present on all app responses, including errors
     @app.middleware("http")
     async def add_cors_headers(request: Request, call_next):
@@ -753,26 +780,8 @@ def create_app() -> FastAPI:
             app.state.payments_enabled = False
             logging.warning(f"[Startup] Razorpay warm-up failed: {e}")
 
-        # Supply reminder scheduler disabled for now
-        # This was causing memory issues and has been temporarily disabled
-        # To re-enable, uncomment the code below
-        # try:
-        #     import threading
-        #     def start_scheduler_delayed():
-        #         """Start scheduler after a delay to ensure startup completes"""
-        #         import time
-        #         time.sleep(5)  # Wait 5 seconds after startup
-        #         try:
-        #             from app.services.supply_reminder import start_supply_reminder_scheduler
-        #             start_supply_reminder_scheduler()
-        #             print("[Startup] Supply reminder scheduler started")
-        #         except Exception as e:
-        #             print(f"[Startup] Warning: Failed to start supply reminder scheduler: {e}")
-        #     
-        #     scheduler_thread = threading.Thread(target=start_scheduler_delayed, daemon=True, name="SchedulerStarter")
-        #     scheduler_thread.start()
-        # except Exception as e:
-        #     print(f"[Startup] Warning: Failed to start supply reminder scheduler thread: {e}")
+        # Supply reminders, expired OTP cleanup and offer expiry run on the
+        # background scheduler (app.services.scheduler), started from lifespan()
         
         # Periodic garbage collection to prevent memory accumulation
         # More frequent GC to prevent SSL memory errors
@@ -828,21 +837,45 @@ def create_app() -> FastAPI:
     async def _shutdown(app: FastAPI) -> None:
         """Cleanup on shutdown - ensures all resources are properly released."""
         try:
-            # Close shared Razorpay AsyncClient if present
-            client = getattr(app.state, 'razorpay_async_client', None)
-            if client is not None:
-                try:
-                    await client.aclose()
-                    logging.info("[Shutdown] Razorpay AsyncClient closed")
-                except Exception as e:
-                    logging.warning(f"[Shutdown] Error closing Razorpay AsyncClient: {e}")
-                finally:
-                    try:
-                        delattr(app.state, 'razorpay_async_client')
-                    except Exception:
-                        pass
+            from app.services.scheduler import get_scheduler
+            await get_scheduler().stop()
+        except Exception as e:
+            logging.warning(f"[Shutdown] Error stopping background scheduler: {e}")
+        
+        try:
+            # Store queued WhatsApp events and finish in-flight auto-replies
+            from app.services.whatsapp_ingest import get_whatsapp_ingest_queue
+            await get_whatsapp_ingest_queue().stop()
+        except Exception as e:
+            logging.warning(f"[Shutdown] Error stopping WhatsApp ingest queue: {e}")
+        
+        try:
+            # Write queued in-app notifications
+            from app.services.notification_writer import notification_writer
+            await notification_writer.close()
+        except Exception as e:
+            logging.warning(f"[Shutdown] Error flushing notification writer: {e}")
+        
+        try:
+            # Interrupted payroll runs stop making progress and can be restarted once stale
+            from app.services.payroll import shutdown_payroll_executor
+            shutdown_payroll_executor()
+        except Exception as e:
+            logging.warning(f"[Shutdown] Error stopping payroll run executor: {e}")
+        
+        try:
+            from app.services.auth_crypto import shutdown_hash_executor
+            shutdown_hash_executor()
+        except Exception as e:
+            logging.warning(f"[Shutdown] Error stopping password hash executor: {e}")
+        
+        try:
+            # Close the shared Razorpay AsyncClient
+            from app.razorpay_service import close_async_client
+            await close_async_client()
+            logging.info("[Shutdown] Razorpay AsyncClient closed")
         except Exception as e:
-            logging.warning(f"[Shutdown] Error during Razorpay client cleanup: {e}")
+            logging.warning(f"[Shutdown] Error closing Razorpay AsyncClient: {e}")
         
         try:
             # Shutdown thread pool executor
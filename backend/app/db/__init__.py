@@ -15,6 +15,7 @@ from app.db.session import (
     sync_engine,
     SyncSessionLocal,
     get_db,
+    is_missing_table,
 )
 
 __all__ = [
@@ -27,4 +28,5 @@ __all__ = [
     "sync_engine",
     "SyncSessionLocal",
     "get_db",
+    "is_missing_table",
 ]
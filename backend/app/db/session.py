@@ -13,10 +13,16 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from typing import AsyncGenerator
 import logging
 
 from app.settings import settings
+from app.services.metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,11 +54,18 @@ def _create_async_engine():
     
     logger.info(f"Creating async engine for: {db_url.split('@')[0]}...@{db_url.split('@')[1] if '@' in db_url else 'local'}")
     
+    # SQLite (local dev, benchmarks): aiosqlite uses NullPool, which rejects pool sizing args
+    if db_url.startswith("sqlite"):
+        engine = create_async_engine(db_url, echo=settings.DEBUG, connect_args=connect_args)
+        instrument_engine(engine, "async")
+        return engine
+    
     engine = create_async_engine(
         db_url,
         echo=settings.DEBUG,  # SQL logging only in debug mode
         
-        # Connection Pooling
+        # Connection Pooling (instrumented pool records checkout wait times)
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
         pool_timeout=settings.DB_POOL_TIMEOUT,
@@ -62,6 +75,7 @@ def _create_async_engine():
         # Connect args (prepared statements, app name, etc.)
         connect_args=connect_args,
     )
+    instrument_engine(engine, "async")
     
     return engine
 
@@ -100,6 +114,24 @@ except Exception as e:
     logger.warning(f"[DB] Deferred engine initialization (will retry on first request): {e}")
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Error Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def is_missing_table(exc: BaseException, table: str) -> bool:
+    """True if a database error means `table` doesn't exist (migration not applied).
+
+    Lets optional features fall back for good on a missing table while treating
+    other errors (connection drops, timeouts, lock waits) as transient.
+    """
+    if not isinstance(exc, (ProgrammingError, OperationalError)):
+        return False
+    message = str(exc).lower()
+    return table.lower() in message and any(
+        marker in message for marker in ("does not exist", "no such table", "undefinedtable")
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Database Initialization
 # ─────────────────────────────────────────────────────────────────────────────
@@ -211,6 +243,7 @@ def _create_sync_engine():
     return create_engine(
         sync_url,
         echo=settings.DEBUG,
+        poolclass=InstrumentedQueuePool,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
         pool_timeout=settings.DB_POOL_TIMEOUT,
@@ -221,6 +254,7 @@ def _create_sync_engine():
 
 # Global sync engine (module-level to avoid per-request creation)
 sync_engine = _create_sync_engine()
+instrument_engine(sync_engine, "sync")
 
 # Sync session factory
 SyncSessionLocal = sessionmaker(
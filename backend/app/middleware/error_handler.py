@@ -60,7 +60,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException)
     return JSONResponse(
         status_code=exc.status_code,
         content=create_error_response(message=message, code=code),
-        headers=get_cors_headers(request)
+        # Keep headers set on the exception (Retry-After, WWW-Authenticate)
+        headers={**(exc.headers or {}), **get_cors_headers(request)}
     )
 
 
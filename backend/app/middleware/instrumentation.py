@@ -0,0 +1,74 @@
+"""
+Request Instrumentation Middleware
+
+Times every request, collects its SQL activity (see app.services.metrics) and records
+both under the matched route template (e.g. "/api/admin/bookings/{booking_id}"), so
+per-route metrics don't explode into one series per ID.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from starlette.routing import Match, Route
+
+from app.services.metrics import RequestStats, bind_request_stats, finish_request, reset_request_stats
+from app.settings import settings
+
+# Label for requests that matched no route (404s, scanners) - keeps label cardinality bounded
+UNMATCHED_ROUTE = "unmatched"
+
+# endpoint function -> routes using it, built lazily from app.routes
+_routes_by_endpoint: Optional[Dict[object, List[Route]]] = None
+
+
+def _route_template(request: Request) -> str:
+    global _routes_by_endpoint
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    if _routes_by_endpoint is None:
+        mapping: Dict[object, List[Route]] = {}
+        for route in request.app.routes:
+            route_endpoint = getattr(route, "endpoint", None)
+            if route_endpoint is not None:
+                mapping.setdefault(route_endpoint, []).append(route)
+        _routes_by_endpoint = mapping
+    routes = _routes_by_endpoint.get(endpoint)
+    if not routes:
+        return UNMATCHED_ROUTE
+    if len(routes) == 1:
+        return routes[0].path
+    # Same endpoint mounted on several paths - pick the one that matches this request
+    for route in routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return routes[0].path
+
+
+async def instrumentation_middleware(request: Request, call_next):
+    """Record latency, status and SQL statistics for each request."""
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+
+    stats = RequestStats()
+    token = bind_request_stats(stats)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        if settings.METRICS_SERVER_TIMING:
+            total_ms = (time.perf_counter() - start) * 1000
+            response.headers["Server-Timing"] = (
+                f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.query_count} queries", '
+                f"pool;dur={stats.pool_wait_seconds * 1000:.1f}, app;dur={total_ms:.1f}"
+            )
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        finish_request(stats, request.method, _route_template(request), status_code, elapsed)
+        reset_request_stats(token)
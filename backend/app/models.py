@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, date
 from typing import Optional, List, List
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, DateTime, Date, Text, Float, ForeignKey, Boolean, JSON
+from sqlalchemy import String, Integer, DateTime, Date, Text, Float, ForeignKey, Boolean, JSON, Index, UniqueConstraint, text, event
 from .db import Base
 
 class ProgramParticipant(Base):
@@ -219,6 +219,14 @@ class ItemMedia(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # "My bookings" keyset pages: WHERE user_id = ? AND (start_datetime, id) < (?, ?)
+        Index("ix_bookings_user_start_id", "user_id", "start_datetime", "id"),
+        # Slot conflict checks: space, active status, overlapping [start, end)
+        Index("ix_bookings_space_status_start_end", "space_id", "status", "start_datetime", "end_datetime"),
+        # Admin invoice list keyset pages, newest first
+        Index("ix_bookings_created_id", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     booking_reference: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
     # Optional reference to group related bookings (series)
@@ -259,6 +267,13 @@ class Booking(Base):
 
 class BookingItem(Base):
     __tablename__ = "booking_items"
+    __table_args__ = (
+        Index("ix_booking_items_booking_id", "booking_id"),
+        # Vendor order lists and counts
+        Index("ix_booking_items_vendor_event_supplied", "vendor_id", "event_date", "is_supplyed"),
+        # Supply reminder scan: all vendors' unsupplied items for one event date
+        Index("ix_booking_items_event_supplied", "event_date", "is_supplyed"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     booking_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookings.id"), nullable=False)
     item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"), nullable=False)
@@ -293,8 +308,78 @@ class BookingItem(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class VendorSettlementDaily(Base):
+    """Supplied booking items per vendor, day and item, by settlement state (see app.services.settlement_rollup).
+
+    The day is when the item was settled (settled items) or supplied (everything else).
+    Quantities, not amounts, are stored: amounts use the item's current vendor_price,
+    like the itemized summary does.
+    """
+    __tablename__ = "vendor_settlement_daily"
+
+    vendor_id: Mapped[int] = mapped_column(Integer, ForeignKey("vendor_profiles.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    settled_items: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    settled_quantity: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Supplied, verified by admin, not yet settled
+    verified_items: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    verified_quantity: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Supplied, not yet verified or settled
+    unverified_items: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    unverified_quantity: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_vendor_settlement_daily_day", "day"),
+    )
+
+
+class BrokerSettlementDaily(Base):
+    """Bookings with brokerage per broker and booking day (see app.services.settlement_rollup)"""
+    __tablename__ = "broker_settlement_daily"
+
+    broker_id: Mapped[int] = mapped_column(Integer, ForeignKey("broker_profiles.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    bookings: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    brokerage: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
+    settled_bookings: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    settled_brokerage: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_broker_settlement_daily_day", "day"),
+    )
+
+
+def _register_settlement_rollup(model, kind: str) -> None:
+    # Same transaction as the write, so the rollups can't drift from the source rows
+    def _apply(connection, target, old: bool, new: bool) -> None:
+        from app.services.rollup_lock import lock_rollup_sync
+        from app.services.settlement_rollup import ROLLUP_TABLES, rollup_delta, source_values
+
+        old_values = source_values(kind, target, previous=True) if old else None
+        new_values = source_values(kind, target) if new else None
+        statements = rollup_delta(kind, connection.dialect.name, old_values, new_values)
+        if statements:
+            lock_rollup_sync(connection, ROLLUP_TABLES[kind])  # Wait out a running rebuild
+        for stmt in statements:
+            connection.execute(stmt)
+
+    event.listen(model, "after_insert", lambda mapper, connection, target: _apply(connection, target, False, True))
+    event.listen(model, "after_update", lambda mapper, connection, target: _apply(connection, target, True, True))
+    event.listen(model, "after_delete", lambda mapper, connection, target: _apply(connection, target, True, False))
+
+
+_register_settlement_rollup(Booking, "broker")
+_register_settlement_rollup(BookingItem, "vendor")
+
+
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_booking_status", "booking_id", "status"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     booking_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("bookings.id"), nullable=True)
     amount: Mapped[float] = mapped_column(Float, nullable=False)
@@ -312,6 +397,13 @@ class Payment(Base):
 
 class Refund(Base):
     __tablename__ = "refunds"
+    __table_args__ = (
+        # Latest refund per booking
+        Index("ix_refunds_booking_created", "booking_id", "created_at"),
+        # Admin refund list: keyset pages and date windows, with or without a status filter
+        Index("ix_refunds_created_id", "created_at", "id"),
+        Index("ix_refunds_status_created_id", "status", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     booking_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookings.id"), nullable=False)
     amount: Mapped[float] = mapped_column(Float, nullable=False)
@@ -329,6 +421,9 @@ class Refund(Base):
 
 class BookingEvent(Base):
     __tablename__ = "booking_events"
+    __table_args__ = (
+        Index("ix_booking_events_booking_to_status", "booking_id", "to_status"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     booking_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookings.id"), nullable=False)
     actor_user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
@@ -371,8 +466,16 @@ class GalleryImage(Base):
 
 
 # --- WhatsApp Integration ---
+# Length of the last-message preview kept on WhatsAppConversation
+WHATSAPP_PREVIEW_CHARS = 100
+
+
 class WhatsAppConversation(Base):
     __tablename__ = "whatsapp_conversations"
+    __table_args__ = (
+        Index("ix_whatsapp_conversations_status_last_message_at", "status", "last_message_at"),
+        Index("ix_whatsapp_conversations_last_message_at", "last_message_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
@@ -380,12 +483,46 @@ class WhatsAppConversation(Base):
     session_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     status: Mapped[str] = mapped_column(String(32), default="active")  # active|closed|archived
     last_message_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Inbox summary, maintained on message insert (see whatsapp_summary_update)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Inbound since an admin last opened it
+    last_message_preview: Mapped[Optional[str]] = mapped_column(String(WHATSAPP_PREVIEW_CHARS), nullable=True)
+    last_direction: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)  # inbound|outbound
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+def whatsapp_summary_update(conversation_id: int, messages: int, inbound: int, last_text: Optional[str],
+                            last_direction: str, last_at: datetime):
+    """UPDATE that folds newly inserted messages into a conversation's inbox summary."""
+    t = WhatsAppConversation.__table__
+    return (
+        t.update()
+        .where(t.c.id == conversation_id)
+        .values(
+            message_count=t.c.message_count + messages,
+            unread_count=t.c.unread_count + inbound,
+            last_message_preview=(last_text or "")[:WHATSAPP_PREVIEW_CHARS],
+            last_direction=last_direction,
+            last_message_at=last_at,
+        )
+    )
+
+
+# Inbound messages are unique per provider id (webhook retries are dropped on insert)
+WHATSAPP_INBOUND_PROVIDER_ID_WHERE = "direction = 'inbound' AND provider_message_id IS NOT NULL AND provider_message_id <> ''"
+
+
 class WhatsAppMessage(Base):
     __tablename__ = "whatsapp_messages"
+    __table_args__ = (
+        Index(
+            "uq_whatsapp_messages_inbound_provider_id", "provider_message_id", unique=True,
+            postgresql_where=text(WHATSAPP_INBOUND_PROVIDER_ID_WHERE),
+            sqlite_where=text(WHATSAPP_INBOUND_PROVIDER_ID_WHERE),
+        ),
+        Index("ix_whatsapp_messages_conversation_created", "conversation_id", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     conversation_id: Mapped[int] = mapped_column(Integer, ForeignKey("whatsapp_conversations.id"), nullable=False)
@@ -398,6 +535,54 @@ class WhatsAppMessage(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class WhatsAppDailyStat(Base):
+    """Per-day (UTC) WhatsApp counters backing the admin stats view (see app.services.whatsapp_stats)"""
+    __tablename__ = "whatsapp_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    conversations_created: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Conversations created on this day that are no longer 'active' (closed/archived)
+    conversations_inactive: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    messages_inbound: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    messages_outbound: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    auto_replies: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+@event.listens_for(WhatsAppMessage, "after_insert")
+def _update_conversation_summary(mapper, connection, target: WhatsAppMessage) -> None:
+    # Same transaction as the INSERT, so the summary and daily stats can't drift from the messages.
+    # Core bulk inserts (app.services.whatsapp_ingest) apply both updates themselves.
+    from app.services.rollup_lock import WHATSAPP_DAILY_STATS, lock_rollup_sync
+    from app.services.whatsapp_stats import daily_stats_upsert, is_auto_reply
+
+    connection.execute(whatsapp_summary_update(
+        target.conversation_id, 1, 1 if target.direction == "inbound" else 0,
+        target.text_content, target.direction, target.created_at,
+    ))
+    inbound = target.direction == "inbound"
+    lock_rollup_sync(connection, WHATSAPP_DAILY_STATS)  # Wait out a running rebuild
+    connection.execute(daily_stats_upsert(
+        connection.dialect.name, (target.created_at or datetime.utcnow()).date(),
+        messages_inbound=1 if inbound else 0,
+        messages_outbound=0 if inbound else 1,
+        auto_replies=1 if not inbound and is_auto_reply(target.message_metadata) else 0,
+    ))
+
+
+@event.listens_for(WhatsAppConversation, "after_insert")
+def _count_new_conversation(mapper, connection, target: WhatsAppConversation) -> None:
+    from app.services.rollup_lock import WHATSAPP_DAILY_STATS, lock_rollup_sync
+    from app.services.whatsapp_stats import daily_stats_upsert
+
+    lock_rollup_sync(connection, WHATSAPP_DAILY_STATS)
+    connection.execute(daily_stats_upsert(
+        connection.dialect.name, (target.created_at or datetime.utcnow()).date(),
+        conversations_created=1,
+        conversations_inactive=0 if (target.status or "active") == "active" else 1,
+    ))
+
+
 class WhatsAppKeywordResponse(Base):
     __tablename__ = "whatsapp_keyword_responses"
     
@@ -458,6 +643,9 @@ class Staff(Base):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     phone: Mapped[str] = mapped_column(String(32), nullable=False)
     date_of_birth: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    # Day of year of the birthday on a leap-year calendar (Feb 29 = 60, Mar 1 = 61 every year),
+    # kept in sync with date_of_birth; lets the HR dashboard range-scan upcoming birthdays
+    birthday_doy: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     address: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     aadhar_number: Mapped[Optional[str]] = mapped_column(String(20), nullable=True, unique=True)
     pan_number: Mapped[Optional[str]] = mapped_column(String(20), nullable=True, unique=True)
@@ -494,6 +682,23 @@ class Staff(Base):
     payrolls: Mapped[List["Payroll"]] = relationship("Payroll", back_populates="staff")
     attendance_otps: Mapped[List["AttendanceOTP"]] = relationship("AttendanceOTP", back_populates="staff")
 
+    __table_args__ = (
+        Index("ix_staff_active_birthday_doy", "is_active", "birthday_doy"),
+    )
+
+
+def birthday_day_of_year(value: Optional[date]) -> Optional[int]:
+    """Day of year of `value`'s month/day in a leap year, so every birthday has one fixed number."""
+    if value is None:
+        return None
+    return date(2000, value.month, value.day).timetuple().tm_yday
+
+
+@event.listens_for(Staff, "before_insert")
+@event.listens_for(Staff, "before_update")
+def _sync_birthday_doy(mapper, connection, target: Staff) -> None:
+    target.birthday_doy = birthday_day_of_year(target.date_of_birth)
+
 
 class StaffDocument(Base):
     __tablename__ = "staff_documents"
@@ -554,6 +759,61 @@ class Attendance(Base):
     corrected_by: Mapped[Optional["User"]] = relationship("User", foreign_keys=[corrected_by_user_id])
 
 
+class AttendanceMonthly(Base):
+    """Per-staff, per-month attendance totals, maintained on every attendance write (see app.services.attendance_rollup)"""
+    __tablename__ = "attendance_monthly"
+
+    staff_id: Mapped[int] = mapped_column(Integer, ForeignKey("staff.id", ondelete="CASCADE"), primary_key=True)
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    record_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    present_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    absent_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    half_day_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    leave_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    holiday_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    total_hours: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
+    overtime_hours: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_attendance_monthly_period", "year", "month"),
+    )
+
+
+def _apply_attendance_rollup(connection, old_values, new_values) -> None:
+    # Same transaction as the attendance write, so the rollup can't drift from it
+    from app.services.attendance_rollup import attendance_rollup_delta
+    from app.services.rollup_lock import ATTENDANCE_MONTHLY, lock_rollup_sync
+
+    statements = attendance_rollup_delta(connection.dialect.name, old_values, new_values)
+    if statements:
+        lock_rollup_sync(connection, ATTENDANCE_MONTHLY)  # Wait out a running rebuild
+    for stmt in statements:
+        connection.execute(stmt)
+
+
+@event.listens_for(Attendance, "after_insert")
+def _rollup_attendance_insert(mapper, connection, target: Attendance) -> None:
+    from app.services.attendance_rollup import attendance_values
+
+    _apply_attendance_rollup(connection, None, attendance_values(target))
+
+
+@event.listens_for(Attendance, "after_update")
+def _rollup_attendance_update(mapper, connection, target: Attendance) -> None:
+    from app.services.attendance_rollup import attendance_values
+
+    _apply_attendance_rollup(connection, attendance_values(target, previous=True), attendance_values(target))
+
+
+@event.listens_for(Attendance, "after_delete")
+def _rollup_attendance_delete(mapper, connection, target: Attendance) -> None:
+    from app.services.attendance_rollup import attendance_values
+
+    _apply_attendance_rollup(connection, attendance_values(target, previous=True), None)
+
+
 class Leave(Base):
     __tablename__ = "leaves"
     
@@ -633,6 +893,46 @@ class Payroll(Base):
     # Relationships
     staff: Mapped["Staff"] = relationship("Staff", back_populates="payrolls")
 
+    __table_args__ = (
+        # One payroll per staff per month; batch runs upsert on this key
+        UniqueConstraint("staff_id", "month", "year", name="uq_payroll_staff_period"),
+    )
+
+
+# At most one pending/running payroll run per month
+PAYROLL_RUN_ACTIVE_WHERE = "status IN ('pending', 'running')"
+
+
+class PayrollRun(Base):
+    """A batch payroll calculation for all (or selected) staff for one month (see app.services.payroll)"""
+    __tablename__ = "payroll_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    month: Mapped[int] = mapped_column(Integer, nullable=False)
+    year: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")  # pending|running|completed|failed
+    total_staff: Mapped[int] = mapped_column(Integer, default=0)
+    processed_count: Mapped[int] = mapped_column(Integer, default=0)
+    succeeded_count: Mapped[int] = mapped_column(Integer, default=0)
+    skipped_count: Mapped[int] = mapped_column(Integer, default=0)  # Locked payrolls are left untouched
+    failed_count: Mapped[int] = mapped_column(Integer, default=0)
+    errors: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # [{staff_id, error}]
+    staff_ids: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # None = all active staff
+    started_by_user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_payroll_runs_period", "year", "month"),
+        Index(
+            "uq_payroll_runs_active_period", "year", "month", unique=True,
+            postgresql_where=text(PAYROLL_RUN_ACTIVE_WHERE),
+            sqlite_where=text(PAYROLL_RUN_ACTIVE_WHERE),
+        ),
+    )
+
 
 class Office(Base):
     __tablename__ = "offices"
@@ -968,4 +1268,50 @@ class UserEventDate(Base):
     
     # Metadata
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# --- Background Scheduler ---
+class ScheduledJobRun(Base):
+    """Run history for periodic background jobs (see app.services.scheduler)"""
+    __tablename__ = "scheduled_job_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_name: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="running")  # running|success|failed|timeout
+    worker: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment="host:pid of the worker that ran the job")
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class ScheduledJobLock(Base):
+    """Per-job run lease for dialects without advisory locks (see app.services.scheduler)"""
+    __tablename__ = "scheduled_job_locks"
+
+    job_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment="host:pid of the worker holding the lease")
+    lease_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CacheVersion(Base):
+    """Shared version counters for in-process response caches (e.g. the public catalog)"""
+    __tablename__ = "cache_versions"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ServiceToken(Base):
+    """Third-party API access tokens shared by all workers (e.g. the Route Mobile login token)"""
+    __tablename__ = "service_tokens"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    token: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    issued_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    lease_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, comment="Set while one worker logs in")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -7,7 +7,7 @@ from __future__ import annotations
 from datetime import datetime, date, time
 from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, DateTime, Date, Time, Text, Float, ForeignKey, Boolean, DECIMAL
+from sqlalchemy import String, Integer, DateTime, Date, Time, Text, Float, ForeignKey, Boolean, DECIMAL, UniqueConstraint
 
 from .db import Base
 
@@ -75,6 +75,9 @@ class EventSchedule(Base):
     Tracks ticket sales and availability per occurrence.
     """
     __tablename__ = "event_schedules"
+    __table_args__ = (
+        UniqueConstraint("event_definition_id", "schedule_date", "start_time", name="unique_event_schedule"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     
@@ -92,6 +95,7 @@ class EventSchedule(Base):
     # Capacity for this specific occurrence
     max_tickets: Mapped[int] = mapped_column(Integer, nullable=False)
     tickets_sold: Mapped[int] = mapped_column(Integer, default=0)
+    tickets_held: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Active payment holds (see TicketHold)
     
     # Pricing override (if different from default)
     ticket_price: Mapped[Optional[float]] = mapped_column(DECIMAL(10, 2), nullable=True)
@@ -111,8 +115,8 @@ class EventSchedule(Base):
     
     @property
     def tickets_available(self) -> int:
-        """Calculate available tickets."""
-        return self.max_tickets - self.tickets_sold
+        """Calculate available tickets (sold and held tickets both count against capacity)."""
+        return self.max_tickets - (self.tickets_sold or 0) - (self.tickets_held or 0)
     
     @property
     def effective_price(self) -> float:
@@ -147,3 +151,26 @@ class TicketType(Base):
     
     # Relationships
     event_definition: Mapped["EventDefinition"] = relationship("EventDefinition", back_populates="ticket_types")
+
+
+class TicketHold(Base):
+    """Ticket reservation of a booking on an event schedule.
+
+    Held quantities are counted in `event_schedules.tickets_held`, so a hold reserves
+    capacity without selling it. Holds are confirmed into `tickets_sold` when the booking
+    is created, returned when it is cancelled or rejected, or released/expired back to
+    the pool while still active.
+    """
+    __tablename__ = "ticket_holds"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    schedule_id: Mapped[int] = mapped_column(Integer, ForeignKey("event_schedules.id", ondelete="CASCADE"), nullable=False, index=True)
+    booking_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("bookings.id", ondelete="SET NULL"), nullable=True, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default='active')  # 'active', 'confirmed', 'released', 'expired', 'returned'
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -4,7 +4,9 @@ Supports: Email, SMS, In-App, and WhatsApp notifications
 """
 from __future__ import annotations
 
+import asyncio
 import smtplib
+from functools import partial
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
@@ -13,6 +15,8 @@ from datetime import datetime
 from .core import settings
 from .models import User, Booking, Space, Venue, BookingItem, Item, VendorProfile
 from .services.whatsapp_route_mobile import RouteMobileWhatsAppClient
+from .services.notification_fanout import EMAIL, WHATSAPP, Delivery, fan_out, summarize
+from .services.notification_writer import IN_APP_NOTIFICATIONS, notification_writer, write_notifications
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -470,8 +474,12 @@ class NotificationService:
     ):
         """Send vendor notifications after successful payment.
         
-        Groups booking items by vendor and sends separate notifications to each vendor.
-        Items without vendors are sent to admin.
+        Groups booking items by vendor and sends one WhatsApp + one email per vendor,
+        listing all of that vendor's items. Items without vendors are sent to admin.
+        All sends run concurrently through services.notification_fanout, bounded per channel.
+        
+        Returns one result dict per send (channel, recipient, target, ok, error, elapsed_ms)
+        for auditing; an empty list if nothing was sent.
         
         Template format (vendor):
         {{1}} = Vendor name
@@ -499,7 +507,7 @@ class NotificationService:
             
             if not rows:
                 print(f"[NOTIFICATION] No booking items found for booking {booking.id}")
-                return
+                return []
             
             # Group items by vendor_id (None for items without vendor)
             vendor_items_map: dict[Optional[int], list[tuple[BookingItem, Item, Optional[VendorProfile], Optional[User]]]] = defaultdict(list)
@@ -521,33 +529,13 @@ class NotificationService:
             # Format delivery location
             delivery_location = f"{space.name}, {venue.city or venue.name or 'Location'}"
             
-            # Send notifications to each vendor
+            # One message per vendor and channel, all sent concurrently (bounded per channel)
+            deliveries: list[Delivery] = []
             for vendor_id, items_list in vendor_items_map.items():
                 if not items_list:
                     continue
                 
-                # Format items list
-                items_lines = []
-                total_amount = 0.0
-                item_num = 1
-                
-                for bi, item, vp, vendor_user in items_list:
-                    item_name = item.name if item else f"Item {bi.id}"
-                    quantity = bi.quantity
-                    category = getattr(item, 'category', 'Standard') if item else 'Standard'
-                    unit_price = float(bi.unit_price or 0)
-                    item_total = float(bi.total_price or (unit_price * quantity))
-                    total_amount += item_total
-                    
-                    # Format: "1. Flower Decoration – 10 sets – Premium – ₹2,000 – ₹20,000"
-                    items_lines.append(
-                        f"{item_num}. {item_name} – {quantity} sets – {category} – ₹{int(unit_price):,} – ₹{int(item_total):,}"
-                    )
-                    item_num += 1
-                
-                # Join items with space separator (as per template example)
-                items_text = " ".join(items_lines)
-                total_amount_str = f"₹{int(total_amount):,}"
+                items_text, total_amount_str = NotificationService._vendor_items_text(items_list)
                 
                 if vendor_id:
                     # Send to vendor
@@ -558,121 +546,93 @@ class NotificationService:
                         print(f"[NOTIFICATION] Vendor user not found for vendor_id {vendor_id}")
                         continue
                     
-                    vendor_name = f"{vendor_user.first_name} {vendor_user.last_name}".strip() or vendor_user.username or "Vendor"
-                    vendor_mobile = vendor_user.mobile
-                    vendor_email = vp.contact_email if vp and vp.contact_email else vendor_user.username
-                    
-                    # Send WhatsApp
-                    if vendor_mobile:
-                        try:
-                            rm_client = RouteMobileWhatsAppClient()
-                            to = NotificationService._normalize_phone_number(vendor_mobile)
-                            if to:
-                                variables = [
-                                    vendor_name,  # {{1}}
-                                    delivery_date,  # {{2}}
-                                    delivery_time,  # {{3}}
-                                    delivery_location,  # {{4}}
-                                    items_text,  # {{5}}
-                                    total_amount_str,  # {{6}}
-                                ]
-                                
-                                res = await rm_client.send_template(
-                                    to_mobile=to,
-                                    template_name="vendor",
-                                    language="en",
-                                    body_parameters=variables,
-                                )
-                                
-                                if res.get('ok'):
-                                    print(f"[NOTIFICATION] ✓ Vendor WhatsApp sent to {vendor_name} ({to})")
-                                else:
-                                    print(f"[NOTIFICATION] ✗ Vendor WhatsApp failed for {vendor_name}: {res}")
-                        except Exception as wa_error:
-                            print(f"[NOTIFICATION] Vendor WhatsApp error: {wa_error}")
-                    
-                    # Send Email
-                    if vendor_email:
-                        try:
-                            await NotificationService._send_vendor_delivery_email(
-                                vendor_email=vendor_email,
-                                vendor_name=vendor_name,
-                                delivery_date=delivery_date,
-                                delivery_time=delivery_time,
-                                delivery_location=delivery_location,
-                                items_text=items_text,
-                                total_amount=total_amount_str,
-                                booking_reference=booking.booking_reference
-                            )
-                            print(f"[NOTIFICATION] ✓ Vendor email sent to {vendor_email}")
-                        except Exception as email_error:
-                            print(f"[NOTIFICATION] Vendor email error: {email_error}")
+                    recipient = f"vendor:{vendor_id}"
+                    name = f"{vendor_user.first_name} {vendor_user.last_name}".strip() or vendor_user.username or "Vendor"
+                    mobile = vendor_user.mobile
+                    email = vp.contact_email if vp and vp.contact_email else vendor_user.username
+                    is_admin = False
                 else:
-                    # Send to admin (items without vendor)
-                    try:
-                        # Get first admin user
-                        admin_stmt = select(User).where(User.role == 'admin').limit(1)
-                        admin_rs = await session.execute(admin_stmt)
-                        admin_user = admin_rs.scalar_one_or_none()
-                        
-                        if admin_user:
-                            admin_name = f"{admin_user.first_name} {admin_user.last_name}".strip() or admin_user.username or "Admin"
-                            admin_mobile = admin_user.mobile
-                            admin_email = admin_user.username
-                            
-                            # Send WhatsApp to admin
-                            if admin_mobile:
-                                try:
-                                    rm_client = RouteMobileWhatsAppClient()
-                                    to = NotificationService._normalize_phone_number(admin_mobile)
-                                    if to:
-                                        variables = [
-                                            admin_name,  # {{1}}
-                                            delivery_date,  # {{2}}
-                                            delivery_time,  # {{3}}
-                                            delivery_location,  # {{4}}
-                                            items_text,  # {{5}}
-                                            total_amount_str,  # {{6}}
-                                        ]
-                                        
-                                        res = await rm_client.send_template(
-                                            to_mobile=to,
-                                            template_name="vendor",
-                                            language="en",
-                                            body_parameters=variables,
-                                        )
-                                        
-                                        if res.get('ok'):
-                                            print(f"[NOTIFICATION] ✓ Admin WhatsApp sent for unassigned items ({to})")
-                                        else:
-                                            print(f"[NOTIFICATION] ✗ Admin WhatsApp failed: {res}")
-                                except Exception as wa_error:
-                                    print(f"[NOTIFICATION] Admin WhatsApp error: {wa_error}")
-                            
-                            # Send Email to admin
-                            if admin_email:
-                                try:
-                                    await NotificationService._send_vendor_delivery_email(
-                                        vendor_email=admin_email,
-                                        vendor_name=admin_name,
-                                        delivery_date=delivery_date,
-                                        delivery_time=delivery_time,
-                                        delivery_location=delivery_location,
-                                        items_text=items_text,
-                                        total_amount=total_amount_str,
-                                        booking_reference=booking.booking_reference,
-                                        is_admin=True
-                                    )
-                                    print(f"[NOTIFICATION] ✓ Admin email sent for unassigned items to {admin_email}")
-                                except Exception as email_error:
-                                    print(f"[NOTIFICATION] Admin email error: {email_error}")
-                        else:
-                            print(f"[NOTIFICATION] No admin user found to notify for unassigned items")
-                    except Exception as admin_error:
-                        print(f"[NOTIFICATION] Error sending admin notification: {admin_error}")
-                        
+                    # Send to admin (items without vendor); first admin user
+                    admin_rs = await session.execute(select(User).where(User.role == 'admin').limit(1))
+                    admin_user = admin_rs.scalar_one_or_none()
+                    if not admin_user:
+                        print(f"[NOTIFICATION] No admin user found to notify for unassigned items")
+                        continue
+                    
+                    recipient = "admin"
+                    name = f"{admin_user.first_name} {admin_user.last_name}".strip() or admin_user.username or "Admin"
+                    mobile = admin_user.mobile
+                    email = admin_user.username
+                    is_admin = True
+                
+                to = NotificationService._normalize_phone_number(mobile) if mobile else ""
+                if to:
+                    variables = [
+                        name,  # {{1}}
+                        delivery_date,  # {{2}}
+                        delivery_time,  # {{3}}
+                        delivery_location,  # {{4}}
+                        items_text,  # {{5}}
+                        total_amount_str,  # {{6}}
+                    ]
+                    deliveries.append(Delivery(WHATSAPP, recipient, to, partial(
+                        RouteMobileWhatsAppClient().send_template,
+                        to_mobile=to,
+                        template_name="vendor",
+                        language="en",
+                        body_parameters=variables,
+                    )))
+                
+                if email:
+                    if not settings.SMTP_HOST:
+                        print(f"[NOTIFICATION] Email not configured. Would send vendor delivery email to {email}")
+                    else:
+                        subject, html_content = NotificationService._vendor_delivery_email_content(
+                            vendor_name=name,
+                            delivery_date=delivery_date,
+                            delivery_time=delivery_time,
+                            delivery_location=delivery_location,
+                            items_text=items_text,
+                            total_amount=total_amount_str,
+                            booking_reference=booking.booking_reference,
+                            is_admin=is_admin,
+                        )
+                        deliveries.append(Delivery(EMAIL, recipient, email, partial(
+                            NotificationService._send_email, email, subject, html_content
+                        )))
+            
+            results = await fan_out(deliveries)
+            summary = summarize(results)
+            print(
+                f"[NOTIFICATION] Vendor notifications for booking {booking.id}: "
+                f"{summary['sent']} sent, {summary['failed']} failed across {len(vendor_items_map)} recipient(s)"
+            )
+            return [r.as_dict() for r in results]
+            
         except Exception as e:
             print(f"[NOTIFICATION] Error sending vendor notifications after payment: {e}")
+            return []
+    
+    @staticmethod
+    def _vendor_items_text(items_list: list) -> tuple[str, str]:
+        """(items text, total amount) for the vendor template's {{5}} and {{6}}"""
+        items_lines = []
+        total_amount = 0.0
+        for item_num, (bi, item, vp, vendor_user) in enumerate(items_list, start=1):
+            item_name = item.name if item else f"Item {bi.id}"
+            quantity = bi.quantity
+            category = getattr(item, 'category', 'Standard') if item else 'Standard'
+            unit_price = float(bi.unit_price or 0)
+            item_total = float(bi.total_price or (unit_price * quantity))
+            total_amount += item_total
+            
+            # Format: "1. Flower Decoration – 10 sets – Premium – ₹2,000 – ₹20,000"
+            items_lines.append(
+                f"{item_num}. {item_name} – {quantity} sets – {category} – ₹{int(unit_price):,} – ₹{int(item_total):,}"
+            )
+        
+        # Join items with space separator (as per template example)
+        return " ".join(items_lines), f"₹{int(total_amount):,}"
     
     @staticmethod
     async def _send_vendor_delivery_email(
@@ -692,127 +652,151 @@ class NotificationService:
                 print(f"[NOTIFICATION] Email not configured. Would send vendor delivery email to {vendor_email}")
                 return
             
-            recipient_type = "Admin" if is_admin else "Vendor"
-            subject = f"Delivery Request - Booking {booking_reference}"
+            subject, html_content = NotificationService._vendor_delivery_email_content(
+                vendor_name=vendor_name,
+                delivery_date=delivery_date,
+                delivery_time=delivery_time,
+                delivery_location=delivery_location,
+                items_text=items_text,
+                total_amount=total_amount,
+                booking_reference=booking_reference,
+                is_admin=is_admin,
+            )
+            await NotificationService._send_email(vendor_email, subject, html_content)
             
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Delivery Request - LeBRQ</title>
-            </head>
-            <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif; background-color: #f7f9f8;">
-                <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f7f9f8; padding: 40px 20px;">
-                    <tr>
-                        <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.07); overflow: hidden;">
-                                
-                                <!-- Header -->
-                                <tr>
-                                    <td style="background: linear-gradient(135deg, #2D5016 0%, #3d6b1f 100%); padding: 40px 30px; text-align: center;">
-                                        <h1 style="color: #ffffff; margin: 0; font-size: 28px; font-weight: 700;">Delivery Request</h1>
-                                        <p style="color: #e6f7e6; margin: 8px 0 0 0; font-size: 14px;">Booking Reference: {booking_reference}</p>
-                                    </td>
-                                </tr>
-                                
-                                <!-- Main Content -->
-                                <tr>
-                                    <td style="padding: 40px 30px;">
-                                        <p style="color: #1f2937; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
-                                            Dear <strong>{vendor_name}</strong>,
-                                        </p>
-                                        <p style="color: #4b5563; font-size: 15px; line-height: 1.7; margin: 0 0 30px 0;">
-                                            Please deliver the following items:
-                                        </p>
-                                        
-                                        <!-- Delivery Details Card -->
-                                        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f9fafb; border: 2px solid #e5e7eb; border-radius: 10px; margin: 0 0 30px 0;">
+        except Exception as e:
+            print(f"[NOTIFICATION] Error sending vendor delivery email: {e}")
+    
+    @staticmethod
+    def _vendor_delivery_email_content(
+        vendor_name: str,
+        delivery_date: str,
+        delivery_time: str,
+        delivery_location: str,
+        items_text: str,
+        total_amount: str,
+        booking_reference: str,
+        is_admin: bool = False
+    ) -> tuple[str, str]:
+        """(subject, html) of the delivery request email to a vendor or admin"""
+        recipient_type = "Admin" if is_admin else "Vendor"
+        subject = f"Delivery Request - Booking {booking_reference}"
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Delivery Request - LeBRQ</title>
+        </head>
+        <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif; background-color: #f7f9f8;">
+            <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f7f9f8; padding: 40px 20px;">
+                <tr>
+                    <td align="center">
+                        <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.07); overflow: hidden;">
+                            
+                            <!-- Header -->
+                            <tr>
+                                <td style="background: linear-gradient(135deg, #2D5016 0%, #3d6b1f 100%); padding: 40px 30px; text-align: center;">
+                                    <h1 style="color: #ffffff; margin: 0; font-size: 28px; font-weight: 700;">Delivery Request</h1>
+                                    <p style="color: #e6f7e6; margin: 8px 0 0 0; font-size: 14px;">Booking Reference: {booking_reference}</p>
+                                </td>
+                            </tr>
+                            
+                            <!-- Main Content -->
+                            <tr>
+                                <td style="padding: 40px 30px;">
+                                    <p style="color: #1f2937; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
+                                        Dear <strong>{vendor_name}</strong>,
+                                    </p>
+                                    <p style="color: #4b5563; font-size: 15px; line-height: 1.7; margin: 0 0 30px 0;">
+                                        Please deliver the following items:
+                                    </p>
+                                    
+                                    <!-- Delivery Details Card -->
+                                    <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f9fafb; border: 2px solid #e5e7eb; border-radius: 10px; margin: 0 0 30px 0;">
+                                        <tr>
+                                            <td style="padding: 25px;">
+                                                <table width="100%" cellpadding="8" cellspacing="0">
+                                                    <tr>
+                                                        <td style="color: #6b7280; font-size: 14px; width: 160px; vertical-align: top;">
+                                                            <strong>Delivery Date:</strong>
+                                                        </td>
+                                                        <td style="color: #1f2937; font-size: 14px; font-weight: 600;">
+                                                            {delivery_date}
+                                                        </td>
+                                                    </tr>
+                                                    <tr>
+                                                        <td style="color: #6b7280; font-size: 14px; padding-top: 12px;">
+                                                            <strong>Delivery Time:</strong>
+                                                        </td>
+                                                        <td style="color: #1f2937; font-size: 14px; padding-top: 12px;">
+                                                            {delivery_time}
+                                                        </td>
+                                                    </tr>
+                                                    <tr>
+                                                        <td style="color: #6b7280; font-size: 14px; padding-top: 12px;">
+                                                            <strong>Delivery Location:</strong>
+                                                        </td>
+                                                        <td style="color: #1f2937; font-size: 14px; padding-top: 12px;">
+                                                            {delivery_location}
+                                                        </td>
+                                                    </tr>
+                                                </table>
+                                            </td>
+                                        </tr>
+                                    </table>
+                                    
+                                    <!-- Items List -->
+                                    <div style="background-color: #f9fafb; border-left: 4px solid #2D5016; padding: 20px; border-radius: 6px; margin: 0 0 30px 0;">
+                                        <h3 style="color: #2D5016; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;">Items:</h3>
+                                        <p style="color: #1f2937; font-size: 14px; line-height: 1.8; margin: 0; white-space: pre-line;">{items_text}</p>
+                                    </div>
+                                    
+                                    <!-- Total Amount -->
+                                    <div style="background-color: #d1fae5; border: 2px solid #10B981; border-radius: 10px; padding: 20px; margin: 0 0 30px 0;">
+                                        <table width="100%" cellpadding="0" cellspacing="0">
                                             <tr>
-                                                <td style="padding: 25px;">
-                                                    <table width="100%" cellpadding="8" cellspacing="0">
-                                                        <tr>
-                                                            <td style="color: #6b7280; font-size: 14px; width: 160px; vertical-align: top;">
-                                                                <strong>Delivery Date:</strong>
-                                                            </td>
-                                                            <td style="color: #1f2937; font-size: 14px; font-weight: 600;">
-                                                                {delivery_date}
-                                                            </td>
-                                                        </tr>
-                                                        <tr>
-                                                            <td style="color: #6b7280; font-size: 14px; padding-top: 12px;">
-                                                                <strong>Delivery Time:</strong>
-                                                            </td>
-                                                            <td style="color: #1f2937; font-size: 14px; padding-top: 12px;">
-                                                                {delivery_time}
-                                                            </td>
-                                                        </tr>
-                                                        <tr>
-                                                            <td style="color: #6b7280; font-size: 14px; padding-top: 12px;">
-                                                                <strong>Delivery Location:</strong>
-                                                            </td>
-                                                            <td style="color: #1f2937; font-size: 14px; padding-top: 12px;">
-                                                                {delivery_location}
-                                                            </td>
-                                                        </tr>
-                                                    </table>
+                                                <td style="color: #065f46; font-size: 18px; font-weight: 700;">
+                                                    Total Amount:
+                                                </td>
+                                                <td align="right" style="color: #065f46; font-size: 24px; font-weight: 700;">
+                                                    {total_amount}
                                                 </td>
                                             </tr>
                                         </table>
-                                        
-                                        <!-- Items List -->
-                                        <div style="background-color: #f9fafb; border-left: 4px solid #2D5016; padding: 20px; border-radius: 6px; margin: 0 0 30px 0;">
-                                            <h3 style="color: #2D5016; margin: 0 0 15px 0; font-size: 18px; font-weight: 700;">Items:</h3>
-                                            <p style="color: #1f2937; font-size: 14px; line-height: 1.8; margin: 0; white-space: pre-line;">{items_text}</p>
-                                        </div>
-                                        
-                                        <!-- Total Amount -->
-                                        <div style="background-color: #d1fae5; border: 2px solid #10B981; border-radius: 10px; padding: 20px; margin: 0 0 30px 0;">
-                                            <table width="100%" cellpadding="0" cellspacing="0">
-                                                <tr>
-                                                    <td style="color: #065f46; font-size: 18px; font-weight: 700;">
-                                                        Total Amount:
-                                                    </td>
-                                                    <td align="right" style="color: #065f46; font-size: 24px; font-weight: 700;">
-                                                        {total_amount}
-                                                    </td>
-                                                </tr>
-                                            </table>
-                                        </div>
-                                        
-                                        <p style="color: #4b5563; font-size: 15px; line-height: 1.7; margin: 0 0 20px 0;">
-                                            Kindly confirm delivery schedule.
-                                        </p>
-                                        
-                                        <p style="color: #1f2937; font-size: 15px; margin: 20px 0 0 0;">
-                                            Best regards,<br>
-                                            <strong>Team LeBRQ</strong>
-                                        </p>
-                                    </td>
-                                </tr>
-                                
-                                <!-- Footer -->
-                                <tr>
-                                    <td style="background-color: #f9fafb; padding: 30px; border-top: 1px solid #e5e7eb; text-align: center;">
-                                        <p style="color: #6b7280; font-size: 13px; line-height: 1.6; margin: 0;">
-                                            <strong style="color: #2D5016;">LeBRQ Events & Venues</strong><br>
-                                            This is an automated message. Please confirm delivery schedule.
-                                        </p>
-                                    </td>
-                                </tr>
-                            </table>
-                        </td>
-                    </tr>
-                </table>
-            </body>
-            </html>
-            """
-            
-            await NotificationService._send_email(vendor_email, subject, html_content)
-            
-        except Exception as e:
-            print(f"[NOTIFICATION] Error sending vendor delivery email: {e}")
+                                    </div>
+                                    
+                                    <p style="color: #4b5563; font-size: 15px; line-height: 1.7; margin: 0 0 20px 0;">
+                                        Kindly confirm delivery schedule.
+                                    </p>
+                                    
+                                    <p style="color: #1f2937; font-size: 15px; margin: 20px 0 0 0;">
+                                        Best regards,<br>
+                                        <strong>Team LeBRQ</strong>
+                                    </p>
+                                </td>
+                            </tr>
+                            
+                            <!-- Footer -->
+                            <tr>
+                                <td style="background-color: #f9fafb; padding: 30px; border-top: 1px solid #e5e7eb; text-align: center;">
+                                    <p style="color: #6b7280; font-size: 13px; line-height: 1.6; margin: 0;">
+                                        <strong style="color: #2D5016;">LeBRQ Events & Venues</strong><br>
+                                        This is an automated message. Please confirm delivery schedule.
+                                    </p>
+                                </td>
+                            </tr>
+                        </table>
+                    </td>
+                </tr>
+            </table>
+        </body>
+        </html>
+        """
+        
+        return subject, html_content
     
     @staticmethod
     async def send_class_booking_confirmation(
@@ -1851,6 +1835,11 @@ class NotificationService:
     
     @staticmethod
     async def _send_email(to_email: str, subject: str, html_content: str):
+        """Send email using SMTP, in a worker thread so the SMTP session never blocks the event loop"""
+        await asyncio.to_thread(NotificationService._send_email_sync, to_email, subject, html_content)
+    
+    @staticmethod
+    def _send_email_sync(to_email: str, subject: str, html_content: str):
         """Send email using SMTP"""
         if not settings.SMTP_HOST:
             print(f"[NOTIFICATION] SMTP not configured (SMTP_HOST is not set). Cannot send email to {to_email}")
@@ -2917,39 +2906,22 @@ Wishing you a joyful celebration.
         booking_id: int,
         session: AsyncSession
     ):
-        """Save notification in database for in-app display"""
+        """Save notification in database for in-app display.
+        
+        Queued on the shared notification writer, which group-commits rows from all
+        requests; written and committed with `session` when the writer isn't running
+        on this event loop (background threads).
+        """
         try:
-            from sqlalchemy import text
-            
-            # Create notifications table if it doesn't exist
-            await session.execute(text("""
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_id INT NOT NULL,
-                    title VARCHAR(255) NOT NULL,
-                    message TEXT NOT NULL,
-                    booking_id INT,
-                    is_read BOOLEAN DEFAULT FALSE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_user_id (user_id),
-                    INDEX idx_booking_id (booking_id)
-                )
-            """))
-            
-            # Insert notification
-            await session.execute(
-                text("""
-                    INSERT INTO notifications (user_id, title, message, booking_id, is_read, created_at)
-                    VALUES (:user_id, :title, :message, :booking_id, FALSE, NOW())
-                """),
-                {
-                    'user_id': user_id,
-                    'title': title,
-                    'message': message,
-                    'booking_id': booking_id
-                }
-            )
-            await session.commit()
+            row = {
+                'user_id': user_id,
+                'title': (title or '')[:255],  # notifications.title is VARCHAR(255)
+                'message': message,
+                'booking_id': booking_id,
+            }
+            if not notification_writer.enqueue(IN_APP_NOTIFICATIONS, **row):
+                await write_notifications(session, {IN_APP_NOTIFICATIONS: [row]})
+                await session.commit()
             
             print(f"[NOTIFICATION] In-app notification created for user {user_id}")
             
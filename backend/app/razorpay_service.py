@@ -4,14 +4,19 @@ Razorpay Payment Service - LIVE MODE
 ⚠️ WARNING: THIS SERVICE IS NOW RUNNING IN LIVE MODE
 Real payments will be processed. Do not test with real money.
 
-Handles Razorpay payment operations including order creation and verification
+Handles Razorpay payment operations including order creation and verification.
+Async handlers use the a* methods (acreate_order, afetch_payment, arefund_payment),
+which share one pooled httpx.AsyncClient and never block the event loop; the sync
+methods remain for sync callers.
 """
 
+import asyncio
 import os
 import hashlib
 import hmac
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+import httpx
 import requests
 import threading
 import random
@@ -23,6 +28,20 @@ _cached_key_id: Optional[str] = None
 _cached_key_secret: Optional[str] = None
 _cached_service: Optional['RazorpayService'] = None
 _service_init_lock = None  # Will be set in __init__.py
+_async_client: Optional[httpx.AsyncClient] = None
+
+# Retry policy shared by the sync session (urllib3 Retry) and the async client
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+
+class RazorpayError(Exception):
+    """Razorpay request failed; str(e) is safe to show to users."""
+
+
+class InvalidPaymentData(ValueError):
+    """Checkout callback data is incomplete or its signature doesn't match."""
 
 
 class RazorpayService:
@@ -225,9 +244,9 @@ class RazorpayService:
             try:
                 from urllib3.util.retry import Retry
                 retry_strategy = Retry(
-                    total=3,
-                    backoff_factor=0.5,
-                    status_forcelist=[429, 500, 502, 503, 504],
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=sorted(RETRY_STATUSES),
                     allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE", "PATCH"]),
                     raise_on_status=False,
                 )
@@ -463,6 +482,128 @@ class RazorpayService:
                     pass
             raise Exception(f"Failed to refund Razorpay payment: {str(e)}")
 
+    # ─── Async API (shared pooled httpx.AsyncClient; use these from async handlers) ───
+
+    async def _arequest(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        timeout: float = 15.0,
+        retry_if_sent: bool = True,
+    ) -> httpx.Response:
+        """Send a request with the same retry policy as the sync session.
+
+        Retries connection failures and RETRY_STATUSES with exponential backoff. With
+        retry_if_sent=False (refunds), only failures where the request provably never
+        reached Razorpay (connect errors, 429) are retried, so money is never moved twice.
+        """
+        client = get_async_client()
+        for attempt in range(MAX_RETRIES + 1):
+            last_attempt = attempt == MAX_RETRIES
+            try:
+                response = await client.request(
+                    method,
+                    f"{self.RAZORPAY_API_URL}{path}",
+                    json=json,
+                    auth=(self.key_id, self.key_secret),
+                    timeout=httpx.Timeout(timeout, connect=5.0),
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if last_attempt:
+                    raise
+            except httpx.TransportError:
+                if last_attempt or not retry_if_sent:
+                    raise
+            else:
+                retryable = response.status_code == 429 or (retry_if_sent and response.status_code in RETRY_STATUSES)
+                if not retryable or last_attempt:
+                    return response
+            delay = BACKOFF_FACTOR * (2 ** attempt)
+            print(f"[Razorpay] {method} {path} attempt {attempt + 1} failed, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        raise RazorpayError("Payment service is temporarily unavailable. Please try again later.")
+
+    @staticmethod
+    def _error_detail(response: httpx.Response) -> str:
+        try:
+            error_obj = response.json().get('error', {})
+            return error_obj.get('description', error_obj.get('message', str(error_obj)))
+        except Exception:
+            return (response.text or f"HTTP {response.status_code}")[:200]
+
+    async def acreate_order(
+        self,
+        amount: int,  # Amount in paise
+        currency: str = 'INR',
+        receipt: Optional[str] = None,
+        description: str = 'Booking Payment',
+        notes: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Async create_order(); raises RazorpayError with a user-facing message."""
+        if not self.is_configured():
+            raise ValueError(f"Razorpay not configured for {self.mode} mode")
+
+        payload: Dict[str, Any] = {'amount': amount, 'currency': currency, 'description': description}
+        if receipt:
+            payload['receipt'] = receipt
+        if notes:
+            payload['notes'] = notes
+
+        try:
+            response = await self._arequest('POST', '/orders', json=payload, timeout=15.0)
+        except httpx.TimeoutException as e:
+            print(f"[Razorpay] ERROR: Request timeout (15s exceeded) - {str(e)}")
+            raise RazorpayError("Payment gateway is not responding. Please try again in a few minutes.")
+        except httpx.TransportError as e:
+            print(f"[Razorpay] ERROR: Connection failed - {str(e)}")
+            raise RazorpayError("Unable to connect to payment service. Please try again shortly.")
+        if not response.is_success:
+            print(f"[Razorpay] ERROR: HTTP error - {self._error_detail(response)}")
+            raise RazorpayError("Payment service encountered an error. Please try again or contact support.")
+        result = response.json()
+        print(f"[Razorpay] Order created successfully: {result.get('id')}")
+        return result
+
+    async def afetch_payment(self, payment_id: str) -> Dict[str, Any]:
+        """Async fetch_payment()."""
+        if not self.is_configured():
+            raise ValueError(f"Razorpay not configured for {self.mode} mode")
+        try:
+            response = await self._arequest('GET', f'/payments/{payment_id}', timeout=10.0)
+        except httpx.HTTPError as e:
+            raise RazorpayError(f"Failed to fetch Razorpay payment: {str(e)}")
+        if not response.is_success:
+            raise RazorpayError(f"Failed to fetch Razorpay payment: {self._error_detail(response)} (Status: {response.status_code})")
+        return response.json()
+
+    async def arefund_payment(
+        self,
+        payment_id: str,
+        amount: Optional[int] = None,
+        notes: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Async refund_payment(). Only retried when the request never reached Razorpay."""
+        if not self.is_configured():
+            raise ValueError(f"Razorpay not configured for {self.mode} mode")
+
+        payload: Dict[str, Any] = {}
+        if amount is not None:
+            payload['amount'] = amount
+        if notes:
+            payload['notes'] = notes
+
+        try:
+            response = await self._arequest(
+                'POST', f'/payments/{payment_id}/refund', json=payload, timeout=10.0, retry_if_sent=False,
+            )
+        except httpx.HTTPError as e:
+            raise RazorpayError(f"Failed to refund Razorpay payment: {str(e)}")
+        if not response.is_success:
+            raise RazorpayError(f"Razorpay API error: {response.status_code} - {self._error_detail(response)}")
+        return response.json()
+
 
 # Global instance and cached credentials
 _razorpay_service = None
@@ -598,3 +739,74 @@ def get_razorpay_service() -> RazorpayService:
                     raise
     
     return _razorpay_service
+
+
+# ─── Shared async client ───
+
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide pooled AsyncClient for Razorpay (credentials are sent per request)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            headers={
+                'Content-Type': 'application/json',
+                'User-Agent': 'LebrQ-Payment-Service/1.0',
+            },
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the shared AsyncClient (app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+# ─── Settlement helpers (vendor/broker payment flows) ───
+
+async def create_settlement_order(
+    amount: float,
+    receipt: str,
+    description: str,
+    notes: Dict[str, Any],
+) -> str:
+    """Create the Razorpay order that pays out a vendor/broker settlement; returns the order id.
+
+    Raises ValueError if Razorpay isn't configured and RazorpayError on gateway failures.
+    """
+    service = get_razorpay_service()
+    if not service.is_configured():
+        raise ValueError("Razorpay not configured")
+    order = await service.acreate_order(
+        amount=int(amount * 100),
+        currency='INR',
+        receipt=receipt,
+        description=description,
+        notes=notes,
+    )
+    if not order or 'id' not in order:
+        print(f"[Razorpay] ERROR: Invalid settlement order response: {order}")
+        raise RazorpayError("Payment service encountered an error. Please try again.")
+    return order['id']
+
+
+async def confirm_settlement_payment(payment_data: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """Verify a checkout callback and fetch the payment; returns (order_id, payment_id, payment_details).
+
+    Accepts both razorpay_* and short key names. Raises InvalidPaymentData when ids are
+    missing or the signature doesn't match, RazorpayError if the fetch fails.
+    """
+    payment_id = payment_data.get('razorpay_payment_id') or payment_data.get('payment_id')
+    order_id = payment_data.get('razorpay_order_id') or payment_data.get('order_id')
+    signature = payment_data.get('razorpay_signature') or payment_data.get('signature')
+    if not all([payment_id, order_id, signature]):
+        raise InvalidPaymentData('Missing payment verification data')
+
+    service = get_razorpay_service()
+    if not service.verify_payment(order_id, payment_id, signature):
+        raise InvalidPaymentData('Payment verification failed - invalid signature')
+    return order_id, payment_id, await service.afetch_payment(payment_id)
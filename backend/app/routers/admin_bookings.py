@@ -3,15 +3,20 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, Query, Form, Body, BackgroundTasks, status
 from fastapi.responses import StreamingResponse
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import re
 import secrets
 from sqlalchemy import select, and_, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session, AsyncSessionLocal
-from app.auth import get_current_user, hash_password
+from app.auth import get_current_user
+from app.services.auth_crypto import hash_password_async
 from app.models import Booking, BookingEvent, User, Space, Venue, BookingItem, Item, VendorProfile, BrokerProfile, BookingItemRejection, Refund
 from app.notifications import NotificationService
+from app.services import ticket_inventory
+from app.utils.fast_json import FastJSONResponse
+from app.utils.csv_export import stream_csv
+from app.utils.keyset import decode_cursor, keyset_before, next_cursor, split_page
 import json
 
 router = APIRouter()
@@ -585,7 +590,7 @@ async def list_bookings(
         # Add pagination metadata
         total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         
-        return {
+        return FastJSONResponse({
             "items": out,
             "pagination": {
                 "page": page,
@@ -595,7 +600,7 @@ async def list_bookings(
                 "has_next": page < total_pages,
                 "has_prev": page > 1
             }
-        }
+        })
     
     except HTTPException:
         raise  # Re-raise HTTP exceptions
@@ -1206,7 +1211,7 @@ async def admin_create_vendor(
         temp_password = secrets.token_urlsafe(8)
         created_user = User(
             username=candidate,
-            password_hash=hash_password(temp_password),
+            password_hash=await hash_password_async(temp_password),
             role='vendor',
             mobile=contact_phone,
         )
@@ -1318,7 +1323,7 @@ async def admin_invite_vendor(
 
     # Generate a new temp password and set it
     new_password = secrets.token_urlsafe(8)
-    user.password_hash = hash_password(new_password)
+    user.password_hash = await hash_password_async(new_password)
     await session.commit()
 
     # Send invitation email in background thread to avoid blocking
@@ -1457,6 +1462,9 @@ async def admin_suspend_vendor(
     
     await session.commit()
     await session.refresh(vp)
+    # Suspensions hide the vendor's items from the public catalog
+    from app.services.catalog_cache import bump_catalog_version
+    await bump_catalog_version(session)
     
     return {
         'ok': True,
@@ -1620,7 +1628,7 @@ async def admin_create_broker(
         temp_password = secrets.token_urlsafe(8)
         created_user = User(
             username=candidate,
-            password_hash=hash_password(temp_password),
+            password_hash=await hash_password_async(temp_password),
             role='broker',
             mobile=contact_phone,
         )
@@ -1740,7 +1748,7 @@ async def admin_invite_broker(
     
     # Generate new temp password
     temp_password = secrets.token_urlsafe(8)
-    u.password_hash = hash_password(temp_password)
+    u.password_hash = await hash_password_async(temp_password)
     await session.commit()
     
     # Send invitation email in background thread to avoid blocking
@@ -2509,13 +2517,14 @@ async def approve_booking(booking_id: int, note: Optional[str] = None, backgroun
 
                     # Vendor notifications (non-critical)
                     try:
-                        await NotificationService.send_vendor_notifications_after_payment(
+                        vendor_results = await NotificationService.send_vendor_notifications_after_payment(
                             booking=bg_booking,
                             space=space_obj,
                             venue=venue_obj,
                             session=async_session,
                         )
-                        print(f"[ADMIN] ✓ Vendor notifications sent successfully")
+                        sent = sum(1 for r in vendor_results if r["ok"])
+                        print(f"[ADMIN] ✓ Vendor notifications: {sent}/{len(vendor_results)} sent")
                     except Exception as vendor_error:
                         print(f"[ADMIN] Vendor notification error (non-critical): {vendor_error}")
 
@@ -2575,6 +2584,8 @@ async def reject_booking(booking_id: int, note: Optional[str] = None, background
     # Commit status update first so missing booking_events table doesn't block rejection
     booking.status = 'rejected'
     booking.admin_note = note
+    if getattr(booking, 'event_schedule_id', None) and prev not in ('rejected', 'cancelled'):
+        await ticket_inventory.release_booking_tickets(session, booking.id)  # Return the tickets to the pool
     await session.commit()
 
     # Try to record the event in a separate transaction; ignore if table missing
@@ -2720,13 +2731,21 @@ async def send_supply_reminders_manual(
 ):
     """Manually trigger supply reminder check (admin only)"""
     try:
-        from app.services.supply_reminder import send_supply_reminders
-        count = await send_supply_reminders(session)
+        # Run through the scheduler so a manual trigger can't overlap the periodic run
+        from app.services.scheduler import get_scheduler
+        run = await get_scheduler().run_job('supply_reminders', force=True)
+        if run is None:
+            raise HTTPException(status_code=409, detail='Supply reminder check is already running on another worker')
+        if run['status'] != 'success':
+            raise HTTPException(status_code=500, detail=f"Failed to send supply reminders: {run.get('error_message')}")
+        count = (run.get('result') or {}).get('queued', 0)
         return {
             'ok': True,
             'reminders_sent': count,
             'message': f'Successfully sent {count} supply reminder(s)'
         }
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -2842,60 +2861,97 @@ async def mark_clients_viewed(
         return {'ok': False, 'message': f'Error: {str(e)}'}
 
 
+def _date_window(column, from_date: Optional[str], to_date: Optional[str]) -> list:
+    """Conditions for from_date <= column's day <= to_date (YYYY-MM-DD), as plain ranges an index can serve."""
+    conditions = []
+    try:
+        if from_date:
+            conditions.append(column >= datetime.strptime(from_date, '%Y-%m-%d'))
+        if to_date:
+            conditions.append(column < datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Dates must be YYYY-MM-DD')
+    return conditions
+
+
+def _totals_stmt(rows_stmt, id_column, amount_column):
+    """Count and amount sum over exactly the rows (same joins and filters) a listing query returns."""
+    return rows_stmt.order_by(None).with_only_columns(
+        func.count(id_column),
+        func.coalesce(func.sum(amount_column), 0.0),
+        maintain_column_froms=False,
+    )
+
+
+def _refund_conditions(status: Optional[str], from_date: Optional[str], to_date: Optional[str]) -> list:
+    conditions = _date_window(Refund.created_at, from_date, to_date)
+    if status:
+        conditions.append(Refund.status == status)
+    return conditions
+
+
+def _refund_rows_stmt(conditions: list):
+    return (
+        select(
+            Refund,
+            Booking,
+            User.first_name,
+            User.last_name,
+            User.username,
+            User.mobile,
+            Space.name.label('space_name'),
+            Venue.name.label('venue_name'),
+        )
+        .join(Booking, Booking.id == Refund.booking_id)
+        .join(User, User.id == Booking.user_id)
+        .join(Space, Space.id == Booking.space_id)
+        .join(Venue, Venue.id == Booking.venue_id)
+        .where(*conditions)
+        .order_by(Refund.created_at.desc(), Refund.id.desc())
+    )
+
+
 @router.get('/admin/refunds')
 async def list_refunds(
     status: Optional[str] = Query(default=None, description="Filter by refund status"),
+    from_date: Optional[str] = Query(default=None, description="Refunds created on or after this day (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(default=None, description="Refunds created on or before this day (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: empty for the first page, then pagination.next_cursor"),
+    include_total: bool = Query(default=True, description="Compute the count and amount totals"),
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(admin_required)
 ):
-    """List all refunds with booking details for admin."""
+    """List refunds with booking details for admin, newest first.
+
+    Pages by page/per_page, or by cursor on (created_at, id) which costs the same at any
+    depth. Totals (count and amount of every matching refund) come from one aggregate.
+    GET /admin/refunds/export streams the same rows as CSV.
+    """
+    stmt = _refund_rows_stmt(_refund_conditions(status, from_date, to_date))
     try:
-        # First, check if refunds table exists and has data
-        stmt_count = select(func.count(Refund.id))
-        rs_count = await session.execute(stmt_count)
-        total_refunds_count = rs_count.scalar() or 0
-        print(f"[ADMIN REFUNDS] Total refunds in database: {total_refunds_count}")
-        
-        # Build query with joins
-        stmt = (
-            select(
-                Refund,
-                Booking,
-                User.first_name,
-                User.last_name,
-                User.username,
-                User.mobile,
-                Space.name.label('space_name'),
-                Venue.name.label('venue_name'),
-            )
-            .join(Booking, Booking.id == Refund.booking_id)
-            .join(User, User.id == Booking.user_id)
-            .join(Space, Space.id == Booking.space_id)
-            .join(Venue, Venue.id == Booking.venue_id)
-            .order_by(Refund.created_at.desc())
-        )
-        
-        # Apply status filter
-        if status:
-            stmt = stmt.where(Refund.status == status)
-        
-        # Execute query
-        rs = await session.execute(stmt)
-        rows = rs.all()
-        print(f"[ADMIN REFUNDS] Found {len(rows)} refund(s) matching criteria")
-        
-        # Calculate pagination
-        total = len(rows)
-        total_pages = (total + per_page - 1) // per_page
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_rows = rows[start_idx:end_idx]
+        total = None
+        total_amount = None
+        if include_total:
+            rs_totals = await session.execute(_totals_stmt(stmt, Refund.id, Refund.amount))
+            total, total_amount = rs_totals.one()
+        
+        if cursor is not None:
+            if cursor:
+                try:
+                    after = decode_cursor(cursor, (datetime, int))
+                except ValueError:
+                    raise HTTPException(status_code=400, detail='Invalid cursor')
+                stmt = stmt.where(keyset_before((Refund.created_at, Refund.id), after))
+        else:
+            stmt = stmt.offset((page - 1) * per_page)
+        rs = await session.execute(stmt.limit(per_page + 1))
+        page_rows, has_next = split_page(rs.all(), per_page)
         
         # Serialize results
         refunds_list = []
-        for refund, booking, first_name, last_name, username, mobile, space_name, venue_name in paginated_rows:
+        for refund, booking, first_name, last_name, username, mobile, space_name, venue_name in page_rows:
             user_name = f"{first_name or ''} {last_name or ''}".strip() or username
             refunds_list.append({
                 'id': refund.id,
@@ -2938,13 +2994,20 @@ async def list_refunds(
                 'page': page,
                 'per_page': per_page,
                 'total': total,
-                'pages': total_pages,
+                'pages': (total + per_page - 1) // per_page if total is not None else None,
+                'has_next': has_next,
+                'next_cursor': next_cursor(page_rows, has_next, lambda row: (row[0].created_at, row[0].id)),
+            },
+            'totals': {
+                'count': total,
+                'amount': float(total_amount) if total_amount is not None else None,
             },
             'debug': {
-                'total_in_db': total_refunds_count,
                 'returned': len(refunds_list),
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ADMIN REFUNDS] ERROR: {e}")
         import traceback
@@ -2952,6 +3015,48 @@ async def list_refunds(
         raise HTTPException(status_code=500, detail=f'Failed to fetch refunds: {str(e)}')
 
 
+@router.get('/admin/refunds/export')
+async def export_refunds(
+    status: Optional[str] = Query(default=None, description="Filter by refund status"),
+    from_date: Optional[str] = Query(default=None, description="Refunds created on or after this day (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(default=None, description="Refunds created on or before this day (YYYY-MM-DD)"),
+    admin: User = Depends(admin_required)
+):
+    """CSV of every matching refund, streamed from a server-side cursor (for reconciliation)."""
+    stmt = _refund_rows_stmt(_refund_conditions(status, from_date, to_date))
+
+    def to_row(row):
+        refund, booking, first_name, last_name, username, mobile, space_name, venue_name = row
+        return [
+            refund.id,
+            refund.created_at.isoformat(),
+            refund.processed_at.isoformat() if refund.processed_at else '',
+            refund.status,
+            refund.refund_type or '',
+            refund.refund_method or '',
+            refund.refund_reference or '',
+            f"{float(refund.amount):.2f}",
+            booking.booking_reference,
+            booking.start_datetime.isoformat(),
+            f"{float(booking.total_amount):.2f}",
+            f"{first_name or ''} {last_name or ''}".strip() or username,
+            username,
+            mobile or '',
+            space_name,
+            venue_name,
+            refund.reason or '',
+        ]
+
+    return stream_csv(
+        stmt,
+        ['Refund ID', 'Created At', 'Processed At', 'Status', 'Type', 'Method', 'Reference', 'Amount',
+         'Booking Reference', 'Event Start', 'Booking Total', 'Customer', 'Username', 'Mobile',
+         'Space', 'Venue', 'Reason'],
+        to_row,
+        filename=f"refunds_{datetime.utcnow():%Y%m%d}.csv",
+    )
+
+
 @router.get('/admin/refunds/test/{booking_id}')
 async def test_refunds_for_booking(
     booking_id: int,
@@ -3126,7 +3231,7 @@ async def process_refund(
             print(f"[PROCESS REFUND] Endpoint: /payments/{payment.provider_payment_id}/refund")
             print(f"[PROCESS REFUND] Amount: {refund_amount_paise} paise")
             
-            refund_response = razorpay_service.refund_payment(
+            refund_response = await razorpay_service.arefund_payment(
                 payment_id=payment.provider_payment_id,
                 amount=refund_amount_paise,
                 notes=refund_notes
@@ -3449,104 +3554,154 @@ async def download_refund_invoice(
 
 # ================= INVOICE MANAGEMENT (ADMIN) ================= #
 
+def _invoice_type(status: Optional[str], start_datetime: Optional[datetime], now: datetime) -> str:
+    """Same rule as the booking invoice: tax invoice once a confirmed event has started."""
+    status_lower = (status or '').lower()
+    
+    # Event is completed if the start date has passed (aware datetimes compared in UTC)
+    is_event_completed = False
+    if start_datetime:
+        if start_datetime.tzinfo is not None:
+            start_datetime = start_datetime.astimezone(timezone.utc).replace(tzinfo=None)
+        is_event_completed = start_datetime < now
+    
+    # Invoice type logic:
+    # - Tax Invoice: Event date has passed AND status is approved/confirmed/paid
+    # - Proforma Invoice: Event date hasn't passed OR status is pending
+    is_tax_invoice = is_event_completed and status_lower in ['approved', 'confirmed', 'confirm', 'paid']
+    is_proforma_invoice = not is_tax_invoice and status_lower in ['pending', 'approved', 'confirmed', 'confirm', 'paid']
+    if is_tax_invoice:
+        return 'TAX INVOICE'
+    if is_proforma_invoice:
+        return 'PROFORMA INVOICE'
+    return 'INVOICE'
+
+
+def _invoice_conditions(status: Optional[str], from_date: Optional[str], to_date: Optional[str]) -> list:
+    conditions = _date_window(Booking.start_datetime, from_date, to_date)
+    if status:
+        conditions.append(Booking.status == status)
+    return conditions
+
+
+def _invoice_rows_stmt(conditions: list):
+    return (
+        select(
+            Booking.id,
+            Booking.booking_reference,
+            Booking.status,
+            Booking.total_amount,
+            Booking.start_datetime,
+            Booking.created_at,
+            User.first_name,
+            User.last_name,
+            User.username,
+        )
+        .join(User, User.id == Booking.user_id)
+        .where(*conditions)
+        .order_by(Booking.created_at.desc(), Booking.id.desc())
+    )
+
+
 @router.get('/admin/invoices')
 async def list_invoices(
     status: Optional[str] = Query(default=None),
     from_date: Optional[str] = Query(default=None, description="Filter bookings with start_datetime >= this (YYYY-MM-DD)"),
     to_date: Optional[str] = Query(default=None, description="Filter bookings with start_datetime <= this (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(default=None, ge=1, le=500, description="Page size; omit (without cursor) for every matching booking"),
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: empty for the first page, then next_cursor"),
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(admin_required)
 ):
-    """List all bookings that can have invoices generated. Admin only."""
+    """List all bookings that can have invoices generated, newest first. Admin only.
+
+    With limit or cursor the list is paged on (created_at, id); next_cursor fetches the
+    following page. Totals (count and amount of every matching booking) come from one
+    aggregate. GET /admin/invoices/export streams the same rows as CSV.
+    """
+    stmt = _invoice_rows_stmt(_invoice_conditions(status, from_date, to_date))
+    paged = limit is not None or cursor is not None
+    page_size = limit or 50
     try:
-        stmt = (
-            select(
-                Booking,
-                User.first_name,
-                User.last_name,
-                User.username,
-            )
-            .join(User, User.id == Booking.user_id)
-            .order_by(Booking.created_at.desc())
-        )
-        
-        conditions = []
-        if status:
-            conditions.append(Booking.status == status)
-        if from_date:
-            conditions.append(func.date(Booking.start_datetime) >= from_date)
-        if to_date:
-            conditions.append(func.date(Booking.start_datetime) <= to_date)
-        
-        if conditions:
-            stmt = stmt.where(and_(*conditions))
+        rs_totals = await session.execute(_totals_stmt(stmt, Booking.id, Booking.total_amount))
+        total, total_amount = rs_totals.one()
         
+        if cursor:
+            try:
+                after = decode_cursor(cursor, (datetime, int))
+            except ValueError:
+                raise HTTPException(status_code=400, detail='Invalid cursor')
+            stmt = stmt.where(keyset_before((Booking.created_at, Booking.id), after))
+        if paged:
+            stmt = stmt.limit(page_size + 1)
         rs = await session.execute(stmt)
-        rows = rs.all()
+        rows, has_next = split_page(rs.all(), page_size) if paged else (rs.all(), False)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f'Failed to fetch bookings: {str(e)}')
     
+    now = datetime.utcnow()
     invoices = []
-    from datetime import datetime, timezone
-    
-    if not rows:
-        return {'invoices': [], 'count': 0}
-    
-    for booking, first_name, last_name, username in rows:
-        try:
-            user_name = f"{first_name or ''} {last_name or ''}".strip() or username
-            status_lower = (booking.status or '').lower()
-            
-            # Determine invoice type based on event completion (same logic as booking invoice)
-            is_event_completed = False
-            if booking.start_datetime:
-                now = datetime.utcnow()
-                booking_date = booking.start_datetime
-                
-                # Handle timezone-aware and naive datetimes
-                if booking_date.tzinfo is not None:
-                    booking_date_utc = booking_date.astimezone(timezone.utc).replace(tzinfo=None)
-                else:
-                    booking_date_utc = booking_date
-                
-                # Event is completed if the start date has passed
-                is_event_completed = booking_date_utc < now
-            
-            # Invoice type logic:
-            # - Tax Invoice: Event date has passed AND status is approved/confirmed/paid
-            # - Proforma Invoice: Event date hasn't passed OR status is pending
-            is_tax_invoice = is_event_completed and status_lower in ['approved', 'confirmed', 'confirm', 'paid']
-            is_proforma_invoice = not is_tax_invoice and status_lower in ['pending', 'approved', 'confirmed', 'confirm', 'paid']
-            
-            # Determine invoice type label
-            if is_tax_invoice:
-                invoice_type = 'TAX INVOICE'
-            elif is_proforma_invoice:
-                invoice_type = 'PROFORMA INVOICE'
-            else:
-                invoice_type = 'INVOICE'
-            
-            invoices.append({
-                'booking_id': booking.id,
-                'booking_reference': booking.booking_reference,
-                'invoice_number': f"BK-{booking.booking_reference}",
-                'customer_name': user_name,
-                'customer_email': username,
-                'status': booking.status,
-                'invoice_type': invoice_type,
-                'total_amount': float(booking.total_amount),
-                'start_datetime': booking.start_datetime.isoformat() if booking.start_datetime else None,
-                'created_at': booking.created_at.isoformat() if getattr(booking, 'created_at', None) else None,
-            })
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            # Continue with other bookings even if one fails
-            continue
+    for booking_id, reference, booking_status, amount, start_datetime, created_at, first_name, last_name, username in rows:
+        invoices.append({
+            'booking_id': booking_id,
+            'booking_reference': reference,
+            'invoice_number': f"BK-{reference}",
+            'customer_name': f"{first_name or ''} {last_name or ''}".strip() or username,
+            'customer_email': username,
+            'status': booking_status,
+            'invoice_type': _invoice_type(booking_status, start_datetime, now),
+            'total_amount': float(amount or 0.0),
+            'start_datetime': start_datetime.isoformat() if start_datetime else None,
+            'created_at': created_at.isoformat() if created_at else None,
+        })
     
-    return {'invoices': invoices, 'count': len(invoices)}
+    result = {
+        'invoices': invoices,
+        'count': len(invoices),
+        'totals': {'count': total, 'amount': float(total_amount)},
+    }
+    if paged:
+        result['has_next'] = has_next
+        result['next_cursor'] = next_cursor(rows, has_next, lambda row: (row.created_at, row.id))
+    return result
+
+
+@router.get('/admin/invoices/export')
+async def export_invoices(
+    status: Optional[str] = Query(default=None),
+    from_date: Optional[str] = Query(default=None, description="Filter bookings with start_datetime >= this (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(default=None, description="Filter bookings with start_datetime <= this (YYYY-MM-DD)"),
+    admin: User = Depends(admin_required)
+):
+    """CSV of every matching invoice, streamed from a server-side cursor (for reconciliation)."""
+    now = datetime.utcnow()
+
+    def to_row(row):
+        booking_id, reference, booking_status, amount, start_datetime, created_at, first_name, last_name, username = row
+        return [
+            f"BK-{reference}",
+            _invoice_type(booking_status, start_datetime, now),
+            booking_id,
+            reference,
+            booking_status,
+            f"{float(amount or 0.0):.2f}",
+            start_datetime.isoformat() if start_datetime else '',
+            created_at.isoformat() if created_at else '',
+            f"{first_name or ''} {last_name or ''}".strip() or username,
+            username,
+        ]
+
+    return stream_csv(
+        _invoice_rows_stmt(_invoice_conditions(status, from_date, to_date)),
+        ['Invoice Number', 'Invoice Type', 'Booking ID', 'Booking Reference', 'Status', 'Total Amount',
+         'Event Start', 'Created At', 'Customer', 'Email'],
+        to_row,
+        filename=f"invoices_{now:%Y%m%d}.csv",
+    )
 
 
 @router.get('/admin/invoices/{booking_id}/data')
@@ -13,6 +13,7 @@ from app.schemas.items import (
     ItemPricingInfo
 )
 from app.auth import require_role
+from app.services.catalog_cache import bump_catalog_version_sync
 import logging
 
 logger = logging.getLogger(__name__)
@@ -92,6 +93,7 @@ async def create_catalog_item(
         try:
             db.commit()
             db.refresh(item)
+            bump_catalog_version_sync(db)
         except Exception as e:
             db.rollback()
             error_msg = str(e)
@@ -104,6 +106,7 @@ async def create_catalog_item(
                 db.add(item)
                 db.commit()
                 db.refresh(item)
+                bump_catalog_version_sync(db)
                 logger.warning(f"[Admin Items] Created item without performance_team_profile (column not found)")
             else:
                 raise
@@ -161,6 +164,7 @@ async def update_catalog_item(
         
         db.commit()
         db.refresh(item)
+        bump_catalog_version_sync(db)
         
         # Log item status change to history if status changed
         if 'item_status' in update_data and old_item_status != update_data.get('item_status'):
@@ -250,6 +254,7 @@ async def apply_bulk_markup(
             logger.info(f"[Admin Items] Item {item.id}: ₹{old_price} → ₹{item.price}")
         
         db.commit()
+        bump_catalog_version_sync(db)
         
         # Refresh all items
         for item in updated_items:
@@ -338,6 +343,7 @@ async def apply_bulk_preparation_time(
             logger.info(f"[Admin Items] Item {item.id} ({item.name}): {old_prep_time} min → {data.preparation_time_minutes} min")
         
         db.commit()
+        bump_catalog_version_sync(db)
         
         # Refresh all items
         for item in updated_items:
@@ -514,6 +520,7 @@ async def delete_catalog_item(
         
         db.delete(item)
         db.commit()
+        bump_catalog_version_sync(db)
         
         logger.info(f"[Admin Items] Deleted item ID: {item_id}")
         return None
@@ -333,25 +333,24 @@ async def broadcast_notification_to_all_vendors(
     sent_count = 0
     failed_count = 0
     
-    for vp in vendor_profiles:
-        try:
-            await VendorNotificationService.create_notification(
-                session=session,
-                vendor_user_id=vp.user_id,
-                type=payload.type,
-                title=payload.title,
-                message=payload.message,
-                booking_id=payload.booking_id,
-                booking_item_id=payload.booking_item_id,
-                link=payload.link,
-                priority=payload.priority,
-                send_whatsapp=payload.send_whatsapp,
-                send_email=payload.send_email,
-            )
-            sent_count += 1
-        except Exception as e:
-            print(f"[ADMIN_VENDOR] Failed to send to vendor {vp.id}: {e}")
-            failed_count += 1
+    try:
+        sent_count = await VendorNotificationService.create_notifications(
+            session=session,
+            vendor_user_ids=[vp.user_id for vp in vendor_profiles if vp.user_id],
+            type=payload.type,
+            title=payload.title,
+            message=payload.message,
+            booking_id=payload.booking_id,
+            booking_item_id=payload.booking_item_id,
+            link=payload.link,
+            priority=payload.priority,
+            send_whatsapp=payload.send_whatsapp,
+            send_email=payload.send_email,
+        )
+    except Exception as e:
+        print(f"[ADMIN_VENDOR] Failed to broadcast to {len(vendor_profiles)} vendors: {e}")
+        await session.rollback()
+        failed_count = len(vendor_profiles)
     
     return {
         'ok': True,
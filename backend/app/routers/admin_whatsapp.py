@@ -12,6 +12,7 @@ from sqlalchemy.orm import selectinload
 from app.db import get_session
 from app.auth import get_current_user
 from app.models import User, WhatsAppConversation, WhatsAppMessage, WhatsAppKeywordResponse, WhatsAppQuickReply
+from app.services import whatsapp_stats
 from app.services.route_mobile import send_session_message
 from app.services.whatsapp_chatbot import whatsapp_chatbot
 
@@ -73,80 +74,61 @@ async def list_conversations(
     session: AsyncSession = Depends(get_session),
     admin: User = Depends(admin_required),
 ):
-    """List all WhatsApp conversations with pagination"""
+    """List all WhatsApp conversations with pagination.
+    
+    Served from the denormalized summary columns on whatsapp_conversations:
+    one count query and one page query (joined with the linked user).
+    """
     try:
-        # Build query
-        query = select(WhatsAppConversation)
-        
-        # Apply filters
+        filters = []
         if status:
-            query = query.where(WhatsAppConversation.status == status)
+            filters.append(WhatsAppConversation.status == status)
         
         if search:
-            search_term = f"%{search}%"
-            query = query.where(WhatsAppConversation.phone_number.like(search_term))
+            # Numbers are stored without '+'; the trigram index on phone_number serves the substring match
+            term = search.strip().lstrip('+').replace(' ', '')
+            if term:
+                filters.append(WhatsAppConversation.phone_number.like(f"%{term}%"))
         
         # Get total count
-        count_query = select(func.count()).select_from(WhatsAppConversation)
-        if status:
-            count_query = count_query.where(WhatsAppConversation.status == status)
-        if search:
-            search_term = f"%{search}%"
-            count_query = count_query.where(WhatsAppConversation.phone_number.like(search_term))
-        
+        count_query = select(func.count()).select_from(WhatsAppConversation).where(*filters)
         total_result = await session.execute(count_query)
         total = total_result.scalar() or 0
         
         # Apply pagination and ordering
         offset = (page - 1) * per_page
-        query = query.order_by(desc(WhatsAppConversation.last_message_at)).offset(offset).limit(per_page)
-        
-        # Execute query
+        query = (
+            select(WhatsAppConversation, User)
+            .outerjoin(User, User.id == WhatsAppConversation.user_id)
+            .where(*filters)
+            .order_by(desc(WhatsAppConversation.last_message_at))
+            .offset(offset)
+            .limit(per_page)
+        )
         result = await session.execute(query)
-        conversations = result.scalars().all()
         
-        # Get message counts for each conversation
         conversation_list = []
-        for conv in conversations:
-            # Count messages
-            msg_count_query = select(func.count()).where(WhatsAppMessage.conversation_id == conv.id)
-            msg_count_result = await session.execute(msg_count_query)
-            message_count = msg_count_result.scalar() or 0
-            
-            # Get last message
-            last_msg_query = (
-                select(WhatsAppMessage)
-                .where(WhatsAppMessage.conversation_id == conv.id)
-                .order_by(desc(WhatsAppMessage.created_at))
-                .limit(1)
-            )
-            last_msg_result = await session.execute(last_msg_query)
-            last_message = last_msg_result.scalars().first()
-            
-            # Get user info if available
+        for conv, user in result.all():
             user_info = None
-            if conv.user_id:
-                user_query = select(User).where(User.id == conv.user_id)
-                user_result = await session.execute(user_query)
-                user = user_result.scalars().first()
-                if user:
-                    user_info = {
-                        'id': user.id,
-                        'name': f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
-                        'email': user.username,
-                    }
+            if user:
+                user_info = {
+                    'id': user.id,
+                    'name': f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
+                    'email': user.username,
+                }
             
             conversation_list.append({
                 'id': conv.id,
                 'phone_number': conv.phone_number,
                 'user': user_info,
                 'status': conv.status,
-                'message_count': message_count,
+                'message_count': conv.message_count or 0,
+                'unread_count': conv.unread_count or 0,
                 'last_message': {
-                    'text': (last_message.text_content or '')[:100] if last_message else None,
-                    'direction': last_message.direction if last_message else None,
-                    'created_at': last_message.created_at.isoformat() if last_message else None,
-                } if last_message else None,
+                    'text': conv.last_message_preview or '',
+                    'direction': conv.last_direction,
+                    'created_at': conv.last_message_at.isoformat() if conv.last_message_at else None,
+                } if conv.last_direction else None,
                 'last_message_at': conv.last_message_at.isoformat() if conv.last_message_at else None,
                 'created_at': conv.created_at.isoformat(),
                 'updated_at': conv.updated_at.isoformat(),
@@ -196,9 +178,12 @@ async def get_conversation_messages(
         messages = result.scalars().all()
         
         # Get total count
-        count_query = select(func.count()).where(WhatsAppMessage.conversation_id == conversation_id)
-        count_result = await session.execute(count_query)
-        total = count_result.scalar() or 0
+        total = conversation.message_count or 0
+        
+        # Opening the conversation marks its inbound messages as read
+        if page == 1 and conversation.unread_count:
+            conversation.unread_count = 0
+            await session.commit()
         
         message_list = [
             {
@@ -270,9 +255,10 @@ async def send_reply(
         )
         session.add(db_message)
         
-        # Update conversation last_message_at
+        # Update conversation last_message_at; replying also marks it read
         conversation.last_message_at = datetime.utcnow()
         conversation.updated_at = datetime.utcnow()
+        conversation.unread_count = 0
         
         await session.commit()
         await session.refresh(db_message)
@@ -315,8 +301,10 @@ async def update_conversation_status(
         if not conversation:
             raise HTTPException(status_code=404, detail='Conversation not found')
         
+        old_status = conversation.status
         conversation.status = status
         conversation.updated_at = datetime.utcnow()
+        await whatsapp_stats.record_status_change(session, conversation, old_status)
         
         await session.commit()
         await session.refresh(conversation)
@@ -813,61 +801,19 @@ async def get_whatsapp_stats(
 ):
     """Get WhatsApp conversation statistics"""
     try:
-        from datetime import timedelta
-        
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Total conversations
-        total_conv_query = select(func.count()).where(WhatsAppConversation.created_at >= cutoff_date)
-        total_conv_result = await session.execute(total_conv_query)
-        total_conversations = total_conv_result.scalar() or 0
-        
-        # Active conversations
-        active_conv_query = select(func.count()).where(
-            WhatsAppConversation.status == 'active',
-            WhatsAppConversation.created_at >= cutoff_date
-        )
-        active_conv_result = await session.execute(active_conv_query)
-        active_conversations = active_conv_result.scalar() or 0
-        
-        # Total messages
-        total_msg_query = select(func.count()).where(WhatsAppMessage.created_at >= cutoff_date)
-        total_msg_result = await session.execute(total_msg_query)
-        total_messages = total_msg_result.scalar() or 0
-        
-        # Inbound messages
-        inbound_msg_query = select(func.count()).where(
-            WhatsAppMessage.direction == 'inbound',
-            WhatsAppMessage.created_at >= cutoff_date
-        )
-        inbound_msg_result = await session.execute(inbound_msg_query)
-        inbound_messages = inbound_msg_result.scalar() or 0
-        
-        # Outbound messages
-        outbound_msg_query = select(func.count()).where(
-            WhatsAppMessage.direction == 'outbound',
-            WhatsAppMessage.created_at >= cutoff_date
-        )
-        outbound_msg_result = await session.execute(outbound_msg_query)
-        outbound_messages = outbound_msg_result.scalar() or 0
-        
-        # Auto-replies
-        auto_reply_query = select(func.count()).where(
-            WhatsAppMessage.is_auto_reply == True,
-            WhatsAppMessage.created_at >= cutoff_date
-        )
-        auto_reply_result = await session.execute(auto_reply_query)
-        auto_replies = auto_reply_result.scalar() or 0
+        # One SUM over at most `days` + 1 rows of the daily rollup
+        stats = await whatsapp_stats.get_stats(session, days)
+        outbound_messages = stats['messages_outbound']
         
         return {
             'period_days': days,
-            'total_conversations': total_conversations,
-            'active_conversations': active_conversations,
-            'total_messages': total_messages,
-            'inbound_messages': inbound_messages,
+            'total_conversations': stats['conversations_created'],
+            'active_conversations': stats['conversations_created'] - stats['conversations_inactive'],
+            'total_messages': stats['messages_inbound'] + outbound_messages,
+            'inbound_messages': stats['messages_inbound'],
             'outbound_messages': outbound_messages,
-            'auto_replies': auto_replies,
-            'manual_replies': outbound_messages - auto_replies,
+            'auto_replies': stats['auto_replies'],
+            'manual_replies': outbound_messages - stats['auto_replies'],
         }
     except Exception as e:
         print(f"[ADMIN WHATSAPP] Error getting stats: {e}")
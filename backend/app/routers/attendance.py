@@ -9,12 +9,13 @@ from sqlalchemy import select, func, and_, or_, extract
 from sqlalchemy.orm import selectinload
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
 from ..auth import get_current_user
 from ..db import get_session
-from ..models import User, Staff, Attendance
+from ..models import User, Staff, Attendance, AttendanceMonthly
+from ..services.attendance_rollup import month_bounds
 
 router = APIRouter(prefix="/hr/attendance", tags=["hr-attendance"])
 
@@ -385,15 +386,71 @@ async def update_attendance(
     return attendance
 
 
+def _rollup_summary(rollup: Optional[AttendanceMonthly], start_date: date, end_date: date) -> dict:
+    """Summary counters from a monthly rollup row (None = no attendance recorded)"""
+    present = rollup.present_count if rollup else 0
+    half_days = rollup.half_day_count if rollup else 0
+    holidays = rollup.holiday_count if rollup else 0
+    return {
+        # Working days exclude holidays
+        "total_working_days": (end_date - start_date).days + 1 - holidays,
+        "present_days": present + (half_days * 0.5),
+        "absent_days": rollup.absent_count if rollup else 0,
+        "half_days": half_days,
+        "leave_days": rollup.leave_count if rollup else 0,
+        "holidays": holidays,
+        "total_hours": round(rollup.total_hours or 0.0, 2) if rollup else 0.0,
+        "total_overtime_hours": round(rollup.overtime_hours or 0.0, 2) if rollup else 0.0,
+    }
+
+
 @router.get("/summary/monthly")
 async def get_monthly_summary(
-    staff_id: int,
+    staff_id: Optional[int] = Query(None, description="Staff member (omit for all active staff)"),
     month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     year: int = Query(..., ge=2000, description="Year"),
+    department: Optional[str] = Query(None, description="Filter by department (all-staff summary only)"),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(admin_or_hr_required),
 ):
-    """Get monthly attendance summary for a staff member"""
+    """Get monthly attendance summary for a staff member, or for all active staff"""
+    start_date, end_date = month_bounds(year, month)
+    
+    if staff_id is None:
+        # One row per active staff member, straight from the rollup table
+        stmt = (
+            select(Staff, AttendanceMonthly)
+            .outerjoin(
+                AttendanceMonthly,
+                and_(
+                    AttendanceMonthly.staff_id == Staff.id,
+                    AttendanceMonthly.year == year,
+                    AttendanceMonthly.month == month,
+                ),
+            )
+            .where(Staff.is_active == True)
+            .order_by(Staff.first_name, Staff.last_name, Staff.id)
+        )
+        if department:
+            stmt = stmt.where(Staff.department == department)
+        result = await session.execute(stmt)
+        return {
+            "month": month,
+            "year": year,
+            "start_date": start_date,
+            "end_date": end_date,
+            "staff": [
+                {
+                    "staff_id": staff.id,
+                    "employee_code": staff.employee_code,
+                    "name": f"{staff.first_name} {staff.last_name}",
+                    "department": staff.department,
+                    **_rollup_summary(rollup, start_date, end_date),
+                }
+                for staff, rollup in result.all()
+            ],
+        }
+    
     # Verify staff exists
     result = await session.execute(
         select(Staff).where(Staff.id == staff_id)
@@ -402,49 +459,25 @@ async def get_monthly_summary(
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found")
     
-    # Get all attendance records for the month
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    rollup = await session.get(AttendanceMonthly, (staff_id, year, month))
     
+    # Day-by-day records for the detail view
     result = await session.execute(
         select(Attendance).where(
             Attendance.staff_id == staff_id,
             Attendance.attendance_date >= start_date,
             Attendance.attendance_date <= end_date,
-        )
+        ).order_by(Attendance.attendance_date)
     )
     records = result.scalars().all()
     
-    # Calculate summary
-    present_count = sum(1 for r in records if r.status == "present")
-    absent_count = sum(1 for r in records if r.status == "absent")
-    half_day_count = sum(1 for r in records if r.status == "half_day")
-    leave_count = sum(1 for r in records if r.status == "leave")
-    holiday_count = sum(1 for r in records if r.status == "holiday")
-    
-    total_hours = sum(r.total_hours or 0.0 for r in records)
-    total_overtime = sum(r.overtime_hours or 0.0 for r in records)
-    
-    # Calculate working days (excluding holidays)
-    total_working_days = (end_date - start_date).days + 1 - holiday_count
-    
     return {
         "staff_id": staff_id,
         "month": month,
         "year": year,
         "start_date": start_date,
         "end_date": end_date,
-        "total_working_days": total_working_days,
-        "present_days": present_count + (half_day_count * 0.5),
-        "absent_days": absent_count,
-        "half_days": half_day_count,
-        "leave_days": leave_count,
-        "holidays": holiday_count,
-        "total_hours": round(total_hours, 2),
-        "total_overtime_hours": round(total_overtime, 2),
+        **_rollup_summary(rollup, start_date, end_date),
         "attendance_records": [
             {
                 "date": r.attendance_date,
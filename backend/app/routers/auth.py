@@ -15,9 +15,13 @@ from ..models import User
 from ..auth import (
     create_access_token_for_user,
     create_access_token,  # legacy
-    verify_password,
     get_current_user,
-    hash_password,
+)
+from ..services.auth_crypto import (
+    PasswordHashTimeout,
+    hash_password_async,
+    login_throttle,
+    verify_password_async,
 )
 try:
     import phonenumbers
@@ -88,6 +92,15 @@ async def login(payload: LoginRequest, session: AsyncSession = Depends(get_sessi
                 detail="Password is required"
             )
         
+        # Refuse usernames with too many recent failures before running the KDF
+        retry_after = login_throttle.retry_after(payload.username)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts. Please try again later.",
+                headers={"Retry-After": str(retry_after)},
+            )
+        
         # Query user from database
         try:
             rs = await session.execute(select(User).where(User.username == payload.username))
@@ -103,11 +116,17 @@ async def login(payload: LoginRequest, session: AsyncSession = Depends(get_sessi
         # Verify user exists and password is correct
         if not user:
             # Don't reveal if user exists or not (security best practice)
+            login_throttle.record_failure(payload.username)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
         
-        # Verify password
+        # Verify password (off the event loop; new_hash is set when the stored hash is outdated)
         try:
-            password_valid = verify_password(payload.password, user.password_hash)
+            password_valid, new_hash = await verify_password_async(payload.password, user.password_hash)
+        except PasswordHashTimeout:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Login is busy right now. Please try again."
+            )
         except Exception as pwd_error:
             logger.error(f"[AUTH] Password verification error for user {user.id}: {str(pwd_error)}")
             logger.error(f"[AUTH] Traceback: {traceback.format_exc()}")
@@ -117,7 +136,18 @@ async def login(payload: LoginRequest, session: AsyncSession = Depends(get_sessi
             )
         
         if not password_valid:
+            login_throttle.record_failure(payload.username)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        login_throttle.clear(payload.username)
+        
+        # Transparent rehash to the current scheme/work factor (non-blocking)
+        if new_hash:
+            try:
+                user.password_hash = new_hash
+                await session.commit()
+            except Exception as rehash_error:
+                await session.rollback()
+                logger.warning(f"[AUTH] Password rehash failed for user {user.id}: {rehash_error}")
         
         # Check if user is suspended (for customers, check User.suspended_until directly)
         try:
@@ -326,7 +356,14 @@ async def change_password(
             )
         
         # Verify current password
-        if not verify_password(payload.current_password, user.password_hash):
+        try:
+            current_valid, _ = await verify_password_async(payload.current_password, user.password_hash)
+        except PasswordHashTimeout:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password change operation timed out. Please try again."
+            )
+        if not current_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
@@ -339,20 +376,16 @@ async def change_password(
                 detail="New password must be at least 8 characters long"
             )
         
-        # Check if new password is same as current password
-        if verify_password(payload.new_password, user.password_hash):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="New password must be different from current password"
-            )
-        
-        # Hash new password (with timeout protection)
+        # Check if new password is same as current password, then hash it (with timeout protection)
         try:
-            new_password_hash = await asyncio.wait_for(
-                asyncio.to_thread(hash_password, payload.new_password),
-                timeout=5.0  # 5 second timeout for password hashing
-            )
-        except asyncio.TimeoutError:
+            same_password, _ = await verify_password_async(payload.new_password, user.password_hash)
+            if same_password:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="New password must be different from current password"
+                )
+            new_password_hash = await hash_password_async(payload.new_password)
+        except PasswordHashTimeout:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Password change operation timed out. Please try again."
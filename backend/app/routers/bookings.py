@@ -2,19 +2,23 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from typing import Optional, Generator
-from sqlalchemy import select, not_, or_, and_, func, text
+from sqlalchemy import select, not_, or_, and_, case, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.auth import get_current_user
+from app.utils.fast_json import FastJSONResponse
+from app.utils.keyset import decode_cursor, keyset_before, next_cursor, split_page
 from app.models import Booking, Space, BookingItem, Item, User, Venue, BookingEvent, VendorProfile, Refund
 from app.schemas.bookings import BookingCreate, BookingOut
 from datetime import datetime, date, timezone, timedelta
 from app.core import settings
 from app.notifications import NotificationService
 from app.services.client_notification_service import ClientNotificationService
+from app.services import booking_cart, booking_series, space_cache, ticket_inventory
+from app.services.ticket_inventory import TicketsUnavailable
 # Import event ticketing models (if table doesn't exist yet, operations will be no-ops)
 try:
-    from app.models_events import EventSchedule, EventDefinition
+    from app.models_events import EventDefinition
     EVENT_TICKETING_ENABLED = True
 except ImportError:
     EVENT_TICKETING_ENABLED = False
@@ -77,9 +81,7 @@ async def _check_for_conflicts(
 @router.post("/bookings", response_model=BookingOut)
 async def create_booking(payload: BookingCreate, session: AsyncSession = Depends(get_session), current_user: User = Depends(get_current_user)):
     # validate space
-    stmt = select(Space).where(Space.id == payload.space_id)
-    rs = await session.execute(stmt)
-    space = rs.scalars().first()
+    space = await space_cache.get_space(session, payload.space_id)
     if not space:
         raise HTTPException(status_code=404, detail="Space not found")
 
@@ -128,7 +130,7 @@ async def create_booking(payload: BookingCreate, session: AsyncSession = Depends
 
     # Check if user is a broker and get broker profile
     broker_id = None
-    brokerage_amount = 0.0
+    brokerage_percentage = 0.0
     if current_user.role == 'broker':
         from app.models import BrokerProfile
         rs_broker = await session.execute(
@@ -137,7 +139,7 @@ async def create_booking(payload: BookingCreate, session: AsyncSession = Depends
         broker_profile = rs_broker.scalars().first()
         if broker_profile:
             broker_id = broker_profile.id
-            brokerage_percentage = float(getattr(broker_profile, 'brokerage_percentage', 0.0))
+            brokerage_percentage = float(getattr(broker_profile, 'brokerage_percentage', 0.0) or 0.0)
             # Brokerage will be calculated after items are added (based on final total)
 
     # create booking
@@ -170,15 +172,13 @@ async def create_booking(payload: BookingCreate, session: AsyncSession = Depends
     
     if EVENT_TICKETING_ENABLED and event_schedule_id:
         try:
-            schedule_result = await session.execute(
-                select(EventSchedule).where(EventSchedule.id == event_schedule_id)
-            )
-            schedule = schedule_result.scalar_one_or_none()
+            # Fast pre-check from the availability cache; the checkout hold below is authoritative
+            schedule = await ticket_inventory.get_availability(session, event_schedule_id)
             
             if schedule:
                 # Check ticket availability
                 requested_tickets = payload.attendees or 1
-                tickets_available = schedule.max_tickets - schedule.tickets_sold
+                tickets_available = schedule.available
                 
                 if schedule.status != 'scheduled':
                     raise HTTPException(status_code=400, detail=f"Event is {schedule.status}")
@@ -237,110 +237,36 @@ async def create_booking(payload: BookingCreate, session: AsyncSession = Depends
     session.add(b)
     await session.flush()  # to get booking.id
 
-    # add booking items
-    items_total = 0.0
-    for it in payload.items or []:
-        stmt = select(Item).where(Item.id == it.item_id)
-        rs = await session.execute(stmt)
-        item = rs.scalars().first()
-        if not item:
-            raise HTTPException(status_code=404, detail=f"Item {it.item_id} not found")
-        unit = float(item.price)
-        qty = int(it.quantity)
-        
-        # Calculate total including extra hours cost if applicable
-        base_total = unit * qty
-        extra_hours_cost = 0.0
-        hours_used = getattr(it, 'hours_used', None)
-        
-        # If item has hour-based pricing and hours_used is provided
-        if hours_used and item.base_hours_included and item.base_hours_included > 0 and item.rate_per_extra_hour:
-            extra_hours = max(0, hours_used - item.base_hours_included)
-            if extra_hours > 0:
-                extra_hours_cost = float(extra_hours * item.rate_per_extra_hour * qty)
-        
-        total = base_total + extra_hours_cost
-        
-        bi = BookingItem(
-            booking_id=b.id,
-            item_id=item.id,
-            vendor_id=item.vendor_id,
-            quantity=qty,
-            unit_price=unit,
-            total_price=total,
-            event_date=start_dt.date(),
-            booking_status=b.status,
-            is_supplied=False,
-            hours_used=hours_used if hours_used else None,
-        )
-        session.add(bi)
-        items_total += total
-
-    # add custom items (by name/price) - create or reuse Item rows by name
-    for ci in (payload.custom_items or []):
-        name = (ci.name or '').strip()
-        if not name:
-            continue
-        # Extract stage_banner_url from code if present (format: "stage_banner:URL")
-        stage_banner_url = None
-        item_code = ci.code or None
-        if item_code and item_code.startswith('stage_banner:'):
-            stage_banner_url = item_code.replace('stage_banner:', '')
-            item_code = 'stage_banner'  # Use a consistent code for lookup
-        
-        # For transport items, use code 'transport' for consistent lookup
-        # This allows transport items to be assigned to vendors later
-        if item_code == 'transport':
-            item_code = 'transport'
-        
-        # Try to find an existing catalog item by exact name match or by code for transport
-        if item_code == 'transport':
-            # Look for transport item by code in description or by name
-            rs = await session.execute(
-                select(Item).where(
-                    (Item.name == name) | (Item.description == 'transport')
-                )
-            )
-        else:
-            rs = await session.execute(select(Item).where(Item.name == name))
-        item = rs.scalars().first()
-        if not item:
-            # Create a simple catalog item (no vendor) so we can reference it
-            # If it's a stage banner, store the URL in image_url
-            # For transport, store 'transport' in description so it can be identified
-            item = Item(
-                name=name, 
-                description=item_code or None, 
-                price=float(ci.unit_price or 0.0),
-                image_url=stage_banner_url if stage_banner_url else None
+    # Sell the tickets with the booking: hold them (conditional UPDATE, can't oversell) and
+    # confirm the hold into tickets_sold. No payment-success callback reaches the server, so
+    # waiting for one would let the hold expire; cancellation/rejection returns the tickets.
+    if EVENT_TICKETING_ENABLED and event_schedule_id:
+        try:
+            await ticket_inventory.acquire_hold(
+                session, event_schedule_id, payload.attendees or 1, user_id=current_user.id, booking_id=b.id
             )
-            session.add(item)
-            await session.flush()
-        elif stage_banner_url and not item.image_url:
-            # Update existing item with stage banner URL if not already set
-            item.image_url = stage_banner_url
-        elif item_code == 'transport' and not item.description:
-            # Ensure transport items have description set
-            item.description = 'transport'
-        unit = float(ci.unit_price or 0.0)
-        qty = int(ci.quantity or 1)
-        if qty <= 0:
-            qty = 1
-        total = unit * qty
-        # For transport items, vendor_id starts as None but can be assigned later via admin
-        bi = BookingItem(
+        except TicketsUnavailable as e:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail=e.message)
+        await ticket_inventory.confirm_booking_tickets(session, b.id, event_schedule_id, payload.attendees or 1)
+
+    # add booking items: catalog items by id and custom items by name/price, resolved and
+    # priced together (custom names missing from the catalog become vendor-less Items)
+    try:
+        cart = await booking_cart.assemble_cart(session, payload.items, payload.custom_items)
+    except booking_cart.CartItemNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Item {e.item_id} not found")
+    session.add_all([
+        BookingItem(
             booking_id=b.id,
-            item_id=item.id,
-            vendor_id=item.vendor_id,  # Will be None for transport, can be assigned later
-            quantity=qty,
-            unit_price=unit,
-            total_price=total,
+            **line.booking_item_fields(),
             event_date=start_dt.date(),
             booking_status=b.status,
             is_supplied=False,
         )
-        session.add(bi)
-        items_total += total
+        for line in cart
+    ])
+    items_total = booking_cart.cart_total(cart)
 
     b.total_amount = float(b.total_amount) + items_total
 
@@ -358,17 +284,9 @@ async def create_booking(payload: BookingCreate, session: AsyncSession = Depends
         # Non-blocking: if schema lacks discount fields, ignore
         pass
     
-    # Calculate brokerage if user is a broker
-    if broker_id:
-        from app.models import BrokerProfile
-        rs_broker = await session.execute(
-            select(BrokerProfile).where(BrokerProfile.id == broker_id)
-        )
-        broker_profile = rs_broker.scalars().first()
-        if broker_profile:
-            brokerage_percentage = float(getattr(broker_profile, 'brokerage_percentage', 0.0))
-            if brokerage_percentage > 0:
-                b.brokerage_amount = float(b.total_amount) * (brokerage_percentage / 100.0)
+    # Calculate brokerage if user is a broker (percentage read with the profile above)
+    if broker_id and brokerage_percentage > 0:
+        b.brokerage_amount = float(b.total_amount) * (brokerage_percentage / 100.0)
     
     # Participant entries for live shows are created only after successful payment verification.
     # Avoid creating participants at booking time to prevent unauthorized entries.
@@ -463,6 +381,8 @@ async def list_my_bookings(
     to_date: Optional[str] = Query(default=None, description="Filter bookings with start_datetime <= this (YYYY-MM-DD)"),
     page: int = Query(1, ge=1, description="Page number (1-indexed)"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: empty for the first page, then pagination.next_cursor"),
+    include_total: Optional[bool] = Query(default=None, description="Count all matching bookings (default: yes with page, no with cursor)"),
     session: AsyncSession = Depends(get_session), 
     current_user: User = Depends(get_current_user)
 ):
@@ -475,6 +395,10 @@ async def list_my_bookings(
     - to_date: Optional filter by end date (YYYY-MM-DD format)
     - page: Page number (default: 1)
     - page_size: Items per page (default: 50, max: 100)
+    - cursor: Switches to keyset pagination on (start_datetime, id), newest first, served by
+      ix_bookings_user_start_id. Pass it empty for the first page, then echo next_cursor;
+      page is ignored and rack orders come with the first page only.
+    - include_total: Whether to run the COUNT for pagination.total
     """
     # Only include bookings owned by the current user
     base_stmt = select(Booking).where(
@@ -504,37 +428,78 @@ async def list_my_bookings(
         # Default behavior: exclude cancelled bookings (for backward compatibility)
         base_stmt = base_stmt.where(Booking.status != 'cancelled')
     
-    # Apply date filters if provided
+    # Apply date filters if provided (plain ranges on start_datetime so the index applies)
     if from_date:
         try:
-            from_dt = datetime.strptime(from_date, '%Y-%m-%d').date()
-            base_stmt = base_stmt.where(func.date(Booking.start_datetime) >= from_dt)
+            from_dt = datetime.strptime(from_date, '%Y-%m-%d')
+            base_stmt = base_stmt.where(Booking.start_datetime >= from_dt)
         except ValueError:
             pass  # Invalid date format, ignore
     if to_date:
         try:
-            to_dt = datetime.strptime(to_date, '%Y-%m-%d').date()
-            base_stmt = base_stmt.where(func.date(Booking.start_datetime) <= to_dt)
+            # Whole to_date included: before the following midnight
+            to_dt = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+            base_stmt = base_stmt.where(Booking.start_datetime < to_dt)
         except ValueError:
             pass  # Invalid date format, ignore
     
+    keyset_mode = cursor is not None
+    if include_total is None:
+        include_total = not keyset_mode
+    
     # Get total count for pagination (before applying limit/offset)
-    count_stmt = select(func.count(Booking.id)).select_from(base_stmt.subquery())
-    total_result = await session.execute(count_stmt)
-    total = total_result.scalar() or 0
+    total = None
+    if include_total:
+        count_stmt = base_stmt.with_only_columns(func.count(Booking.id)).order_by(None)
+        total = (await session.execute(count_stmt)).scalar() or 0
+    
+    # Latest refund and cancellation time ride along with cancelled bookings in the page query
+    is_cancelled = Booking.status == 'cancelled'
+    latest_refund_id = (
+        select(Refund.id)
+        .where(Refund.booking_id == Booking.id)
+        .order_by(Refund.created_at.desc(), Refund.id.desc())
+        .limit(1)
+        .correlate(Booking)
+        .scalar_subquery()
+    )
+    cancellation_time = case(
+        (
+            is_cancelled,
+            select(func.max(BookingEvent.created_at))
+            .where(BookingEvent.booking_id == Booking.id, BookingEvent.to_status == 'cancelled')
+            .correlate(Booking)
+            .scalar_subquery(),
+        ),
+        else_=None,
+    )
+    stmt = (
+        base_stmt
+        .add_columns(Refund, cancellation_time.label('cancellation_time'))
+        .outerjoin(Refund, and_(is_cancelled, Refund.id == latest_refund_id))
+        .order_by(Booking.start_datetime.desc(), Booking.id.desc())
+    )
     
-    # Apply pagination
-    offset = (page - 1) * page_size
-    stmt = base_stmt.order_by(Booking.start_datetime.desc()).offset(offset).limit(page_size)
-    rs = await session.execute(stmt)
-    rows = rs.scalars().all()
+    # Apply pagination (one extra row tells whether there is a next page)
+    if keyset_mode:
+        if cursor:
+            try:
+                after = decode_cursor(cursor, (datetime, int))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(keyset_before((Booking.start_datetime, Booking.id), after))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    rs = await session.execute(stmt.limit(page_size + 1))
+    page_rows, has_next = split_page(rs.all(), page_size)
+    rows = [booking for booking, _, _ in page_rows]
     
     # Log for debugging
     import logging
     logger = logging.getLogger(__name__)
     logger.info(f"[BOOKINGS] Query returned {len(rows)} bookings for user {current_user.id} with status filter: {status}")
     
-    # Get all booking IDs for batch fetching refunds and cancellation events
+    # Get all booking IDs for batch fetching booking items
     booking_ids = [b.id for b in rows]
     
     # Batch fetch booking items for all bookings
@@ -562,37 +527,22 @@ async def list_my_bookings(
                 'is_supplied': booking_item.is_supplied,
             })
     
-    # Batch fetch refunds for all bookings
     refunds_map = {}
-    if booking_ids:
-        stmt_refunds = select(Refund).where(Refund.booking_id.in_(booking_ids)).order_by(Refund.created_at.desc())
-        rs_refunds = await session.execute(stmt_refunds)
-        refunds = rs_refunds.scalars().all()
-        for refund in refunds:
-            if refund.booking_id not in refunds_map:  # Only keep the latest refund per booking
-                refunds_map[refund.booking_id] = {
-                    'id': refund.id,
-                    'amount': float(refund.amount),
-                    'status': refund.status,
-                    'refund_type': refund.refund_type,
-                    'reason': refund.reason,
-                    'notes': refund.notes,
-                    'created_at': refund.created_at.isoformat(),
-                    'processed_at': refund.processed_at.isoformat() if refund.processed_at else None,
-                }
-    
-    # Batch fetch cancellation events for all bookings
     cancellation_times_map = {}
-    if booking_ids:
-        stmt_events = select(BookingEvent).where(
-            BookingEvent.booking_id.in_(booking_ids),
-            BookingEvent.to_status == 'cancelled'
-        ).order_by(BookingEvent.created_at.desc())
-        rs_events = await session.execute(stmt_events)
-        events = rs_events.scalars().all()
-        for event in events:
-            if event.booking_id not in cancellation_times_map:  # Only keep the latest cancellation event per booking
-                cancellation_times_map[event.booking_id] = event.created_at.isoformat()
+    for booking, refund, cancelled_at in page_rows:
+        if refund is not None:
+            refunds_map[booking.id] = {
+                'id': refund.id,
+                'amount': float(refund.amount),
+                'status': refund.status,
+                'refund_type': refund.refund_type,
+                'reason': refund.reason,
+                'notes': refund.notes,
+                'created_at': refund.created_at.isoformat(),
+                'processed_at': refund.processed_at.isoformat() if refund.processed_at else None,
+            }
+        if cancelled_at is not None:
+            cancellation_times_map[booking.id] = cancelled_at.isoformat()
     
     # Serialize bookings to ensure proper JSON response
     # This prevents any potential issues with ORM object serialization
@@ -661,22 +611,26 @@ async def list_my_bookings(
         rack_orders_stmt = rack_orders_stmt.where(RackOrder.status != 'cancelled')
     
     rack_orders_stmt = rack_orders_stmt.order_by(RackOrder.created_at.desc())
-    rack_orders_rs = await session.execute(rack_orders_stmt)
-    rack_orders = rack_orders_rs.scalars().all()
-    
-    # Get surprise gift info for rack orders
+    rack_orders = []
+    if not keyset_mode or not cursor:
+        # Cursor pages list rack orders once, on the first page
+        rack_orders_rs = await session.execute(rack_orders_stmt)
+        rack_orders = rack_orders_rs.scalars().all()
+    
+    # Get surprise gift info for rack orders (one query for all applied offers)
+    offers_map = {}
+    offer_ids = {ro.applied_offer_id for ro in rack_orders if ro.applied_offer_id}
+    if offer_ids:
+        from ..models import Offer
+        offer_result = await session.execute(select(Offer).where(Offer.id.in_(offer_ids)))
+        offers_map = {offer.id: offer for offer in offer_result.scalars().all()}
     for rack_order in rack_orders:
         surprise_gift_name = None
         surprise_gift_image_url = None
-        if rack_order.applied_offer_id:
-            from ..models import Offer
-            offer_result = await session.execute(
-                select(Offer).where(Offer.id == rack_order.applied_offer_id)
-            )
-            offer = offer_result.scalar_one_or_none()
-            if offer:
-                surprise_gift_name = offer.surprise_gift_name
-                surprise_gift_image_url = offer.surprise_gift_image_url
+        offer = offers_map.get(rack_order.applied_offer_id)
+        if offer:
+            surprise_gift_name = offer.surprise_gift_name
+            surprise_gift_image_url = offer.surprise_gift_image_url
         
         # Convert rack order to booking-like format
         rack_order_dict = {
@@ -722,20 +676,35 @@ async def list_my_bookings(
     logger.info(f"[BOOKINGS] Returning {len(result)} bookings for user {current_user.id} (skipped {skipped_count} non-owned bookings, {len(rack_orders)} rack orders)")
     
     # Add pagination metadata (include rack orders in total count)
-    total_with_rack_orders = total + len(rack_orders)
-    total_pages = (total_with_rack_orders + page_size - 1) // page_size if total_with_rack_orders > 0 else 0
+    total_with_rack_orders = total + len(rack_orders) if total is not None else None
+    if keyset_mode:
+        return FastJSONResponse({
+            "items": result,
+            "pagination": {
+                "page_size": page_size,
+                "total": total_with_rack_orders,
+                "has_next": has_next,
+                "next_cursor": next_cursor(rows, has_next, lambda b: (b.start_datetime, b.id)),
+            }
+        })
     
-    return {
+    if total_with_rack_orders is None:
+        total_pages = None
+    else:
+        total_pages = (total_with_rack_orders + page_size - 1) // page_size if total_with_rack_orders > 0 else 0
+        has_next = page < total_pages
+    
+    return FastJSONResponse({
         "items": result,
         "pagination": {
             "page": page,
             "page_size": page_size,
             "total": total_with_rack_orders,
             "total_pages": total_pages,
-            "has_next": page < total_pages,
+            "has_next": has_next,
             "has_prev": page > 1
         }
-    }
+    })
 
 
 @router.get('/bookings/today')
@@ -940,9 +909,7 @@ async def get_public_booking(booking_id: int, session: AsyncSession = Depends(ge
     booking, space_name, venue_name = row
 
     # Safely fetch optional attributes that may not exist on Space model in all deployments
-    # We'll query Space again to access all attributes directly
-    rs2 = await session.execute(select(Space).where(Space.id == booking.space_id))
-    space = rs2.scalars().first()
+    space = await space_cache.get_space(session, booking.space_id)
 
     def safe_get(obj, attr, default=None):
         try:
@@ -1010,8 +977,7 @@ async def get_price_quote(
         raise HTTPException(status_code=400, detail='Invalid time range')
 
     # Fetch space pricing
-    rs = await session.execute(select(Space).where(Space.id == space_id))
-    space = rs.scalars().first()
+    space = await space_cache.get_space(session, space_id)
     if not space:
         raise HTTPException(status_code=404, detail='Space not found')
 
@@ -2075,6 +2041,10 @@ async def cancel_booking(
     prev_status = booking.status
     booking.status = 'cancelled'
     session.add(booking)
+
+    # Return the booking's tickets to the pool
+    if EVENT_TICKETING_ENABLED and booking.event_schedule_id:
+        await ticket_inventory.release_booking_tickets(session, booking.id)
     
     # Generate cancellation date string for the note
     cancellation_date = now.strftime('%B %d, %Y at %I:%M %p')
@@ -2297,8 +2267,7 @@ async def update_booking(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Get space for pricing
-    rs_space = await session.execute(select(Space).where(Space.id == original.space_id))
-    space = rs_space.scalars().first()
+    space = await space_cache.get_space(session, original.space_id)
     if not space:
         raise HTTPException(status_code=404, detail='Associated space not found')
 
@@ -2615,6 +2584,10 @@ async def create_booking_series(
       - event_type: str optional
       - items: [{ item_id, quantity }] optional per-booking items
       - customer_note: str optional
+
+    The whole series costs a fixed number of queries: one conflict scan over the
+    window, one item lookup and two bulk inserts (see app.services.booking_series).
+    `results` reports every date as created or skipped (with the reason).
     """
     try:
         space_id = int(payload.get('space_id'))
@@ -2624,8 +2597,7 @@ async def create_booking_series(
         raise HTTPException(status_code=400, detail='Invalid payload: space_id/start_datetime/end_datetime')
 
     # Validate space
-    rs = await session.execute(select(Space).where(Space.id == space_id))
-    space = rs.scalars().first()
+    space = await space_cache.get_space(session, space_id)
     if not space:
         raise HTTPException(status_code=404, detail='Space not found')
 
@@ -2664,118 +2636,31 @@ async def create_booking_series(
 
     series_ref = 'SR-' + uuid.uuid4().hex[:10].upper()
 
-    created: list[dict] = []
-    skipped: list[dict] = []
-
-    cur = start_date
-    while cur <= end_date:
-        # Skip excluded weekdays (Python: Monday=0 .. Sunday=6)
-        if cur.weekday() in excluded_set:
-            skipped.append({'date': cur.isoformat(), 'reason': 'excluded_weekday'})
-            cur = cur + timedelta(days=1)
-            continue
-
-        sdt = datetime.combine(cur, start_t)
-        edt = datetime.combine(cur, end_t)
-        if edt <= sdt:
-            edt = sdt + timedelta(hours=1)
-
-        # Overlap check
-        rs = await session.execute(
-            select(Booking).where(
-                Booking.space_id == space_id,
-                Booking.status.in_(["pending","approved","confirmed"]),
-                not_(
-                    or_(
-                        Booking.end_datetime <= sdt,
-                        Booking.start_datetime >= edt,
-                    )
-                )
-            )
-        )
-        conflict = rs.scalars().first()
-        if conflict:
-            skipped.append({'date': cur.isoformat(), 'reason': f'conflict:{conflict.booking_reference}'})
-            cur = cur + timedelta(days=1)
-            continue
-
-        # Price calc
-        # Admin bookings (regular programs) should have no payment
-        is_admin_booking = payload.get('is_admin_booking') or False
-        duration_hours = max(0.0, (edt - sdt).total_seconds() / 3600.0)
-        if is_admin_booking:
-            total_amount = 0.0
-        else:
-            total_amount = float(duration_hours * float(space.price_per_hour))
-
-        # Create booking
-        # Admin bookings (regular programs, live shows) should be auto-approved
-        booking_status = 'approved' if is_admin_booking else 'pending'
-        
-        booking_ref = 'BK-' + uuid.uuid4().hex[:10].upper()
-        b = Booking(
-            booking_reference=booking_ref,
-            series_reference=series_ref,
-            user_id=current_user.id,
-            venue_id=space.venue_id,
-            space_id=space.id,
-            start_datetime=sdt,
-            end_datetime=edt,
-            attendees=attendees,
-            status=booking_status,
-            total_amount=total_amount,
-            booking_type=booking_type,
-            event_type=event_type,
-            customer_note=customer_note,
-            is_admin_booking=is_admin_booking,
-            admin_note=payload.get('admin_note'),
-            banner_image_url=payload.get('banner_image_url'),
-        )
-        session.add(b)
-        await session.flush()  # get b.id
-
-        # Optional items
-        items_total = 0.0
-        for it in items:
-            try:
-                item_id = int(it.get('item_id'))
-                qty = int(it.get('quantity') or 1)
-            except Exception:
-                continue
-            rs = await session.execute(select(Item).where(Item.id == item_id))
-            item = rs.scalars().first()
-            if not item:
-                continue
-            unit = float(item.price)
-            total = unit * qty
-            bi = BookingItem(
-                booking_id=b.id,
-                item_id=item.id,
-                vendor_id=item.vendor_id,
-                quantity=qty,
-                unit_price=unit,
-                total_price=total,
-                event_date=sdt.date(),
-                booking_status=b.status,
-                is_supplied=False,
-            )
-            session.add(bi)
-            items_total += total
-
-        # For admin bookings, keep total_amount at 0 (no payment required)
-        if not is_admin_booking:
-            b.total_amount = float(b.total_amount) + items_total
-        await session.flush()
-
-        created.append({
-            'id': b.id,
-            'booking_reference': booking_ref,
-            'date': cur.isoformat(),
-            'start_datetime': sdt.isoformat(),
-            'end_datetime': edt.isoformat(),
-        })
+    # Plan every date, resolve conflicts in one range query, then bulk insert
+    plan = booking_series.plan_series(start_date, end_date, start_t, end_t, excluded_set)
+    await booking_series.find_conflicts(session, space_id, plan)
+    series_items = await booking_series.load_items(session, items)
+    await booking_series.create_series(
+        session,
+        space,
+        plan,
+        user_id=current_user.id,
+        series_reference=series_ref,
+        items=series_items,
+        is_admin_booking=bool(payload.get('is_admin_booking') or False),
+        booking_fields={
+            'attendees': attendees,
+            'booking_type': booking_type,
+            'event_type': event_type,
+            'customer_note': customer_note,
+            'admin_note': payload.get('admin_note'),
+            'banner_image_url': payload.get('banner_image_url'),
+        },
+    )
 
-        cur = cur + timedelta(days=1)
+    results = [o.report() for o in plan]
+    created = [{k: v for k, v in r.items() if k != 'status'} for r in results if r['status'] == 'created']
+    skipped = [{k: v for k, v in r.items() if k != 'status'} for r in results if r['status'] == 'skipped']
 
     await session.commit()
 
@@ -2802,6 +2687,7 @@ async def create_booking_series(
         'skipped_count': len(skipped),
         'created': created,
         'skipped': skipped,
+        'results': results,
         'message': f"Created {len(created)} booking(s); skipped {len(skipped)}."
     }
 
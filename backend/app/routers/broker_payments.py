@@ -14,6 +14,7 @@ from pydantic import BaseModel
 from ..db import get_session
 from ..auth import get_current_user, get_current_admin
 from ..models import Booking, BrokerProfile, User, Payment
+from ..razorpay_service import InvalidPaymentData, confirm_settlement_payment, create_settlement_order
 
 router = APIRouter(prefix="/broker/payments", tags=["broker-payments"])
 
@@ -49,15 +50,21 @@ class BrokerPaymentSummary(BaseModel):
 @router.get("/summary")
 async def get_broker_payment_summary(
     period: str = Query("monthly", description="weekly, monthly, or yearly"),
-    broker_id: Optional[int] = Query(None, description="Broker ID (admin only)"),
+    broker_id: Optional[int] = Query(None, description="Broker ID (admin only; omit for all brokers)"),
     include_settled: bool = Query(True, description="Include already settled bookings"),
     session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    """Get brokerage payment summary for a broker."""
+    """Get brokerage payment summary for a broker, or for all brokers (admin without broker_id).
+
+    Totals come from the daily settlement rollups (app.services.settlement_rollup);
+    the itemized list is capped at 1000 bookings.
+    """
+    from ..services.settlement_rollup import broker_totals
+
     try:
         # Admin can view any broker, brokers can only view their own
-        if user.role == 'admin' and broker_id:
+        if user.role == 'admin':
             target_broker_id = broker_id
         elif user.role == 'broker':
             # Add timeout to broker profile lookup
@@ -79,19 +86,32 @@ async def get_broker_payment_summary(
         print(f"[BROKER PAYMENTS] Error determining broker ID: {e}")
         raise HTTPException(status_code=500, detail='Failed to determine broker')
     
-    # Calculate date range
+    # Calculate date range (whole days, matching the daily rollups)
     now = datetime.utcnow()
     if period == 'weekly':
-        start_date = now - timedelta(days=7)
-        period_label = 'Weekly'
+        days, period_label = 7, 'Weekly'
     elif period == 'monthly':
-        start_date = now - timedelta(days=30)
-        period_label = 'Monthly'
+        days, period_label = 30, 'Monthly'
     elif period == 'yearly':
-        start_date = now - timedelta(days=365)
-        period_label = 'Yearly'
+        days, period_label = 365, 'Yearly'
     else:
         raise HTTPException(status_code=400, detail='Invalid period. Use: weekly, monthly, or yearly')
+    start_day = (now - timedelta(days=days)).date()
+    start_date = datetime.combine(start_day, datetime.min.time())
+    
+    if target_broker_id is None:
+        brokers = await broker_totals(session, start_day)
+        brokers.sort(key=lambda row: row['total_brokerage'], reverse=True)
+        return {
+            'period': period_label,
+            'start_date': start_date.isoformat(),
+            'end_date': now.isoformat(),
+            'total_bookings': sum(row['total_bookings'] for row in brokers),
+            'total_brokerage': sum(row['total_brokerage'] for row in brokers),
+            'settled_brokerage': sum(row['settled_brokerage'] for row in brokers),
+            'pending_brokerage': sum(row['pending_brokerage'] for row in brokers),
+            'brokers': brokers,
+        }
     
     # Build query conditions
     conditions = [
@@ -100,12 +120,6 @@ async def get_broker_payment_summary(
         Booking.created_at >= start_date,  # Filter by booking date
     ]
     
-    if not include_settled:
-        # Only include unsettled bookings
-        # For brokers, we'll use a custom field or check payment status
-        # For now, we'll include all bookings and mark settlement separately
-        pass
-    
     # First, get broker profile separately to avoid join issues
     try:
         rs_broker = await asyncio.wait_for(
@@ -116,6 +130,7 @@ async def get_broker_payment_summary(
         if not broker_profile:
             raise HTTPException(status_code=404, detail='Broker profile not found')
         brokerage_percentage = float(getattr(broker_profile, 'brokerage_percentage', 0.0))
+        totals = await asyncio.wait_for(broker_totals(session, start_day, broker_id=target_broker_id), timeout=5.0)
     except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail='Request timeout - database query took too long')
     except HTTPException:
@@ -123,6 +138,7 @@ async def get_broker_payment_summary(
     except Exception as e:
         print(f"[BROKER PAYMENTS] Error fetching broker profile: {e}")
         raise HTTPException(status_code=500, detail='Failed to fetch broker profile')
+    totals = totals[0] if totals else {}
     
     # Query bookings with brokerage - simpler query without join
     # Add limit to prevent fetching too many records
@@ -154,12 +170,6 @@ async def get_broker_payment_summary(
         raise HTTPException(status_code=500, detail=f'Database query failed: {str(e)}')
     
     items = []
-    total_brokerage = 0.0
-    settled_brokerage = 0.0
-    pending_brokerage = 0.0
-    
-    # For now, we'll use a simple approach: check if booking status indicates settlement
-    # In the future, you might want to add a broker_settlement table similar to vendor settlements
     for booking in rows:
         # Skip if booking is None
         if not booking:
@@ -178,13 +188,6 @@ async def get_broker_payment_summary(
             except Exception:
                 pass
         
-        if is_settled:
-            settled_brokerage += brokerage_amount
-        else:
-            pending_brokerage += brokerage_amount
-        
-        total_brokerage += brokerage_amount
-        
         # Get booking created_at safely
         booking_date = None
         if hasattr(booking, 'created_at') and booking.created_at:
@@ -208,10 +211,10 @@ async def get_broker_payment_summary(
         'period': period_label,
         'start_date': start_date.isoformat(),
         'end_date': now.isoformat(),
-        'total_bookings': len(items),
-        'total_brokerage': total_brokerage,
-        'settled_brokerage': settled_brokerage,
-        'pending_brokerage': pending_brokerage,
+        'total_bookings': totals.get('total_bookings', 0),
+        'total_brokerage': totals.get('total_brokerage', 0.0),
+        'settled_brokerage': totals.get('settled_brokerage', 0.0),
+        'pending_brokerage': totals.get('pending_brokerage', 0.0),
         'items': items,
     }
 
@@ -282,33 +285,21 @@ async def prepare_broker_payment(
     if getattr(booking, 'broker_settled', False):
         raise HTTPException(status_code=400, detail='Broker payment already settled')
     
-    # Import payment service
+    # Create Razorpay order
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        if not razorpay_service.is_configured():
+        try:
+            order_id = await create_settlement_order(
+                brokerage_amount,
+                receipt=f"broker_{booking_id}_{int(datetime.utcnow().timestamp())}",
+                description=f"Brokerage payment for booking {booking.booking_reference}",
+                notes={
+                    'booking_id': booking_id,
+                    'payment_type': 'broker_payment',
+                    'broker_id': booking.broker_id,
+                },
+            )
+        except ValueError:
             raise HTTPException(status_code=503, detail='Payment service is not available. Please contact support.')
-        
-        # Create Razorpay order
-        amount_paise = int(brokerage_amount * 100)
-        razorpay_order = razorpay_service.create_order(
-            amount=amount_paise,
-            currency='INR',
-            receipt=f"broker_{booking_id}_{int(datetime.utcnow().timestamp())}",
-            description=f"Brokerage payment for booking {booking.booking_reference}",
-            notes={
-                'booking_id': booking_id,
-                'payment_type': 'broker_payment',
-                'broker_id': booking.broker_id,
-            }
-        )
-        
-        if not razorpay_order or 'id' not in razorpay_order:
-            logger.error(f"[Broker Payment] Invalid order response: {razorpay_order}")
-            raise HTTPException(status_code=503, detail='Payment service encountered an error. Please try again.')
-        
-        order_id = razorpay_order.get('id')
         logger.info(f"[Broker Payment] Order created for booking {booking_id}: {order_id}")
         
         return {
@@ -357,28 +348,10 @@ async def verify_broker_payment(
     
     # Verify payment with Razorpay
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        razorpay_payment_id = payment_data.get('razorpay_payment_id') or payment_data.get('payment_id')
-        razorpay_order_id = payment_data.get('razorpay_order_id') or payment_data.get('order_id')
-        razorpay_signature = payment_data.get('razorpay_signature') or payment_data.get('signature')
-        
-        if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-            raise HTTPException(status_code=400, detail='Missing payment verification data')
-        
-        # Verify payment signature
-        is_valid = razorpay_service.verify_payment(
-            razorpay_order_id,
-            razorpay_payment_id,
-            razorpay_signature
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail='Payment verification failed - invalid signature')
-        
-        # Fetch payment details from Razorpay
-        payment_details = razorpay_service.fetch_payment(razorpay_payment_id)
+        try:
+            razorpay_order_id, razorpay_payment_id, payment_details = await confirm_settlement_payment(payment_data)
+        except InvalidPaymentData as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Create payment record
         brokerage_amount = float(getattr(booking, 'brokerage_amount', 0.0))
@@ -474,31 +447,21 @@ async def prepare_bulk_broker_payment(
     
     # Create Razorpay order
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        if not razorpay_service.is_configured():
+        try:
+            order_id = await create_settlement_order(
+                total_amount,
+                receipt=f"broker_bulk_{broker_id}_{int(datetime.utcnow().timestamp())}",
+                description=f"Bulk brokerage payment for {len(booking_ids)} bookings",
+                notes={
+                    'broker_id': broker_id,
+                    'payment_type': 'broker_bulk_payment',
+                    'booking_ids': booking_ids,
+                    'count': len(booking_ids),
+                },
+            )
+        except ValueError:
             raise HTTPException(status_code=500, detail='Payment gateway not configured')
         
-        amount_paise = int(total_amount * 100)
-        razorpay_order = razorpay_service.create_order(
-            amount=amount_paise,
-            currency='INR',
-            receipt=f"broker_bulk_{broker_id}_{int(datetime.utcnow().timestamp())}",
-            description=f"Bulk brokerage payment for {len(booking_ids)} bookings",
-            notes={
-                'broker_id': broker_id,
-                'payment_type': 'broker_bulk_payment',
-                'booking_ids': booking_ids,
-                'count': len(booking_ids),
-            }
-        )
-        
-        if not razorpay_order or 'id' not in razorpay_order:
-            raise HTTPException(status_code=500, detail='Failed to create payment order')
-        
-        order_id = razorpay_order.get('id')
-        
         return {
             'ok': True,
             'order_id': order_id,
@@ -551,28 +514,10 @@ async def verify_bulk_broker_payment(
     
     # Verify payment with Razorpay
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        razorpay_payment_id = payment_data.get('razorpay_payment_id') or payment_data.get('payment_id')
-        razorpay_order_id = payment_data.get('razorpay_order_id') or payment_data.get('order_id')
-        razorpay_signature = payment_data.get('razorpay_signature') or payment_data.get('signature')
-        
-        if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-            raise HTTPException(status_code=400, detail='Missing payment verification data')
-        
-        # Verify payment signature
-        is_valid = razorpay_service.verify_payment(
-            razorpay_order_id,
-            razorpay_payment_id,
-            razorpay_signature
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail='Payment verification failed - invalid signature')
-        
-        # Fetch payment details
-        payment_details = razorpay_service.fetch_payment(razorpay_payment_id)
+        try:
+            razorpay_order_id, razorpay_payment_id, payment_details = await confirm_settlement_payment(payment_data)
+        except InvalidPaymentData as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Calculate total amount
         total_amount = sum(float(getattr(b, 'brokerage_amount', 0.0)) for b in bookings)
@@ -7,7 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from ..db import get_session
-from ..models import Space, Booking
+from ..models import Booking
+from ..services.space_cache import list_spaces
 
 
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
@@ -43,8 +44,7 @@ async def chatbot_message(req: ChatRequest, session: AsyncSession = Depends(get_
 
     # Rates for spaces
     if "rate" in ql or "price" in ql or "cost" in ql:
-        rs = await session.execute(select(Space).order_by(Space.id))
-        spaces = rs.scalars().all()
+        spaces = await list_spaces(session)
         if not spaces:
             return ChatResponse(reply="Our rate cards will be updated shortly.", intent="rates")
         lines = [f"{s.name}: INR {int(s.price_per_hour)}/hour" for s in spaces]
@@ -72,8 +72,7 @@ async def chatbot_message(req: ChatRequest, session: AsyncSession = Depends(get_
 
     # Grant Hall or Meeting Room info
     if "grant" in ql or "hall" in ql or "meeting room" in ql or "room" in ql:
-        rs = await session.execute(select(Space).order_by(Space.id))
-        spaces = rs.scalars().all()
+        spaces = await list_spaces(session)
         info = []
         for s in spaces:
             if ("grant" in ql or "hall" in ql) and "grant" in (s.name or "").lower():
@@ -110,3 +110,81 @@ async def diagnostics_tables(
         out["ok"] = False
         out["error"] = str(e)
     return out
+
+
+@router.get("/diagnostics/scheduler")
+async def diagnostics_scheduler(
+    current_user: Any = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+    job_name: Optional[str] = Query(None, description="Only show runs of this job"),
+    limit: int = Query(50, ge=1, le=500),
+) -> Dict[str, Any]:
+    """Registered background jobs and their recent run history (durations, results, errors)."""
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    from sqlalchemy import select
+    from app.models import ScheduledJobRun
+    from app.services.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    stmt = select(ScheduledJobRun).order_by(ScheduledJobRun.started_at.desc()).limit(limit)
+    if job_name:
+        stmt = stmt.where(ScheduledJobRun.job_name == job_name)
+    runs = (await session.execute(stmt)).scalars().all()
+    return {
+        "worker": scheduler.worker,
+        "running": scheduler.running,
+        "jobs": [
+            {"name": j.name, "interval_seconds": j.interval_seconds, "timeout_seconds": j.timeout_seconds}
+            for j in scheduler.jobs
+        ],
+        "runs": [
+            {
+                "id": r.id,
+                "job_name": r.job_name,
+                "status": r.status,
+                "worker": r.worker,
+                "started_at": r.started_at.isoformat() if r.started_at else None,
+                "finished_at": r.finished_at.isoformat() if r.finished_at else None,
+                "duration_ms": r.duration_ms,
+                "result": r.result,
+                "error_message": r.error_message,
+            }
+            for r in runs
+        ],
+    }
+
+
+@router.get("/diagnostics/performance")
+async def diagnostics_performance(
+    current_user: Any = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+) -> Dict[str, Any]:
+    """Slowest routes and most SQL-heavy routes on this worker, plus recent N+1 findings."""
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    from app.services import metrics
+
+    routes = []
+    for labels in metrics.HTTP_REQUEST_SECONDS.label_sets():
+        latency = metrics.HTTP_REQUEST_SECONDS.snapshot(*labels)
+        queries = metrics.DB_QUERIES_PER_REQUEST.snapshot(*labels)
+        db_time = metrics.DB_SECONDS_PER_REQUEST.snapshot(*labels)
+        count = latency["count"] or 1
+        routes.append({
+            "method": labels[0],
+            "route": labels[1],
+            "requests": latency["count"],
+            "avg_ms": round(latency["sum"] / count * 1000, 1),
+            "avg_queries": round(queries["sum"] / count, 1) if queries else 0,
+            "avg_db_ms": round(db_time["sum"] / count * 1000, 1) if db_time else 0,
+            "n_plus_one_requests": int(metrics.N_PLUS_ONE.value(*labels)),
+        })
+    return {
+        "pid": os.getpid(),
+        "slowest": sorted(routes, key=lambda r: r["avg_ms"], reverse=True)[:limit],
+        "most_queries": sorted(routes, key=lambda r: r["avg_queries"], reverse=True)[:limit],
+        "n_plus_one": metrics.recent_n_plus_one()[:limit],
+    }
@@ -5,9 +5,11 @@ Manages master event templates/definitions.
 from datetime import datetime, date, time, timedelta
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, or_
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects import postgresql, sqlite
 from pydantic import BaseModel, Field
 
 from ..db import get_session
@@ -113,7 +115,8 @@ class EventDefinitionResponse(BaseModel):
 
 class GenerateSchedulesRequest(BaseModel):
     """Schema for generating recurring schedules."""
-    event_definition_id: int
+    event_definition_id: Optional[int] = None
+    event_definition_ids: Optional[List[int]] = Field(None, description="Generate for several definitions at once")
     start_date: str = Field(..., description="YYYY-MM-DD format")
     end_date: str = Field(..., description="YYYY-MM-DD format")
 
@@ -427,24 +430,130 @@ async def delete_event_definition(
 # Schedule Generation
 # ========================================
 
+# Rows per INSERT statement (keeps bind parameters well under the asyncpg limit)
+SCHEDULE_INSERT_BATCH = 1000
+# Whether the unique_event_schedule constraint exists for ON CONFLICT (checked on first use)
+_schedule_conflict_target = {"available": True}
+
+
+def recurrence_dates(definition: EventDefinition, start_date: date, end_date: date) -> List[date]:
+    """All dates in [start_date, end_date] on which a recurring definition occurs."""
+    # Recurrence days use 1=Monday ... 7=Sunday to match PostgreSQL EXTRACT(ISODOW)
+    if definition.recurrence_days:
+        allowed_days = {int(d) for d in definition.recurrence_days.split(',') if d.strip()}
+    else:
+        allowed_days = {1, 2, 3, 4, 5, 6, 7}  # All days
+    
+    days = (end_date - start_date).days + 1
+    return [
+        d for d in (start_date + timedelta(days=i) for i in range(days))
+        if d.isoweekday() in allowed_days
+    ]
+
+
+async def bulk_generate_schedules(
+    session: AsyncSession,
+    definitions: List[EventDefinition],
+    start_date: date,
+    end_date: date,
+) -> dict:
+    """Create the missing schedules of several recurring definitions in bulk.
+    
+    Computes the recurrence set in memory, fetches existing (definition, date, start_time)
+    keys in one query and inserts the rest with multi-row INSERT ... ON CONFLICT DO NOTHING
+    (backed by the unique_event_schedule constraint, so concurrent runs can't duplicate).
+    Where the migration couldn't add that constraint the prefiltered rows are inserted plainly.
+    Returns {definition_id: schedules_created}. The caller commits.
+    """
+    if not definitions:
+        return {}
+    
+    existing = await session.execute(
+        select(EventSchedule.event_definition_id, EventSchedule.schedule_date, EventSchedule.start_time)
+        .where(
+            EventSchedule.event_definition_id.in_([d.id for d in definitions]),
+            EventSchedule.schedule_date >= start_date,
+            EventSchedule.schedule_date <= end_date,
+        )
+    )
+    existing_keys = set(existing.all())
+    
+    rows = []
+    for definition in definitions:
+        for schedule_date in recurrence_dates(definition, start_date, end_date):
+            if (definition.id, schedule_date, definition.default_start_time) in existing_keys:
+                continue
+            rows.append({
+                "event_definition_id": definition.id,
+                "schedule_date": schedule_date,
+                "start_time": definition.default_start_time,
+                "end_time": definition.default_end_time,
+                "max_tickets": definition.max_tickets,
+                "tickets_sold": 0,
+                "tickets_held": 0,
+                "ticket_price": definition.default_ticket_price,
+                "status": 'scheduled',
+                "is_blocked": False,
+            })
+    
+    created = {d.id: 0 for d in definitions}
+    if not rows:
+        return created
+    
+    dialect_insert = sqlite.insert if session.bind.dialect.name == "sqlite" else postgresql.insert
+    now = datetime.utcnow()
+    for i in range(0, len(rows), SCHEDULE_INSERT_BATCH):
+        batch = rows[i:i + SCHEDULE_INSERT_BATCH]
+        for row in batch:
+            row["created_at"] = row["updated_at"] = now
+        stmt = dialect_insert(EventSchedule).values(batch).returning(EventSchedule.event_definition_id)
+        if _schedule_conflict_target["available"]:
+            try:
+                async with session.begin_nested():
+                    inserted = (await session.execute(
+                        stmt.on_conflict_do_nothing(index_elements=["event_definition_id", "schedule_date", "start_time"])
+                    )).all()
+            except (ProgrammingError, OperationalError) as e:
+                if "ON CONFLICT" not in str(e).upper():
+                    raise
+                # unique_event_schedule missing (migration skipped it over duplicate rows):
+                # the keys were prefiltered above, so a plain INSERT is still correct
+                _schedule_conflict_target["available"] = False
+                inserted = (await session.execute(stmt)).all()
+        else:
+            inserted = (await session.execute(stmt)).all()
+        for (definition_id,) in inserted:
+            created[definition_id] += 1
+    return created
+
+
 @router.post("/generate-schedules")
 async def generate_schedules(
     data: GenerateSchedulesRequest,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(admin_required),
 ):
-    """Generate recurring schedules for an event definition (admin only)."""
-    # Get the event definition
+    """Generate recurring schedules for one or more event definitions (admin only)."""
+    definition_ids = list(dict.fromkeys(data.event_definition_ids or []))
+    if data.event_definition_id is not None and data.event_definition_id not in definition_ids:
+        definition_ids.insert(0, data.event_definition_id)
+    if not definition_ids:
+        raise HTTPException(status_code=400, detail="event_definition_id or event_definition_ids is required")
+    
+    # Get the event definitions
     result = await session.execute(
-        select(EventDefinition).where(EventDefinition.id == data.event_definition_id)
+        select(EventDefinition).where(EventDefinition.id.in_(definition_ids))
     )
-    definition = result.scalar_one_or_none()
+    definitions = sorted(result.scalars().all(), key=lambda d: definition_ids.index(d.id))
     
-    if not definition:
+    if len(definitions) != len(definition_ids):
         raise HTTPException(status_code=404, detail="Event definition not found")
     
-    if definition.recurrence_type == 'none':
-        raise HTTPException(status_code=400, detail="Event is not recurring")
+    for definition in definitions:
+        if definition.recurrence_type == 'none':
+            raise HTTPException(status_code=400, detail=f"Event {definition.event_code} is not recurring")
+        if not definition.default_start_time or not definition.default_end_time:
+            raise HTTPException(status_code=400, detail=f"Event {definition.event_code} has no default start/end time")
     
     # Parse dates
     try:
@@ -456,56 +565,20 @@ async def generate_schedules(
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="Start date must be before end date")
     
-    # Parse recurrence days
-    if definition.recurrence_days:
-        allowed_days = [int(d) for d in definition.recurrence_days.split(',')]
-    else:
-        allowed_days = [1, 2, 3, 4, 5, 6, 7]  # All days
-    
-    # Generate schedules
-    created_count = 0
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Python weekday: 0=Monday, 6=Sunday
-        # We use 1=Monday, 7=Sunday to match PostgreSQL EXTRACT(ISODOW)
-        day_of_week = current_date.weekday() + 1  # Convert to 1-7
-        
-        if day_of_week in allowed_days:
-            # Check if schedule already exists
-            existing = await session.execute(
-                select(EventSchedule).where(
-                    and_(
-                        EventSchedule.event_definition_id == definition.id,
-                        EventSchedule.schedule_date == current_date,
-                        EventSchedule.start_time == definition.default_start_time,
-                    )
-                )
-            )
-            
-            if not existing.scalar_one_or_none():
-                schedule = EventSchedule(
-                    event_definition_id=definition.id,
-                    schedule_date=current_date,
-                    start_time=definition.default_start_time,
-                    end_time=definition.default_end_time,
-                    max_tickets=definition.max_tickets,
-                    ticket_price=definition.default_ticket_price,
-                    status='scheduled',
-                )
-                session.add(schedule)
-                created_count += 1
-        
-        current_date += timedelta(days=1)
-    
+    created = await bulk_generate_schedules(session, definitions, start_date, end_date)
     await session.commit()
     
+    created_count = sum(created.values())
     return {
         "success": True,
         "message": f"Generated {created_count} schedules",
         "schedules_created": created_count,
-        "event_code": definition.event_code,
+        "event_code": ", ".join(d.event_code for d in definitions),
         "date_range": f"{data.start_date} to {data.end_date}",
+        "per_event": [
+            {"event_code": d.event_code, "schedules_created": created[d.id]}
+            for d in definitions
+        ],
     }
 
 
@@ -14,6 +14,8 @@ from ..db import get_session
 from ..models_events import EventDefinition, EventSchedule
 from ..models import User, ProgramParticipant, Booking
 from ..auth import get_current_user
+from ..services import ticket_inventory
+from ..services.ticket_inventory import TicketsUnavailable
 
 # Admin required dependency
 def admin_required(user: User = Depends(get_current_user)):
@@ -144,7 +146,7 @@ def schedule_to_response(schedule: EventSchedule, definition: EventDefinition) -
         end_time=time_to_str(schedule.end_time),
         max_tickets=schedule.max_tickets,
         tickets_sold=schedule.tickets_sold,
-        tickets_available=schedule.max_tickets - schedule.tickets_sold,
+        tickets_available=schedule.tickets_available,
         ticket_price=float(schedule.ticket_price) if schedule.ticket_price is not None else None,
         effective_price=effective_price,
         status=schedule.status,
@@ -210,7 +212,7 @@ async def list_schedules(
             raise HTTPException(status_code=400, detail="Invalid date_to format")
     
     if available_only:
-        query = query.where(EventSchedule.tickets_sold < EventSchedule.max_tickets)
+        query = query.where(EventSchedule.tickets_sold + EventSchedule.tickets_held < EventSchedule.max_tickets)
         query = query.where(EventSchedule.is_blocked == False)
     
     query = query.order_by(EventSchedule.schedule_date, EventSchedule.start_time)
@@ -244,7 +246,7 @@ async def get_upcoming_schedules(
         .where(EventSchedule.is_blocked == False)
         .where(EventSchedule.schedule_date >= today)
         .where(EventSchedule.schedule_date <= end_date)
-        .where(EventSchedule.tickets_sold < EventSchedule.max_tickets)
+        .where(EventSchedule.tickets_sold + EventSchedule.tickets_held < EventSchedule.max_tickets)
     )
     
     if event_type:
@@ -414,6 +416,7 @@ async def update_schedule(
     
     await session.commit()
     await session.refresh(schedule)
+    ticket_inventory.invalidate(schedule.id)
     
     return schedule_to_response(schedule, definition)
 
@@ -445,6 +448,7 @@ async def cancel_schedule(
     
     schedule.status = 'cancelled'
     await session.commit()
+    ticket_inventory.invalidate(schedule.id)
     
     return {"success": True, "message": "Schedule cancelled"}
 
@@ -461,63 +465,33 @@ async def check_availability(
 ):
     """Check ticket availability for a schedule.
     
-    Public endpoint for frontend to check before booking.
+    Public endpoint for frontend to check before booking. Served from the
+    ticket inventory cache, so polling doesn't hit the database every time.
     """
-    result = await session.execute(
-        select(EventSchedule, EventDefinition)
-        .join(EventDefinition, EventSchedule.event_definition_id == EventDefinition.id)
-        .where(EventSchedule.id == schedule_id)
-    )
-    row = result.first()
+    snapshot = await ticket_inventory.get_availability(session, schedule_id)
     
-    if not row:
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
-    schedule, definition = row
+    available = snapshot.available
     
-    available = schedule.max_tickets - schedule.tickets_sold
-    
-    if schedule.status != 'scheduled':
-        return TicketAvailabilityResponse(
-            is_available=False,
-            available_tickets=0,
-            message=f"Event is {schedule.status}",
-            schedule_id=schedule.id,
-            event_title=definition.title,
-            schedule_date=schedule.schedule_date.isoformat(),
-            start_time=time_to_str(schedule.start_time),
-        )
-    
-    if schedule.is_blocked:
-        return TicketAvailabilityResponse(
-            is_available=False,
-            available_tickets=0,
-            message="This time slot is blocked",
-            schedule_id=schedule.id,
-            event_title=definition.title,
-            schedule_date=schedule.schedule_date.isoformat(),
-            start_time=time_to_str(schedule.start_time),
-        )
-    
-    if available < quantity:
-        return TicketAvailabilityResponse(
-            is_available=False,
-            available_tickets=available,
-            message=f"Only {available} tickets available" if available > 0 else "Sold out",
-            schedule_id=schedule.id,
-            event_title=definition.title,
-            schedule_date=schedule.schedule_date.isoformat(),
-            start_time=time_to_str(schedule.start_time),
-        )
+    if snapshot.status != 'scheduled':
+        is_available, available, message = False, 0, f"Event is {snapshot.status}"
+    elif snapshot.is_blocked:
+        is_available, available, message = False, 0, "This time slot is blocked"
+    elif available < quantity:
+        is_available, message = False, f"Only {available} tickets available" if available > 0 else "Sold out"
+    else:
+        is_available, message = True, "Tickets available"
     
     return TicketAvailabilityResponse(
-        is_available=True,
+        is_available=is_available,
         available_tickets=available,
-        message="Tickets available",
-        schedule_id=schedule.id,
-        event_title=definition.title,
-        schedule_date=schedule.schedule_date.isoformat(),
-        start_time=time_to_str(schedule.start_time),
+        message=message,
+        schedule_id=snapshot.schedule_id,
+        event_title=snapshot.event_title,
+        schedule_date=snapshot.schedule_date.isoformat(),
+        start_time=time_to_str(snapshot.start_time),
     )
 
 
@@ -531,32 +505,26 @@ async def reserve_tickets(
     """Reserve tickets (admin only - for manual adjustments).
     
     NOTE: Normal ticket purchases go through the payment flow which
-    atomically reserves tickets after payment verification.
+    confirms the checkout hold into sold tickets after payment verification.
     """
-    result = await session.execute(
-        select(EventSchedule).where(EventSchedule.id == schedule_id)
-    )
-    schedule = result.scalar_one_or_none()
-    
-    if not schedule:
-        raise HTTPException(status_code=404, detail="Schedule not found")
-    
-    available = schedule.max_tickets - schedule.tickets_sold
-    
-    if available < quantity:
+    try:
+        max_tickets, tickets_sold, tickets_held = await ticket_inventory.sell_tickets(
+            session, schedule_id, quantity, require_bookable=False
+        )
+    except TicketsUnavailable as e:
+        if e.not_found:
+            raise HTTPException(status_code=404, detail="Schedule not found")
         raise HTTPException(
             status_code=400, 
-            detail=f"Not enough tickets. Available: {available}, Requested: {quantity}"
+            detail=f"Not enough tickets. Available: {e.available}, Requested: {quantity}"
         )
-    
-    schedule.tickets_sold += quantity
     await session.commit()
     
     return {
         "success": True,
         "tickets_reserved": quantity,
-        "new_total_sold": schedule.tickets_sold,
-        "remaining": schedule.max_tickets - schedule.tickets_sold,
+        "new_total_sold": tickets_sold,
+        "remaining": max_tickets - tickets_sold - tickets_held,
     }
 
 
@@ -657,7 +625,7 @@ async def get_schedule_stats(
         "schedule_date": schedule.schedule_date.isoformat(),
         "max_tickets": schedule.max_tickets,
         "tickets_sold": schedule.tickets_sold,
-        "tickets_available": schedule.max_tickets - schedule.tickets_sold,
+        "tickets_available": schedule.tickets_available,
         "verified_entries": verified_count,
         "total_scans": total_scans,
         "expected_revenue": schedule.tickets_sold * effective_price,
@@ -727,7 +695,7 @@ async def admin_get_schedules_by_type(
             "end_time": schedule.end_time.strftime("%H:%M:%S") if schedule.end_time else None,
             "max_tickets": schedule.max_tickets,
             "tickets_sold": schedule.tickets_sold,
-            "tickets_available": schedule.max_tickets - schedule.tickets_sold,
+            "tickets_available": schedule.tickets_available,
             "ticket_price": float(schedule.ticket_price) if schedule.ticket_price else float(definition.default_ticket_price),
             "status": schedule.status,
             "is_blocked": schedule.is_blocked,
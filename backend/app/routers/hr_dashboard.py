@@ -5,14 +5,16 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, extract
+from sqlalchemy import select, func, and_, or_, extract, case
 from sqlalchemy.orm import selectinload
 from typing import Optional
 from datetime import datetime, date, timedelta
 
 from ..auth import get_current_user
 from ..db import get_session
-from ..models import User, Staff, Attendance, Leave, Payroll
+from ..models import User, Staff, Attendance, Leave, Payroll, birthday_day_of_year
+from ..services import hr_dashboard_cache
+from ..settings import settings
 
 router = APIRouter(prefix="/hr/dashboard", tags=["hr-dashboard"])
 
@@ -24,6 +26,49 @@ def admin_or_hr_required(user: User = Depends(get_current_user)) -> User:
     return user
 
 
+def _next_birthday(date_of_birth: date, today: date) -> date:
+    """Next occurrence of a birthday on or after today (Feb 29 falls on Feb 28 in other years)"""
+    for year in (today.year, today.year + 1):
+        try:
+            birthday = date(year, date_of_birth.month, date_of_birth.day)
+        except ValueError:
+            birthday = date(year, 2, 28)
+        if birthday >= today:
+            return birthday
+    return birthday
+
+
+async def _upcoming_birthdays(session: AsyncSession, today: date, window_days: int) -> list:
+    """Active staff with a birthday in [today, today + window_days], via the birthday_doy index"""
+    start_doy = birthday_day_of_year(today)
+    # +1 covers Feb 29 (doy 60) being skipped by the calendar in non-leap years
+    end_doy = start_doy + window_days + 1
+    if end_doy <= 366:
+        doy_filter = Staff.birthday_doy.between(start_doy, end_doy)
+    else:
+        doy_filter = or_(Staff.birthday_doy >= start_doy, Staff.birthday_doy <= end_doy - 366)
+    
+    result = await session.execute(
+        select(Staff.id, Staff.first_name, Staff.last_name, Staff.date_of_birth)
+        .where(Staff.is_active == True, doy_filter)
+    )
+    last_day = today + timedelta(days=window_days)
+    upcoming_birthdays = []
+    for staff_id, first_name, last_name, date_of_birth in result.all():
+        if not date_of_birth:
+            continue
+        birthday = _next_birthday(date_of_birth, today)
+        if birthday <= last_day:
+            upcoming_birthdays.append({
+                "staff_id": staff_id,
+                "name": f"{first_name} {last_name}",
+                "date": birthday,
+                "days_until": (birthday - today).days,
+            })
+    upcoming_birthdays.sort(key=lambda x: x["date"])
+    return upcoming_birthdays
+
+
 @router.get("/stats")
 async def get_dashboard_stats(
     session: AsyncSession = Depends(get_session),
@@ -31,87 +76,37 @@ async def get_dashboard_stats(
 ):
     """Get HR dashboard statistics"""
     today = date.today()
-    
-    # Total staff
-    result = await session.execute(
-        select(func.count(Staff.id)).where(Staff.is_active == True)
-    )
-    total_staff = result.scalar() or 0
-    
-    # Present today
-    result = await session.execute(
-        select(func.count(Attendance.id)).where(
-            Attendance.attendance_date == today,
-            Attendance.status == "present",
-        )
-    )
-    present_today = result.scalar() or 0
-    
-    # Absent today
-    result = await session.execute(
-        select(func.count(Attendance.id)).where(
-            Attendance.attendance_date == today,
-            Attendance.status == "absent",
-        )
-    )
-    absent_today = result.scalar() or 0
-    
-    # Upcoming birthdays (next 30 days)
-    today_month = today.month
-    today_day = today.day
-    next_month = today + timedelta(days=30)
-    
-    # Get staff with birthdays in next 30 days
-    result = await session.execute(
-        select(Staff).where(
-            Staff.is_active == True,
-            Staff.date_of_birth.isnot(None),
+    cached = hr_dashboard_cache.get(today)
+    if cached is not None:
+        return cached
+    
+    # Counters in one round trip: today's attendance as conditional counts, the rest as scalar subqueries
+    attendance_today = (
+        select(
+            func.count(case((Attendance.status == "present", 1))).label("present"),
+            func.count(case((Attendance.status == "absent", 1))).label("absent"),
         )
+        .where(Attendance.attendance_date == today)
+        .subquery()
     )
-    all_staff = result.scalars().all()
-    
-    upcoming_birthdays = []
-    for staff in all_staff:
-        if staff.date_of_birth:
-            # Create birthday for this year
-            birthday_this_year = date(today.year, staff.date_of_birth.month, staff.date_of_birth.day)
-            # If birthday already passed this year, use next year
-            if birthday_this_year < today:
-                birthday_this_year = date(today.year + 1, staff.date_of_birth.month, staff.date_of_birth.day)
-            
-            # Check if within next 30 days
-            if today <= birthday_this_year <= next_month:
-                days_until = (birthday_this_year - today).days
-                upcoming_birthdays.append({
-                    "staff_id": staff.id,
-                    "name": f"{staff.first_name} {staff.last_name}",
-                    "date": birthday_this_year,
-                    "days_until": days_until,
-                })
-    
-    # Sort by date
-    upcoming_birthdays.sort(key=lambda x: x["date"])
-    
-    # Monthly salary expenses (current month)
-    current_month = today.month
-    current_year = today.year
-    
     result = await session.execute(
-        select(func.sum(Payroll.net_salary)).where(
-            Payroll.month == current_month,
-            Payroll.year == current_year,
-            Payroll.status.in_(["processed", "locked"]),
+        select(
+            select(func.count(Staff.id)).where(Staff.is_active == True).scalar_subquery(),
+            attendance_today.c.present,
+            attendance_today.c.absent,
+            select(func.count(Leave.id)).where(Leave.status == "pending").scalar_subquery(),
+            select(func.sum(Payroll.net_salary)).where(
+                Payroll.month == today.month,
+                Payroll.year == today.year,
+                Payroll.status.in_(["processed", "locked"]),
+            ).scalar_subquery(),
         )
     )
-    monthly_salary_expenses = result.scalar() or 0.0
+    total_staff, present_today, absent_today, pending_leave_requests, monthly_salary_expenses = result.one()
     
-    # Leave requests (pending)
-    result = await session.execute(
-        select(func.count(Leave.id)).where(Leave.status == "pending")
-    )
-    pending_leave_requests = result.scalar() or 0
+    upcoming_birthdays = await _upcoming_birthdays(session, today, settings.HR_BIRTHDAY_WINDOW_DAYS)
     
-    # Get recent pending leaves
+    # Oldest pending leaves first
     result = await session.execute(
         select(Leave)
         .where(Leave.status == "pending")
@@ -135,15 +130,17 @@ async def get_dashboard_stats(
         for leave in recent_pending_leaves
     ]
     
-    return {
-        "total_staff": total_staff,
-        "present_today": present_today,
-        "absent_today": absent_today,
+    payload = {
+        "total_staff": total_staff or 0,
+        "present_today": present_today or 0,
+        "absent_today": absent_today or 0,
         "upcoming_birthdays": upcoming_birthdays[:10],  # Top 10
-        "monthly_salary_expenses": monthly_salary_expenses,
-        "pending_leave_requests": pending_leave_requests,
+        "monthly_salary_expenses": monthly_salary_expenses or 0.0,
+        "pending_leave_requests": pending_leave_requests or 0,
         "recent_pending_leaves": pending_leaves_list,
     }
+    hr_dashboard_cache.put(today, payload)
+    return payload
 
 
 @router.get("/attendance-summary")
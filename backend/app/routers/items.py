@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Form, Request
 from typing import Optional
 from datetime import datetime
 from sqlalchemy import select, and_, func, or_, text
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.auth import get_current_user
 from app.models import Item, User, VendorProfile
+from app.services.catalog_cache import cached_catalog_response, bump_catalog_version
 
 router = APIRouter()
 
@@ -21,6 +22,7 @@ def admin_required(user: User = Depends(get_current_user)):
 
 @router.get('/items')
 async def list_public_items(
+    request: Request,
     main_category: Optional[str] = Query(default=None),
     category: Optional[str] = Query(default=None),
     subcategory: Optional[str] = Query(default=None),
@@ -30,68 +32,75 @@ async def list_public_items(
     q: Optional[str] = Query(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    now = datetime.utcnow()
-    # Join with VendorProfile to filter out suspended vendors
-    stmt = (
-        select(Item)
-        .outerjoin(VendorProfile, Item.vendor_id == VendorProfile.id)
-        .where(Item.available == True)  # noqa: E712
-        .where(
-            # Include items if vendor_id is NULL (no vendor) OR vendor is not suspended
-            or_(
-                Item.vendor_id.is_(None),
-                VendorProfile.suspended_until.is_(None),
-                VendorProfile.suspended_until <= now
+    async def build():
+        now = datetime.utcnow()
+        # Join with VendorProfile to filter out suspended vendors
+        stmt = (
+            select(Item)
+            .outerjoin(VendorProfile, Item.vendor_id == VendorProfile.id)
+            .where(Item.available == True)  # noqa: E712
+            .where(
+                # Include items if vendor_id is NULL (no vendor) OR vendor is not suspended
+                or_(
+                    Item.vendor_id.is_(None),
+                    VendorProfile.suspended_until.is_(None),
+                    VendorProfile.suspended_until <= now
+                )
             )
         )
-    )
-    conditions = []
-    if main_category:
-        conditions.append(Item.main_category == main_category)
-    if category:
-        conditions.append(Item.category == category)
-    if subcategory:
-        conditions.append(Item.subcategory == subcategory)
-    if type:
-        conditions.append(Item.type == type)
-    if space_id:
-        conditions.append((Item.space_id == space_id) | (Item.space_id.is_(None)))
-    if vendor_id is not None:
-        conditions.append(Item.vendor_id == vendor_id)
+        conditions = []
+        if main_category:
+            conditions.append(Item.main_category == main_category)
+        if category:
+            conditions.append(Item.category == category)
+        if subcategory:
+            conditions.append(Item.subcategory == subcategory)
+        if type:
+            conditions.append(Item.type == type)
+        if space_id:
+            conditions.append((Item.space_id == space_id) | (Item.space_id.is_(None)))
+        if vendor_id is not None:
+            conditions.append(Item.vendor_id == vendor_id)
+        if q:
+            like = f"%{q}%"
+            conditions.append(func.lower(Item.name).like(func.lower(like)))
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        # Cross-dialect NULL ordering: emulate "NULLS LAST" by ordering on IS NULL, then value
+        stmt = stmt.order_by(
+            Item.space_id.is_(None), Item.space_id.asc(),
+            Item.subcategory.is_(None), Item.subcategory.asc(),
+            Item.name.asc()
+        )
+        rs = await session.execute(stmt)
+        items = rs.scalars().all()
+        return {'items': [
+            {
+                'id': it.id,
+                'name': it.name,
+                'description': it.description,
+                'price': it.price,
+                'main_category': it.main_category,
+                'category': it.category,
+                'subcategory': it.subcategory,
+                'type': it.type,
+                'image_url': it.image_url,
+                'video_url': it.video_url,
+                'profile_image_url': it.profile_image_url,
+                'profile_info': it.profile_info,
+                'performance_team_profile': getattr(it, 'performance_team_profile', None),
+                'space_id': it.space_id,
+                'vendor_id': it.vendor_id,
+                'item_status': it.item_status,
+                'preparation_time_minutes': it.preparation_time_minutes,
+            } for it in items
+        ], 'count': len(items)}
+
+    # Free-text searches have a poor hit rate; don't let them evict the common filter keys
     if q:
-        like = f"%{q}%"
-        conditions.append(func.lower(Item.name).like(func.lower(like)))
-    if conditions:
-        stmt = stmt.where(and_(*conditions))
-    # Cross-dialect NULL ordering: emulate "NULLS LAST" by ordering on IS NULL, then value
-    stmt = stmt.order_by(
-        Item.space_id.is_(None), Item.space_id.asc(),
-        Item.subcategory.is_(None), Item.subcategory.asc(),
-        Item.name.asc()
-    )
-    rs = await session.execute(stmt)
-    items = rs.scalars().all()
-    return {'items': [
-        {
-            'id': it.id,
-            'name': it.name,
-            'description': it.description,
-            'price': it.price,
-            'main_category': it.main_category,
-            'category': it.category,
-            'subcategory': it.subcategory,
-            'type': it.type,
-            'image_url': it.image_url,
-            'video_url': it.video_url,
-            'profile_image_url': it.profile_image_url,
-            'profile_info': it.profile_info,
-            'performance_team_profile': getattr(it, 'performance_team_profile', None),
-            'space_id': it.space_id,
-            'vendor_id': it.vendor_id,
-            'item_status': it.item_status,
-            'preparation_time_minutes': it.preparation_time_minutes,
-        } for it in items
-    ], 'count': len(items)}
+        return await build()
+    key = f"items:{main_category}:{category}:{subcategory}:{type}:{space_id}:{vendor_id}"
+    return await cached_catalog_response(request, session, key, build)
 
 
 @router.get('/admin/items')
@@ -318,6 +327,7 @@ async def admin_create_item(
     try:
         await session.commit()
         await session.refresh(it)
+        await bump_catalog_version(session)
         return {'ok': True, 'id': it.id}
     except Exception as e:
         await session.rollback()
@@ -331,6 +341,7 @@ async def admin_create_item(
             session.add(it)
             await session.commit()
             await session.refresh(it)
+            await bump_catalog_version(session)
             return {'ok': True, 'id': it.id, 'warning': 'performance_team_profile column not found, item created without it'}
         raise HTTPException(status_code=500, detail=f"Failed to create item: {error_msg}")
 
@@ -406,6 +417,7 @@ async def admin_update_item(
     if preparation_time_minutes is not None: it.preparation_time_minutes = preparation_time_minutes
     
     await session.commit()
+    await bump_catalog_version(session)
     
     # Log item status change to history if status changed
     if item_status is not None and old_item_status != item_status:
@@ -447,4 +459,5 @@ async def admin_delete_item(
         raise HTTPException(status_code=404, detail='Item not found')
     await session.delete(it)
     await session.commit()
+    await bump_catalog_version(session)
     return {'ok': True}
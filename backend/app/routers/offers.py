@@ -1331,7 +1331,7 @@ async def notify_all_users_about_offer(
                 import asyncio
                 from app.db import AsyncSessionLocal, SyncSessionLocal
                 from app.models import User as UserModel, OfferNotification
-                from sqlalchemy import select as async_select
+                from sqlalchemy import select as async_select, insert as sa_insert
                 from app.notifications import NotificationService
                 from datetime import datetime as dt
                 import re
@@ -1403,6 +1403,42 @@ async def notify_all_users_about_offer(
                     BATCH_SIZE = 5  # Send 5 messages in parallel
                     BATCH_DELAY = 1.0  # 1 second delay between batches
                     
+                    notified = []  # Users reached on at least one channel, not yet recorded
+                    
+                    def record_notifications(batch):
+                        """Upsert OfferNotification rows for many users in one transaction"""
+                        if not batch:
+                            return
+                        sync_notify_session = SyncSessionLocal()
+                        try:
+                            existing = {
+                                n.user_id: n
+                                for n in sync_notify_session.query(OfferNotification).filter(
+                                    OfferNotification.offer_id == stored_offer_id,
+                                    OfferNotification.user_id.in_([row['user_id'] for row in batch])
+                                ).all()
+                            }
+                            new_rows = []
+                            for row in batch:
+                                notification = existing.get(row['user_id'])
+                                if notification:
+                                    # Update existing record
+                                    notification.whatsapp_sent = notification.whatsapp_sent or row['whatsapp_sent']
+                                    notification.sms_sent = notification.sms_sent or row['sms_sent']
+                                    notification.email_sent = notification.email_sent or row['email_sent']
+                                    notification.notified_at = datetime.utcnow()
+                                else:
+                                    new_rows.append({**row, 'offer_id': stored_offer_id, 'notified_by_user_id': stored_admin_id})
+                            if new_rows:
+                                # One multi-row INSERT instead of a transaction per user
+                                sync_notify_session.execute(sa_insert(OfferNotification), new_rows)
+                            sync_notify_session.commit()
+                        except Exception as e:
+                            sync_notify_session.rollback()
+                            print(f"[NOTIFY OFFER] Failed to record notifications for {len(batch)} user(s): {e}")
+                        finally:
+                            sync_notify_session.close()
+                    
                     async def send_to_user(user_data):
                         """Send notifications to a single user"""
                         nonlocal whatsapp_sent, sms_sent, email_sent, failed_count
@@ -1481,43 +1517,14 @@ async def notify_all_users_about_offer(
                                         print(f"[NOTIFY OFFER] {channel.upper()} failed for user {user_data['id']}: {results[idx]}")
                                         failed_count += 1
                             
-                            # Record notification in database if at least one channel succeeded
+                            # Recorded in batches (record_notifications) if at least one channel succeeded
                             if whatsapp_success or sms_success or email_success:
-                                try:
-                                    sync_notify_session = SyncSessionLocal()
-                                    try:
-                                        # Check if notification record already exists
-                                        existing = sync_notify_session.query(OfferNotification).filter(
-                                            OfferNotification.offer_id == stored_offer_id,
-                                            OfferNotification.user_id == user_data['id']
-                                        ).first()
-                                        
-                                        if existing:
-                                            # Update existing record
-                                            existing.whatsapp_sent = existing.whatsapp_sent or whatsapp_success
-                                            existing.sms_sent = existing.sms_sent or sms_success
-                                            existing.email_sent = existing.email_sent or email_success
-                                            existing.notified_at = datetime.utcnow()
-                                        else:
-                                            # Create new record
-                                            notification = OfferNotification(
-                                                offer_id=stored_offer_id,
-                                                user_id=user_data['id'],
-                                                whatsapp_sent=whatsapp_success,
-                                                sms_sent=sms_success,
-                                                email_sent=email_success,
-                                                notified_by_user_id=stored_admin_id
-                                            )
-                                            sync_notify_session.add(notification)
-                                        
-                                        sync_notify_session.commit()
-                                    except Exception as e:
-                                        sync_notify_session.rollback()
-                                        print(f"[NOTIFY OFFER] Failed to record notification for user {user_data['id']}: {e}")
-                                    finally:
-                                        sync_notify_session.close()
-                                except Exception as e:
-                                    print(f"[NOTIFY OFFER] Failed to record notification for user {user_data['id']}: {e}")
+                                notified.append({
+                                    'user_id': user_data['id'],
+                                    'whatsapp_sent': whatsapp_success,
+                                    'sms_sent': sms_success,
+                                    'email_sent': email_success,
+                                })
                             
                             return True
                         except Exception as e:
@@ -1532,11 +1539,16 @@ async def notify_all_users_about_offer(
                         
                         # Send batch in parallel
                         await asyncio.gather(*[send_to_user(user_data) for user_data in batch], return_exceptions=True)
+                        if len(notified) >= settings.NOTIFICATION_WRITE_BATCH_SIZE:
+                            record_notifications(notified)
+                            notified = []
                         
                         # Delay between batches to avoid rate limiting (except for last batch)
                         if i + BATCH_SIZE < len(users_data):
                             await asyncio.sleep(BATCH_DELAY)
                     
+                    record_notifications(notified)
+                    
                     total_sent = whatsapp_sent + sms_sent + email_sent
                     print(f"[NOTIFY OFFER] Background task completed: Total users: {len(users_data)}, WhatsApp: {whatsapp_sent}, SMS: {sms_sent}, Email: {email_sent}, Failed: {failed_count}")
                 
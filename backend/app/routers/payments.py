@@ -12,7 +12,7 @@ import httpx
 from app.db import get_db, AsyncSessionLocal
 from app.models import User, Booking, Payment, ProgramParticipant, Space, Venue
 from app.auth import get_current_user
-from app.razorpay_service import get_razorpay_service
+from app.razorpay_service import get_async_client, get_razorpay_service
 from app.notifications import NotificationService
 from app.schemas import (
     PaymentStatusResponse,
@@ -22,7 +22,8 @@ from app.schemas import (
 
 # Import event ticketing models (if available)
 try:
-    from app.models_events import EventSchedule, EventDefinition
+    from app.models_events import EventDefinition
+    from app.services.ticket_inventory import confirm_booking_tickets_sync
     EVENT_TICKETING_ENABLED = True
 except ImportError:
     EVENT_TICKETING_ENABLED = False
@@ -32,25 +33,6 @@ logger = logging.getLogger(__name__)
 # Razorpay API base URL for async client
 RAZORPAY_API_URL = "https://api.razorpay.com/v1"
 
-def _get_async_client(req: Optional[Request], key_id: str, key_secret: str) -> httpx.AsyncClient:
-    """Create a pooled async HTTP client for Razorpay with basic auth.
-
-    Uses sane timeouts and connection limits to avoid resource exhaustion.
-    """
-    timeout = httpx.Timeout(15.0, connect=5.0)
-    limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
-    headers = {
-        "User-Agent": "LebrQ-Payment-Service/1.0",
-        "Content-Type": "application/json",
-    }
-    return httpx.AsyncClient(
-        base_url=RAZORPAY_API_URL,
-        auth=(key_id, key_secret),
-        timeout=timeout,
-        limits=limits,
-        headers=headers,
-    )
-
 # Router prefix should NOT include the global API prefix.
 # core.py includes this router with prefix=settings.API_PREFIX ("/api").
 # Use "/payments" here so the final path becomes "/api/payments/...".
@@ -130,25 +112,15 @@ async def handle_payment_callback(
             
             if EVENT_TICKETING_ENABLED and event_schedule_id:
                 try:
-                    schedule = db.query(EventSchedule).filter(
-                        EventSchedule.id == event_schedule_id
-                    ).with_for_update().first()  # Lock row for atomic update
-                    
-                    if schedule:
-                        quantity = booking.attendees or 1
-                        tickets_available = schedule.max_tickets - schedule.tickets_sold
-                        
-                        if tickets_available >= quantity:
-                            schedule.tickets_sold += quantity
-                            db.commit()
-                            logger.info(f"Reserved {quantity} tickets for schedule {schedule.id}")
-                        else:
-                            # Race condition: not enough tickets
-                            logger.error(
-                                f"Ticket oversold for schedule {schedule.id}. "
-                                f"Available: {tickets_available}, Requested: {quantity}"
-                            )
-                            # Don't fail the payment, but log for manual resolution
+                    # Confirms the checkout hold (or sells directly if it expired) with a
+                    # conditional UPDATE, so no row lock is held across the callback
+                    quantity = booking.attendees or 1
+                    if confirm_booking_tickets_sync(db, booking.id, event_schedule_id, quantity):
+                        db.commit()
+                        logger.info(f"Reserved {quantity} tickets for schedule {event_schedule_id}")
+                    else:
+                        # Not enough tickets left: don't fail the payment, but log for manual resolution
+                        db.rollback()
                 except Exception as e:
                     logger.error(f"Failed to reserve tickets: {e}")
                     db.rollback()
@@ -431,7 +403,7 @@ async def create_razorpay_order(
 
         key_id = getattr(razorpay_service, "key_id", None)
         key_secret = getattr(razorpay_service, "key_secret", None)
-        client = _get_async_client(req, key_id, key_secret)
+        client = get_async_client()
 
         # Build payload
         receipt_id = f"order_{int(datetime.now().timestamp())}_{current_user.id}"
@@ -449,52 +421,46 @@ async def create_razorpay_order(
         last_error: Optional[str] = None
         response_json: Optional[Dict[str, Any]] = None
 
-        try:
-            for attempt in range(1, max_retries + 1):
-                try:
-                    t0 = asyncio.get_event_loop().time()
-                    resp = await client.post("/orders", json=payload)
-                    latency_ms = (asyncio.get_event_loop().time() - t0) * 1000.0
-                    key_preview = (key_id or "")[:8]
-                    logger.info(f"[Razorpay] create_order latency: {latency_ms:.0f} ms (attempt {attempt}) key={key_preview}...")
-
-                    if resp.is_success:
-                        response_json = resp.json()
-                        break
-
-                    try:
-                        err_json = resp.json()
-                        err_detail = err_json.get("error", {}).get("description", str(err_json))
-                    except Exception:
-                        err_detail = (resp.text or "HTTP error")[0:200]
-                    status_code = resp.status_code
-
-                    if status_code in (429, 500, 502, 503, 504) and attempt < max_retries:
-                        delay = base_backoff * (2 ** (attempt - 1))
-                        logger.warning(f"Retrying Razorpay (attempt {attempt}/{max_retries}) in {delay:.1f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-
-                    last_error = f"HTTP {status_code}: {err_detail}"
+        for attempt in range(1, max_retries + 1):
+            try:
+                t0 = asyncio.get_event_loop().time()
+                resp = await client.post(f"{RAZORPAY_API_URL}/orders", json=payload, auth=(key_id, key_secret))
+                latency_ms = (asyncio.get_event_loop().time() - t0) * 1000.0
+                key_preview = (key_id or "")[:8]
+                logger.info(f"[Razorpay] create_order latency: {latency_ms:.0f} ms (attempt {attempt}) key={key_preview}...")
+
+                if resp.is_success:
+                    response_json = resp.json()
                     break
 
-                except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.TransportError) as e:
-                    last_error = f"{type(e).__name__}: {str(e)}"
-                    if attempt < max_retries:
-                        delay = base_backoff * (2 ** (attempt - 1))
-                        logger.warning(f"Razorpay transient error, retrying in {delay:.1f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    break
-                except Exception as e:
-                    last_error = f"unexpected_error: {str(e)}"
-                    logger.error(f"[Razorpay] Unexpected error: {last_error}", exc_info=True)
-                    break
-        finally:
-            try:
-                await client.aclose()
-            except Exception:
-                pass
+                try:
+                    err_json = resp.json()
+                    err_detail = err_json.get("error", {}).get("description", str(err_json))
+                except Exception:
+                    err_detail = (resp.text or "HTTP error")[0:200]
+                status_code = resp.status_code
+
+                if status_code in (429, 500, 502, 503, 504) and attempt < max_retries:
+                    delay = base_backoff * (2 ** (attempt - 1))
+                    logger.warning(f"Retrying Razorpay (attempt {attempt}/{max_retries}) in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+
+                last_error = f"HTTP {status_code}: {err_detail}"
+                break
+
+            except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.TransportError) as e:
+                last_error = f"{type(e).__name__}: {str(e)}"
+                if attempt < max_retries:
+                    delay = base_backoff * (2 ** (attempt - 1))
+                    logger.warning(f"Razorpay transient error, retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+                break
+            except Exception as e:
+                last_error = f"unexpected_error: {str(e)}"
+                logger.error(f"[Razorpay] Unexpected error: {last_error}", exc_info=True)
+                break
 
         if response_json is None:
             status = 503 if last_error and any(k in last_error for k in ["timeout", "transport", "502", "503", "504"]) else 502
@@ -10,15 +10,16 @@ from sqlalchemy.orm import selectinload
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
-from calendar import monthrange
 from io import BytesIO
 import os
 from pathlib import Path
 
 from ..auth import get_current_user
 from ..db import get_session
-from ..models import User, Staff, Attendance, Leave, Payroll
+from ..models import User, Staff, AttendanceMonthly, Leave, Payroll, PayrollRun
 from ..core import settings
+from ..services.attendance_rollup import month_bounds
+from ..services.payroll import PayrollRunConflict, calculate_monthly_payroll, start_payroll_run
 
 router = APIRouter(prefix="/hr/payroll", tags=["hr-payroll"])
 
@@ -69,128 +70,30 @@ class PayrollOut(BaseModel):
         from_attributes = True
 
 
-def calculate_monthly_payroll(
-    staff: Staff,
-    month: int,
-    year: int,
-    attendance_records: List[Attendance],
-    leave_records: List[Leave],
-) -> Dict[str, Any]:
-    """Calculate payroll for a staff member for a given month"""
-    # Get month boundaries
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-    
-    # Calculate total working days (excluding Sundays, can be customized)
-    total_days = monthrange(year, month)[1]
-    # Count Sundays (assuming Sunday = 0)
-    sundays = sum(1 for day in range(1, total_days + 1) if date(year, month, day).weekday() == 6)
-    total_working_days = total_days - sundays
-    
-    # Process attendance
-    present_count = 0
-    absent_count = 0
-    half_day_count = 0
-    holiday_count = 0
-    leave_count = 0
-    unpaid_leave_count = 0
-    total_hours = 0.0
-    overtime_hours = 0.0
-    
-    for att in attendance_records:
-        if att.status == "present":
-            present_count += 1
-        elif att.status == "absent":
-            absent_count += 1
-        elif att.status == "half_day":
-            half_day_count += 1
-            present_count += 0.5
-        elif att.status == "holiday":
-            holiday_count += 1
-        elif att.status == "leave":
-            leave_count += 1
-        
-        if att.total_hours:
-            total_hours += att.total_hours
-        if att.overtime_hours:
-            overtime_hours += att.overtime_hours
-    
-    # Process leaves
-    for leave in leave_records:
-        if leave.status == "approved":
-            if leave.leave_type == "unpaid":
-                unpaid_leave_count += leave.total_days
-            else:
-                leave_count += leave.total_days
-    
-    # Calculate basic salary
-    if staff.salary_type == "monthly":
-        basic_salary = staff.fixed_salary or 0.0
-        # Calculate salary based on present days
-        calculated_salary = (basic_salary / total_working_days) * present_count
-    else:  # hourly
-        basic_salary = 0.0
-        hourly_wage = staff.hourly_wage or 0.0
-        calculated_salary = total_hours * hourly_wage
-    
-    # Calculate allowances
-    allowances = staff.allowances or {}
-    total_allowances = sum(
-        allowances.get("hra", 0),
-        allowances.get("travel", 0),
-        allowances.get("food", 0),
-        sum(allowances.get("custom", {}).values()) if isinstance(allowances.get("custom"), dict) else 0,
-    )
-    
-    # Calculate overtime pay (assuming 1.5x for overtime)
-    overtime_rate = 1.5
-    if staff.salary_type == "monthly":
-        hourly_rate = (staff.fixed_salary or 0.0) / (total_working_days * 8)  # Assuming 8 hours per day
-    else:
-        hourly_rate = staff.hourly_wage or 0.0
-    overtime_pay = overtime_hours * hourly_rate * overtime_rate
-    
-    # Calculate deductions
-    deductions = staff.deductions or {}
-    total_deductions = sum(
-        deductions.get("pf", 0),
-        deductions.get("esi", 0),
-        deductions.get("tds", 0),
-        sum(deductions.get("custom", {}).values()) if isinstance(deductions.get("custom"), dict) else 0,
-    )
-    
-    # Calculate leave deductions (for unpaid leaves)
-    if staff.salary_type == "monthly":
-        daily_rate = (staff.fixed_salary or 0.0) / total_working_days
-        leave_deductions = unpaid_leave_count * daily_rate
-    else:
-        leave_deductions = 0.0  # For hourly, unpaid leave doesn't affect salary
-    
-    # Calculate net salary
-    net_salary = calculated_salary + total_allowances + overtime_pay - total_deductions - leave_deductions
-    
-    return {
-        "period_start": first_day,
-        "period_end": last_day,
-        "total_working_days": total_working_days,
-        "present_days": present_count,
-        "absent_days": absent_count,
-        "leave_days": leave_count,
-        "unpaid_leave_days": unpaid_leave_count,
-        "half_days": half_day_count,
-        "holidays": holiday_count,
-        "total_hours": total_hours if staff.salary_type == "hourly" else None,
-        "overtime_hours": overtime_hours,
-        "basic_salary": basic_salary,
-        "calculated_salary": calculated_salary,
-        "total_allowances": total_allowances,
-        "overtime_pay": overtime_pay,
-        "total_deductions": total_deductions,
-        "leave_deductions": leave_deductions,
-        "net_salary": net_salary,
-        "allowances_breakdown": allowances,
-        "deductions_breakdown": deductions,
-    }
+class PayrollRunCreate(BaseModel):
+    staff_ids: Optional[List[int]] = Field(None, description="Limit the run to these staff (default: all active staff)")
+
+
+class PayrollRunOut(BaseModel):
+    id: int
+    month: int
+    year: int
+    status: str
+    total_staff: int
+    processed_count: int
+    succeeded_count: int
+    skipped_count: int
+    failed_count: int
+    errors: Optional[List[Dict[str, Any]]]
+    staff_ids: Optional[List[int]]
+    started_by_user_id: Optional[int]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
 
 
 @router.post("/calculate", response_model=PayrollOut)
@@ -223,18 +126,9 @@ async def calculate_payroll(
     if existing_payroll and existing_payroll.is_locked:
         raise HTTPException(status_code=400, detail="Payroll for this month is locked and cannot be recalculated")
     
-    # Get attendance records for the month
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-    
-    result = await session.execute(
-        select(Attendance).where(
-            Attendance.staff_id == staff_id,
-            Attendance.attendance_date >= first_day,
-            Attendance.attendance_date <= last_day,
-        )
-    )
-    attendance_records = result.scalars().all()
+    # Attendance totals for the month (maintained on every attendance write)
+    first_day, last_day = month_bounds(year, month)
+    attendance = await session.get(AttendanceMonthly, (staff_id, year, month))
     
     # Get leave records for the month
     result = await session.execute(
@@ -251,7 +145,7 @@ async def calculate_payroll(
     leave_records = result.scalars().all()
     
     # Calculate payroll
-    payroll_data = calculate_monthly_payroll(staff, month, year, attendance_records, leave_records)
+    payroll_data = calculate_monthly_payroll(staff, month, year, attendance, leave_records)
     
     # Create or update payroll record
     if existing_payroll:
@@ -380,6 +274,56 @@ async def lock_payroll(
     return payroll
 
 
+@router.post("/runs", response_model=PayrollRunOut, status_code=202)
+async def create_payroll_run(
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2000),
+    data: Optional[PayrollRunCreate] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(admin_or_hr_required),
+):
+    """Calculate payroll for all active staff (or the given staff) for a month in the background"""
+    try:
+        return await start_payroll_run(
+            session, month, year,
+            started_by_user_id=current_user.id,
+            staff_ids=data.staff_ids if data else None,
+        )
+    except PayrollRunConflict as e:
+        raise HTTPException(status_code=409, detail=f"{e} (run_id={e.run_id})")
+
+
+@router.get("/runs", response_model=List[PayrollRunOut])
+async def list_payroll_runs(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=2000),
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(admin_or_hr_required),
+):
+    """List recent payroll runs"""
+    stmt = select(PayrollRun)
+    if month:
+        stmt = stmt.where(PayrollRun.month == month)
+    if year:
+        stmt = stmt.where(PayrollRun.year == year)
+    result = await session.execute(stmt.order_by(PayrollRun.id.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/runs/{run_id}", response_model=PayrollRunOut)
+async def get_payroll_run(
+    run_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(admin_or_hr_required),
+):
+    """Get the progress and errors of a payroll run"""
+    run = await session.get(PayrollRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return run
+
+
 @router.get("", response_model=List[PayrollOut])
 async def list_payroll(
     staff_id: Optional[int] = Query(None, description="Filter by staff ID"),
@@ -4,7 +4,7 @@ Rack API Routes - Public and Admin endpoints
 from __future__ import annotations
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
@@ -13,6 +13,7 @@ from sqlalchemy.orm import selectinload
 from ..db import get_session
 from ..models_rack import Rack, RackProduct, RackOrder
 from ..auth import get_current_user, get_current_admin
+from ..services.catalog_cache import cached_catalog_response, bump_catalog_version
 
 router = APIRouter(prefix="/racks", tags=["racks"])
 
@@ -95,11 +96,22 @@ class RackResponse(RackBase):
 # Public Routes
 @router.get("/products/all", response_model=List[RackProductResponse])
 async def get_all_products(
+    request: Request,
     active_only: bool = Query(True, description="Only return products from active racks"),
     status_filter: Optional[str] = Query("active", description="Filter by product status"),
     session: AsyncSession = Depends(get_session),
 ):
-    """Get all products from all racks (public endpoint)"""
+    """Get all products from all racks (public endpoint, served from the catalog cache)"""
+    return await cached_catalog_response(
+        request,
+        session,
+        f"rack_products:{active_only}:{status_filter}",
+        lambda: _build_all_products(active_only, status_filter, session),
+        List[RackProductResponse],
+    )
+
+
+async def _build_all_products(active_only: bool, status_filter: Optional[str], session: AsyncSession) -> List[dict]:
     # Query all products, optionally filtered by rack active status
     query = select(RackProduct)
     
@@ -235,6 +247,7 @@ async def create_rack(
     session.add(rack)
     await session.commit()
     await session.refresh(rack)
+    await bump_catalog_version(session)
     
     return {
         "id": rack.id,
@@ -282,6 +295,7 @@ async def update_rack(
     
     await session.commit()
     await session.refresh(rack)
+    await bump_catalog_version(session)
     
     # Get images and videos from JSON fields
     def get_product_images(p):
@@ -344,6 +358,7 @@ async def delete_rack(
     
     await session.delete(rack)
     await session.commit()
+    await bump_catalog_version(session)
     
     return None
 
@@ -418,6 +433,7 @@ async def create_product(
     session.add(product)
     await session.commit()
     await session.refresh(product)
+    await bump_catalog_version(session)
     
     # Parse JSON fields for response
     images = json.loads(product.images_json) if product.images_json else []
@@ -481,6 +497,7 @@ async def update_product(
     
     await session.commit()
     await session.refresh(product)
+    await bump_catalog_version(session)
     
     # Parse JSON fields for response
     images = json.loads(product.images_json) if product.images_json else []
@@ -521,6 +538,7 @@ async def delete_product(
     
     await session.delete(product)
     await session.commit()
+    await bump_catalog_version(session)
     
     return None
 
@@ -4,7 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
 from app.db import get_session, AsyncSessionLocal
-from app.models import Booking, Space
+from app.models import Booking
+from app.services import space_cache
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/time-slots", tags=["time-slots"])
@@ -12,27 +13,39 @@ async def _execute_with_retry(db: AsyncSession, stmt, max_retries: int = 2):
     """Execute a DB statement with small retry on transient connection errors.
     Handles async driver errors like 'handler is closed' / 'TCPTransport closed'.
     """
+    return await _with_retry(db, lambda session: session.execute(stmt), max_retries)
+
+
+async def _with_retry(db: AsyncSession, op, max_retries: int = 2):
+    """Run `op(session)` (any awaitable DB read, e.g. a space_cache lookup) with the
+    same retry-on-transient-error handling as _execute_with_retry.
+    """
     attempt = 0
     last_err: Exception | None = None
     cur_db = db
-    while attempt <= max_retries:
-        try:
-            return await cur_db.execute(stmt)
-        except Exception as e:  # transient connection/transport errors
-            msg = str(e).lower()
-            transient = any(k in msg for k in [
-                'handler is closed', 'tcptranport closed', 'tcptransport closed',
-                'connection reset', 'connection aborted', 'server has gone away',
-                'lost connection', 'read timeout', 'write timeout', 'timeout'
-            ])
-            if not transient or attempt == max_retries:
-                last_err = e
-                break
-            attempt += 1
-            # Try again with a fresh session
-            async with AsyncSessionLocal() as new_db:
-                cur_db = new_db
-                continue
+    fresh_db: AsyncSession | None = None
+    try:
+        while attempt <= max_retries:
+            try:
+                return await op(cur_db)
+            except Exception as e:  # transient connection/transport errors
+                msg = str(e).lower()
+                transient = any(k in msg for k in [
+                    'handler is closed', 'tcptranport closed', 'tcptransport closed',
+                    'connection reset', 'connection aborted', 'server has gone away',
+                    'lost connection', 'read timeout', 'write timeout', 'timeout'
+                ])
+                if not transient or attempt == max_retries:
+                    last_err = e
+                    break
+                attempt += 1
+                # Try again with a fresh session (closed once we're done with it)
+                if fresh_db is not None:
+                    await fresh_db.close()
+                fresh_db = cur_db = AsyncSessionLocal()
+    finally:
+        if fresh_db is not None:
+            await fresh_db.close()
     raise last_err if last_err else RuntimeError("Database operation failed")
 
 class TimeSlotRequest(BaseModel):
@@ -74,8 +87,7 @@ async def get_available_time_slots(
         target_date = datetime.strptime(selected_date, "%Y-%m-%d").date()
         
         # Get space information
-        result = await _execute_with_retry(db, select(Space).where(Space.id == space_id))
-        space = result.scalar_one_or_none()
+        space = await _with_retry(db, lambda session: space_cache.get_space(session, space_id))
         
         if not space:
             raise HTTPException(status_code=404, detail="Space not found")
@@ -299,10 +311,7 @@ async def get_calendar_availability(
         end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
         
         # Get space information
-        result = await db.execute(
-            select(Space).where(Space.id == space_id)
-        )
-        space = result.scalar_one_or_none()
+        space = await space_cache.get_space(db, space_id)
         
         if not space:
             raise HTTPException(status_code=404, detail="Space not found")
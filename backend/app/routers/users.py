@@ -12,11 +12,12 @@ from pydantic import BaseModel, EmailStr
 from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth import create_access_token, hash_password
+from ..auth import create_access_token
 from ..core import settings
 from ..db import get_session
 from ..models import User, VendorProfile
 from ..notifications import NotificationService
+from ..services.auth_crypto import PasswordHashTimeout, hash_password_async
 from ..services.otp_service import clear_otp, is_mobile_verified, send_otp, verify_otp
 
 try:
@@ -130,13 +131,10 @@ async def _check_mobile_duplicate(session: AsyncSession, normalized_mobile: str)
 
 
 async def _hash_password_async(password: str) -> str:
-    """Hash password asynchronously to avoid blocking event loop."""
+    """Hash password in the auth crypto pool to avoid blocking event loop."""
     try:
-        return await asyncio.wait_for(
-            asyncio.to_thread(hash_password, password),
-            timeout=5.0
-        )
-    except asyncio.TimeoutError:
+        return await hash_password_async(password)
+    except PasswordHashTimeout:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Password hashing timed out. Please try again."
@@ -7,6 +7,8 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.auth import get_current_user
+from app.services.catalog_cache import bump_catalog_version
+from app.utils.fast_json import FastJSONResponse
 from app.models import BookingItem, VendorProfile, User, Item, Booking, Venue, BookingItemRejection
 from pydantic import BaseModel
 
@@ -166,7 +168,7 @@ async def vendor_orders(session: AsyncSession = Depends(get_session), user: User
                 'item_image': item_image,
                 'item_category': item_category,
             })
-        return rows
+        return FastJSONResponse(rows)
     except HTTPException:
         raise
     except Exception as e:
@@ -475,6 +477,7 @@ async def vendor_create_item(
     session.add(it)
     await session.commit()
     await session.refresh(it)
+    await bump_catalog_version(session)
     return {'ok': True, 'id': it.id}
 
 
@@ -538,6 +541,7 @@ async def vendor_update_item(
     if item_status is not None: it.item_status = item_status
     if preparation_time_minutes is not None: it.preparation_time_minutes = preparation_time_minutes
     await session.commit()
+    await bump_catalog_version(session)
     
     # Log item status change to history if status changed
     if item_status is not None and old_item_status != item_status:
@@ -583,6 +587,7 @@ async def vendor_delete_item(
         raise HTTPException(status_code=404, detail='Item not found')
     await session.delete(it)
     await session.commit()
+    await bump_catalog_version(session)
     return {'ok': True}
 
 
@@ -13,6 +13,7 @@ from pydantic import BaseModel
 from ..db import get_session
 from ..auth import get_current_user, get_current_admin
 from ..models import BookingItem, VendorProfile, User, Item, Booking, Payment
+from ..razorpay_service import InvalidPaymentData, confirm_settlement_payment, create_settlement_order
 
 router = APIRouter(prefix="/vendor/payments", tags=["vendor-payments"])
 
@@ -48,17 +49,25 @@ class PaymentSummary(BaseModel):
 @router.get("/summary")
 async def get_payment_summary(
     period: str = Query("monthly", description="weekly, monthly, or yearly"),
-    vendor_id: Optional[int] = Query(None, description="Vendor ID (admin only)"),
+    vendor_id: Optional[int] = Query(None, description="Vendor ID (admin only; omit for all vendors)"),
     include_unverified: bool = Query(False, description="Include items that are supplied but not yet verified by admin"),
+    include_items: bool = Query(True, description="Include the itemized list (single vendor only)"),
+    items_limit: int = Query(500, ge=1, le=5000, description="Max itemized rows"),
+    items_offset: int = Query(0, ge=0),
     session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    """Get payment summary for a vendor. 
+    """Get payment summary for a vendor, or for all vendors (admin without vendor_id).
     By default, only includes supplied AND verified items.
     Set include_unverified=True to also include items marked as supplied but not yet verified.
+
+    Totals come from the daily settlement rollups (app.services.settlement_rollup), grouped
+    per item; the itemized list is paged and only fetched for a single vendor.
     """
-    # Admin can view any vendor, vendors can only view their own
-    if user.role == 'admin' and vendor_id:
+    from ..services.settlement_rollup import sum_vendor_totals, vendor_totals
+
+    # Admin can view any vendor (or all), vendors can only view their own
+    if user.role == 'admin':
         target_vendor_id = vendor_id
     elif user.role == 'vendor':
         rs = await session.execute(select(VendorProfile).where(VendorProfile.user_id == user.id))
@@ -69,117 +78,108 @@ async def get_payment_summary(
     else:
         raise HTTPException(status_code=403, detail='Access denied')
     
-    # Calculate date range
+    # Calculate date range (whole days, matching the daily rollups)
     now = datetime.utcnow()
     if period == 'weekly':
-        start_date = now - timedelta(days=7)
-        period_label = 'Weekly'
+        days, period_label = 7, 'Weekly'
     elif period == 'monthly':
-        start_date = now - timedelta(days=30)
-        period_label = 'Monthly'
+        days, period_label = 30, 'Monthly'
     elif period == 'yearly':
-        start_date = now - timedelta(days=365)
-        period_label = 'Yearly'
+        days, period_label = 365, 'Yearly'
     else:
         raise HTTPException(status_code=400, detail='Invalid period. Use: weekly, monthly, or yearly')
+    start_day = (now - timedelta(days=days)).date()
+    start_date = datetime.combine(start_day, datetime.min.time())
+    
+    if target_vendor_id is None:
+        vendors = await vendor_totals(session, start_day, by="vendor")
+        for row in vendors:
+            row.update(sum_vendor_totals([row], include_unverified))
+        vendors.sort(key=lambda row: row['total_amount'], reverse=True)
+        return {
+            'period': period_label,
+            'start_date': start_date.isoformat(),
+            'end_date': now.isoformat(),
+            **sum_vendor_totals(vendors, include_unverified),
+            'vendors': vendors,
+        }
     
-    # Build query conditions
-    conditions = [
-        BookingItem.vendor_id == target_vendor_id,
-        BookingItem.is_supplied == True,  # Must be marked as supplied
-    ]
-    
-    # For date filtering: include items that were either:
-    # 1. Supplied within the period (supplied_at >= start_date), OR
-    # 2. Settled within the period (payment_settled_at >= start_date) - for settled items
-    # This ensures settled items show up based on when they were settled, not just when supplied
-    date_condition = or_(
-        (BookingItem.supplied_at.isnot(None)) & (BookingItem.supplied_at >= start_date),
-        (BookingItem.payment_settled_at.isnot(None)) & (BookingItem.payment_settled_at >= start_date)
-    )
+    per_item = await vendor_totals(session, start_day, vendor_id=target_vendor_id)
+    totals = sum_vendor_totals(per_item, include_unverified)
     
-    if include_unverified:
-        # Include items that are supplied (verified or not)
-        # Use the date condition above to include both supplied and settled items
-        conditions.append(date_condition)
-    else:
-        # Only include verified items (unless they're settled, in which case include them)
-        # For settled items, we include them regardless of verification status
-        # For non-settled items, they must be verified
-        conditions.append(
-            or_(
-                # Settled items (include regardless of verification)
-                (BookingItem.payment_settled == True),
-                # Non-settled items (must be verified)
-                and_(
-                    BookingItem.supply_verified == True,
-                    BookingItem.verified_at.isnot(None)
+    items = []
+    if include_items:
+        # Settled items count from when they were settled, everything else from when supplied
+        activity_at = case(
+            (BookingItem.payment_settled == True, func.coalesce(BookingItem.payment_settled_at, BookingItem.supplied_at)),
+            else_=BookingItem.supplied_at,
+        )
+        conditions = [
+            BookingItem.vendor_id == target_vendor_id,
+            BookingItem.is_supplied == True,  # Must be marked as supplied
+            activity_at >= start_date,
+        ]
+        if not include_unverified:
+            # Settled items are included regardless of verification; others must be verified
+            conditions.append(
+                or_(
+                    (BookingItem.payment_settled == True),
+                    and_(
+                        BookingItem.supply_verified == True,
+                        BookingItem.verified_at.isnot(None)
+                    )
                 )
             )
+        
+        stmt = (
+            select(
+                BookingItem,
+                Booking.booking_reference,
+                Item.name,
+                Item.image_url,
+                Item.vendor_price,
+            )
+            .join(Booking, Booking.id == BookingItem.booking_id)
+            .join(Item, Item.id == BookingItem.item_id)
+            .where(and_(*conditions))
+            .order_by(activity_at.desc(), BookingItem.id.desc())
+            .offset(items_offset)
+            .limit(items_limit)
         )
-        conditions.append(date_condition)
-    
-    # Query supplied items (and optionally verified)
-    stmt = (
-        select(
-            BookingItem,
-            Booking,
-            Item,
-        )
-        .join(Booking, Booking.id == BookingItem.booking_id)
-        .join(Item, Item.id == BookingItem.item_id)
-        .where(and_(*conditions))
-    )
-    
-    # Order by settlement date (if settled) or supplied date (if not settled)
-    # This ensures settled items are ordered by when they were settled
-    stmt = stmt.order_by(
-        case(
-            (BookingItem.payment_settled_at.isnot(None), BookingItem.payment_settled_at),
-            (BookingItem.supplied_at.isnot(None), BookingItem.supplied_at),
-            else_=BookingItem.verified_at
-        ).desc()
-    )
-    
-    rs = await session.execute(stmt)
-    rows = rs.all()
-    
-    items = []
-    total_amount = 0.0
-    
-    for bi, b, it in rows:
-        # Calculate vendor price (cost) - use vendor_price from Item, not the customer price
-        vendor_unit_price = float(it.vendor_price or 0.0)
-        vendor_total_price = vendor_unit_price * bi.quantity
+        rs = await session.execute(stmt)
         
-        items.append({
-            'booking_item_id': bi.id,
-            'booking_id': b.id,
-            'booking_reference': b.booking_reference,
-            'item_name': it.name,
-            'item_image_url': it.image_url,
-            'quantity': bi.quantity,
-            'unit_price': vendor_unit_price,  # Vendor cost price
-            'total_price': vendor_total_price,  # Vendor cost total
-            'customer_unit_price': float(bi.unit_price),  # Customer price for reference
-            'customer_total_price': float(bi.total_price),  # Customer price for reference
-            'supplied_at': bi.supplied_at.isoformat() if bi.supplied_at else None,
-            'verified_at': bi.verified_at.isoformat() if bi.verified_at else None,
-            'is_supplied': bool(bi.is_supplied),
-            'supply_verified': bool(bi.supply_verified),
-            'payment_settled': getattr(bi, 'payment_settled', False),
-            'payment_settled_at': getattr(bi, 'payment_settled_at', None).isoformat() if getattr(bi, 'payment_settled_at', None) else None,
-            'event_date': bi.event_date.isoformat() if bi.event_date else None,
-        })
-        total_amount += vendor_total_price  # Use vendor price for settlement
+        for bi, booking_reference, item_name, item_image_url, vendor_price in rs.all():
+            # Calculate vendor price (cost) - use vendor_price from Item, not the customer price
+            vendor_unit_price = float(vendor_price or 0.0)
+            items.append({
+                'booking_item_id': bi.id,
+                'booking_id': bi.booking_id,
+                'booking_reference': booking_reference,
+                'item_name': item_name,
+                'item_image_url': item_image_url,
+                'quantity': bi.quantity,
+                'unit_price': vendor_unit_price,  # Vendor cost price
+                'total_price': vendor_unit_price * bi.quantity,  # Vendor cost total
+                'customer_unit_price': float(bi.unit_price),  # Customer price for reference
+                'customer_total_price': float(bi.total_price),  # Customer price for reference
+                'supplied_at': bi.supplied_at.isoformat() if bi.supplied_at else None,
+                'verified_at': bi.verified_at.isoformat() if bi.verified_at else None,
+                'is_supplied': bool(bi.is_supplied),
+                'supply_verified': bool(bi.supply_verified),
+                'payment_settled': bool(bi.payment_settled),
+                'payment_settled_at': bi.payment_settled_at.isoformat() if bi.payment_settled_at else None,
+                'event_date': bi.event_date.isoformat() if bi.event_date else None,
+            })
     
     return {
         'period': period_label,
         'start_date': start_date.isoformat(),
         'end_date': now.isoformat(),
-        'total_items': len(items),
-        'total_amount': total_amount,
+        **totals,
+        'per_item': per_item,
         'items': items,
+        'items_limit': items_limit,
+        'items_offset': items_offset,
     }
 
 
@@ -1125,30 +1125,19 @@ async def prepare_vendor_payment(
     
     # Create Razorpay order
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        if not razorpay_service.is_configured():
+        try:
+            order_id = await create_settlement_order(
+                total_amount,
+                receipt=f"vendor_{booking_item_ids[0]}_{int(datetime.utcnow().timestamp())}",
+                description=f"Vendor payment for {len(booking_item_ids)} item(s)",
+                notes={
+                    'booking_item_ids': booking_item_ids,
+                    'payment_type': 'vendor_payment',
+                    'item_count': len(booking_item_ids),
+                },
+            )
+        except ValueError:
             raise HTTPException(status_code=503, detail='Payment service is not available. Please contact support.')
-        
-        amount_paise = int(total_amount * 100)
-        razorpay_order = razorpay_service.create_order(
-            amount=amount_paise,
-            currency='INR',
-            receipt=f"vendor_{booking_item_ids[0]}_{int(datetime.utcnow().timestamp())}",
-            description=f"Vendor payment for {len(booking_item_ids)} item(s)",
-            notes={
-                'booking_item_ids': booking_item_ids,
-                'payment_type': 'vendor_payment',
-                'item_count': len(booking_item_ids),
-            }
-        )
-        
-        if not razorpay_order or 'id' not in razorpay_order:
-            logger.error(f"[Vendor Payment] Invalid order response: {razorpay_order}")
-            raise HTTPException(status_code=503, detail='Payment service encountered an error. Please try again.')
-        
-        order_id = razorpay_order.get('id')
         logger.info(f"[Vendor Payment] Order created: {order_id} for {len(booking_item_ids)} items")
         
         return {
@@ -1197,28 +1186,10 @@ async def verify_vendor_payment(
     
     # Verify payment with Razorpay
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        razorpay_payment_id = payment_data.get('razorpay_payment_id') or payment_data.get('payment_id')
-        razorpay_order_id = payment_data.get('razorpay_order_id') or payment_data.get('order_id')
-        razorpay_signature = payment_data.get('razorpay_signature') or payment_data.get('signature')
-        
-        if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-            raise HTTPException(status_code=400, detail='Missing payment verification data')
-        
-        # Verify payment signature
-        is_valid = razorpay_service.verify_payment(
-            razorpay_order_id,
-            razorpay_payment_id,
-            razorpay_signature
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail='Payment verification failed - invalid signature')
-        
-        # Fetch payment details
-        payment_details = razorpay_service.fetch_payment(razorpay_payment_id)
+        try:
+            razorpay_order_id, razorpay_payment_id, payment_details = await confirm_settlement_payment(payment_data)
+        except InvalidPaymentData as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Calculate total amount
         total_amount = 0.0
@@ -1348,31 +1319,21 @@ async def prepare_bulk_vendor_payment(
     
     # Create Razorpay order
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        if not razorpay_service.is_configured():
+        try:
+            order_id = await create_settlement_order(
+                total_amount,
+                receipt=f"vendor_bulk_{vendor_id}_{int(datetime.utcnow().timestamp())}",
+                description=f"Bulk vendor payment for {len(booking_item_ids)} item(s)",
+                notes={
+                    'vendor_id': vendor_id,
+                    'payment_type': 'vendor_bulk_payment',
+                    'booking_item_ids': booking_item_ids,
+                    'item_count': len(booking_item_ids),
+                },
+            )
+        except ValueError:
             raise HTTPException(status_code=500, detail='Payment gateway not configured')
         
-        amount_paise = int(total_amount * 100)
-        razorpay_order = razorpay_service.create_order(
-            amount=amount_paise,
-            currency='INR',
-            receipt=f"vendor_bulk_{vendor_id}_{int(datetime.utcnow().timestamp())}",
-            description=f"Bulk vendor payment for {len(booking_item_ids)} item(s)",
-            notes={
-                'vendor_id': vendor_id,
-                'payment_type': 'vendor_bulk_payment',
-                'booking_item_ids': booking_item_ids,
-                'item_count': len(booking_item_ids),
-            }
-        )
-        
-        if not razorpay_order or 'id' not in razorpay_order:
-            raise HTTPException(status_code=500, detail='Failed to create payment order')
-        
-        order_id = razorpay_order.get('id')
-        
         return {
             'ok': True,
             'order_id': order_id,
@@ -1433,28 +1394,10 @@ async def verify_bulk_vendor_payment(
     
     # Verify payment with Razorpay
     try:
-        from ..routers.payments import get_razorpay_service
-        razorpay_service = get_razorpay_service()
-        
-        razorpay_payment_id = payment_data.get('razorpay_payment_id') or payment_data.get('payment_id')
-        razorpay_order_id = payment_data.get('razorpay_order_id') or payment_data.get('order_id')
-        razorpay_signature = payment_data.get('razorpay_signature') or payment_data.get('signature')
-        
-        if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-            raise HTTPException(status_code=400, detail='Missing payment verification data')
-        
-        # Verify payment signature
-        is_valid = razorpay_service.verify_payment(
-            razorpay_order_id,
-            razorpay_payment_id,
-            razorpay_signature
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail='Payment verification failed - invalid signature')
-        
-        # Fetch payment details
-        payment_details = razorpay_service.fetch_payment(razorpay_payment_id)
+        try:
+            razorpay_order_id, razorpay_payment_id, payment_details = await confirm_settlement_payment(payment_data)
+        except InvalidPaymentData as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Calculate total amount
         total_amount = 0.0
@@ -1,36 +1,21 @@
 from typing import List, Optional, Dict, Any, Union
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, insert, text
 from ..db import get_session
 from ..models import Venue, Space
 from ..schemas.venues import VenueOut, SpaceOut, VenueWithSpaces
 from .auth import require_role
+from ..services.catalog_cache import cached_catalog_response, bump_catalog_version
+from ..services.space_cache import parse_json_field
 from pydantic import BaseModel, Field, model_validator
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/venues", tags=["venues"])
 
 
-def parse_json_field(value: Any) -> Any:
-    """Parse JSON string fields from database.
-    
-    PostgreSQL may store JSON as text strings when migrated from other databases.
-    This helper safely parses those strings back to Python objects.
-    """
-    if value is None:
-        return None
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except (json.JSONDecodeError, TypeError):
-            return value
-    return value
-
-
 @router.get("/", response_model=List[VenueOut])
 async def get_venues(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
@@ -54,6 +39,7 @@ async def get_venues(
 
 @router.get("/spaces", response_model=List[SpaceOut])
 async def list_spaces(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of records per page (default 100, max 500)"),
     session: AsyncSession = Depends(get_session)
@@ -62,7 +48,14 @@ async def list_spaces(
     
     Prevents memory exhaustion from loading all spaces into memory simultaneously.
     Each space object has relationship overhead, pagination ensures memory efficiency.
+    Served from the public catalog cache (ETag / 304 support).
     """
+    return await cached_catalog_response(
+        request, session, f"spaces:{skip}:{limit}", lambda: _build_space_list(skip, limit, session), List[SpaceOut]
+    )
+
+
+async def _build_space_list(skip: int, limit: int, session: AsyncSession) -> List[SpaceOut]:
     rs = await session.execute(
         select(Space)
         .order_by(Space.id.asc())
@@ -91,14 +84,20 @@ async def list_spaces(
             "created_at": space.created_at,
             "updated_at": space.updated_at,
         }
-        result.append(space_dict)
+        result.append(SpaceOut(**space_dict))
     
     return result
 
 
 @router.get("/spaces/{space_id}", response_model=SpaceOut)
-async def get_space(space_id: int, session: AsyncSession = Depends(get_session)):
-    """Get a specific space"""
+async def get_space(space_id: int, request: Request, session: AsyncSession = Depends(get_session)):
+    """Get a specific space (served from the public catalog cache)"""
+    return await cached_catalog_response(
+        request, session, f"space:{space_id}", lambda: _build_space_out(space_id, session), SpaceOut
+    )
+
+
+async def _build_space_out(space_id: int, session: AsyncSession) -> SpaceOut:
     try:
         # Direct query without connection check to avoid extra round-trip
         result = await session.execute(select(Space).where(Space.id == space_id))
@@ -377,6 +376,7 @@ async def create_space(venue_id: int, payload: SpaceCreate, session: AsyncSessio
     session.add(space)
     await session.commit()
     await session.refresh(space)
+    await bump_catalog_version(session)
     
     # Parse JSON fields for response (may be stored as strings in PostgreSQL)
     return {
@@ -558,6 +558,7 @@ async def update_space(space_id: int, payload: SpaceUpdate, session: AsyncSessio
             pass
         raise HTTPException(status_code=400, detail=f"Failed to update space: {e}")
     await session.refresh(space)
+    await bump_catalog_version(session)
     
     # Log what's being returned
     if space.features:
@@ -592,4 +593,5 @@ async def delete_space(space_id: int, session: AsyncSession = Depends(get_sessio
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
     await session.delete(space)
     await session.commit()
+    await bump_catalog_version(session)
     return None
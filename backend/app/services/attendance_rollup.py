@@ -0,0 +1,177 @@
+"""
+Monthly Attendance Rollups
+Maintains `attendance_monthly`, one row of status counts and hour totals per staff
+member per month, so monthly summaries and payroll never re-scan raw attendance rows.
+
+How it works:
+- Every ORM insert/update/delete of an Attendance row (check-in, check-out, QR verify-otp,
+  manual marking and edits) applies the difference between the row's old and new
+  contribution in the same transaction, via the mapper hooks in app.models
+  (INSERT ... ON CONFLICT (staff_id, year, month) DO UPDATE SET n = n + excluded.n).
+- `rebuild_attendance_rollups()` recomputes a month from the raw rows; a nightly job runs it
+  for the current and previous month to repair drift (raw SQL writes, float rounding).
+  It holds the rollup lock (app.services.rollup_lock) that the hooks take shared, so
+  check-ins committed while it runs are neither missed nor overwritten. The migration
+  backfills all history.
+"""
+import logging
+from calendar import monthrange
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Attendance, AttendanceMonthly
+from app.services.rollup_lock import ATTENDANCE_MONTHLY, lock_rollup
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLUMNS = {
+    "present": "present_count",
+    "absent": "absent_count",
+    "half_day": "half_day_count",
+    "leave": "leave_count",
+    "holiday": "holiday_count",
+}
+COUNTER_COLUMNS = ("record_count", *STATUS_COLUMNS.values(), "total_hours", "overtime_hours")
+
+# Attendance fields that affect the rollup, in attendance_values() order
+_ROLLUP_FIELDS = ("staff_id", "attendance_date", "status", "total_hours", "overtime_hours")
+
+AttendanceValues = Tuple[Any, ...]
+RollupKey = Tuple[int, int, int]  # (staff_id, year, month)
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def attendance_values(target: Attendance, previous: bool = False) -> Optional[AttendanceValues]:
+    """The rollup-relevant fields of an attendance row, as flushed now or (previous=True) before this flush."""
+    state = inspect(target)
+    values = []
+    for name in _ROLLUP_FIELDS:
+        value = getattr(target, name)
+        if previous:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        values.append(value)
+    if values[0] is None or values[1] is None:
+        return None
+    return tuple(values)
+
+
+def _contribution(values: AttendanceValues) -> Tuple[RollupKey, Dict[str, float]]:
+    staff_id, attendance_date, status, total_hours, overtime_hours = values
+    increments: Dict[str, float] = {
+        "record_count": 1,
+        "total_hours": total_hours or 0.0,
+        "overtime_hours": overtime_hours or 0.0,
+    }
+    if status in STATUS_COLUMNS:
+        increments[STATUS_COLUMNS[status]] = 1
+    return (staff_id, attendance_date.year, attendance_date.month), increments
+
+
+def rollup_upsert(dialect_name: str, staff_id: int, year: int, month: int, **increments: float):
+    """INSERT ... ON CONFLICT that adds `increments` to a staff member's month."""
+    values = {name: increments.get(name, 0) for name in COUNTER_COLUMNS}
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(AttendanceMonthly).values(
+        staff_id=staff_id, year=year, month=month, updated_at=datetime.utcnow(), **values,
+    )
+    table = AttendanceMonthly.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=["staff_id", "year", "month"],
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in COUNTER_COLUMNS if values[name]},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def attendance_rollup_delta(
+    dialect_name: str,
+    old_values: Optional[AttendanceValues],
+    new_values: Optional[AttendanceValues],
+) -> List[Any]:
+    """Upserts that move a row's contribution from `old_values` to `new_values` (either may be None)."""
+    if old_values == new_values:
+        return []
+    deltas: Dict[RollupKey, Dict[str, float]] = {}
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        if values is None:
+            continue
+        key, increments = _contribution(values)
+        target = deltas.setdefault(key, {})
+        for name, amount in increments.items():
+            target[name] = target.get(name, 0) + sign * amount
+    return [
+        rollup_upsert(dialect_name, *key, **increments)
+        for key, increments in deltas.items()
+        if any(increments.values())
+    ]
+
+
+async def get_monthly_rollups(
+    session: AsyncSession, year: int, month: int, staff_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, AttendanceMonthly]:
+    """Rollup rows for a month keyed by staff_id (staff without attendance are absent)."""
+    stmt = select(AttendanceMonthly).where(AttendanceMonthly.year == year, AttendanceMonthly.month == month)
+    if staff_ids is not None:
+        stmt = stmt.where(AttendanceMonthly.staff_id.in_(list(staff_ids)))
+    result = await session.execute(stmt)
+    return {row.staff_id: row for row in result.scalars().all()}
+
+
+async def rebuild_attendance_rollups(
+    session: AsyncSession, year: int, month: int, staff_ids: Optional[Iterable[int]] = None,
+) -> Dict[str, Any]:
+    """Recompute a month's rollups (all staff, or `staff_ids`) from the raw attendance rows."""
+    first_day, last_day = month_bounds(year, month)
+    staff_ids = list(staff_ids) if staff_ids is not None else None
+
+    columns = [
+        Attendance.staff_id,
+        func.count(Attendance.id),
+        *[func.sum(case((Attendance.status == status, 1), else_=0)) for status in STATUS_COLUMNS],
+        func.coalesce(func.sum(Attendance.total_hours), 0.0),
+        func.coalesce(func.sum(Attendance.overtime_hours), 0.0),
+    ]
+    stmt = (
+        select(*columns)
+        .where(Attendance.attendance_date >= first_day, Attendance.attendance_date <= last_day)
+        .group_by(Attendance.staff_id)
+    )
+    clear = delete(AttendanceMonthly).where(AttendanceMonthly.year == year, AttendanceMonthly.month == month)
+    if staff_ids is not None:
+        stmt = stmt.where(Attendance.staff_id.in_(staff_ids))
+        clear = clear.where(AttendanceMonthly.staff_id.in_(staff_ids))
+
+    # Before reading: waits for in-flight attendance writes, holds new ones until commit
+    await lock_rollup(session, ATTENDANCE_MONTHLY, exclusive=True)
+    now = datetime.utcnow()
+    rows = [
+        {"staff_id": row[0], "year": year, "month": month, "updated_at": now,
+         **{name: value or 0 for name, value in zip(COUNTER_COLUMNS, row[1:])}}
+        for row in (await session.execute(stmt)).all()
+    ]
+    await session.execute(clear)
+    if rows:
+        await session.execute(AttendanceMonthly.__table__.insert(), rows)
+    await session.commit()
+    return {"year": year, "month": month, "staff": len(rows)}
+
+
+async def reconcile_attendance_rollups(session: AsyncSession) -> Dict[str, Any]:
+    """Scheduler job: rebuild the current and previous month."""
+    today = date.today()
+    previous = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+    results = [
+        await rebuild_attendance_rollups(session, *previous),
+        await rebuild_attendance_rollups(session, today.year, today.month),
+    ]
+    return {"months": results}
@@ -0,0 +1,137 @@
+"""
+Auth Crypto Service
+Password hashing and verification off the event loop, with transparent rehashing and
+a per-username throttle on failed logins.
+
+How it works:
+- Hashes and verifications run in a dedicated ThreadPoolExecutor of
+  PASSWORD_HASH_WORKERS threads, so a burst of logins queues there instead of blocking
+  the event loop (passlib's pbkdf2 runs in hashlib, which releases the GIL).
+  PASSWORD_HASH_TIMEOUT_SECONDS bounds the wait, queueing included.
+- `verify_password_async()` returns (valid, new_hash). new_hash is set when the stored
+  hash is bcrypt or uses rounds other than PASSWORD_PBKDF2_ROUNDS; callers store it, so
+  raising the work factor upgrades users as they log in.
+- `login_throttle` counts failed logins per username. After LOGIN_FAILURE_LIMIT failures
+  within LOGIN_FAILURE_WINDOW_SECONDS further attempts are refused without running the
+  KDF until the oldest failure ages out. A successful login clears the count. State is
+  per worker and bounded to LOGIN_THROTTLE_MAX_USERNAMES entries.
+
+Usage:
+    retry_after = login_throttle.retry_after(username)
+    if retry_after:
+        raise HTTPException(status_code=429, headers={"Retry-After": str(retry_after)}, ...)
+    valid, new_hash = await verify_password_async(password, user.password_hash)
+    if not valid:
+        login_throttle.record_failure(username)
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Optional, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashTimeout(Exception):
+    """The hash pool didn't finish in PASSWORD_HASH_TIMEOUT_SECONDS (overloaded)."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="PasswordHash")
+    return _executor
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_get_executor(), fn, *args),
+            timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise PasswordHashTimeout()
+
+
+async def verify_password_async(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set only for a valid password whose hash is outdated."""
+    from app.auth import verify_and_update_password
+
+    return await _run(verify_and_update_password, plain, hashed)
+
+
+async def hash_password_async(plain: str) -> str:
+    from app.auth import hash_password
+
+    return await _run(hash_password, plain)
+
+
+def shutdown_hash_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+class LoginThrottle:
+    """Recent failed-login times per username, oldest username evicted first."""
+
+    __slots__ = ("_failures",)
+
+    def __init__(self):
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return (username or "").strip().lower()
+
+    def _recent(self, key: str, now: float) -> Optional[Deque[float]]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        cutoff = now - settings.LOGIN_FAILURE_WINDOW_SECONDS
+        while failures and failures[0] <= cutoff:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, username: str) -> int:
+        """Seconds until this username may try again; 0 if it isn't throttled."""
+        now = time.monotonic()
+        failures = self._recent(self._key(username), now)
+        if failures is None or len(failures) < settings.LOGIN_FAILURE_LIMIT:
+            return 0
+        # Allowed again once enough failures have aged out of the window
+        unlock_at = failures[len(failures) - settings.LOGIN_FAILURE_LIMIT] + settings.LOGIN_FAILURE_WINDOW_SECONDS
+        return max(1, math.ceil(unlock_at - now))
+
+    def record_failure(self, username: str) -> None:
+        key = self._key(username)
+        now = time.monotonic()
+        failures = self._recent(key, now)
+        if failures is None:
+            failures = self._failures[key] = deque(maxlen=max(1, settings.LOGIN_FAILURE_LIMIT))
+            while len(self._failures) > settings.LOGIN_THROTTLE_MAX_USERNAMES:
+                self._failures.popitem(last=False)
+        else:
+            self._failures.move_to_end(key)
+        failures.append(now)
+        if len(failures) >= settings.LOGIN_FAILURE_LIMIT:
+            logger.warning(f"[Auth Crypto] Throttling logins for {key!r} after {len(failures)} failures")
+
+    def clear(self, username: str) -> None:
+        self._failures.pop(self._key(username), None)
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,225 @@
+"""
+Booking Cart Assembly
+Resolves and prices the add-ons of a new booking (catalog items by id, ad-hoc items by
+name) in a fixed number of round trips, however large the cart is.
+
+How it works:
+- `resolve_items()` loads every requested catalog item in one IN query.
+- `resolve_custom_items()` looks up every custom item name (plus the shared transport
+  item, if the cart has transport lines) in one query. Names not in the catalog become
+  new vendor-less Items in one bulk INSERT ... RETURNING; repeats of a name within the
+  cart reuse the same new row, as the old per-line lookups did after each flush.
+- `price_lines()` applies hour-based pricing over the whole cart in one pass:
+  total = unit * qty + max(0, hours_used - base_hours_included) * rate_per_extra_hour * qty
+  for items with hour-based pricing and hours_used given.
+- `assemble_cart()` runs both and returns CartLines ready to become BookingItems.
+
+Usage:
+    try:
+        lines = await assemble_cart(session, payload.items, payload.custom_items)
+    except CartItemNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Item {e.item_id} not found")
+    session.add_all([BookingItem(booking_id=b.id, **line.booking_item_fields()) for line in lines])
+    b.total_amount += cart_total(lines)
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Item
+
+logger = logging.getLogger(__name__)
+
+STAGE_BANNER_PREFIX = "stage_banner:"
+TRANSPORT_CODE = "transport"
+
+
+class CartItemNotFound(Exception):
+    def __init__(self, item_id: int):
+        self.item_id = item_id
+        super().__init__(f"Item {item_id} not found")
+
+
+class CartLine:
+    __slots__ = (
+        "item_id", "vendor_id", "quantity", "unit_price", "total_price", "hours_used",
+        "base_hours_included", "rate_per_extra_hour",
+    )
+
+    def __init__(
+        self,
+        item_id: Optional[int],
+        vendor_id: Optional[int],
+        quantity: int,
+        unit_price: float,
+        hours_used: Optional[int] = None,
+        base_hours_included: int = 0,
+        rate_per_extra_hour: float = 0.0,
+    ):
+        self.item_id = item_id
+        self.vendor_id = vendor_id
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.hours_used = hours_used or None
+        self.base_hours_included = base_hours_included or 0
+        self.rate_per_extra_hour = float(rate_per_extra_hour or 0.0)
+        self.total_price = unit_price * quantity
+
+    def booking_item_fields(self) -> Dict[str, Any]:
+        return {
+            "item_id": self.item_id,
+            "vendor_id": self.vendor_id,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+            "total_price": self.total_price,
+            "hours_used": self.hours_used,
+        }
+
+
+def price_lines(lines: Sequence[CartLine]) -> float:
+    """Set total_price on every line (base plus extra hours) and return the cart total."""
+    for line in lines:
+        extra_hours = (
+            max(0, line.hours_used - line.base_hours_included)
+            if line.hours_used and line.base_hours_included > 0 and line.rate_per_extra_hour
+            else 0
+        )
+        line.total_price = line.unit_price * line.quantity + float(extra_hours * line.rate_per_extra_hour * line.quantity)
+    return cart_total(lines)
+
+
+def cart_total(lines: Iterable[CartLine]) -> float:
+    return sum(line.total_price for line in lines)
+
+
+async def resolve_items(session: AsyncSession, requested: Sequence[Any]) -> List[CartLine]:
+    """Catalog items ({item_id, quantity, hours_used}) to CartLines in one query.
+
+    Raises CartItemNotFound for the first unknown id, in cart order.
+    """
+    if not requested:
+        return []
+    rs = await session.execute(select(Item).where(Item.id.in_({it.item_id for it in requested})))
+    items = {item.id: item for item in rs.scalars().all()}
+    lines: List[CartLine] = []
+    for it in requested:
+        item = items.get(it.item_id)
+        if item is None:
+            raise CartItemNotFound(it.item_id)
+        lines.append(CartLine(
+            item.id,
+            item.vendor_id,
+            int(it.quantity),
+            float(item.price),
+            hours_used=getattr(it, "hours_used", None),
+            base_hours_included=item.base_hours_included,
+            rate_per_extra_hour=item.rate_per_extra_hour,
+        ))
+    return lines
+
+
+async def resolve_custom_items(session: AsyncSession, requested: Sequence[Any]) -> List[CartLine]:
+    """Custom items ({name, quantity, unit_price, code}) to CartLines, reusing catalog Items by name.
+
+    One lookup query, plus one bulk insert when some names are new. Codes of the form
+    "stage_banner:<url>" store the URL on the item's image_url; code "transport" matches
+    (and marks) the shared transport item through its description, so transport lines can
+    be assigned to a vendor later.
+    """
+    wanted = []
+    for ci in requested or []:
+        name = (ci.name or "").strip()
+        if not name:
+            continue
+        code = ci.code or None
+        stage_banner_url = None
+        if code and code.startswith(STAGE_BANNER_PREFIX):
+            stage_banner_url = code[len(STAGE_BANNER_PREFIX):]
+            code = "stage_banner"  # Use a consistent code for lookup
+        wanted.append((ci, name, code, stage_banner_url))
+    if not wanted:
+        return []
+
+    names = {name for _, name, _, _ in wanted}
+    has_transport = any(code == TRANSPORT_CODE for _, _, code, _ in wanted)
+    condition = Item.name.in_(names)
+    if has_transport:
+        condition = or_(condition, Item.description == TRANSPORT_CODE)
+    rs = await session.execute(select(Item).where(condition).order_by(Item.id))
+    existing = rs.scalars().all()
+    by_name: Dict[str, Any] = {}
+    transport_item = None
+    for item in existing:
+        by_name.setdefault(item.name, item)
+        if transport_item is None and item.description == TRANSPORT_CODE:
+            transport_item = item
+
+    # New catalog rows keyed by name; matched by name again after the insert
+    new_rows: Dict[str, Dict[str, Any]] = {}
+    resolved: List[Any] = []  # Item or the name of a new row, per wanted line
+    for _, name, code, stage_banner_url in wanted:
+        item = by_name.get(name)
+        if code == TRANSPORT_CODE and transport_item is not None:
+            # Old lookup: first of (name match | transport item) by id; a new row sorts last
+            if item is None or (not isinstance(transport_item, str) and transport_item.id < item.id):
+                item = transport_item
+        if item is None:
+            if name not in new_rows:
+                # A simple catalog item (no vendor) so the booking item can reference it
+                new_rows[name] = {
+                    "name": name,
+                    "description": code,
+                    "price": None,  # first line's unit price, set below
+                    "image_url": stage_banner_url or None,
+                }
+                if code == TRANSPORT_CODE and transport_item is None:
+                    transport_item = name
+            resolved.append(name)
+            continue
+        if isinstance(item, str):
+            resolved.append(item)
+            continue
+        if stage_banner_url and not item.image_url:
+            # Update existing item with stage banner URL if not already set
+            item.image_url = stage_banner_url
+        elif code == TRANSPORT_CODE and not item.description:
+            item.description = TRANSPORT_CODE
+            if transport_item is None:
+                transport_item = item
+        resolved.append(item)
+
+    lines: List[CartLine] = []
+    for (ci, _, _, _), item in zip(wanted, resolved):
+        unit = float(ci.unit_price or 0.0)
+        qty = max(1, int(ci.quantity or 1))
+        if isinstance(item, str):
+            row = new_rows[item]
+            if row["price"] is None:
+                row["price"] = unit
+            lines.append(CartLine(None, None, qty, unit))
+        else:
+            # Vendor is None for transport until an admin assigns one
+            lines.append(CartLine(item.id, item.vendor_id, qty, unit))
+
+    if new_rows:
+        rs = await session.execute(insert(Item).returning(Item.id, Item.name), list(new_rows.values()))
+        new_ids = {name: item_id for item_id, name in rs.all()}
+        for line, item in zip(lines, resolved):
+            if isinstance(item, str):
+                line.item_id = new_ids[item]
+        logger.info(f"[Booking Cart] Created {len(new_ids)} custom catalog item(s)")
+    return lines
+
+
+async def assemble_cart(
+    session: AsyncSession,
+    items: Optional[Sequence[Any]],
+    custom_items: Optional[Sequence[Any]],
+) -> List[CartLine]:
+    """Catalog lines then custom lines, priced. Callers attach them to the booking and commit."""
+    lines = await resolve_items(session, items or [])
+    lines += await resolve_custom_items(session, custom_items or [])
+    price_lines(lines)
+    return lines
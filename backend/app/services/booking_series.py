@@ -0,0 +1,233 @@
+"""
+Booking Series Engine
+Creates a recurring series of daily bookings (regular programs, multi-day hires) in a
+fixed number of round trips, however long the series is.
+
+How it works:
+- `plan_series()` computes every occurrence up front (skipping excluded weekdays).
+- `find_conflicts()` fetches all active bookings on the space that overlap the whole
+  window in one range query, then checks each occurrence in memory against the booked
+  intervals (sorted by start, with a running max of end times so the scan stops early).
+- `load_items()` resolves the requested items in one query.
+- `create_series()` bulk-inserts the bookings (INSERT ... RETURNING id) and then their
+  booking items. Each Occurrence ends up created or skipped and reports itself per date.
+
+Series bookings never carry a broker or supply state, so the ORM-level settlement
+rollup hooks (app.services.settlement_rollup) have nothing to record for these
+Core inserts.
+
+Usage:
+    plan = plan_series(start_date, end_date, start_time, end_time, excluded_weekdays)
+    await find_conflicts(session, space.id, plan)
+    await create_series(session, space, plan, user_id=user.id, series_reference=ref,
+                        items=await load_items(session, requested_items))
+    await session.commit()
+    report = [o.report() for o in plan]
+"""
+import logging
+import uuid
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, not_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Booking, BookingItem, Item
+
+logger = logging.getLogger(__name__)
+
+# Bookings in these states block a slot
+ACTIVE_STATUSES = ("pending", "approved", "confirmed")
+
+
+class Occurrence:
+    __slots__ = ("day", "start", "end", "status", "reason", "booking_id", "booking_reference")
+
+    def __init__(self, day: date, start: Optional[datetime], end: Optional[datetime]):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.status = "planned"  # planned -> created | skipped
+        self.reason: Optional[str] = None
+        self.booking_id: Optional[int] = None
+        self.booking_reference: Optional[str] = None
+
+    def skip(self, reason: str) -> None:
+        self.status = "skipped"
+        self.reason = reason
+
+    def report(self) -> Dict[str, Any]:
+        row: Dict[str, Any] = {"date": self.day.isoformat(), "status": self.status}
+        if self.status == "created":
+            row.update(
+                id=self.booking_id,
+                booking_reference=self.booking_reference,
+                start_datetime=self.start.isoformat(),
+                end_datetime=self.end.isoformat(),
+            )
+        elif self.reason:
+            row["reason"] = self.reason
+        return row
+
+
+def plan_series(
+    start_date: date,
+    end_date: date,
+    start_time: time,
+    end_time: time,
+    excluded_weekdays: Iterable[int] = (),
+) -> List[Occurrence]:
+    """One occurrence per day in [start_date, end_date]; excluded weekdays (Mon=0..Sun=6) come back skipped."""
+    excluded = set(excluded_weekdays)
+    plan: List[Occurrence] = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in excluded:
+            occurrence = Occurrence(day, None, None)
+            occurrence.skip("excluded_weekday")
+        else:
+            start = datetime.combine(day, start_time)
+            end = datetime.combine(day, end_time)
+            if end <= start:
+                end = start + timedelta(hours=1)
+            occurrence = Occurrence(day, start, end)
+        plan.append(occurrence)
+        day += timedelta(days=1)
+    return plan
+
+
+async def find_conflicts(session: AsyncSession, space_id: int, plan: Sequence[Occurrence]) -> int:
+    """Mark planned occurrences that overlap an active booking as skipped; returns how many."""
+    planned = [o for o in plan if o.status == "planned"]
+    if not planned:
+        return 0
+    window_start = min(o.start for o in planned)
+    window_end = max(o.end for o in planned)
+    rs = await session.execute(
+        select(Booking.start_datetime, Booking.end_datetime, Booking.booking_reference)
+        .where(
+            Booking.space_id == space_id,
+            Booking.status.in_(ACTIVE_STATUSES),
+            not_(or_(Booking.end_datetime <= window_start, Booking.start_datetime >= window_end)),
+        )
+        .order_by(Booking.start_datetime, Booking.id)
+    )
+    booked: List[Tuple[datetime, datetime, str]] = list(rs.all())
+    if not booked:
+        return 0
+
+    starts = [b[0] for b in booked]
+    # max_end[i] = latest end among booked[0..i]; lets the backward scan stop early
+    max_end: List[datetime] = []
+    for _, end, _ in booked:
+        max_end.append(end if not max_end or end > max_end[-1] else max_end[-1])
+
+    conflicts = 0
+    for occurrence in planned:
+        # Candidates start before the occurrence ends; one of them conflicts if it ends after it starts
+        i = bisect_left(starts, occurrence.end) - 1
+        while i >= 0 and max_end[i] > occurrence.start:
+            if booked[i][1] > occurrence.start:
+                occurrence.skip(f"conflict:{booked[i][2]}")
+                conflicts += 1
+                break
+            i -= 1
+    return conflicts
+
+
+async def load_items(session: AsyncSession, requested: Iterable[Dict[str, Any]]) -> List[Tuple[Item, int]]:
+    """Resolve [{item_id, quantity}] to (Item, quantity) pairs in one query; unknown or malformed entries are dropped."""
+    wanted: List[Tuple[int, int]] = []
+    for it in requested:
+        try:
+            wanted.append((int(it.get("item_id")), int(it.get("quantity") or 1)))
+        except Exception:
+            continue
+    if not wanted:
+        return []
+    rs = await session.execute(select(Item).where(Item.id.in_({item_id for item_id, _ in wanted})))
+    items = {item.id: item for item in rs.scalars().all()}
+    return [(items[item_id], qty) for item_id, qty in wanted if item_id in items]
+
+
+async def create_series(
+    session: AsyncSession,
+    space: Any,
+    plan: Sequence[Occurrence],
+    *,
+    user_id: int,
+    series_reference: str,
+    items: Sequence[Tuple[Item, int]] = (),
+    is_admin_booking: bool = False,
+    booking_fields: Optional[Dict[str, Any]] = None,
+) -> List[Occurrence]:
+    """Bulk-insert a booking (plus items) for every planned occurrence. Callers check conflicts first and commit.
+
+    `space` is anything with id/venue_id/price_per_hour (a CachedSpace or a Space).
+    Admin bookings (regular programs, live shows) are auto-approved and free.
+    """
+    planned = [o for o in plan if o.status == "planned"]
+    if not planned:
+        return []
+
+    booking_status = "approved" if is_admin_booking else "pending"
+    item_rows_per_booking = [
+        {
+            "item_id": item.id,
+            "vendor_id": item.vendor_id,
+            "quantity": qty,
+            "unit_price": float(item.price),
+            "total_price": float(item.price) * qty,
+        }
+        for item, qty in items
+    ]
+    items_total = sum(row["total_price"] for row in item_rows_per_booking)
+    price_per_hour = float(space.price_per_hour or 0.0)
+
+    now = datetime.utcnow()
+    booking_rows = []
+    for occurrence in planned:
+        occurrence.booking_reference = "BK-" + uuid.uuid4().hex[:10].upper()
+        duration_hours = max(0.0, (occurrence.end - occurrence.start).total_seconds() / 3600.0)
+        booking_rows.append({
+            **(booking_fields or {}),
+            "booking_reference": occurrence.booking_reference,
+            "series_reference": series_reference,
+            "user_id": user_id,
+            "venue_id": space.venue_id,
+            "space_id": space.id,
+            "start_datetime": occurrence.start,
+            "end_datetime": occurrence.end,
+            "status": booking_status,
+            # For admin bookings, keep total_amount at 0 (no payment required)
+            "total_amount": 0.0 if is_admin_booking else duration_hours * price_per_hour + items_total,
+            "is_admin_booking": is_admin_booking,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    rs = await session.execute(
+        insert(Booking).returning(Booking.id, Booking.booking_reference),
+        booking_rows,
+    )
+    # Matched by reference (unique), so RETURNING row order doesn't matter
+    ids = {reference: booking_id for booking_id, reference in rs.all()}
+    for occurrence in planned:
+        occurrence.booking_id = ids[occurrence.booking_reference]
+        occurrence.status = "created"
+
+    if item_rows_per_booking:
+        await session.execute(insert(BookingItem), [
+            {
+                **row,
+                "booking_id": occurrence.booking_id,
+                "event_date": occurrence.day,
+                "booking_status": booking_status,
+                "is_supplied": False,
+            }
+            for occurrence in planned
+            for row in item_rows_per_booking
+        ])
+    logger.info(f"[Booking Series] {series_reference}: created {len(planned)} booking(s) on space {space.id}")
+    return planned
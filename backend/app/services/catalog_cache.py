@@ -0,0 +1,280 @@
+"""
+Public Catalog Cache
+Serves read-mostly public catalog endpoints (items, spaces, rack products) from
+pre-serialized, precompressed responses with strong ETags.
+
+How it works:
+- Each endpoint builds its payload once per filter key and catalog version; the JSON
+  body and its gzip/brotli variants are kept in a small per-worker LRU.
+- The catalog version lives in the `cache_versions` table so a write on one gunicorn
+  worker invalidates every worker. Workers re-read it at most every
+  CATALOG_CACHE_VERSION_CHECK_SECONDS.
+- Admin/vendor write endpoints call `bump_catalog_version()` after committing.
+- Payloads are validated and dumped through the endpoint's response model before they
+  are cached, so the cached body carries exactly the fields FastAPI would have returned.
+- Clients revalidate with If-None-Match and get 304 Not Modified when nothing changed.
+  The compressed variant is picked from Accept-Encoding q-values (`br;q=0` refuses br).
+
+Usage:
+    @router.get("/things")
+    async def list_things(request: Request, session: AsyncSession = Depends(get_session)):
+        async def build():
+            ...
+            return payload
+        return await cached_catalog_response(request, session, "things:all", build, List[ThingOut])
+"""
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.settings import settings
+from app.utils.fast_json import dumps
+
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_NAME = "catalog"
+
+# Don't bother compressing tiny bodies (matches GZipMiddleware minimum_size in core.py)
+MIN_COMPRESS_SIZE = 1000
+
+CACHE_CONTROL = "public, no-cache"  # Clients may store but must revalidate (cheap 304)
+
+
+class _CatalogEntry:
+    __slots__ = ("version", "created_at", "etag", "body", "gzip_body", "br_body")
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.created_at = time.monotonic()
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.gzip_body: Optional[bytes] = None
+        self.br_body: Optional[bytes] = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.gzip_body = gzip.compress(body, compresslevel=6)
+            if BROTLI_AVAILABLE:
+                self.br_body = brotli.compress(body, quality=5)
+
+
+_entries: "OrderedDict[str, _CatalogEntry]" = OrderedDict()
+_version_state: Dict[str, Any] = {
+    "db_version": 0,        # Last version read from cache_versions
+    "local_version": 0,     # Bumps made by this worker (fallback if the table is unavailable)
+    "checked_at": 0.0,
+    "db_available": True,
+}
+
+
+def _current_version() -> str:
+    return f"{_version_state['db_version']}.{_version_state['local_version']}"
+
+
+async def get_catalog_version(session: AsyncSession) -> str:
+    """Return the shared catalog version, re-reading it from the DB at most every few seconds."""
+    now = time.monotonic()
+    if now - _version_state["checked_at"] < settings.CATALOG_CACHE_VERSION_CHECK_SECONDS:
+        return _current_version()
+    _version_state["checked_at"] = now
+    if not _version_state["db_available"]:
+        return _current_version()
+
+    from app.db import is_missing_table
+    from app.models import CacheVersion
+    try:
+        version = (await session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == CATALOG_VERSION_NAME)
+        )).scalar()
+        _version_state["db_version"] = version or 0
+    except Exception as e:
+        if is_missing_table(e, "cache_versions"):
+            # Migration not applied - fall back to per-worker versions + TTL for good
+            logger.warning(f"[Catalog Cache] Shared version unavailable, using per-worker invalidation: {e}")
+            _version_state["db_available"] = False
+        else:
+            # Transient (connection drop, timeout): keep the last version, retry after the check interval
+            logger.warning(f"[Catalog Cache] Failed to read shared catalog version, retrying in {settings.CATALOG_CACHE_VERSION_CHECK_SECONDS:g}s: {e}")
+        try:
+            await session.rollback()
+        except Exception:
+            pass
+    return _current_version()
+
+
+def _bump_local() -> None:
+    _version_state["local_version"] += 1
+    _version_state["checked_at"] = 0.0  # Force a re-read on the next request
+    _entries.clear()
+
+
+async def bump_catalog_version(session: AsyncSession) -> None:
+    """Invalidate cached catalog responses on all workers. Call after committing a catalog write."""
+    _bump_local()
+    if not _version_state["db_available"]:
+        return
+    from app.models import CacheVersion
+    try:
+        result = await session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == CATALOG_VERSION_NAME)
+            .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        )
+        if not result.rowcount:
+            session.add(CacheVersion(name=CATALOG_VERSION_NAME, version=1))
+        await session.commit()
+    except Exception as e:
+        logger.warning(f"[Catalog Cache] Failed to bump shared catalog version: {e}")
+        try:
+            await session.rollback()
+        except Exception:
+            pass
+
+
+def bump_catalog_version_sync(db: Session) -> None:
+    """Sync-session variant of bump_catalog_version() for routers using get_db()."""
+    _bump_local()
+    if not _version_state["db_available"]:
+        return
+    from app.models import CacheVersion
+    try:
+        result = db.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == CATALOG_VERSION_NAME)
+            .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        )
+        if not result.rowcount:
+            db.add(CacheVersion(name=CATALOG_VERSION_NAME, version=1))
+        db.commit()
+    except Exception as e:
+        logger.warning(f"[Catalog Cache] Failed to bump shared catalog version: {e}")
+        try:
+            db.rollback()
+        except Exception:
+            pass
+
+
+@lru_cache(maxsize=64)
+def _adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _serialize(payload: Any, response_model: Any = None) -> bytes:
+    if response_model is not None:
+        # Same filtering FastAPI applies to a route's return value (undeclared fields dropped)
+        adapter = _adapter(response_model)
+        payload = adapter.dump_python(
+            adapter.validate_python(payload, from_attributes=True), mode="json", by_alias=True
+        )
+    return dumps(payload)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2)
+    return any(c == etag or c == f"W/{etag}" for c in candidates)
+
+
+def _encoding_qualities(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}; malformed q-values count as 0."""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+def _pick_encoding(accept_encoding: str, entry: _CatalogEntry) -> Optional[str]:
+    """Best acceptable precompressed variant of `entry` (br wins ties), or None for identity."""
+    qualities = _encoding_qualities(accept_encoding)
+    default_q = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding, body in (("br", entry.br_body), ("gzip", entry.gzip_body)):
+        q = qualities.get(coding, default_q)
+        if body is not None and q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _build_response(request: Request, entry: _CatalogEntry) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding = _pick_encoding(request.headers.get("accept-encoding", ""), entry)
+    if encoding == "br":
+        return Response(content=entry.br_body, media_type="application/json", headers={**headers, "Content-Encoding": "br"})
+    if encoding == "gzip":
+        return Response(content=entry.gzip_body, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_catalog_response(
+    request: Request,
+    session: AsyncSession,
+    key: str,
+    build: Callable[[], Awaitable[Any]],
+    response_model: Any = None,
+) -> Response:
+    """
+    Serve a public catalog payload from the cache, building it on a miss.
+
+    Args:
+        request: Incoming request (for If-None-Match / Accept-Encoding)
+        session: DB session used for the version check (and by `build`)
+        key: Cache key; must encode every filter that affects the payload
+        build: Coroutine factory returning the JSON-compatible payload. HTTPExceptions
+               propagate unchanged and are never cached.
+        response_model: The route's response_model. The cached response bypasses
+               FastAPI's own response_model filtering, so pass it here to get the same.
+    """
+    if not settings.CATALOG_CACHE_ENABLED:
+        return _build_response(request, _CatalogEntry("disabled", _serialize(await build(), response_model)))
+
+    version = await get_catalog_version(session)
+    entry = _entries.get(key)
+    if (
+        entry is None
+        or entry.version != version
+        or time.monotonic() - entry.created_at > settings.CATALOG_CACHE_TTL_SECONDS
+    ):
+        entry = _CatalogEntry(version, _serialize(await build(), response_model))
+        _entries[key] = entry
+        while len(_entries) > settings.CATALOG_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    _entries.move_to_end(key)
+    return _build_response(request, entry)
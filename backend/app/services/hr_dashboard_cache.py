@@ -0,0 +1,66 @@
+"""
+HR Dashboard Cache
+Per-worker, short-TTL cache of the HR dashboard payload, which HR opens on every login.
+
+How it works:
+- The payload is cached per day (it depends on "today") for HR_DASHBOARD_CACHE_SECONDS.
+- A Session listener notes flushes that touch Staff, Attendance, Leave or Payroll rows and
+  drops the cache once that transaction commits, so writes made through this worker show up
+  on the next request. Writes on other workers show up within the TTL.
+- Core statements that bypass the ORM (bulk upserts) call `invalidate()` themselves.
+
+Usage:
+    payload = hr_dashboard_cache.get(today)
+    if payload is None:
+        payload = await build()
+        hr_dashboard_cache.put(today, payload)
+"""
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Attendance, Leave, Payroll, Staff
+from app.settings import settings
+
+_HR_MODELS = (Staff, Attendance, Leave, Payroll)
+_PENDING_KEY = "hr_dashboard_dirty"
+
+_entry: Dict[str, Any] = {"day": None, "payload": None, "created_at": 0.0}
+
+
+def get(day: date) -> Optional[Dict[str, Any]]:
+    if _entry["day"] != day or time.monotonic() - _entry["created_at"] > settings.HR_DASHBOARD_CACHE_SECONDS:
+        return None
+    return _entry["payload"]
+
+
+def put(day: date, payload: Dict[str, Any]) -> None:
+    _entry.update(day=day, payload=payload, created_at=time.monotonic())
+
+
+def invalidate() -> None:
+    _entry.update(day=None, payload=None, created_at=0.0)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_hr_writes(session: Session, flush_context) -> None:
+    if session.info.get(_PENDING_KEY):
+        return
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _HR_MODELS):
+            session.info[_PENDING_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,369 @@
+"""
+Performance Instrumentation
+In-process metrics for finding slow routes and chatty database access.
+
+Collects:
+- Per-route request latency histograms and request counters (by status)
+- Per-request SQL statement counts and time spent in SQL (SQLAlchemy engine events)
+- N+1 detection: identical statements repeated within one request are logged and counted
+- Connection pool checkout wait time and pool occupancy gauges
+
+Metrics are exposed in Prometheus text format by the /metrics endpoint (see core.py).
+Values are per worker process; with several gunicorn workers each scrape hits one of them.
+
+Usage:
+    from app.services.metrics import instrument_engine, RequestStats, bind_request_stats
+
+    instrument_engine(engine)          # once per engine (done in app.db.session)
+    stats = RequestStats()             # per request (done by the instrumentation middleware)
+    token = bind_request_stats(stats)
+    ...
+    finish_request(stats, "GET", "/admin/bookings", 200, elapsed)
+    reset_request_stats(token)
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter as _StatementCounter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# Longest statement text kept in N+1 findings/logs
+STATEMENT_PREVIEW_CHARS = 300
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Metric types (minimal Prometheus-compatible implementations)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[labels] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def label_sets(self) -> List[Tuple[str, ...]]:
+        return list(self._series.keys())
+
+    def snapshot(self, *labels: str) -> Optional[Dict[str, Any]]:
+        """Count, sum and per-bucket (non-cumulative) counts for one label set."""
+        series = self._series.get(labels)
+        if series is None:
+            return None
+        counts = series[:-1]
+        return {"count": int(sum(counts)), "sum": series[-1], "buckets": dict(zip(self.buckets + (float("inf"),), counts))}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_number(cumulative)}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are read from callbacks at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set_function(self, func: Callable[[], float], *labels: str) -> None:
+        self._callbacks[labels] = func
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, func in sorted(self._callbacks.items()):
+            try:
+                value = float(func())
+            except Exception:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of this process and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "lebrq_http_request_duration_seconds", "Request latency by route template", ("method", "route"))
+HTTP_REQUESTS = registry.counter(
+    "lebrq_http_requests_total", "Requests by route template and status code", ("method", "route", "status"))
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "lebrq_db_queries_per_request", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS)
+DB_SECONDS_PER_REQUEST = registry.histogram(
+    "lebrq_db_seconds_per_request", "Time spent executing SQL per request", ("method", "route"))
+DB_QUERIES = registry.counter(
+    "lebrq_db_queries_total", "SQL statements executed (request or background)", ("context",))
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "lebrq_db_pool_wait_seconds", "Time spent waiting for a pooled connection", ("engine",), POOL_WAIT_BUCKETS)
+DB_POOL_CHECKED_OUT = registry.gauge(
+    "lebrq_db_pool_checked_out", "Connections currently checked out of the pool", ("engine",))
+DB_POOL_SIZE = registry.gauge(
+    "lebrq_db_pool_size", "Configured pool size", ("engine",))
+DB_POOL_OVERFLOW = registry.gauge(
+    "lebrq_db_pool_overflow", "Overflow connections currently open", ("engine",))
+N_PLUS_ONE = registry.counter(
+    "lebrq_db_n_plus_one_total", "Requests in which one statement repeated past the N+1 threshold", ("method", "route"))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-request statistics
+# ─────────────────────────────────────────────────────────────────────────────
+
+class RequestStats:
+    """SQL activity of one request, collected via a context variable."""
+
+    __slots__ = ("query_count", "query_seconds", "pool_wait_seconds", "statements")
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.statements: "_StatementCounter[str]" = _StatementCounter()
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.query_count += 1
+        self.query_seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("lebrq_request_stats", default=None)
+
+# Most recent N+1 findings, newest last (for /admin/diagnostics/n-plus-one)
+_recent_n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+def bind_request_stats(stats: RequestStats) -> contextvars.Token:
+    return _request_stats.set(stats)
+
+
+def reset_request_stats(token: contextvars.Token) -> None:
+    _request_stats.reset(token)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def finish_request(stats: RequestStats, method: str, route: str, status_code: int, elapsed: float) -> None:
+    """Record a finished request and run the N+1 check."""
+    HTTP_REQUEST_SECONDS.observe(elapsed, method, route)
+    HTTP_REQUESTS.inc(method, route, str(status_code))
+    DB_QUERIES_PER_REQUEST.observe(stats.query_count, method, route)
+    DB_SECONDS_PER_REQUEST.observe(stats.query_seconds, method, route)
+
+    repeated = stats.repeated_statements(settings.METRICS_N_PLUS_ONE_THRESHOLD)
+    if repeated:
+        N_PLUS_ONE.inc(method, route)
+        statement, count = repeated[0]
+        preview = " ".join(statement.split())[:STATEMENT_PREVIEW_CHARS]
+        _recent_n_plus_one.append({
+            "at": time.time(),
+            "method": method,
+            "route": route,
+            "query_count": stats.query_count,
+            "repeats": count,
+            "statement": preview,
+        })
+        logger.warning(
+            f"[N+1] {method} {route}: statement repeated {count}x "
+            f"({stats.query_count} queries, {stats.query_seconds * 1000:.0f}ms in SQL): {preview}"
+        )
+
+
+def recent_n_plus_one() -> List[Dict[str, Any]]:
+    return list(reversed(_recent_n_plus_one))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Engine / pool instrumentation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _record_pool_wait(engine_label: str, seconds: float) -> None:
+    DB_POOL_WAIT_SECONDS.observe(seconds, engine_label)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(self.engine_label, time.perf_counter() - start)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection."""
+
+    engine_label = "async"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(self.engine_label, time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("lebrq_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("lebrq_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+        DB_QUERIES.inc("request")
+    else:
+        DB_QUERIES.inc("background")
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None:
+        starts = conn.info.get("lebrq_query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(engine, label: str = "async") -> None:
+    """Attach query timing listeners and pool gauges to an engine (sync or async). Idempotent."""
+    if not settings.METRICS_ENABLED or engine is None:
+        return
+    target = getattr(engine, "sync_engine", engine)
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+    pool = target.pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout, label)
+    if hasattr(pool, "size"):
+        DB_POOL_SIZE.set_function(pool.size, label)
+    if hasattr(pool, "overflow"):
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0), label)
@@ -0,0 +1,127 @@
+"""
+Notification Fan-out
+Sends a batch of independent notifications (WhatsApp, email) concurrently, bounded per
+channel, and reports one structured result per send.
+
+How it works:
+- Callers describe each send as a Delivery: channel, recipient (who, for audit logs),
+  target (phone/email) and a zero-argument coroutine factory that performs it.
+- `fan_out()` starts every send at once. Each waits on its channel's semaphore
+  (NOTIFY_WHATSAPP_CONCURRENCY / NOTIFY_EMAIL_CONCURRENCY, shared by all fan-outs in the
+  worker so a burst of bookings can't flood a provider) and is bounded by
+  NOTIFY_SEND_TIMEOUT_SECONDS.
+- A send fails when it raises, times out or returns a dict with "ok": False (the
+  RouteMobileWhatsAppClient convention). Failures are recorded on that send's
+  DeliveryResult and never cancel the others. Results come back in input order.
+- `summarize()` condenses results into counts plus the failures, for logs and audits.
+
+Usage:
+    results = await fan_out([
+        Delivery("whatsapp", "vendor:12", to, partial(client.send_template, to, "vendor", "en", params)),
+        Delivery("email", "vendor:12", email, partial(NotificationService._send_email, email, subject, html)),
+    ])
+    logger.info(f"[Vendor Notify] {summarize(results)}")
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP = "whatsapp"
+EMAIL = "email"
+
+
+class Delivery:
+    __slots__ = ("channel", "recipient", "target", "send")
+
+    def __init__(self, channel: str, recipient: str, target: str, send: Callable[[], Awaitable[Any]]):
+        self.channel = channel
+        self.recipient = recipient
+        self.target = target
+        self.send = send
+
+
+class DeliveryResult:
+    __slots__ = ("channel", "recipient", "target", "ok", "error", "elapsed_ms")
+
+    def __init__(self, delivery: Delivery, ok: bool, error: Optional[str], elapsed_ms: int):
+        self.channel = delivery.channel
+        self.recipient = delivery.recipient
+        self.target = delivery.target
+        self.ok = ok
+        self.error = error
+        self.elapsed_ms = elapsed_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "recipient": self.recipient,
+            "target": self.target,
+            "ok": self.ok,
+            "error": self.error,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+# channel -> (loop, semaphore); recreated if the worker's event loop changes
+_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def _channel_limit(channel: str) -> int:
+    if channel == EMAIL:
+        return settings.NOTIFY_EMAIL_CONCURRENCY
+    return settings.NOTIFY_WHATSAPP_CONCURRENCY
+
+
+def _semaphore(channel: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _semaphores.get(channel)
+    if entry is None or entry[0] is not loop:
+        entry = _semaphores[channel] = (loop, asyncio.Semaphore(max(1, _channel_limit(channel))))
+    return entry[1]
+
+
+def _failure_reason(result: Any) -> Optional[str]:
+    if isinstance(result, dict) and result.get("ok") is False:
+        return str(result.get("error") or result.get("response") or result)[:500]
+    return None
+
+
+async def _deliver(delivery: Delivery) -> DeliveryResult:
+    async with _semaphore(delivery.channel):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(delivery.send(), timeout=settings.NOTIFY_SEND_TIMEOUT_SECONDS)
+            error = _failure_reason(result)
+        except asyncio.TimeoutError:
+            error = f"timed out after {settings.NOTIFY_SEND_TIMEOUT_SECONDS:g}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+    if error:
+        logger.warning(f"[Notification Fan-out] {delivery.channel} to {delivery.recipient} ({delivery.target}) failed: {error}")
+    return DeliveryResult(delivery, error is None, error, elapsed_ms)
+
+
+async def fan_out(deliveries: Sequence[Delivery]) -> List[DeliveryResult]:
+    """Run all deliveries concurrently (bounded per channel); one result per delivery, in order."""
+    if not deliveries:
+        return []
+    return list(await asyncio.gather(*(_deliver(d) for d in deliveries)))
+
+
+def summarize(results: Sequence[DeliveryResult]) -> Dict[str, Any]:
+    by_channel: Dict[str, Dict[str, int]] = {}
+    for r in results:
+        counts = by_channel.setdefault(r.channel, {"sent": 0, "failed": 0})
+        counts["sent" if r.ok else "failed"] += 1
+    return {
+        "sent": sum(1 for r in results if r.ok),
+        "failed": sum(1 for r in results if not r.ok),
+        "by_channel": by_channel,
+        "failures": [r.as_dict() for r in results if not r.ok],
+    }
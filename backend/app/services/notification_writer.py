@@ -0,0 +1,209 @@
+"""
+Notification Writer
+Group-commits notification rows (in-app `notifications`, client_notifications,
+vendor_notifications) as multi-row INSERTs instead of one transaction per row.
+
+How it works:
+- `NotificationBatch(session)` is request-scoped. `add()` buffers rows per table and
+  `flush()` writes each table's rows with one executemany INSERT and commits once.
+  Every NOTIFICATION_WRITE_BATCH_SIZE rows are written early (same transaction) so a
+  large loop doesn't hold them all in memory. Use it where a caller loops over
+  recipients and the rows must exist when it returns.
+- `notification_writer` is the worker-wide writer for fire-and-forget rows. `enqueue()`
+  buffers a row; a background flush in its own session writes everything pending once
+  NOTIFICATION_WRITE_BATCH_SIZE rows are queued or NOTIFICATION_WRITE_FLUSH_SECONDS after
+  the first one, so concurrent requests share one transaction.
+- The writer runs on the event loop it was started on (app lifespan). Elsewhere, e.g.
+  threads running their own loop or before startup, `enqueue()` returns False and the
+  caller writes the row itself. `close()` flushes what is left at shutdown.
+- When a background flush fails its rows are retried one by one (a savepoint each),
+  so a bad row is logged and dropped without taking the rest of the batch with it. An
+  in-app notification is never worth failing or retrying a request for.
+
+Usage:
+    batch = NotificationBatch(session)
+    for admin_id in admin_ids:
+        await batch.add(IN_APP_NOTIFICATIONS, user_id=admin_id, title=title, message=message, booking_id=booking_id)
+    await batch.flush()
+
+    if not notification_writer.enqueue(IN_APP_NOTIFICATIONS, user_id=user_id, title=title, message=message):
+        await write_notifications(session, {IN_APP_NOTIFICATIONS: [row]})
+        await session.commit()
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# The legacy in-app `notifications` table has no ORM model (routers/notifications.py
+# reads it with raw SQL); this describes it for Core inserts only.
+IN_APP_NOTIFICATIONS = Table(
+    "notifications",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("title", String(255), nullable=False),
+    Column("message", Text, nullable=False),
+    Column("booking_id", Integer),
+    Column("is_read", Boolean, default=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+# target (Table or ORM model) -> rows as column dicts
+Rows = Dict[Any, List[Dict[str, Any]]]
+
+
+async def write_notifications(session: AsyncSession, rows: Rows) -> int:
+    """INSERT all rows, one executemany per table and column set. Doesn't commit."""
+    written = 0
+    for target, table_rows in rows.items():
+        by_columns: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in table_rows:
+            by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        for same_columns in by_columns.values():
+            await session.execute(insert(target), same_columns)
+            written += len(same_columns)
+    return written
+
+
+class NotificationBatch:
+    """Request-scoped buffer written into the caller's session."""
+
+    __slots__ = ("_session", "_rows", "_pending", "written")
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        self._rows: Rows = {}
+        self._pending = 0
+        self.written = 0
+
+    def __len__(self) -> int:
+        return self._pending + self.written
+
+    async def add(self, target, **values) -> None:
+        self._rows.setdefault(target, []).append(values)
+        self._pending += 1
+        if self._pending >= settings.NOTIFICATION_WRITE_BATCH_SIZE:
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        rows, self._rows, self._pending = self._rows, {}, 0
+        self.written += await write_notifications(self._session, rows)
+
+    async def flush(self) -> int:
+        """Write the remaining rows and commit. Returns the number of rows written in total."""
+        if self._pending:
+            await self._write_pending()
+        if self.written:
+            await self._session.commit()
+        return self.written
+
+
+class NotificationWriter:
+    """Worker-wide group-commit buffer, flushed in the background on size or time."""
+
+    __slots__ = ("_rows", "_pending", "_loop", "_timer", "_tasks")
+
+    def __init__(self):
+        self._rows: Rows = {}
+        self._pending = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    def enqueue(self, target, **values) -> bool:
+        """Buffer a row; False if the writer isn't running on this event loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            if asyncio.get_running_loop() is not loop:
+                return False
+        except RuntimeError:
+            return False
+        self._rows.setdefault(target, []).append(values)
+        self._pending += 1
+        if self._pending >= settings.NOTIFICATION_WRITE_BATCH_SIZE:
+            self._flush_soon()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.NOTIFICATION_WRITE_FLUSH_SECONDS, self._flush_soon)
+        return True
+
+    def _take(self) -> Rows:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, self._rows, self._pending = self._rows, {}, 0
+        return rows
+
+    def _flush_soon(self) -> None:
+        task = self._loop.create_task(self._write(self._take()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, rows: Rows) -> int:
+        if not rows:
+            return 0
+        from app.db import AsyncSessionLocal
+
+        count = sum(len(r) for r in rows.values())
+        try:
+            async with AsyncSessionLocal() as session:
+                await write_notifications(session, rows)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"[Notification Writer] Batch of {count} notification row(s) failed, writing them one by one: {e}")
+            return await self._write_each(rows)
+        logger.debug(f"[Notification Writer] Wrote {count} notification row(s)")
+        return count
+
+    async def _write_each(self, rows: Rows) -> int:
+        """Write rows one per savepoint so a bad row only loses itself."""
+        from app.db import AsyncSessionLocal
+
+        written = dropped = 0
+        try:
+            async with AsyncSessionLocal() as session:
+                for target, table_rows in rows.items():
+                    for row in table_rows:
+                        try:
+                            async with session.begin_nested():
+                                await session.execute(insert(target), [row])
+                            written += 1
+                        except Exception as e:
+                            dropped += 1
+                            logger.error(f"[Notification Writer] Dropped notification row for user {row.get('user_id')}: {e}")
+                await session.commit()
+        except Exception as e:
+            count = sum(len(r) for r in rows.values())
+            logger.error(f"[Notification Writer] Dropped {count} notification row(s): {e}")
+            return 0
+        if dropped:
+            logger.warning(f"[Notification Writer] Wrote {written} notification row(s), dropped {dropped}")
+        return written
+
+    async def flush(self) -> int:
+        """Write everything pending now, in one transaction. Returns the number of rows written."""
+        return await self._write(self._take())
+
+    async def close(self) -> None:
+        """Flush pending rows and wait for in-flight flushes (shutdown)."""
+        if self._loop is None:
+            return
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop = None
+
+
+notification_writer = NotificationWriter()
@@ -50,6 +50,13 @@ def _cleanup_expired_otps():
         return
     
     _last_cleanup_time = current_time
+    purge_expired_otps(current_time)
+
+
+def purge_expired_otps(current_time: Optional[float] = None) -> int:
+    """Remove all expired OTPs from storage now. Returns the number removed."""
+    if current_time is None:
+        current_time = time.time()
     expired_keys = [
         mobile for mobile, data in _otp_storage.items()
         if current_time > data.get("expires_at", 0)
@@ -59,6 +66,7 @@ def _cleanup_expired_otps():
     
     if expired_keys:
         logger.debug(f"[OTP] Cleaned up {len(expired_keys)} expired OTPs")
+    return len(expired_keys)
 
 
 def generate_otp(length: int = 6) -> str:
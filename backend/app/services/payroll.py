@@ -0,0 +1,381 @@
+"""
+Payroll Calculation and Batch Runs
+`calculate_monthly_payroll` computes one staff member's payroll from their month of
+attendance and leaves; payroll runs apply it to the whole staff in one background job.
+
+How it works:
+- Starting a run stores a `payroll_runs` row and schedules the run on this worker. A
+  partial unique index allows one pending/running run per month, so concurrent starts
+  get PayrollRunConflict (409) instead of two runs upserting the same payrolls; runs
+  idle for PAYROLL_RUN_STALE_SECONDS are marked failed first.
+- The run loads the staff, the month's attendance rollups (app.services.attendance_rollup)
+  and the approved leaves overlapping the month with one query each (no per-staff
+  round trips) and groups them in memory.
+- Staff are processed in chunks of PAYROLL_RUN_CHUNK_SIZE: calculations run in a small
+  thread pool (keeping the event loop free), then the chunk is written with one
+  INSERT ... ON CONFLICT (staff_id, month, year) DO UPDATE that skips locked payrolls,
+  and the run's progress and per-staff errors are committed.
+
+Usage:
+    run = await start_payroll_run(session, month=3, year=2026, started_by_user_id=user.id)
+    # poll GET /hr/payroll/runs/{run.id}
+"""
+import asyncio
+import logging
+from calendar import monthrange
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AttendanceMonthly, Leave, Payroll, PayrollRun, Staff
+from app.services.attendance_rollup import get_monthly_rollups, month_bounds
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns produced by calculate_monthly_payroll (all rewritten on recalculation)
+PAYROLL_RESULT_COLUMNS = (
+    "period_start", "period_end", "total_working_days", "present_days", "absent_days",
+    "leave_days", "unpaid_leave_days", "half_days", "holidays", "total_hours", "overtime_hours",
+    "basic_salary", "calculated_salary", "total_allowances", "overtime_pay", "total_deductions",
+    "leave_deductions", "net_salary", "allowances_breakdown", "deductions_breakdown",
+)
+
+ACTIVE_RUN_STATUSES = ("pending", "running")
+
+
+class PayrollRunConflict(Exception):
+    """A run for the same month is already in progress."""
+
+    def __init__(self, run_id: Optional[int]):
+        super().__init__(f"Payroll run {run_id} for this month is already in progress")
+        self.run_id = run_id
+
+
+def calculate_monthly_payroll(
+    staff: Staff,
+    month: int,
+    year: int,
+    attendance: Optional[AttendanceMonthly],
+    leave_records: Sequence[Leave],
+) -> Dict[str, Any]:
+    """Calculate payroll for a staff member for a given month from their attendance rollup"""
+    # Get month boundaries
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+
+    # Calculate total working days (excluding Sundays, can be customized)
+    total_days = monthrange(year, month)[1]
+    # Count Sundays (assuming Sunday = 0)
+    sundays = sum(1 for day in range(1, total_days + 1) if date(year, month, day).weekday() == 6)
+    total_working_days = total_days - sundays
+
+    # Attendance totals (no rollup row = no attendance this month)
+    half_day_count = attendance.half_day_count if attendance else 0
+    present_count = (attendance.present_count if attendance else 0) + half_day_count * 0.5
+    absent_count = attendance.absent_count if attendance else 0
+    holiday_count = attendance.holiday_count if attendance else 0
+    leave_count = attendance.leave_count if attendance else 0
+    unpaid_leave_count = 0
+    total_hours = (attendance.total_hours or 0.0) if attendance else 0.0
+    overtime_hours = (attendance.overtime_hours or 0.0) if attendance else 0.0
+
+    # Process leaves
+    for leave in leave_records:
+        if leave.status == "approved":
+            if leave.leave_type == "unpaid":
+                unpaid_leave_count += leave.total_days
+            else:
+                leave_count += leave.total_days
+
+    # Calculate basic salary
+    if staff.salary_type == "monthly":
+        basic_salary = staff.fixed_salary or 0.0
+        # Calculate salary based on present days
+        calculated_salary = (basic_salary / total_working_days) * present_count
+    else:  # hourly
+        basic_salary = 0.0
+        hourly_wage = staff.hourly_wage or 0.0
+        calculated_salary = total_hours * hourly_wage
+
+    # Calculate allowances
+    allowances = staff.allowances or {}
+    total_allowances = sum((
+        allowances.get("hra", 0),
+        allowances.get("travel", 0),
+        allowances.get("food", 0),
+        sum(allowances.get("custom", {}).values()) if isinstance(allowances.get("custom"), dict) else 0,
+    ))
+
+    # Calculate overtime pay (assuming 1.5x for overtime)
+    overtime_rate = 1.5
+    if staff.salary_type == "monthly":
+        hourly_rate = (staff.fixed_salary or 0.0) / (total_working_days * 8)  # Assuming 8 hours per day
+    else:
+        hourly_rate = staff.hourly_wage or 0.0
+    overtime_pay = overtime_hours * hourly_rate * overtime_rate
+
+    # Calculate deductions
+    deductions = staff.deductions or {}
+    total_deductions = sum((
+        deductions.get("pf", 0),
+        deductions.get("esi", 0),
+        deductions.get("tds", 0),
+        sum(deductions.get("custom", {}).values()) if isinstance(deductions.get("custom"), dict) else 0,
+    ))
+
+    # Calculate leave deductions (for unpaid leaves)
+    if staff.salary_type == "monthly":
+        daily_rate = (staff.fixed_salary or 0.0) / total_working_days
+        leave_deductions = unpaid_leave_count * daily_rate
+    else:
+        leave_deductions = 0.0  # For hourly, unpaid leave doesn't affect salary
+
+    # Calculate net salary
+    net_salary = calculated_salary + total_allowances + overtime_pay - total_deductions - leave_deductions
+
+    return {
+        "period_start": first_day,
+        "period_end": last_day,
+        "total_working_days": total_working_days,
+        "present_days": present_count,
+        "absent_days": absent_count,
+        "leave_days": leave_count,
+        "unpaid_leave_days": unpaid_leave_count,
+        "half_days": half_day_count,
+        "holidays": holiday_count,
+        "total_hours": total_hours if staff.salary_type == "hourly" else None,
+        "overtime_hours": overtime_hours,
+        "basic_salary": basic_salary,
+        "calculated_salary": calculated_salary,
+        "total_allowances": total_allowances,
+        "overtime_pay": overtime_pay,
+        "total_deductions": total_deductions,
+        "leave_deductions": leave_deductions,
+        "net_salary": net_salary,
+        "allowances_breakdown": allowances,
+        "deductions_breakdown": deductions,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch runs
+# ─────────────────────────────────────────────────────────────────────────────
+
+_executor: Optional[ThreadPoolExecutor] = None
+_run_tasks: Set[asyncio.Task] = set()  # Strong references until each run finishes
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PAYROLL_RUN_WORKERS, thread_name_prefix="PayrollRun")
+    return _executor
+
+
+def _insert(session: AsyncSession, model):
+    return (sqlite.insert if session.bind.dialect.name == "sqlite" else postgresql.insert)(model)
+
+
+async def start_payroll_run(
+    session: AsyncSession,
+    month: int,
+    year: int,
+    started_by_user_id: Optional[int] = None,
+    staff_ids: Optional[List[int]] = None,
+) -> PayrollRun:
+    """Create a run for the month and execute it in the background. Raises PayrollRunConflict."""
+    now = datetime.utcnow()
+    period = (PayrollRun.month == month, PayrollRun.year == year, PayrollRun.status.in_(ACTIVE_RUN_STATUSES))
+    # A run whose worker stopped reporting progress (crash, restart) no longer blocks the month
+    await session.execute(
+        update(PayrollRun)
+        .where(*period, PayrollRun.updated_at < now - timedelta(seconds=settings.PAYROLL_RUN_STALE_SECONDS))
+        .values(status="failed", finished_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    run = PayrollRun(
+        month=month,
+        year=year,
+        status="pending",
+        staff_ids=sorted(set(staff_ids)) if staff_ids else None,
+        started_by_user_id=started_by_user_id,
+    )
+    session.add(run)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # uq_payroll_runs_active_period: a concurrent request started a run for this month
+        await session.rollback()
+        active = (await session.execute(select(PayrollRun.id).where(*period).limit(1))).scalar()
+        raise PayrollRunConflict(active)
+    await session.refresh(run)
+
+    task = asyncio.create_task(execute_payroll_run(run.id), name=f"payroll-run:{run.id}")
+    _run_tasks.add(task)
+    task.add_done_callback(_run_tasks.discard)
+    return run
+
+
+def _calculate_chunk(
+    staff_rows: Sequence[Any],
+    month: int,
+    year: int,
+    rollups: Dict[int, AttendanceMonthly],
+    leaves_by_staff: Dict[int, List[Any]],
+) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Worker-thread body: (staff_id, payroll data, error) per staff member."""
+    results = []
+    for staff in staff_rows:
+        try:
+            data = calculate_monthly_payroll(
+                staff, month, year, rollups.get(staff.id), leaves_by_staff.get(staff.id, []),
+            )
+            results.append((staff.id, data, None))
+        except Exception as e:
+            results.append((staff.id, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+async def _load_month(session: AsyncSession, run: PayrollRun):
+    """Staff, attendance rollups and approved leaves for the run, keyed by staff_id."""
+    first_day, last_day = month_bounds(run.year, run.month)
+
+    staff_stmt = select(
+        Staff.id, Staff.salary_type, Staff.fixed_salary, Staff.hourly_wage, Staff.allowances, Staff.deductions,
+    ).order_by(Staff.id)
+    if run.staff_ids:
+        staff_stmt = staff_stmt.where(Staff.id.in_(run.staff_ids))
+    else:
+        staff_stmt = staff_stmt.where(Staff.is_active == True)  # noqa: E712
+    staff_rows = (await session.execute(staff_stmt)).all()
+    staff_ids = {row.id for row in staff_rows}
+
+    rollups = await get_monthly_rollups(session, run.year, run.month, run.staff_ids)
+
+    leaves_by_staff: Dict[int, List[Any]] = {}
+    leaves = await session.execute(
+        select(Leave.staff_id, Leave.status, Leave.leave_type, Leave.total_days)
+        .where(
+            Leave.status == "approved",
+            Leave.start_date <= last_day,
+            Leave.end_date >= first_day,
+        )
+    )
+    for row in leaves.all():
+        if row.staff_id in staff_ids:
+            leaves_by_staff.setdefault(row.staff_id, []).append(row)
+
+    locked = await session.execute(
+        select(Payroll.staff_id).where(
+            Payroll.month == run.month,
+            Payroll.year == run.year,
+            or_(Payroll.is_locked == True, Payroll.status == "locked"),  # noqa: E712
+        )
+    )
+    locked_ids = {staff_id for (staff_id,) in locked.all()}
+    return staff_rows, rollups, leaves_by_staff, locked_ids
+
+
+async def _upsert_payrolls(session: AsyncSession, month: int, year: int, results: Dict[int, Dict[str, Any]]) -> None:
+    now = datetime.utcnow()
+    stmt = _insert(session, Payroll).values([
+        {"staff_id": staff_id, "month": month, "year": year, "status": "draft", "is_locked": False,
+         "created_at": now, "updated_at": now, **data}
+        for staff_id, data in results.items()
+    ])
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=["staff_id", "month", "year"],
+        set_={
+            **{name: stmt.excluded[name] for name in PAYROLL_RESULT_COLUMNS},
+            "status": "draft",
+            "updated_at": now,
+        },
+        # A payroll locked after the run loaded its data stays untouched
+        where=Payroll.__table__.c.is_locked.isnot(True),
+    ))
+
+
+async def execute_payroll_run(run_id: int) -> None:
+    """Execute a payroll run with its own session; progress and errors are stored on the run row."""
+    from app.db.session import AsyncSessionLocal
+    from app.services import hr_dashboard_cache
+
+    async with AsyncSessionLocal() as session:
+        run = await session.get(PayrollRun, run_id)
+        if run is None:
+            return
+        try:
+            run.status = "running"
+            run.started_at = datetime.utcnow()
+            staff_rows, rollups, leaves_by_staff, locked_ids = await _load_month(session, run)
+            run.total_staff = len(staff_rows)
+            run.processed_count = run.succeeded_count = run.skipped_count = run.failed_count = 0
+            await session.commit()
+
+            errors: List[Dict[str, Any]] = []
+            loop = asyncio.get_running_loop()
+            chunk_size = max(1, settings.PAYROLL_RUN_CHUNK_SIZE)
+            for start in range(0, len(staff_rows), chunk_size):
+                chunk = [row for row in staff_rows[start:start + chunk_size] if row.id not in locked_ids]
+                skipped = min(chunk_size, len(staff_rows) - start) - len(chunk)
+
+                # Split the chunk across the pool; each worker gets a contiguous slice
+                workers = max(1, settings.PAYROLL_RUN_WORKERS)
+                slice_size = max(1, -(-len(chunk) // workers))
+                outcomes = await asyncio.gather(*[
+                    loop.run_in_executor(
+                        _get_executor(), _calculate_chunk,
+                        chunk[i:i + slice_size], run.month, run.year, rollups, leaves_by_staff,
+                    )
+                    for i in range(0, len(chunk), slice_size)
+                ])
+                computed: Dict[int, Dict[str, Any]] = {}
+                for staff_id, data, error in (item for outcome in outcomes for item in outcome):
+                    if error is None:
+                        computed[staff_id] = data
+                    else:
+                        errors.append({"staff_id": staff_id, "error": error})
+
+                if computed:
+                    await _upsert_payrolls(session, run.month, run.year, computed)
+                run.processed_count += len(chunk) + skipped
+                run.succeeded_count += len(computed)
+                run.skipped_count += skipped
+                run.failed_count += len(chunk) - len(computed)
+                run.errors = errors[:settings.PAYROLL_RUN_MAX_ERRORS] or None
+                run.updated_at = datetime.utcnow()
+                await session.commit()
+
+            run.status = "completed"
+            run.finished_at = datetime.utcnow()
+            await session.commit()
+            logger.info(
+                f"[Payroll Run] Run {run_id} ({run.month}/{run.year}) finished: "
+                f"{run.succeeded_count} calculated, {run.skipped_count} locked, {run.failed_count} failed"
+            )
+        except Exception as e:
+            logger.error(f"[Payroll Run] Run {run_id} failed: {e}", exc_info=True)
+            await session.rollback()
+            run = await session.get(PayrollRun, run_id)
+            if run is not None:
+                run.status = "failed"
+                run.errors = ((run.errors or []) + [{"staff_id": None, "error": f"{type(e).__name__}: {e}"}])[
+                    :settings.PAYROLL_RUN_MAX_ERRORS]
+                run.finished_at = datetime.utcnow()
+                await session.commit()
+        finally:
+            # Bulk upserts bypass the ORM flush hooks the dashboard cache listens to
+            hr_dashboard_cache.invalidate()
+
+
+def shutdown_payroll_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -0,0 +1,60 @@
+"""
+Rollup Locks
+Keeps the nightly rollup rebuilds from overwriting increments committed while they run.
+
+How it works:
+- Rollup tables (attendance_monthly, vendor/broker_settlement_daily, whatsapp_daily_stats)
+  are kept current by upserts in the writing transaction and repaired by a rebuild that
+  reads the source rows, then writes the rollup rows. Without a lock an increment
+  committed between the rebuild's read and its write is lost.
+- Incremental writers take the rollup's PostgreSQL advisory lock in shared mode
+  (`pg_advisory_xact_lock_shared`) before their upserts, so they never wait on each
+  other. A rebuild takes the same lock exclusively before it reads: it waits for writers
+  already in flight to commit (their source rows are then in its read) and holds new
+  ones until it commits (their increments land on the rebuilt rows).
+- The locks are transaction-scoped and released at commit/rollback. Other dialects have
+  no advisory locks and the helpers do nothing there (SQLite is for local development).
+
+Usage:
+    lock_rollup_sync(connection, ATTENDANCE_MONTHLY)                   # mapper hook, before its upserts
+    await lock_rollup(session, ATTENDANCE_MONTHLY, exclusive=True)     # rebuild, before its SELECT
+"""
+import zlib
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+
+ATTENDANCE_MONTHLY = "attendance_monthly"
+VENDOR_SETTLEMENT_DAILY = "vendor_settlement_daily"
+BROKER_SETTLEMENT_DAILY = "broker_settlement_daily"
+WHATSAPP_DAILY_STATS = "whatsapp_daily_stats"
+
+
+def _lock_key(rollup: str) -> int:
+    """Stable 32-bit advisory lock key (Python's hash() is randomized per process)."""
+    return zlib.crc32(f"lebrq-rollup:{rollup}".encode("utf-8"))
+
+
+def rollup_lock(dialect_name: str, rollup: str, exclusive: bool = False) -> Optional[TextClause]:
+    """Statement taking `rollup`'s transaction-scoped lock, or None where there are no advisory locks."""
+    if dialect_name != "postgresql":
+        return None
+    function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+    return text(f"SELECT {function}(:key)").bindparams(key=_lock_key(rollup))
+
+
+def lock_rollup_sync(connection: Connection, rollup: str) -> None:
+    """Shared lock for an incremental write on a sync connection (mapper hooks)."""
+    stmt = rollup_lock(connection.dialect.name, rollup)
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+async def lock_rollup(session: AsyncSession, rollup: str, exclusive: bool = False) -> None:
+    """Shared lock for an incremental write, or (exclusive=True) the lock a rebuild holds."""
+    stmt = rollup_lock(session.bind.dialect.name, rollup, exclusive)
+    if stmt is not None:
+        await session.execute(stmt)
@@ -1,78 +1,19 @@
-import time
 import json
 from typing import Any, Dict, Optional
 
 import httpx
 
 from ..core import settings
-
-_token_cache: Dict[str, Any] = {"token": None, "expires_at": 0.0}
-
-
-async def _fetch_token(client: httpx.AsyncClient) -> str:
-    base = (settings.ROUTEMOBILE_BASE_URL or "").rstrip("/")
-    # Support both oauth client credentials and username/password login depending on config
-    login_path = settings.ROUTEMOBILE_LOGIN_PATH or "/oauth/token"
-    url = f"{base}{login_path}"
-
-    # Try username/password first if provided (jwt_login style)
-    if settings.ROUTEMOBILE_USERNAME and settings.ROUTEMOBILE_PASSWORD:
-        payload: Dict[str, Any] = {
-            "username": settings.ROUTEMOBILE_USERNAME,
-            "password": settings.ROUTEMOBILE_PASSWORD,
-        }
-        resp = await client.post(url, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        # Route Mobile variants return different keys. Support common ones:
-        # - JWTAUTH (observed for /auth/v1/login/)
-        # - access_token / token / jwt (other deployments)
-        token = (
-            data.get("JWTAUTH")
-            or data.get("access_token")
-            or data.get("token")
-            or data.get("jwt")
-        )
-        if not token:
-            raise RuntimeError("RouteMobile token response missing token field")
-        # cache ~55 minutes by default
-        _token_cache["token"] = token
-        _token_cache["expires_at"] = time.time() + float(data.get("expires_in") or 3300)
-        return token
-
-    # Fallback to OAuth client credentials if configured
-    if settings.ROUTEMOBILE_CLIENT_ID and settings.ROUTEMOBILE_CLIENT_SECRET:
-        payload = {
-            "grant_type": "client_credentials",
-            "client_id": settings.ROUTEMOBILE_CLIENT_ID,
-            "client_secret": settings.ROUTEMOBILE_CLIENT_SECRET,
-        }
-        resp = await client.post(url, data=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        token = data.get("access_token")
-        if not token:
-            raise RuntimeError("RouteMobile OAuth response missing access_token")
-        _token_cache["token"] = token
-        _token_cache["expires_at"] = time.time() + float(data.get("expires_in") or 3300)
-        return token
-
-    raise RuntimeError("RouteMobile credentials not configured. Set username/password or client id/secret.")
+from .route_mobile_token import get_route_mobile_token
 
 
 async def get_token(client: Optional[httpx.AsyncClient] = None) -> str:
-    now = time.time()
-    if _token_cache.get("token") and now < float(_token_cache.get("expires_at", 0)) - 60:
-        return str(_token_cache["token"])  # type: ignore
-    close = False
-    if client is None:
-        client = httpx.AsyncClient()
-        close = True
-    try:
-        return await _fetch_token(client)
-    finally:
-        if close:
-            await client.aclose()
+    """Shared Route Mobile access token (see services/route_mobile_token.py).
+
+    `client` is accepted for compatibility; logins use the broker's own client so a
+    login shared by several callers doesn't depend on any one caller's connection.
+    """
+    return await get_route_mobile_token()
 
 
 async def send_session_message(to: str, text: Optional[str] = None, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
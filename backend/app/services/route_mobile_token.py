@@ -0,0 +1,275 @@
+"""
+Route Mobile Token Broker
+One Route Mobile access token for the whole deployment: concurrent callers share a
+single login, the token is renewed before it expires, and every gunicorn worker reuses it.
+
+How it works:
+- `get_route_mobile_token()` returns the worker's cached token while it has more than
+  EXPIRY_SKEW_SECONDS left. Once it is within ROUTEMOBILE_TOKEN_REFRESH_MARGIN_SECONDS
+  of expiry (or past half its lifetime, for short-lived tokens) callers still get it and
+  a refresh starts in the background.
+- Refreshes are single-flight per worker: callers arriving while one runs await the
+  same task instead of logging in again.
+- A refresh first reads the `service_tokens` row and adopts a token another worker
+  already fetched. Otherwise it takes a lease on the row with a conditional UPDATE, logs
+  in and writes the token back. Workers that lose the lease poll the row for up to
+  ROUTEMOBILE_TOKEN_LEASE_SECONDS and only log in themselves if the holder hasn't
+  delivered by then.
+- The login follows ROUTEMOBILE_AUTH_MODE ("jwt_login": username/password, "oauth":
+  client credentials), falling back to the other credential pair when the mode's pair
+  isn't set. A failed login is re-raised to callers for
+  ROUTEMOBILE_TOKEN_FAILURE_BACKOFF_SECONDS instead of being retried, so bad credentials
+  don't become a login storm against the provider's throttle.
+- Without the table (migration not applied) each worker logs in for itself. Other
+  store errors only skip the store for that one refresh.
+
+Usage:
+    try:
+        token = await get_route_mobile_token()
+    except RouteMobileAuthError as e:
+        logger.error(f"No Route Mobile token: {e}")
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_NAME = "route_mobile"
+EXPIRY_SKEW_SECONDS = 30  # Never hand out a token this close to expiry
+LOGIN_TIMEOUT_SECONDS = 15.0
+LEASE_POLL_SECONDS = 0.25
+
+
+class RouteMobileAuthError(RuntimeError):
+    """Route Mobile login failed or no credentials are configured."""
+
+
+_state: Dict[str, Any] = {
+    "token": None,
+    "expires_at": 0.0,      # Wall-clock seconds
+    "refresh_at": 0.0,      # Start a background refresh from here on
+    "failed_at": 0.0,       # Monotonic time of the last failed login
+    "error": None,
+    "store_available": True,
+}
+_refresh_task: Optional["asyncio.Task[str]"] = None
+
+
+def _to_epoch(value: Optional[datetime]) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else 0.0
+
+
+def _to_utc(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def _refresh_at(issued_at: float, expires_at: float) -> float:
+    lifetime = max(0.0, expires_at - issued_at)
+    return expires_at - min(settings.ROUTEMOBILE_TOKEN_REFRESH_MARGIN_SECONDS, lifetime / 2)
+
+
+def has_route_mobile_credentials() -> bool:
+    return bool(
+        (settings.ROUTEMOBILE_USERNAME and settings.ROUTEMOBILE_PASSWORD)
+        or (settings.ROUTEMOBILE_CLIENT_ID and settings.ROUTEMOBILE_CLIENT_SECRET)
+    )
+
+
+async def _login() -> Tuple[str, float, float]:
+    """(token, issued_at, expires_at) from a fresh login."""
+    base = (settings.ROUTEMOBILE_BASE_URL or "").rstrip("/")
+    url = f"{base}{settings.ROUTEMOBILE_LOGIN_PATH or '/oauth/token'}"
+    has_password = bool(settings.ROUTEMOBILE_USERNAME and settings.ROUTEMOBILE_PASSWORD)
+    has_client = bool(settings.ROUTEMOBILE_CLIENT_ID and settings.ROUTEMOBILE_CLIENT_SECRET)
+    if not has_password and not has_client:
+        raise RouteMobileAuthError("RouteMobile credentials not configured. Set username/password or client id/secret.")
+    mode = (settings.ROUTEMOBILE_AUTH_MODE or "oauth").lower()
+    use_password = has_password and (mode == "jwt_login" or not has_client)
+
+    issued_at = time.time()
+    try:
+        async with httpx.AsyncClient(timeout=LOGIN_TIMEOUT_SECONDS) as client:
+            if use_password:
+                resp = await client.post(url, json={
+                    "username": settings.ROUTEMOBILE_USERNAME,
+                    "password": settings.ROUTEMOBILE_PASSWORD,
+                })
+            else:
+                resp = await client.post(url, data={
+                    "grant_type": "client_credentials",
+                    "client_id": settings.ROUTEMOBILE_CLIENT_ID,
+                    "client_secret": settings.ROUTEMOBILE_CLIENT_SECRET,
+                })
+            resp.raise_for_status()
+            data = resp.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise RouteMobileAuthError(f"RouteMobile login failed: {e}") from e
+
+    # Route Mobile variants return different keys:
+    # - JWTAUTH (observed for /auth/v1/login/)
+    # - access_token / token / jwt (OAuth and other deployments)
+    token = data.get("JWTAUTH") or data.get("access_token") or data.get("token") or data.get("jwt")
+    if not token:
+        raise RouteMobileAuthError("RouteMobile login response missing token field")
+    ttl = float(data.get("expires_in") or settings.ROUTEMOBILE_TOKEN_DEFAULT_TTL_SECONDS)
+    logger.info(f"[Route Mobile Token] Logged in ({'password' if use_password else 'client credentials'}), token valid {int(ttl)}s")
+    return str(token), issued_at, issued_at + ttl
+
+
+async def _read_shared() -> Tuple[Optional[str], float, float]:
+    from app.db import AsyncSessionLocal
+    from app.models import ServiceToken
+
+    async with AsyncSessionLocal() as session:
+        row = (await session.execute(
+            select(ServiceToken.token, ServiceToken.issued_at, ServiceToken.expires_at)
+            .where(ServiceToken.name == TOKEN_NAME)
+        )).first()
+    if row is None:
+        return None, 0.0, 0.0
+    return row.token, _to_epoch(row.issued_at), _to_epoch(row.expires_at)
+
+
+async def _take_lease() -> bool:
+    """Claim the right to log in for all workers; False while another worker holds it."""
+    from app.db import AsyncSessionLocal
+    from app.models import ServiceToken
+
+    now = time.time()
+    lease_until = _to_utc(now + settings.ROUTEMOBILE_TOKEN_LEASE_SECONDS)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(ServiceToken)
+            .where(
+                ServiceToken.name == TOKEN_NAME,
+                or_(ServiceToken.lease_until.is_(None), ServiceToken.lease_until < _to_utc(now)),
+            )
+            .values(lease_until=lease_until)
+        )
+        if result.rowcount:
+            await session.commit()
+            return True
+        exists = (await session.execute(
+            select(ServiceToken.name).where(ServiceToken.name == TOKEN_NAME)
+        )).first()
+        if exists:
+            return False
+        session.add(ServiceToken(name=TOKEN_NAME, lease_until=lease_until))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()  # Another worker created the row first and holds the lease
+            return False
+        return True
+
+
+async def _store_shared(token: Optional[str], issued_at: float, expires_at: float) -> None:
+    """Publish a new token (or just release the lease when token is None). Best effort."""
+    from app.db import AsyncSessionLocal
+    from app.models import ServiceToken
+
+    values: Dict[str, Any] = {"lease_until": None}
+    if token:
+        values.update(token=token, issued_at=_to_utc(issued_at), expires_at=_to_utc(expires_at))
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(ServiceToken).where(ServiceToken.name == TOKEN_NAME).values(**values))
+            await session.commit()
+    except SQLAlchemyError as e:
+        logger.warning(f"[Route Mobile Token] Failed to update shared token: {e}")
+
+
+async def _fetch_shared() -> Tuple[str, float, float]:
+    deadline = time.monotonic() + settings.ROUTEMOBILE_TOKEN_LEASE_SECONDS
+    while True:
+        token, issued_at, expires_at = await _read_shared()
+        if token and time.time() < _refresh_at(issued_at, expires_at):
+            return token, issued_at, expires_at
+        if await _take_lease():
+            break
+        if time.monotonic() >= deadline:
+            logger.warning("[Route Mobile Token] No token from the worker holding the login lease, logging in")
+            break
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+
+    try:
+        token, issued_at, expires_at = await _login()
+    except Exception:
+        await _store_shared(None, 0.0, 0.0)  # Let other workers try instead of waiting out the lease
+        raise
+    await _store_shared(token, issued_at, expires_at)
+    return token, issued_at, expires_at
+
+
+async def _fetch() -> Tuple[str, float, float]:
+    if _state["store_available"]:
+        from app.db import is_missing_table
+
+        try:
+            return await _fetch_shared()
+        except SQLAlchemyError as e:
+            if is_missing_table(e, "service_tokens"):
+                # Migration not applied - fall back to a token per worker for good
+                logger.warning(f"[Route Mobile Token] Shared token store unavailable, logging in per worker: {e}")
+                _state["store_available"] = False
+            else:
+                # Transient DB error: log in directly this once, use the store again next refresh
+                logger.warning(f"[Route Mobile Token] Shared token store failed, logging in directly this time: {e}")
+    return await _login()
+
+
+async def _refresh() -> str:
+    error = _state["error"]
+    if error is not None and time.monotonic() - _state["failed_at"] < settings.ROUTEMOBILE_TOKEN_FAILURE_BACKOFF_SECONDS:
+        raise RouteMobileAuthError(str(error))
+    try:
+        token, issued_at, expires_at = await _fetch()
+    except RouteMobileAuthError as e:
+        _state["error"] = e
+        _state["failed_at"] = time.monotonic()
+        logger.error(f"[Route Mobile Token] {e}")
+        raise
+    _state.update(
+        token=token,
+        expires_at=expires_at,
+        refresh_at=_refresh_at(issued_at, expires_at),
+        error=None,
+        failed_at=0.0,
+    )
+    return token
+
+
+def _consume_result(task: "asyncio.Task[str]") -> None:
+    # Background refreshes have no awaiter; errors are already logged in _refresh()
+    if not task.cancelled():
+        task.exception()
+
+
+def _start_refresh() -> "asyncio.Task[str]":
+    global _refresh_task
+    loop = asyncio.get_running_loop()
+    if _refresh_task is None or _refresh_task.done() or _refresh_task.get_loop() is not loop:
+        _refresh_task = loop.create_task(_refresh())
+        _refresh_task.add_done_callback(_consume_result)
+    return _refresh_task
+
+
+async def get_route_mobile_token() -> str:
+    """A valid Route Mobile access token. Raises RouteMobileAuthError if none can be obtained."""
+    now = time.time()
+    token = _state["token"]
+    if token and now < _state["expires_at"] - EXPIRY_SKEW_SECONDS:
+        if now >= _state["refresh_at"]:
+            _start_refresh()
+        return token
+    # shield: a cancelled caller mustn't cancel the login other callers are waiting on
+    return await asyncio.shield(_start_refresh())
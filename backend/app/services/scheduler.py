@@ -0,0 +1,435 @@
+"""
+Background Job Scheduler
+Runs periodic maintenance jobs as asyncio tasks on the application's main event loop.
+
+Every gunicorn worker starts the scheduler, but each job run is guarded by a per-job
+mutex plus a check of the job's run history, so only one worker executes a given job
+per interval. The mutex is a session-level advisory lock on PostgreSQL; other dialects
+claim a lease row in `scheduled_job_locks` with a conditional UPDATE (or the INSERT that
+creates it), which lapses on its own if the holder dies. Runs are recorded in
+`scheduled_job_runs` with their duration and result.
+
+Usage:
+    from app.services.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    scheduler.register("my_job", my_job, interval_seconds=3600)
+    scheduler.start()
+"""
+import asyncio
+import logging
+import os
+import socket
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, delete, text, update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Job callables receive a dedicated session and may return a small JSON-serializable summary
+JobFunc = Callable[[AsyncSession], Awaitable[Optional[Dict[str, Any]]]]
+
+# A run counts as "recent" if it started within this fraction of the interval.
+# Keeps workers whose timers drift slightly apart from re-running the same job.
+RECENT_RUN_FRACTION = 0.9
+
+# Lease slack on top of the job timeout for the history writes around the run
+LEASE_GRACE_SECONDS = 60
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _lock_key(job_name: str) -> int:
+    """Stable 32-bit advisory lock key (Python's hash() is randomized per process)."""
+    return zlib.crc32(f"lebrq-scheduler:{job_name}".encode("utf-8"))
+
+
+class PeriodicJob:
+    """A job registered with the scheduler."""
+
+    def __init__(
+        self,
+        name: str,
+        func: JobFunc,
+        interval_seconds: int,
+        timeout_seconds: float = 300.0,
+        initial_delay_seconds: Optional[int] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.initial_delay_seconds = (
+            settings.SCHEDULER_INITIAL_DELAY_SECONDS if initial_delay_seconds is None else initial_delay_seconds
+        )
+
+
+class JobScheduler:
+    """Runs registered periodic jobs on the current event loop with single-leader execution."""
+
+    def __init__(self):
+        self._jobs: Dict[str, PeriodicJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.worker = _worker_id()
+
+    @property
+    def jobs(self) -> List[PeriodicJob]:
+        return list(self._jobs.values())
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    def register(
+        self,
+        name: str,
+        func: JobFunc,
+        interval_seconds: int,
+        timeout_seconds: float = 300.0,
+        initial_delay_seconds: Optional[int] = None,
+    ) -> PeriodicJob:
+        """Register a periodic job. Registering the same name twice replaces the job."""
+        job = PeriodicJob(name, func, interval_seconds, timeout_seconds, initial_delay_seconds)
+        self._jobs[name] = job
+        return job
+
+    def start(self) -> None:
+        """Start one asyncio task per job on the running loop (idempotent)."""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._job_loop(job), name=f"scheduler:{job.name}")
+            for job in self._jobs.values()
+        ]
+        logger.info(f"[Scheduler] Started {len(self._tasks)} job(s) on worker {self.worker}")
+
+    async def stop(self) -> None:
+        """Cancel all job tasks and wait for them to finish."""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[Scheduler] Stopped")
+
+    async def _job_loop(self, job: PeriodicJob) -> None:
+        await asyncio.sleep(job.initial_delay_seconds)
+        while True:
+            try:
+                await self.run_job(job.name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Never let one failed run kill the loop
+                logger.error(f"[Scheduler] Unexpected error in job {job.name}: {e}", exc_info=True)
+            await asyncio.sleep(job.interval_seconds)
+
+    async def run_job(self, name: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Run a job once if this worker wins leadership for it.
+
+        Args:
+            name: Registered job name
+            force: Run even if another worker ran the job within the current interval
+
+        Returns:
+            Dict describing the run, or None if the run was skipped.
+        """
+        job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(f"Unknown job: {name}")
+
+        from app.db.session import engine, AsyncSessionLocal
+        if engine is None or AsyncSessionLocal is None:
+            logger.warning(f"[Scheduler] Database not initialized; skipping {name}")
+            return None
+
+        if engine.dialect.name != "postgresql":
+            if not await self._take_lease(job, AsyncSessionLocal):
+                logger.debug(f"[Scheduler] {name}: another worker holds the lease")
+                return None
+            try:
+                return await self._run_as_leader(job, AsyncSessionLocal, force)
+            finally:
+                await self._release_lease(job, AsyncSessionLocal)
+
+        key = _lock_key(name)
+
+        # Hold the advisory lock on a dedicated connection for the whole run.
+        # Session-level lock: released explicitly, or automatically if the connection dies.
+        async with engine.connect() as lock_conn:
+            acquired = (await lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+            )).scalar()
+            await lock_conn.commit()
+            if not acquired:
+                logger.debug(f"[Scheduler] {name}: another worker holds the lock")
+                return None
+            try:
+                return await self._run_as_leader(job, AsyncSessionLocal, force)
+            finally:
+                try:
+                    await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    await lock_conn.commit()
+                except Exception as unlock_err:
+                    logger.warning(f"[Scheduler] Failed to release lock for {name}: {unlock_err}")
+
+    async def _take_lease(self, job: PeriodicJob, session_factory) -> bool:
+        """Claim the job's lease row (non-PostgreSQL mutex); False while another worker holds it."""
+        from app.models import ScheduledJobLock
+
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=job.timeout_seconds + LEASE_GRACE_SECONDS)
+        async with session_factory() as session:
+            result = await session.execute(
+                update(ScheduledJobLock)
+                .where(
+                    ScheduledJobLock.job_name == job.name,
+                    or_(ScheduledJobLock.lease_until.is_(None), ScheduledJobLock.lease_until < now),
+                )
+                .values(locked_by=self.worker, lease_until=lease_until)
+            )
+            if result.rowcount:
+                await session.commit()
+                return True
+            exists = (await session.execute(
+                select(ScheduledJobLock.job_name).where(ScheduledJobLock.job_name == job.name)
+            )).first()
+            if exists:
+                return False
+            session.add(ScheduledJobLock(job_name=job.name, locked_by=self.worker, lease_until=lease_until))
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()  # Another worker created the row first and holds the lease
+                return False
+            return True
+
+    async def _release_lease(self, job: PeriodicJob, session_factory) -> None:
+        from app.models import ScheduledJobLock
+
+        try:
+            async with session_factory() as session:
+                await session.execute(
+                    update(ScheduledJobLock)
+                    .where(ScheduledJobLock.job_name == job.name, ScheduledJobLock.locked_by == self.worker)
+                    .values(lease_until=None)
+                )
+                await session.commit()
+        except Exception as release_err:
+            # The lease lapses on its own at lease_until
+            logger.warning(f"[Scheduler] Failed to release lease for {job.name}: {release_err}")
+
+    async def _run_as_leader(self, job: PeriodicJob, session_factory, force: bool) -> Optional[Dict[str, Any]]:
+        from app.models import ScheduledJobRun
+
+        async with session_factory() as session:
+            if not force:
+                recent_cutoff = datetime.utcnow() - timedelta(seconds=job.interval_seconds * RECENT_RUN_FRACTION)
+                last_started = (await session.execute(
+                    select(ScheduledJobRun.started_at)
+                    .where(
+                        ScheduledJobRun.job_name == job.name,
+                        ScheduledJobRun.status.in_(["running", "success"]),
+                    )
+                    .order_by(ScheduledJobRun.started_at.desc())
+                    .limit(1)
+                )).scalar()
+                if last_started and last_started > recent_cutoff:
+                    logger.debug(f"[Scheduler] {job.name}: already ran at {last_started}, skipping")
+                    return None
+
+            run = ScheduledJobRun(job_name=job.name, status="running", worker=self.worker, started_at=datetime.utcnow())
+            session.add(run)
+            await session.commit()
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result: Optional[Dict[str, Any]] = None
+            try:
+                # Jobs get their own session so a failed job can't poison the history write
+                async with session_factory() as job_session:
+                    result = await asyncio.wait_for(job.func(job_session), timeout=job.timeout_seconds)
+                run.status = "success"
+            except asyncio.TimeoutError:
+                run.status = "timeout"
+                run.error_message = f"Timed out after {job.timeout_seconds}s"
+                logger.warning(f"[Scheduler] {job.name} timed out after {job.timeout_seconds}s")
+            except asyncio.CancelledError:
+                run.status = "failed"
+                run.error_message = "Cancelled (worker shutting down)"
+                raise
+            except Exception as e:
+                run.status = "failed"
+                run.error_message = str(e)[:2000]
+                logger.error(f"[Scheduler] {job.name} failed: {e}", exc_info=True)
+            finally:
+                run.duration_ms = int((loop.time() - started) * 1000)
+                run.finished_at = datetime.utcnow()
+                run.result = result if isinstance(result, dict) else None
+                try:
+                    await session.commit()
+                except Exception as commit_err:
+                    logger.warning(f"[Scheduler] Could not record run of {job.name}: {commit_err}")
+
+            logger.info(f"[Scheduler] {job.name} finished: status={run.status} duration={run.duration_ms}ms result={run.result}")
+            return {
+                "job_name": job.name,
+                "status": run.status,
+                "duration_ms": run.duration_ms,
+                "result": run.result,
+                "error_message": run.error_message,
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Built-in maintenance jobs
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def cleanup_expired_otps(session: AsyncSession) -> Dict[str, Any]:
+    """Mark expired attendance OTPs in one UPDATE and purge the in-memory OTP store."""
+    from sqlalchemy import update
+    from app.models import AttendanceOTP
+    from app.services import otp_service
+
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(AttendanceOTP)
+        .where(AttendanceOTP.status == "valid", AttendanceOTP.expires_at < now)
+        .values(status="expired")
+    )
+    await session.commit()
+
+    # The in-memory store is per worker; purge it here too so idle workers don't hold stale OTPs
+    purged = otp_service.purge_expired_otps()
+    return {"attendance_otps_expired": result.rowcount or 0, "memory_otps_purged": purged}
+
+
+async def expire_offers(session: AsyncSession) -> Dict[str, Any]:
+    """Deactivate offers/coupons past their end date and exhausted first-X-users offers."""
+    from sqlalchemy import update
+    from app.models import Offer, Coupon
+
+    now = datetime.utcnow()
+    today = now.date()
+    ended = await session.execute(
+        update(Offer)
+        .where(Offer.is_active == True, Offer.end_date.isnot(None), Offer.end_date < today)  # noqa: E712
+        .values(is_active=False)
+    )
+    exhausted = await session.execute(
+        update(Offer)
+        .where(
+            Offer.is_active == True,  # noqa: E712
+            Offer.offer_type == "first_x_users",
+            Offer.number_of_users.isnot(None),
+            Offer.claimed_count >= Offer.number_of_users,
+        )
+        .values(is_active=False)
+    )
+    coupons = await session.execute(
+        update(Coupon)
+        .where(Coupon.is_active == True, Coupon.valid_until.isnot(None), Coupon.valid_until < now)  # noqa: E712
+        .values(is_active=False)
+    )
+    await session.commit()
+    return {
+        "offers_ended": ended.rowcount or 0,
+        "offers_exhausted": exhausted.rowcount or 0,
+        "coupons_expired": coupons.rowcount or 0,
+    }
+
+
+async def prune_job_history(session: AsyncSession) -> Dict[str, Any]:
+    """Delete scheduler run history older than the retention window."""
+    from app.models import ScheduledJobRun
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.SCHEDULER_HISTORY_RETENTION_DAYS)
+    result = await session.execute(delete(ScheduledJobRun).where(ScheduledJobRun.started_at < cutoff))
+    await session.commit()
+    return {"deleted": result.rowcount or 0}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Global scheduler
+# ─────────────────────────────────────────────────────────────────────────────
+
+_scheduler: Optional[JobScheduler] = None
+
+
+def get_scheduler() -> JobScheduler:
+    """Get the process-wide scheduler with the default jobs registered."""
+    global _scheduler
+    if _scheduler is None:
+        from app.services.attendance_rollup import reconcile_attendance_rollups
+        from app.services.settlement_rollup import reconcile_settlement_rollups
+        from app.services.supply_reminder import send_supply_reminders_job
+        from app.services.ticket_inventory import expire_holds
+        from app.services.whatsapp_stats import reconcile_daily_stats
+        from app.services.whatsapp_summary import reconcile_conversation_summaries
+
+        _scheduler = JobScheduler()
+        _scheduler.register(
+            "supply_reminders",
+            send_supply_reminders_job,
+            interval_seconds=settings.SUPPLY_REMINDER_INTERVAL_SECONDS,
+            timeout_seconds=240.0,
+        )
+        _scheduler.register(
+            "expired_otp_cleanup",
+            cleanup_expired_otps,
+            interval_seconds=settings.OTP_CLEANUP_INTERVAL_SECONDS,
+            timeout_seconds=60.0,
+        )
+        _scheduler.register(
+            "offer_expiry",
+            expire_offers,
+            interval_seconds=settings.OFFER_EXPIRY_INTERVAL_SECONDS,
+            timeout_seconds=60.0,
+        )
+        _scheduler.register(
+            "ticket_hold_expiry",
+            expire_holds,
+            interval_seconds=settings.TICKET_HOLD_EXPIRY_INTERVAL_SECONDS,
+            timeout_seconds=30.0,
+        )
+        _scheduler.register(
+            "whatsapp_summary_reconcile",
+            reconcile_conversation_summaries,
+            interval_seconds=24 * 3600,
+            timeout_seconds=300.0,
+        )
+        _scheduler.register(
+            "whatsapp_daily_stats_reconcile",
+            reconcile_daily_stats,
+            interval_seconds=24 * 3600,
+            timeout_seconds=120.0,
+        )
+        _scheduler.register(
+            "attendance_rollup_reconcile",
+            reconcile_attendance_rollups,
+            interval_seconds=24 * 3600,
+            timeout_seconds=300.0,
+        )
+        _scheduler.register(
+            "settlement_rollup_reconcile",
+            reconcile_settlement_rollups,
+            interval_seconds=24 * 3600,
+            timeout_seconds=300.0,
+        )
+        _scheduler.register(
+            "job_history_prune",
+            prune_job_history,
+            interval_seconds=24 * 3600,
+            timeout_seconds=60.0,
+        )
+    return _scheduler
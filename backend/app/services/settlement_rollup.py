@@ -0,0 +1,344 @@
+"""
+Vendor and Broker Settlement Rollups
+Daily rollups behind the vendor/broker payment summaries, so a yearly summary reads a
+few hundred rollup rows instead of every supplied item or brokered booking.
+
+How it works:
+- `vendor_settlement_daily` counts supplied booking items per (vendor, day, item) in
+  three states: settled, verified (not settled) and unverified. The day is the settlement
+  day for settled items and the supply day otherwise, which is exactly the period filter
+  the itemized summary applies. Quantities are stored and priced with the item's current
+  vendor_price at read time.
+- `broker_settlement_daily` sums bookings with brokerage per (broker, booking day), with
+  the settled share alongside.
+- ORM inserts/updates/deletes of BookingItem and Booking apply the old-minus-new
+  contribution in the same transaction (mapper hooks in app.models).
+- `rebuild_*` recompute a day range from the source tables; a nightly job repairs the
+  last RECONCILE_DAYS and the migration backfills all history. A rebuild holds its
+  rollup's lock (app.services.rollup_lock), which the hooks take shared, so payments
+  and supplies recorded while it runs are neither missed nor overwritten.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    Booking,
+    BookingItem,
+    BrokerProfile,
+    BrokerSettlementDaily,
+    Item,
+    VendorProfile,
+    VendorSettlementDaily,
+)
+from app.services.rollup_lock import BROKER_SETTLEMENT_DAILY, VENDOR_SETTLEMENT_DAILY, lock_rollup
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_DAYS = 35
+
+VENDOR_STATES = ("settled", "verified", "unverified")
+VENDOR_COUNTERS = tuple(f"{state}_{kind}" for state in VENDOR_STATES for kind in ("items", "quantity"))
+BROKER_COUNTERS = ("bookings", "brokerage", "settled_bookings", "settled_brokerage")
+
+# kind -> rollup lock name
+ROLLUP_TABLES = {"vendor": VENDOR_SETTLEMENT_DAILY, "broker": BROKER_SETTLEMENT_DAILY}
+
+# kind -> (rollup model, key columns, counter columns, source fields read by the hooks)
+_ROLLUPS = {
+    "vendor": (
+        VendorSettlementDaily, ("vendor_id", "day", "item_id"), VENDOR_COUNTERS,
+        ("vendor_id", "item_id", "quantity", "is_supplied", "supply_verified", "verified_at",
+         "payment_settled", "payment_settled_at", "supplied_at"),
+    ),
+    "broker": (
+        BrokerSettlementDaily, ("broker_id", "day"), BROKER_COUNTERS,
+        ("broker_id", "brokerage_amount", "created_at", "broker_settled"),
+    ),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Incremental maintenance (called from the mapper hooks)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def source_values(kind: str, target: Any, previous: bool = False) -> Tuple[Any, ...]:
+    """The rollup-relevant fields of a row, as flushed now or (previous=True) before this flush."""
+    state = inspect(target)
+    values = []
+    for name in _ROLLUPS[kind][3]:
+        value = getattr(target, name)
+        if previous:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        values.append(value)
+    return tuple(values)
+
+
+def vendor_state(payment_settled: bool, supply_verified: bool, verified_at: Optional[datetime]) -> str:
+    if payment_settled:
+        return "settled"
+    if supply_verified and verified_at is not None:
+        return "verified"
+    return "unverified"
+
+
+def _vendor_contribution(values) -> Optional[Tuple[tuple, Dict[str, float]]]:
+    (vendor_id, item_id, quantity, is_supplied, supply_verified, verified_at,
+     payment_settled, payment_settled_at, supplied_at) = values
+    activity_at = (payment_settled_at or supplied_at) if payment_settled else supplied_at
+    if not vendor_id or not is_supplied or activity_at is None:
+        return None
+    state = vendor_state(payment_settled, supply_verified, verified_at)
+    return (vendor_id, activity_at.date(), item_id), {f"{state}_items": 1, f"{state}_quantity": quantity or 0}
+
+
+def _broker_contribution(values) -> Optional[Tuple[tuple, Dict[str, float]]]:
+    broker_id, brokerage_amount, created_at, broker_settled = values
+    if not broker_id or not brokerage_amount or brokerage_amount <= 0 or created_at is None:
+        return None
+    increments = {"bookings": 1, "brokerage": float(brokerage_amount)}
+    if broker_settled:
+        increments.update(settled_bookings=1, settled_brokerage=float(brokerage_amount))
+    return (broker_id, created_at.date()), increments
+
+
+_CONTRIBUTIONS = {"vendor": _vendor_contribution, "broker": _broker_contribution}
+
+
+def rollup_upsert(kind: str, dialect_name: str, key: tuple, **increments: float):
+    """INSERT ... ON CONFLICT that adds `increments` to one rollup row."""
+    model, key_columns, counters, _ = _ROLLUPS[kind]
+    values = {name: increments.get(name, 0) for name in counters}
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(model).values(**dict(zip(key_columns, key)), updated_at=datetime.utcnow(), **values)
+    table = model.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in counters if values[name]},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def rollup_delta(kind: str, dialect_name: str, old_values, new_values) -> List[Any]:
+    """Upserts that move a row's contribution from `old_values` to `new_values` (either may be None)."""
+    if old_values == new_values:
+        return []
+    contribution = _CONTRIBUTIONS[kind]
+    deltas: Dict[tuple, Dict[str, float]] = {}
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        found = contribution(values) if values is not None else None
+        if found is None:
+            continue
+        key, increments = found
+        target = deltas.setdefault(key, {})
+        for name, amount in increments.items():
+            target[name] = target.get(name, 0) + sign * amount
+    return [
+        rollup_upsert(kind, dialect_name, key, **increments)
+        for key, increments in deltas.items()
+        if any(increments.values())
+    ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reads
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def vendor_totals(
+    session: AsyncSession, since: date, vendor_id: Optional[int] = None, by: str = "item",
+) -> List[Dict[str, Any]]:
+    """Rollup totals since `since`, grouped per item (one vendor) or per vendor (by="vendor").
+
+    Each row has `<state>_items`, `<state>_quantity` and `<state>_amount` for the three states.
+    """
+    r = VendorSettlementDaily
+    group = [r.item_id, Item.name] if by == "item" else [r.vendor_id, VendorProfile.company_name]
+    amounts = [
+        func.coalesce(func.sum(getattr(r, f"{state}_quantity") * func.coalesce(Item.vendor_price, 0.0)), 0.0)
+        for state in VENDOR_STATES
+    ]
+    stmt = (
+        select(*group, *[func.coalesce(func.sum(getattr(r, name)), 0) for name in VENDOR_COUNTERS], *amounts)
+        .join(Item, Item.id == r.item_id)
+        .where(r.day >= since)
+        .group_by(*group)
+    )
+    if by == "vendor":
+        stmt = stmt.join(VendorProfile, VendorProfile.id == r.vendor_id)
+    if vendor_id is not None:
+        stmt = stmt.where(r.vendor_id == vendor_id)
+
+    rows = []
+    for row in (await session.execute(stmt)).all():
+        key_id, name = row[0], row[1]
+        counters = dict(zip(VENDOR_COUNTERS, (int(v or 0) for v in row[2:2 + len(VENDOR_COUNTERS)])))
+        amounts_by_state = {
+            f"{state}_amount": float(v or 0.0)
+            for state, v in zip(VENDOR_STATES, row[2 + len(VENDOR_COUNTERS):])
+        }
+        rows.append({
+            ("item_id" if by == "item" else "vendor_id"): key_id,
+            ("item_name" if by == "item" else "company_name"): name,
+            **counters,
+            **amounts_by_state,
+        })
+    return rows
+
+
+def sum_vendor_totals(rows: List[Dict[str, Any]], include_unverified: bool) -> Dict[str, Any]:
+    """Collapse grouped vendor totals into the summary counters."""
+    states = VENDOR_STATES if include_unverified else ("settled", "verified")
+    result: Dict[str, Any] = {
+        f"{state}_{kind}": sum(row[f"{state}_{kind}"] for row in rows)
+        for state in VENDOR_STATES
+        for kind in ("items", "quantity", "amount")
+    }
+    result["total_items"] = sum(result[f"{state}_items"] for state in states)
+    result["total_amount"] = sum(result[f"{state}_amount"] for state in states)
+    return result
+
+
+async def broker_totals(session: AsyncSession, since: date, broker_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rollup totals since `since` per broker (one row when broker_id is given)."""
+    r = BrokerSettlementDaily
+    stmt = (
+        select(
+            r.broker_id, BrokerProfile.company_name, BrokerProfile.brokerage_percentage,
+            *[func.coalesce(func.sum(getattr(r, name)), 0) for name in BROKER_COUNTERS],
+        )
+        .join(BrokerProfile, BrokerProfile.id == r.broker_id)
+        .where(r.day >= since)
+        .group_by(r.broker_id, BrokerProfile.company_name, BrokerProfile.brokerage_percentage)
+    )
+    if broker_id is not None:
+        stmt = stmt.where(r.broker_id == broker_id)
+    rows = []
+    for broker, company_name, percentage, bookings, brokerage, settled_bookings, settled_brokerage in (
+        await session.execute(stmt)
+    ).all():
+        rows.append({
+            "broker_id": broker,
+            "company_name": company_name,
+            "brokerage_percentage": float(percentage or 0.0),
+            "total_bookings": int(bookings or 0),
+            "total_brokerage": float(brokerage or 0.0),
+            "settled_bookings": int(settled_bookings or 0),
+            "settled_brokerage": float(settled_brokerage or 0.0),
+            "pending_brokerage": float((brokerage or 0.0) - (settled_brokerage or 0.0)),
+        })
+    return rows
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Rebuilds
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _day_bounds(start_day: date, end_day: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(start_day, datetime.min.time()), datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+async def rebuild_vendor_settlements(session: AsyncSession, start_day: date, end_day: Optional[date] = None) -> Dict[str, Any]:
+    """Recompute vendor rollup rows for [start_day, end_day] from booking_items."""
+    end_day = end_day or datetime.utcnow().date()
+    start_at, end_at = _day_bounds(start_day, end_day)
+    bi = BookingItem
+    activity_at = case(
+        (bi.payment_settled == True, func.coalesce(bi.payment_settled_at, bi.supplied_at)),  # noqa: E712
+        else_=bi.supplied_at,
+    )
+    state = case(
+        (bi.payment_settled == True, "settled"),  # noqa: E712
+        (and_(bi.supply_verified == True, bi.verified_at.isnot(None)), "verified"),  # noqa: E712
+        else_="unverified",
+    )
+    day = func.date(activity_at)
+    counters = []
+    for name in VENDOR_STATES:
+        counters.append(func.sum(case((state == name, 1), else_=0)))
+        counters.append(func.sum(case((state == name, func.coalesce(bi.quantity, 0)), else_=0)))
+    stmt = (
+        select(bi.vendor_id, day, bi.item_id, *counters)
+        .where(
+            bi.vendor_id.isnot(None),
+            bi.is_supplied == True,  # noqa: E712
+            activity_at >= start_at,
+            activity_at < end_at,
+        )
+        .group_by(bi.vendor_id, day, bi.item_id)
+    )
+    # Before reading: waits for in-flight booking item writes, holds new ones until commit
+    await lock_rollup(session, VENDOR_SETTLEMENT_DAILY, exclusive=True)
+    now = datetime.utcnow()
+    rows = [
+        {"vendor_id": row[0], "day": _as_date(row[1]), "item_id": row[2], "updated_at": now,
+         **{name: int(value or 0) for name, value in zip(VENDOR_COUNTERS, row[3:])}}
+        for row in (await session.execute(stmt)).all()
+    ]
+    await session.execute(
+        delete(VendorSettlementDaily).where(VendorSettlementDaily.day >= start_day, VendorSettlementDaily.day <= end_day)
+    )
+    if rows:
+        await session.execute(VendorSettlementDaily.__table__.insert(), rows)
+    await session.commit()
+    return {"vendor_rows": len(rows)}
+
+
+async def rebuild_broker_settlements(session: AsyncSession, start_day: date, end_day: Optional[date] = None) -> Dict[str, Any]:
+    """Recompute broker rollup rows for [start_day, end_day] from bookings."""
+    end_day = end_day or datetime.utcnow().date()
+    start_at, end_at = _day_bounds(start_day, end_day)
+    b = Booking
+    day = func.date(b.created_at)
+    stmt = (
+        select(
+            b.broker_id,
+            day,
+            func.count(b.id),
+            func.sum(b.brokerage_amount),
+            func.sum(case((b.broker_settled == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((b.broker_settled == True, b.brokerage_amount), else_=0.0)),  # noqa: E712
+        )
+        .where(
+            b.broker_id.isnot(None),
+            b.brokerage_amount > 0,
+            b.created_at >= start_at,
+            b.created_at < end_at,
+        )
+        .group_by(b.broker_id, day)
+    )
+    await lock_rollup(session, BROKER_SETTLEMENT_DAILY, exclusive=True)
+    now = datetime.utcnow()
+    rows = [
+        {"broker_id": row[0], "day": _as_date(row[1]), "updated_at": now,
+         **{name: value or 0 for name, value in zip(BROKER_COUNTERS, row[2:])}}
+        for row in (await session.execute(stmt)).all()
+    ]
+    await session.execute(
+        delete(BrokerSettlementDaily).where(BrokerSettlementDaily.day >= start_day, BrokerSettlementDaily.day <= end_day)
+    )
+    if rows:
+        await session.execute(BrokerSettlementDaily.__table__.insert(), rows)
+    await session.commit()
+    return {"broker_rows": len(rows)}
+
+
+async def reconcile_settlement_rollups(session: AsyncSession) -> Dict[str, Any]:
+    """Scheduler job: rebuild the last RECONCILE_DAYS of both rollups."""
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=RECONCILE_DAYS - 1)
+    return {
+        **await rebuild_vendor_settlements(session, start, today),
+        **await rebuild_broker_settlements(session, start, today),
+    }
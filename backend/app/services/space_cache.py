@@ -0,0 +1,166 @@
+"""
+Space/Venue Cache
+Per-worker read-through cache of Space and Venue rows for the booking, pricing,
+availability and chatbot hot paths, with JSON fields parsed once.
+
+How it works:
+- All venues and spaces are loaded in one go (there are only a handful) into
+  CachedSpace/CachedVenue snapshots. Callers get plain objects, never ORM instances,
+  so nothing leaks into their session; treat them (and their JSON fields) as read-only.
+- The snapshot is tagged with the shared catalog version (app.services.catalog_cache).
+  venues.py create/patch/delete already call `bump_catalog_version()`, which clears it
+  immediately on this worker and within CATALOG_CACHE_VERSION_CHECK_SECONDS on the others.
+  CATALOG_CACHE_TTL_SECONDS bounds staleness from writes that don't bump the version.
+- An id missing from the snapshot (created moments ago on another worker) falls back to
+  a direct lookup, so a new space is never reported as "not found".
+- Concurrent reloads are single-flight behind an asyncio.Lock. With CATALOG_CACHE_ENABLED
+  off every call goes to the database.
+
+Usage:
+    space = await get_space(session, space_id)
+    if not space:
+        raise HTTPException(status_code=404, detail="Space not found")
+    total = hours * space.price_per_hour
+"""
+import json
+import logging
+import time
+from asyncio import Lock
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.catalog_cache import get_catalog_version
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_json_field(value: Any) -> Any:
+    """JSON columns may hold text after migrations from other databases; parse those back."""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+    return value
+
+
+class CachedVenue:
+    __slots__ = ("id", "name", "address", "city", "timezone", "metadata_json", "created_at", "updated_at")
+
+    def __init__(self, venue: Any):
+        self.id: int = venue.id
+        self.name: str = venue.name
+        self.address: Optional[str] = venue.address
+        self.city: Optional[str] = venue.city
+        self.timezone: Optional[str] = venue.timezone
+        self.metadata_json: Optional[dict] = parse_json_field(venue.metadata_json)
+        self.created_at: Optional[datetime] = venue.created_at
+        self.updated_at: Optional[datetime] = venue.updated_at
+
+
+class CachedSpace:
+    __slots__ = (
+        "id", "venue_id", "name", "description", "capacity", "price_per_hour", "image_url",
+        "features", "pricing_overrides", "event_types", "stage_options", "banner_sizes",
+        "active", "created_at", "updated_at",
+    )
+
+    def __init__(self, space: Any):
+        self.id: int = space.id
+        self.venue_id: int = space.venue_id
+        self.name: str = space.name
+        self.description: Optional[str] = space.description
+        self.capacity: int = space.capacity or 0
+        self.price_per_hour: float = float(space.price_per_hour or 0.0)
+        self.image_url: Optional[str] = space.image_url
+        # List (legacy) or dict with hall_features/top_banners
+        self.features: Any = parse_json_field(space.features)
+        self.pricing_overrides: Optional[Dict[str, Any]] = parse_json_field(space.pricing_overrides)
+        self.event_types: Optional[List[Dict[str, Any]]] = parse_json_field(space.event_types)
+        self.stage_options: Optional[List[Dict[str, Any]]] = parse_json_field(space.stage_options)
+        self.banner_sizes: Optional[List[Dict[str, Any]]] = parse_json_field(space.banner_sizes)
+        self.active: bool = bool(space.active) if space.active is not None else True
+        self.created_at: Optional[datetime] = space.created_at
+        self.updated_at: Optional[datetime] = space.updated_at
+
+
+_state: Dict[str, Any] = {
+    "version": None,
+    "loaded_at": 0.0,
+    "spaces": {},   # id -> CachedSpace, ordered by id
+    "venues": {},   # id -> CachedVenue, ordered by id
+}
+_reload_lock = Lock()
+
+
+def _is_fresh(version: str) -> bool:
+    return (
+        _state["version"] == version
+        and time.monotonic() - _state["loaded_at"] <= settings.CATALOG_CACHE_TTL_SECONDS
+    )
+
+
+async def _snapshot(session: AsyncSession) -> Dict[str, Any]:
+    from app.models import Space, Venue
+
+    version = await get_catalog_version(session)
+    if _is_fresh(version):
+        return _state
+    async with _reload_lock:
+        if _is_fresh(version):
+            return _state
+        venues = (await session.execute(select(Venue).order_by(Venue.id))).scalars().all()
+        spaces = (await session.execute(select(Space).order_by(Space.id))).scalars().all()
+        _state["venues"] = {v.id: CachedVenue(v) for v in venues}
+        _state["spaces"] = {s.id: CachedSpace(s) for s in spaces}
+        _state["loaded_at"] = time.monotonic()
+        _state["version"] = version
+    return _state
+
+
+async def get_space(session: AsyncSession, space_id: int) -> Optional[CachedSpace]:
+    """Space by id, or None if it doesn't exist."""
+    from app.models import Space
+
+    state = await _snapshot(session) if settings.CATALOG_CACHE_ENABLED else None
+    space = state["spaces"].get(space_id) if state else None
+    if space is None:
+        row = (await session.execute(select(Space).where(Space.id == space_id))).scalars().first()
+        if row is not None:
+            space = CachedSpace(row)
+            if state:
+                state["spaces"][space.id] = space
+    return space
+
+
+async def get_venue(session: AsyncSession, venue_id: int) -> Optional[CachedVenue]:
+    """Venue by id, or None if it doesn't exist."""
+    from app.models import Venue
+
+    state = await _snapshot(session) if settings.CATALOG_CACHE_ENABLED else None
+    venue = state["venues"].get(venue_id) if state else None
+    if venue is None:
+        row = (await session.execute(select(Venue).where(Venue.id == venue_id))).scalars().first()
+        if row is not None:
+            venue = CachedVenue(row)
+            if state:
+                state["venues"][venue.id] = venue
+    return venue
+
+
+async def list_spaces(session: AsyncSession, active_only: bool = False) -> List[CachedSpace]:
+    """All spaces ordered by id (optionally only active ones)."""
+    if not settings.CATALOG_CACHE_ENABLED:
+        from app.models import Space
+        rows = (await session.execute(select(Space).order_by(Space.id))).scalars().all()
+        spaces = [CachedSpace(row) for row in rows]
+    else:
+        state = await _snapshot(session)
+        spaces = sorted(state["spaces"].values(), key=lambda s: s.id)
+    if active_only:
+        spaces = [s for s in spaces if s.active]
+    return spaces
@@ -0,0 +1,374 @@
+"""
+Event Ticket Inventory
+Sells and holds event schedule tickets without overselling and without long row locks.
+
+How it works:
+- Every change to `event_schedules.tickets_sold` / `tickets_held` is a single conditional
+  UPDATE (`... WHERE tickets_sold + tickets_held + n <= max_tickets`). Concurrent buyers
+  never read-modify-write, so capacity can't be oversold and the row lock is held only
+  for the duration of that one statement.
+- Creating a booking takes a hold (`ticket_holds`) against capacity and confirms it into
+  `tickets_sold` in the same transaction: Razorpay checkout completes in the browser and
+  no payment-success callback reaches the server, so the booking is the sale. The hold
+  row records which booking owns the tickets; cancelling or rejecting the booking
+  returns them. Holds left active (none from the booking flow) are expired by the
+  scheduler and their tickets return to the pool.
+- Availability polls are served from a small per-worker cache. Writes made through this
+  module update the cached counters in place (write-through); writes on other workers
+  become visible after TICKET_AVAILABILITY_CACHE_SECONDS.
+
+The core operations take a sync Session so the payment callback (sync) and the async
+routers (via `AsyncSession.run_sync`) share one implementation. Callers commit.
+
+Usage:
+    try:
+        await acquire_hold(session, schedule_id, quantity, booking_id=booking.id)
+    except TicketsUnavailable as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    await confirm_booking_tickets(session, booking.id, schedule_id, quantity)
+    await session.commit()
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, time as dt_time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models_events import EventDefinition, EventSchedule, TicketHold
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TicketsUnavailable(Exception):
+    """Raised when a schedule cannot supply the requested number of tickets."""
+
+    def __init__(self, schedule_id: int, requested: int, available: int, reason: Optional[str] = None,
+                 not_found: bool = False):
+        self.schedule_id = schedule_id
+        self.not_found = not_found
+        self.requested = requested
+        self.available = max(available, 0)
+        if reason:
+            self.message = reason
+        elif self.available > 0:
+            self.message = f"Only {self.available} tickets available"
+        else:
+            self.message = "Sold out"
+        super().__init__(self.message)
+
+
+class AvailabilitySnapshot:
+    """Cached view of one schedule's capacity and display fields."""
+
+    __slots__ = ("schedule_id", "event_definition_id", "event_title", "schedule_date", "start_time", "status", "is_blocked",
+                 "max_tickets", "tickets_sold", "tickets_held", "loaded_at")
+
+    def __init__(self, schedule_id: int, event_definition_id: int, event_title: str, schedule_date: date, start_time: dt_time, status: str,
+                 is_blocked: bool, max_tickets: int, tickets_sold: int, tickets_held: int):
+        self.schedule_id = schedule_id
+        self.event_definition_id = event_definition_id
+        self.event_title = event_title
+        self.schedule_date = schedule_date
+        self.start_time = start_time
+        self.status = status
+        self.is_blocked = bool(is_blocked)
+        self.max_tickets = max_tickets or 0
+        self.tickets_sold = tickets_sold or 0
+        self.tickets_held = tickets_held or 0
+        self.loaded_at = time.monotonic()
+
+    @property
+    def available(self) -> int:
+        return max(self.max_tickets - self.tickets_sold - self.tickets_held, 0)
+
+    @property
+    def bookable(self) -> bool:
+        return self.status == "scheduled" and not self.is_blocked
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Availability cache (per worker)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_availability: Dict[int, AvailabilitySnapshot] = {}
+
+
+def invalidate(schedule_id: Optional[int] = None) -> None:
+    """Drop one schedule (or all) from this worker's availability cache."""
+    if schedule_id is None:
+        _availability.clear()
+    else:
+        _availability.pop(schedule_id, None)
+
+
+def _write_through(schedule_id: int, counters: Tuple[int, int, int]) -> None:
+    """Apply counters returned by an UPDATE ... RETURNING to the cached snapshot."""
+    snapshot = _availability.get(schedule_id)
+    if snapshot is None:
+        return
+    snapshot.max_tickets, snapshot.tickets_sold, snapshot.tickets_held = (c or 0 for c in counters)
+    snapshot.loaded_at = time.monotonic()
+
+
+async def get_availability(session: AsyncSession, schedule_id: int) -> Optional[AvailabilitySnapshot]:
+    """Availability for a schedule, served from cache when fresh. None if the schedule doesn't exist."""
+    snapshot = _availability.get(schedule_id)
+    if snapshot is not None and time.monotonic() - snapshot.loaded_at < settings.TICKET_AVAILABILITY_CACHE_SECONDS:
+        return snapshot
+
+    row = (await session.execute(
+        select(
+            EventSchedule.id, EventSchedule.event_definition_id, EventDefinition.title, EventSchedule.schedule_date, EventSchedule.start_time,
+            EventSchedule.status, EventSchedule.is_blocked, EventSchedule.max_tickets,
+            EventSchedule.tickets_sold, EventSchedule.tickets_held,
+        )
+        .join(EventDefinition, EventSchedule.event_definition_id == EventDefinition.id)
+        .where(EventSchedule.id == schedule_id)
+    )).first()
+    if row is None:
+        _availability.pop(schedule_id, None)
+        return None
+
+    snapshot = AvailabilitySnapshot(*row)
+    _availability[schedule_id] = snapshot
+    return snapshot
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Conditional counter updates
+# ─────────────────────────────────────────────────────────────────────────────
+
+_COUNTERS = (EventSchedule.max_tickets, EventSchedule.tickets_sold, EventSchedule.tickets_held)
+
+
+def _has_capacity(quantity: int):
+    return EventSchedule.tickets_sold + EventSchedule.tickets_held + quantity <= EventSchedule.max_tickets
+
+
+def _bookable():
+    return [EventSchedule.status == "scheduled", EventSchedule.is_blocked == False]  # noqa: E712
+
+
+def _unavailable(db: Session, schedule_id: int, quantity: int, check_bookable: bool = True) -> TicketsUnavailable:
+    """Build the error for a conditional UPDATE that matched no row."""
+    schedule = db.execute(
+        select(EventSchedule.status, EventSchedule.is_blocked, *_COUNTERS).where(EventSchedule.id == schedule_id)
+    ).first()
+    if schedule is None:
+        return TicketsUnavailable(schedule_id, quantity, 0, reason="Schedule not found", not_found=True)
+    status, is_blocked, max_tickets, sold, held = schedule
+    if check_bookable and status != "scheduled":
+        return TicketsUnavailable(schedule_id, quantity, 0, reason=f"Event is {status}")
+    if check_bookable and is_blocked:
+        return TicketsUnavailable(schedule_id, quantity, 0, reason="This time slot is blocked")
+    return TicketsUnavailable(schedule_id, quantity, (max_tickets or 0) - (sold or 0) - (held or 0))
+
+
+def sell_tickets_sync(db: Session, schedule_id: int, quantity: int, require_bookable: bool = True) -> Tuple[int, int, int]:
+    """Atomically add `quantity` to tickets_sold if capacity allows.
+
+    Returns (max_tickets, tickets_sold, tickets_held) after the update.
+    Raises TicketsUnavailable when the schedule is full (or not bookable).
+    """
+    conditions = [EventSchedule.id == schedule_id, _has_capacity(quantity)]
+    if require_bookable:
+        conditions += _bookable()
+    counters = db.execute(
+        update(EventSchedule)
+        .where(*conditions)
+        .values(tickets_sold=EventSchedule.tickets_sold + quantity)
+        .returning(*_COUNTERS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if counters is None:
+        raise _unavailable(db, schedule_id, quantity, check_bookable=require_bookable)
+    _write_through(schedule_id, tuple(counters))
+    return tuple(counters)
+
+
+def acquire_hold_sync(db: Session, schedule_id: int, quantity: int, user_id: Optional[int] = None,
+                      booking_id: Optional[int] = None, ttl_seconds: Optional[int] = None) -> TicketHold:
+    """Hold `quantity` tickets for a checkout. Raises TicketsUnavailable if they can't be held."""
+    counters = db.execute(
+        update(EventSchedule)
+        .where(EventSchedule.id == schedule_id, _has_capacity(quantity), *_bookable())
+        .values(tickets_held=EventSchedule.tickets_held + quantity)
+        .returning(*_COUNTERS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if counters is None:
+        raise _unavailable(db, schedule_id, quantity)
+    _write_through(schedule_id, tuple(counters))
+
+    ttl = settings.TICKET_HOLD_SECONDS if ttl_seconds is None else ttl_seconds
+    hold = TicketHold(
+        schedule_id=schedule_id,
+        booking_id=booking_id,
+        user_id=user_id,
+        quantity=quantity,
+        status="active",
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+    )
+    db.add(hold)
+    db.flush()
+    return hold
+
+
+def _close_hold(db: Session, hold_id: int, status: str) -> Optional[Tuple[int, int]]:
+    """Move an active hold to `status`. Returns (schedule_id, quantity) if this call closed it."""
+    return db.execute(
+        update(TicketHold)
+        .where(TicketHold.id == hold_id, TicketHold.status == "active")
+        .values(status=status, updated_at=datetime.utcnow())
+        .returning(TicketHold.schedule_id, TicketHold.quantity)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def _active_hold_id(db: Session, booking_id: int) -> Optional[int]:
+    return db.execute(
+        select(TicketHold.id)
+        .where(TicketHold.booking_id == booking_id, TicketHold.status == "active")
+        .order_by(TicketHold.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def confirm_booking_tickets_sync(db: Session, booking_id: int, schedule_id: int, quantity: int) -> bool:
+    """Turn a booking's checkout hold into sold tickets after payment.
+
+    If the hold already expired (slow payment) the tickets are sold directly when capacity
+    remains. Returns False when the schedule filled up in the meantime; the payment still
+    stands and the shortfall needs manual resolution.
+    """
+    hold_id = _active_hold_id(db, booking_id)
+    closed = _close_hold(db, hold_id, "confirmed") if hold_id else None
+    if closed:
+        held_schedule_id, held_quantity = closed
+        counters = db.execute(
+            update(EventSchedule)
+            .where(EventSchedule.id == held_schedule_id)
+            .values(
+                tickets_sold=EventSchedule.tickets_sold + held_quantity,
+                tickets_held=EventSchedule.tickets_held - held_quantity,
+            )
+            .returning(*_COUNTERS)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if counters is not None:
+            _write_through(held_schedule_id, tuple(counters))
+        return True
+
+    already_confirmed = db.execute(
+        select(TicketHold.id).where(TicketHold.booking_id == booking_id, TicketHold.status == "confirmed").limit(1)
+    ).scalar()
+    if already_confirmed:
+        return True  # Duplicate payment callback
+
+    try:
+        # Tickets were paid for, so sell them even if the slot was blocked after checkout
+        sell_tickets_sync(db, schedule_id, quantity, require_bookable=False)
+        return True
+    except TicketsUnavailable as e:
+        logger.error(
+            f"[Ticket Inventory] Schedule {schedule_id} oversold for booking {booking_id}: "
+            f"requested {quantity}, available {e.available}"
+        )
+        return False
+
+
+def release_booking_tickets_sync(db: Session, booking_id: int) -> int:
+    """Return a cancelled/rejected booking's tickets to the pool. Returns tickets released.
+
+    An active hold goes back out of `tickets_held`; a confirmed one out of `tickets_sold`.
+    The hold row changes status with a conditional UPDATE, so repeated calls release once.
+    """
+    hold_id = _active_hold_id(db, booking_id)
+    closed = _close_hold(db, hold_id, "released") if hold_id else None
+    if closed:
+        return _return_held(db, {closed[0]: closed[1]})
+
+    returned = db.execute(
+        update(TicketHold)
+        .where(TicketHold.booking_id == booking_id, TicketHold.status == "confirmed")
+        .values(status="returned", updated_at=datetime.utcnow())
+        .returning(TicketHold.schedule_id, TicketHold.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    released = 0
+    for schedule_id, quantity in returned:
+        counters = db.execute(
+            update(EventSchedule)
+            .where(EventSchedule.id == schedule_id)
+            .values(tickets_sold=EventSchedule.tickets_sold - quantity)
+            .returning(*_COUNTERS)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if counters is not None:
+            _write_through(schedule_id, tuple(counters))
+        released += quantity
+    return released
+
+
+def _return_held(db: Session, per_schedule: Dict[int, int]) -> int:
+    released = 0
+    for schedule_id, quantity in per_schedule.items():
+        counters = db.execute(
+            update(EventSchedule)
+            .where(EventSchedule.id == schedule_id)
+            .values(tickets_held=EventSchedule.tickets_held - quantity)
+            .returning(*_COUNTERS)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if counters is not None:
+            _write_through(schedule_id, tuple(counters))
+        released += quantity
+    return released
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Async wrappers
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def sell_tickets(session: AsyncSession, schedule_id: int, quantity: int,
+                       require_bookable: bool = True) -> Tuple[int, int, int]:
+    return await session.run_sync(sell_tickets_sync, schedule_id, quantity, require_bookable)
+
+
+async def acquire_hold(session: AsyncSession, schedule_id: int, quantity: int, user_id: Optional[int] = None,
+                       booking_id: Optional[int] = None, ttl_seconds: Optional[int] = None) -> TicketHold:
+    return await session.run_sync(acquire_hold_sync, schedule_id, quantity, user_id, booking_id, ttl_seconds)
+
+
+async def confirm_booking_tickets(session: AsyncSession, booking_id: int, schedule_id: int, quantity: int) -> bool:
+    return await session.run_sync(confirm_booking_tickets_sync, booking_id, schedule_id, quantity)
+
+
+async def release_booking_tickets(session: AsyncSession, booking_id: int) -> int:
+    return await session.run_sync(release_booking_tickets_sync, booking_id)
+
+
+async def expire_holds(session: AsyncSession) -> Dict[str, Any]:
+    """Scheduler job: expire abandoned checkout holds and return their tickets to the pool."""
+    def _expire(db: Session) -> Dict[str, Any]:
+        expired = db.execute(
+            update(TicketHold)
+            .where(TicketHold.status == "active", TicketHold.expires_at < datetime.utcnow())
+            .values(status="expired", updated_at=datetime.utcnow())
+            .returning(TicketHold.schedule_id, TicketHold.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+        per_schedule: Dict[int, int] = defaultdict(int)
+        for schedule_id, quantity in expired:
+            per_schedule[schedule_id] += quantity
+        released = _return_held(db, per_schedule)
+        return {"holds_expired": len(expired), "tickets_released": released, "schedules": len(per_schedule)}
+
+    result = await session.run_sync(_expire)
+    await session.commit()
+    return result
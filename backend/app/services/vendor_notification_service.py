@@ -9,7 +9,9 @@ Handles all vendor notifications including:
 """
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
+from functools import partial
 from typing import Optional, List, Dict, Any
 from sqlalchemy import select, text, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,6 +23,8 @@ from ..models_vendor_enhanced import (
     VendorActivityLog,
     BookingItemStatusHistory
 )
+from ..services.notification_fanout import EMAIL, WHATSAPP, Delivery, fan_out
+from ..services.notification_writer import NotificationBatch
 from ..services.whatsapp_route_mobile import RouteMobileWhatsAppClient
 from ..core import settings
 
@@ -105,6 +109,63 @@ class VendorNotificationService:
         print(f"[VENDOR_NOTIF] Created notification for vendor user {vendor_user_id}: {title}")
         return notification
     
+    @staticmethod
+    async def create_notifications(
+        session: AsyncSession,
+        vendor_user_ids: List[int],
+        type: str,
+        title: str,
+        message: str,
+        booking_id: Optional[int] = None,
+        booking_item_id: Optional[int] = None,
+        link: Optional[str] = None,
+        priority: str = 'normal',
+        send_whatsapp: bool = False,
+        send_email: bool = False,
+    ) -> int:
+        """
+        Create the same notification for many vendors (e.g. broadcasts)
+        
+        Rows are written as multi-row INSERTs with a single commit (NotificationBatch);
+        requested WhatsApp/email messages then go out concurrently through the
+        notification fan-out. Returns the number of notifications created.
+        """
+        batch = NotificationBatch(session)
+        now = datetime.utcnow()
+        for vendor_user_id in vendor_user_ids:
+            await batch.add(
+                VendorNotification,
+                vendor_user_id=vendor_user_id,
+                type=type,
+                title=title,
+                message=message,
+                booking_id=booking_id,
+                booking_item_id=booking_item_id,
+                link=link,
+                priority=priority,
+                is_read=False,
+                created_at=now,
+            )
+        created = await batch.flush()
+        
+        if send_whatsapp or send_email:
+            rs = await session.execute(select(User).where(User.id.in_(set(vendor_user_ids))))
+            deliveries: List[Delivery] = []
+            for user in rs.scalars().all():
+                recipient = f"vendor_user:{user.id}"
+                if send_whatsapp and user.mobile:
+                    deliveries.append(Delivery(WHATSAPP, recipient, user.mobile, partial(
+                        VendorNotificationService._send_whatsapp_notification, user.mobile, title, message
+                    )))
+                if send_email and user.username:
+                    deliveries.append(Delivery(EMAIL, recipient, user.username, partial(
+                        VendorNotificationService._send_email_notification, user.username, title, message
+                    )))
+            await fan_out(deliveries)
+        
+        print(f"[VENDOR_NOTIF] Created {created} notification(s): {title}")
+        return created
+    
     @staticmethod
     async def notify_vendor_new_order(
         session: AsyncSession,
@@ -419,12 +480,16 @@ class VendorNotificationService:
             
             msg.attach(MIMEText(html, 'html'))
             
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                if settings.SMTP_USE_TLS:
-                    server.starttls()
-                if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
-                    server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-                server.send_message(msg)
+            def _send():
+                with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
+                    if settings.SMTP_USE_TLS:
+                        server.starttls()
+                    if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
+                        server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+                    server.send_message(msg)
+            
+            # SMTP session in a worker thread so it doesn't block the event loop
+            await asyncio.to_thread(_send)
             
             print(f"[VENDOR_NOTIF] Email sent to {email}")
         except Exception as e:
@@ -228,12 +228,9 @@ class WhatsAppChatbotService:
         """
         try:
             if response_type == "price":
-                from app.models import Space
-                from sqlalchemy import select
+                from app.services.space_cache import list_spaces
                 
-                query = select(Space).where(Space.active == True).order_by(Space.id.asc())
-                result = await session.execute(query)
-                spaces = result.scalars().all()
+                spaces = await list_spaces(session, active_only=True)
                 
                 if not spaces:
                     return "Our rate cards will be updated shortly."
@@ -246,7 +243,8 @@ class WhatsAppChatbotService:
                 return "Our pricing per hour:\n" + "\n".join(lines)
             
             elif response_type == "slots":
-                from app.models import Booking, Space
+                from app.models import Booking
+                from app.services.space_cache import list_spaces
                 from sqlalchemy import select, and_, func
                 from datetime import datetime, date, timedelta
                 
@@ -264,9 +262,7 @@ class WhatsAppChatbotService:
                 today_bookings = result.scalars().all()
                 
                 # Get all active spaces
-                space_query = select(Space).where(Space.active == True)
-                space_result = await session.execute(space_query)
-                spaces = space_result.scalars().all()
+                spaces = await list_spaces(session, active_only=True)
                 
                 if not spaces:
                     return "No spaces available at the moment."
@@ -0,0 +1,366 @@
+"""
+WhatsApp Inbound Ingestion Queue
+Decouples the Route Mobile webhook from message storage and auto-replies.
+
+How it works:
+- The callback endpoint parses the payload into `InboundEvent`s, drops ids stored
+  recently (provider retries) and enqueues the rest, then returns 200 immediately.
+  An id is only remembered once its batch has been committed, so a retry of a message
+  whose batch failed to store is accepted again.
+- A consumer task on the worker's event loop drains the queue in small batches and,
+  per batch, loads existing conversations and message ids in one query each, creates
+  missing conversations and inserts messages with INSERT ... ON CONFLICT DO NOTHING
+  on the inbound `provider_message_id` unique index, so retries delivered to another
+  worker are dropped by the database.
+- Only newly stored messages get an auto-reply. Replies run as tasks limited by a
+  semaphore (WHATSAPP_REPLY_CONCURRENCY) and are serialized per phone number so a
+  customer's messages are answered in order.
+- A batch that fails to store is retried WHATSAPP_INGEST_STORE_RETRIES times with
+  exponential backoff before it is given up on (and logged).
+
+The queue is per worker and in memory; if it is full the router falls back to
+processing the callback inline rather than dropping it.
+
+Usage:
+    queue = get_whatsapp_ingest_queue()
+    queue.set_reply_handler(reply_to_event)   # async (session, event, conversation_id)
+    if not queue.enqueue(events):
+        ...  # queue full, process inline
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    WHATSAPP_INBOUND_PROVIDER_ID_WHERE,
+    WhatsAppConversation,
+    WhatsAppMessage,
+    whatsapp_summary_update,
+)
+from app.services.metrics import registry
+from app.services.rollup_lock import WHATSAPP_DAILY_STATS, lock_rollup
+from app.services.whatsapp_stats import daily_stats_upsert
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_EVENTS = registry.counter(
+    "lebrq_whatsapp_inbound_events_total", "Inbound WhatsApp webhook events by outcome", ("outcome",))
+WHATSAPP_QUEUE_DEPTH = registry.gauge(
+    "lebrq_whatsapp_ingest_queue_depth", "Inbound WhatsApp events waiting to be stored")
+
+
+class InboundEvent:
+    """One inbound message extracted from a Route Mobile callback."""
+
+    __slots__ = ("phone", "text", "message_id", "button_id", "timestamp", "raw", "received_at")
+
+    def __init__(self, phone: str, text: str, message_id: Optional[str], button_id: str = "",
+                 timestamp: str = "", raw: Optional[Dict[str, Any]] = None):
+        self.phone = phone  # As received (may include '+')
+        self.text = text
+        self.message_id = message_id or None
+        self.button_id = button_id
+        self.timestamp = timestamp
+        self.raw = raw or {}
+        self.received_at = datetime.utcnow()
+
+    @property
+    def phone_clean(self) -> str:
+        return self.phone.strip().lstrip("+")
+
+
+ReplyHandler = Callable[[AsyncSession, InboundEvent, int], Awaitable[None]]
+
+
+class WhatsAppIngestQueue:
+    """Per-worker queue and batch consumer for inbound WhatsApp events."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._reply_handler: Optional[ReplyHandler] = None
+        self._reply_semaphore: Optional[asyncio.Semaphore] = None
+        self._reply_tasks: Set[asyncio.Task] = set()
+        self._phone_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}  # phone -> (lock, tasks using it)
+        # Recently stored provider message ids; absorbs provider retries before they hit the DB
+        self._recent_ids: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"enqueued": 0, "duplicates": 0, "stored": 0, "replied": 0, "reply_errors": 0, "batches": 0}
+        WHATSAPP_QUEUE_DEPTH.set_function(lambda: self._queue.qsize() if self._queue else 0)
+
+    def set_reply_handler(self, handler: ReplyHandler) -> None:
+        self._reply_handler = handler
+
+    # ─── Fast path ──────────────────────────────────────────────────────────
+
+    def is_duplicate(self, message_id: Optional[str]) -> bool:
+        if not message_id:
+            return False
+        seen_at = self._recent_ids.get(message_id)
+        return seen_at is not None and time.monotonic() - seen_at < settings.WHATSAPP_DEDUPE_WINDOW_SECONDS
+
+    def _remember(self, message_id: Optional[str]) -> None:
+        if not message_id:
+            return
+        self._recent_ids[message_id] = time.monotonic()
+        self._recent_ids.move_to_end(message_id)
+        while len(self._recent_ids) > settings.WHATSAPP_DEDUPE_MAX_IDS:
+            self._recent_ids.popitem(last=False)
+
+    def enqueue(self, events: List[InboundEvent]) -> bool:
+        """Queue events for storage and reply. Returns False if the queue is full."""
+        self._ensure_started()
+        fresh = []
+        for event in events:
+            if self.is_duplicate(event.message_id):
+                self.stats["duplicates"] += 1
+                WHATSAPP_EVENTS.inc("duplicate")
+                continue
+            fresh.append(event)
+        if len(fresh) > self._queue.maxsize - self._queue.qsize():
+            WHATSAPP_EVENTS.inc("queue_full", amount=len(fresh))
+            return False
+        for event in fresh:
+            self._queue.put_nowait(event)
+        self.stats["enqueued"] += len(fresh)
+        WHATSAPP_EVENTS.inc("queued", amount=len(fresh))
+        return True
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.WHATSAPP_INGEST_QUEUE_SIZE)
+            self._reply_semaphore = asyncio.Semaphore(settings.WHATSAPP_REPLY_CONCURRENCY)
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume(), name="whatsapp-ingest")
+            logger.info("[WA Ingest] Consumer started")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain queued events and in-flight replies, then stop the consumer."""
+        if self._queue is not None and self._consumer is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[WA Ingest] Shutdown with {self._queue.qsize()} events still queued")
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        if self._reply_tasks:
+            await asyncio.wait(list(self._reply_tasks), timeout=timeout)
+        logger.info("[WA Ingest] Stopped")
+
+    # ─── Consumer ───────────────────────────────────────────────────────────
+
+    async def _next_batch(self) -> List[InboundEvent]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.WHATSAPP_INGEST_BATCH_WAIT_MS / 1000.0
+        while len(batch) < settings.WHATSAPP_INGEST_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _store_batch(self, batch: List[InboundEvent]) -> List[Tuple[InboundEvent, int]]:
+        """Store a batch, retrying with backoff; raises once the retries are used up."""
+        from app.db import AsyncSessionLocal
+
+        attempt = 0
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    return await store_inbound_events(session, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= settings.WHATSAPP_INGEST_STORE_RETRIES:
+                    raise
+                delay = settings.WHATSAPP_INGEST_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                attempt += 1
+                logger.warning(
+                    f"[WA Ingest] Storing batch of {len(batch)} events failed ({e}); retry {attempt} in {delay:g}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _consume(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                stored = await self._store_batch(batch)
+                # Committed (or already in the DB): provider retries can now be dropped in memory
+                for event in batch:
+                    self._remember(event.message_id)
+                self.stats["batches"] += 1
+                self.stats["stored"] += len(stored)
+                WHATSAPP_EVENTS.inc("stored", amount=len(stored))
+                WHATSAPP_EVENTS.inc("duplicate", amount=len(batch) - len(stored))
+                for event, conversation_id in stored:
+                    self._spawn_reply(event, conversation_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Ids aren't remembered, so a provider retry of these messages is accepted again
+                WHATSAPP_EVENTS.inc("store_error", amount=len(batch))
+                logger.error(f"[WA Ingest] Failed to store batch of {len(batch)} events: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _spawn_reply(self, event: InboundEvent, conversation_id: int) -> None:
+        if self._reply_handler is None:
+            return
+        task = asyncio.create_task(self._reply(event, conversation_id))
+        self._reply_tasks.add(task)
+        task.add_done_callback(self._reply_tasks.discard)
+
+    async def _reply(self, event: InboundEvent, conversation_id: int) -> None:
+        from app.db import AsyncSessionLocal
+
+        phone = event.phone_clean
+        lock, users = self._phone_locks.get(phone) or (asyncio.Lock(), 0)
+        self._phone_locks[phone] = (lock, users + 1)
+        try:
+            async with lock:
+                async with self._reply_semaphore:
+                    async with AsyncSessionLocal() as session:
+                        await self._reply_handler(session, event, conversation_id)
+            self.stats["replied"] += 1
+        except Exception as e:
+            self.stats["reply_errors"] += 1
+            logger.error(f"[WA Ingest] Auto-reply failed for {phone}: {e}", exc_info=True)
+        finally:
+            lock, users = self._phone_locks[phone]
+            if users <= 1:
+                del self._phone_locks[phone]
+            else:
+                self._phone_locks[phone] = (lock, users - 1)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch storage
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _insert(session: AsyncSession, model):
+    return (sqlite.insert if session.bind.dialect.name == "sqlite" else postgresql.insert)(model)
+
+
+async def store_inbound_events(session: AsyncSession, events: List[InboundEvent]) -> List[Tuple[InboundEvent, int]]:
+    """Store a batch of inbound events; returns (event, conversation_id) for newly stored messages only."""
+    # Dedupe within the batch (first occurrence wins)
+    unique: List[InboundEvent] = []
+    seen: Set[str] = set()
+    for event in events:
+        if event.message_id:
+            if event.message_id in seen:
+                continue
+            seen.add(event.message_id)
+        unique.append(event)
+    if not unique:
+        return []
+
+    # Conversations: one lookup, one multi-row insert for new phones
+    phones = {e.phone_clean for e in unique}
+    conversation_ids: Dict[str, int] = {}
+    rows = await session.execute(
+        select(WhatsAppConversation.phone_number, WhatsAppConversation.id)
+        .where(WhatsAppConversation.phone_number.in_(phones))
+        .order_by(WhatsAppConversation.id)
+    )
+    for phone, conversation_id in rows.all():
+        conversation_ids.setdefault(phone, conversation_id)
+
+    now = datetime.utcnow()
+    missing = [p for p in phones if p not in conversation_ids]
+    if missing:
+        created = await session.execute(
+            _insert(session, WhatsAppConversation)
+            .values([
+                {"phone_number": p, "status": "active", "last_message_at": now, "created_at": now, "updated_at": now}
+                for p in missing
+            ])
+            .returning(WhatsAppConversation.phone_number, WhatsAppConversation.id)
+        )
+        conversation_ids.update(dict(created.all()))
+
+    def _row(event: InboundEvent) -> Dict[str, Any]:
+        return {
+            "conversation_id": conversation_ids[event.phone_clean],
+            "direction": "inbound",
+            "message_type": "text",
+            "text_content": event.text,
+            "provider_message_id": event.message_id,
+            "status": "delivered",
+            "message_metadata": event.raw,
+            "created_at": event.received_at,
+        }
+
+    # Messages: the partial unique index on inbound provider_message_id drops retries
+    with_id = [e for e in unique if e.message_id]
+    without_id = [e for e in unique if not e.message_id]
+    stored: List[Tuple[InboundEvent, int]] = []
+    if with_id:
+        by_id = {e.message_id: e for e in with_id}
+        inserted = await session.execute(
+            _insert(session, WhatsAppMessage)
+            .values([_row(e) for e in with_id])
+            .on_conflict_do_nothing(
+                index_elements=["provider_message_id"],
+                index_where=text(WHATSAPP_INBOUND_PROVIDER_ID_WHERE),
+            )
+            .returning(WhatsAppMessage.provider_message_id)
+        )
+        for (message_id,) in inserted.all():
+            event = by_id[message_id]
+            stored.append((event, conversation_ids[event.phone_clean]))
+    if without_id:
+        await session.execute(_insert(session, WhatsAppMessage).values([_row(e) for e in without_id]))
+        stored.extend((e, conversation_ids[e.phone_clean]) for e in without_id)
+
+    # Inbox summaries (message_count, unread_count, last message), one UPDATE per conversation
+    per_conversation: Dict[int, List[InboundEvent]] = {}
+    for event, conversation_id in stored:
+        per_conversation.setdefault(conversation_id, []).append(event)
+    for conversation_id, conversation_events in per_conversation.items():
+        last = conversation_events[-1]
+        await session.execute(
+            whatsapp_summary_update(
+                conversation_id, len(conversation_events), len(conversation_events), last.text, "inbound", now,
+            ).values(updated_at=now)
+        )
+
+    # Daily stats rollup, one upsert per day touched
+    per_day: Dict[date, Dict[str, int]] = {}
+    if missing:
+        per_day.setdefault(now.date(), {})["conversations_created"] = len(missing)
+    for event, _ in stored:
+        counters = per_day.setdefault(event.received_at.date(), {})
+        counters["messages_inbound"] = counters.get("messages_inbound", 0) + 1
+    if per_day:
+        await lock_rollup(session, WHATSAPP_DAILY_STATS)  # Wait out a running rebuild
+    for day, counters in per_day.items():
+        await session.execute(daily_stats_upsert(session.bind.dialect.name, day, **counters))
+    await session.commit()
+    return stored
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Global queue
+# ─────────────────────────────────────────────────────────────────────────────
+
+_ingest_queue: Optional[WhatsAppIngestQueue] = None
+
+
+def get_whatsapp_ingest_queue() -> WhatsAppIngestQueue:
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = WhatsAppIngestQueue()
+    return _ingest_queue
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-import time
 import logging
 from typing import Any, Dict, List, Optional
 
 import httpx
 
 from app.core import settings
+from app.services.route_mobile_token import (
+    RouteMobileAuthError,
+    get_route_mobile_token,
+    has_route_mobile_credentials,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,9 +29,6 @@ class RouteMobileWhatsAppClient:
     similar to Meta's template send with Route Mobile-provided bearer token.
     """
 
-    _token: Optional[str] = None
-    _token_expiry: float = 0.0
-
     def __init__(self) -> None:
         # Considered configured if base URL exists; sender may be optional depending on account
         pass
@@ -37,68 +38,17 @@ class RouteMobileWhatsAppClient:
 
     async def _get_token(self, client: httpx.AsyncClient) -> Optional[str]:
         """
-        Acquire/cached token depending on configured auth mode:
+        Shared Route Mobile token from the token broker (services/route_mobile_token.py),
+        which logs in per ROUTEMOBILE_AUTH_MODE:
         - oauth: client credentials flow on ROUTEMOBILE_LOGIN_PATH (default /oauth/token)
         - jwt_login: username/password login on ROUTEMOBILE_LOGIN_PATH (e.g., /auth/v1/login/)
         Returns token string or None if not needed/failed.
         """
-        now = time.time()
-        if self._token and now < self._token_expiry - 30:
-            return self._token
-
-        base = settings.ROUTEMOBILE_BASE_URL.rstrip("/") if settings.ROUTEMOBILE_BASE_URL else ""
-        login_path = settings.ROUTEMOBILE_LOGIN_PATH or "/oauth/token"
-        auth_url = f"{base}{login_path}"
-
-        mode = (settings.ROUTEMOBILE_AUTH_MODE or "oauth").lower()
-        try:
-            if mode == "jwt_login":
-                # Username/password login returns a JWT (often 'JWTAUTH')
-                if not settings.ROUTEMOBILE_USERNAME or not settings.ROUTEMOBILE_PASSWORD:
-                    return None
-                resp = await client.post(
-                    auth_url,
-                    json={
-                        "username": settings.ROUTEMOBILE_USERNAME,
-                        "password": settings.ROUTEMOBILE_PASSWORD,
-                    },
-                    headers={"Content-Type": "application/json"},
-                    timeout=15.0,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                token = data.get("JWTAUTH") or data.get("access_token")
-                if token:
-                    # no explicit expiry returned; assume 1 hour
-                    self._token = token
-                    self._token_expiry = now + 3600
-                    return self._token
-                logger.warning("[ROUTEMOBILE] Login succeeded but token not found in response: %s", data)
-                return None
-
-            # Default: oauth client credentials
-            if not settings.ROUTEMOBILE_CLIENT_ID or not settings.ROUTEMOBILE_CLIENT_SECRET:
-                return None
-            resp = await client.post(
-                auth_url,
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": settings.ROUTEMOBILE_CLIENT_ID,
-                    "client_secret": settings.ROUTEMOBILE_CLIENT_SECRET,
-                },
-                timeout=15.0,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            token = data.get("access_token")
-            if token:
-                self._token = token
-                expires_in = data.get("expires_in", 300)
-                self._token_expiry = now + float(expires_in)
-                return self._token
-            logger.warning("[ROUTEMOBILE] OAuth succeeded but access_token missing: %s", data)
+        if not has_route_mobile_credentials():
             return None
-        except Exception as e:
+        try:
+            return await get_route_mobile_token()
+        except RouteMobileAuthError as e:
             logger.error("[ROUTEMOBILE] Failed to obtain token: %s", e)
             return None
 
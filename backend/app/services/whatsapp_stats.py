@@ -0,0 +1,153 @@
+"""
+WhatsApp Daily Statistics
+Maintains `whatsapp_daily_stats`, one row of counters per UTC day, so the admin stats
+view sums at most 365 small rows instead of scanning messages and conversations.
+
+How it works:
+- Every message/conversation insert adds to its day's row in the same transaction
+  (INSERT ... ON CONFLICT (day) DO UPDATE SET n = n + excluded.n). ORM inserts go through
+  the after_insert hooks in app.models; the webhook batch ingest upserts once per batch.
+- Changing a conversation's status moves it in or out of `conversations_inactive` for
+  the day it was created, so "active conversations" needs no scan either.
+- A nightly job rebuilds recent days from the source tables to repair drift (raw SQL
+  writes, deleted rows), upserting absolute counts over the existing rows. It holds the
+  rollup lock (app.services.rollup_lock) that every incremental upsert takes shared, so
+  messages stored while it runs are neither missed nor overwritten. The migration
+  backfills all history.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import WhatsAppConversation, WhatsAppDailyStat, WhatsAppMessage
+from app.services.rollup_lock import WHATSAPP_DAILY_STATS, lock_rollup
+
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = (
+    "conversations_created",
+    "conversations_inactive",
+    "messages_inbound",
+    "messages_outbound",
+    "auto_replies",
+)
+
+# Days rebuilt by the nightly reconciliation (today and the previous days)
+RECONCILE_DAYS = 3
+# Day rows per upsert statement when rebuilding long ranges
+REBUILD_UPSERT_BATCH = 500
+
+
+def is_auto_reply(metadata: Any) -> bool:
+    return isinstance(metadata, dict) and bool(metadata.get("auto"))
+
+
+def daily_stats_upsert(dialect_name: str, day: date, **increments: int):
+    """INSERT ... ON CONFLICT that adds `increments` to the counters of `day`."""
+    values = {name: int(increments.get(name, 0)) for name in COUNTER_COLUMNS}
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(WhatsAppDailyStat).values(day=day, updated_at=datetime.utcnow(), **values)
+    table = WhatsAppDailyStat.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=["day"],
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in COUNTER_COLUMNS if values[name]},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+async def record_status_change(session: AsyncSession, conversation: WhatsAppConversation, old_status: str) -> None:
+    """Adjust the inactive count of the conversation's creation day after a status change."""
+    was_active = (old_status or "active") == "active"
+    is_active = conversation.status == "active"
+    if was_active == is_active or conversation.created_at is None:
+        return
+    await lock_rollup(session, WHATSAPP_DAILY_STATS)
+    await session.execute(daily_stats_upsert(
+        session.bind.dialect.name, conversation.created_at.date(),
+        conversations_inactive=-1 if is_active else 1,
+    ))
+
+
+async def get_stats(session: AsyncSession, days: int) -> Dict[str, int]:
+    """Totals since the UTC day `days` days ago (whole days, including today) from the rollup."""
+    since = (datetime.utcnow() - timedelta(days=days)).date()
+    row = (await session.execute(
+        select(*[func.coalesce(func.sum(getattr(WhatsAppDailyStat, name)), 0) for name in COUNTER_COLUMNS])
+        .where(WhatsAppDailyStat.day >= since)
+    )).one()
+    return dict(zip(COUNTER_COLUMNS, (int(v or 0) for v in row)))
+
+
+async def rebuild_daily_stats(session: AsyncSession, start_day: date, end_day: Optional[date] = None) -> Dict[str, Any]:
+    """Recompute the rollup rows for [start_day, end_day] from the source tables."""
+    end_day = end_day or datetime.utcnow().date()
+    start_at = datetime.combine(start_day, datetime.min.time())
+    end_at = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+    rows: Dict[date, Dict[str, int]] = {}
+    # Before reading: waits for in-flight message/conversation writes, holds new ones until commit
+    await lock_rollup(session, WHATSAPP_DAILY_STATS, exclusive=True)
+
+    def _row(day_value) -> Dict[str, int]:
+        day = day_value if isinstance(day_value, date) else date.fromisoformat(str(day_value))
+        return rows.setdefault(day, {name: 0 for name in COUNTER_COLUMNS})
+
+    msg_day = func.date(WhatsAppMessage.created_at)
+    auto = WhatsAppMessage.message_metadata["auto"].as_boolean()
+    messages = await session.execute(
+        select(
+            msg_day,
+            func.sum(case((WhatsAppMessage.direction == "inbound", 1), else_=0)),
+            func.sum(case((WhatsAppMessage.direction == "outbound", 1), else_=0)),
+            func.sum(case(((WhatsAppMessage.direction == "outbound") & (auto == True), 1), else_=0)),  # noqa: E712
+        )
+        .where(WhatsAppMessage.created_at >= start_at, WhatsAppMessage.created_at < end_at)
+        .group_by(msg_day)
+    )
+    for day_value, inbound, outbound, auto_replies in messages.all():
+        row = _row(day_value)
+        row["messages_inbound"] = int(inbound or 0)
+        row["messages_outbound"] = int(outbound or 0)
+        row["auto_replies"] = int(auto_replies or 0)
+
+    conv_day = func.date(WhatsAppConversation.created_at)
+    conversations = await session.execute(
+        select(
+            conv_day,
+            func.count(),
+            func.sum(case((WhatsAppConversation.status != "active", 1), else_=0)),
+        )
+        .where(WhatsAppConversation.created_at >= start_at, WhatsAppConversation.created_at < end_at)
+        .group_by(conv_day)
+    )
+    for day_value, created, inactive in conversations.all():
+        row = _row(day_value)
+        row["conversations_created"] = int(created or 0)
+        row["conversations_inactive"] = int(inactive or 0)
+
+    # Absolute values for every day in the range (zeros where nothing happened)
+    now = datetime.utcnow()
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+    empty = {name: 0 for name in COUNTER_COLUMNS}
+    insert = sqlite.insert if session.bind.dialect.name == "sqlite" else postgresql.insert
+    for i in range(0, len(days), REBUILD_UPSERT_BATCH):
+        stmt = insert(WhatsAppDailyStat).values([
+            {"day": day, "updated_at": now, **rows.get(day, empty)} for day in days[i:i + REBUILD_UPSERT_BATCH]
+        ])
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["day"],
+            set_={name: stmt.excluded[name] for name in (*COUNTER_COLUMNS, "updated_at")},
+        ))
+    await session.commit()
+    return {"days_rebuilt": (end_day - start_day).days + 1, "days_with_activity": len(rows)}
+
+
+async def reconcile_daily_stats(session: AsyncSession) -> Dict[str, Any]:
+    """Scheduler job: rebuild the most recent days of the rollup."""
+    today = datetime.utcnow().date()
+    return await rebuild_daily_stats(session, today - timedelta(days=RECONCILE_DAYS - 1), today)
@@ -0,0 +1,75 @@
+"""
+WhatsApp Conversation Summaries
+Backfill and reconciliation for the denormalized inbox columns on `whatsapp_conversations`
+(message_count, last_message_preview, last_direction, last_message_at).
+
+The columns are kept current on every message insert (see `whatsapp_summary_update` in
+app.models); this job recomputes them from `whatsapp_messages` to repair any drift, e.g.
+rows written by raw SQL or scripts. unread_count has no history to rebuild from, so it is
+left untouched.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import WHATSAPP_PREVIEW_CHARS, WhatsAppConversation, WhatsAppMessage
+
+logger = logging.getLogger(__name__)
+
+# Conversations recomputed per UPDATE/commit, so the job never holds long row locks
+BACKFILL_BATCH_SIZE = 2000
+
+# The nightly run only reconciles conversations active within this window
+RECONCILE_WINDOW = timedelta(days=2)
+
+
+async def backfill_conversation_summaries(session: AsyncSession, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """Recompute inbox summaries from the messages table (all conversations, or those active since `since`)."""
+    c = WhatsAppConversation.__table__
+    m = WhatsAppMessage.__table__
+
+    def latest(column):
+        return (
+            select(column)
+            .where(m.c.conversation_id == c.c.id)
+            .order_by(m.c.created_at.desc(), m.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    values = {
+        "message_count": select(func.count()).where(m.c.conversation_id == c.c.id).scalar_subquery(),
+        "last_message_preview": func.substr(latest(m.c.text_content), 1, WHATSAPP_PREVIEW_CHARS),
+        "last_direction": latest(m.c.direction),
+        "last_message_at": func.coalesce(
+            select(func.max(m.c.created_at)).where(m.c.conversation_id == c.c.id).scalar_subquery(),
+            c.c.last_message_at,
+        ),
+    }
+
+    id_range = select(func.min(c.c.id), func.max(c.c.id))
+    if since is not None:
+        id_range = id_range.where(c.c.last_message_at >= since)
+    low, high = (await session.execute(id_range)).one()
+    if low is None:
+        return {"conversations": 0}
+
+    updated = 0
+    for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+        stmt = c.update().where(c.c.id >= start, c.c.id < start + BACKFILL_BATCH_SIZE).values(**values)
+        if since is not None:
+            stmt = stmt.where(c.c.last_message_at >= since)
+        result = await session.execute(stmt)
+        await session.commit()
+        updated += result.rowcount or 0
+
+    logger.info(f"[WA Summary] Recomputed {updated} conversation summaries")
+    return {"conversations": updated}
+
+
+async def reconcile_conversation_summaries(session: AsyncSession) -> Dict[str, Any]:
+    """Scheduler job: reconcile summaries of recently active conversations."""
+    return await backfill_conversation_summaries(session, since=datetime.utcnow() - RECONCILE_WINDOW)
@@ -143,6 +143,96 @@ class Settings(BaseSettings):
     
     # ─── Timezone ───────────────────────────────────────────────────────────
     LOCAL_TIMEZONE: str = "Asia/Kolkata"
+
+    # ─── Background Scheduler ───────────────────────────────────────────────
+    # Periodic jobs run on the main event loop of every worker; a database
+    # advisory lock ensures only one worker executes each job per interval.
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INITIAL_DELAY_SECONDS: int = 60  # Wait after startup before the first run
+    SUPPLY_REMINDER_INTERVAL_SECONDS: int = 3600
+    OTP_CLEANUP_INTERVAL_SECONDS: int = 900
+    OFFER_EXPIRY_INTERVAL_SECONDS: int = 3600
+    SCHEDULER_HISTORY_RETENTION_DAYS: int = 30
+
+    # ─── Public Catalog Cache ───────────────────────────────────────────────
+    # Items, spaces and rack products are served from pre-serialized, precompressed
+    # per-worker caches keyed by filters and invalidated by a shared catalog version.
+    CATALOG_CACHE_ENABLED: bool = True
+    CATALOG_CACHE_TTL_SECONDS: int = 300  # Safety net for time-based filters (vendor suspensions)
+    CATALOG_CACHE_VERSION_CHECK_SECONDS: float = 5.0  # How often each worker re-reads the shared version
+    CATALOG_CACHE_MAX_ENTRIES: int = 256
+
+    # ─── Event Ticket Inventory ─────────────────────────────────────────────
+    # Ticket counters change only through conditional UPDATEs; a booking holds its
+    # tickets and confirms them as sold, and availability polls hit a per-worker cache.
+    TICKET_HOLD_SECONDS: int = 600  # How long an unconfirmed hold reserves tickets before it expires
+    TICKET_HOLD_EXPIRY_INTERVAL_SECONDS: int = 60
+    TICKET_AVAILABILITY_CACHE_SECONDS: float = 2.0  # Bounds staleness from writes on other workers
+
+    # ─── WhatsApp Webhook Ingestion ─────────────────────────────────────────
+    # The Route Mobile callback only validates and enqueues; a per-worker consumer
+    # batch-stores messages and sends auto-replies with bounded concurrency.
+    WHATSAPP_INGEST_QUEUE_SIZE: int = 5000  # When full, callbacks are processed inline
+    WHATSAPP_INGEST_BATCH_SIZE: int = 100
+    WHATSAPP_INGEST_BATCH_WAIT_MS: int = 50  # How long the consumer waits to fill a batch
+    WHATSAPP_INGEST_STORE_RETRIES: int = 3  # Retries for a batch whose store fails
+    WHATSAPP_INGEST_RETRY_BACKOFF_SECONDS: float = 0.5  # Doubles per retry
+    WHATSAPP_REPLY_CONCURRENCY: int = 8  # Concurrent outbound auto-replies per worker
+    WHATSAPP_DEDUPE_WINDOW_SECONDS: int = 3600  # Provider retries within this window are dropped in memory
+    WHATSAPP_DEDUPE_MAX_IDS: int = 20000
+
+    # ─── HR Dashboard ────────────────────────────────────────────────────────
+    # The dashboard payload is cached per worker and dropped when attendance, leave,
+    # staff or payroll rows are committed; the TTL bounds staleness across workers.
+    HR_DASHBOARD_CACHE_SECONDS: float = 30.0
+    HR_BIRTHDAY_WINDOW_DAYS: int = 30  # "Upcoming birthdays" look-ahead
+
+    # ─── Payroll Runs ────────────────────────────────────────────────────────
+    # Month-end payroll for all staff in one background run: two range queries,
+    # calculation in a small thread pool, and chunked bulk upserts with progress.
+    PAYROLL_RUN_WORKERS: int = 4
+    PAYROLL_RUN_CHUNK_SIZE: int = 200  # Staff per upsert/progress commit
+    PAYROLL_RUN_STALE_SECONDS: int = 900  # A run without progress this long no longer blocks a new one
+    PAYROLL_RUN_MAX_ERRORS: int = 200  # Errors kept on the run row
+
+    # ─── Password Hashing ───────────────────────────────────────────────────
+    # Hashes and verifies run in a small dedicated thread pool, never on the event loop.
+    # Changing the rounds rehashes each user's password at their next successful login.
+    PASSWORD_PBKDF2_ROUNDS: int = 29000  # pbkdf2_sha256 work factor (passlib default)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 5.0  # Includes time queued behind other hashes
+    LOGIN_FAILURE_LIMIT: int = 5  # Failed logins per username before further attempts are refused
+    LOGIN_FAILURE_WINDOW_SECONDS: int = 300
+    LOGIN_THROTTLE_MAX_USERNAMES: int = 10000  # Per-worker bound on tracked usernames
+
+    # ─── Route Mobile Auth Tokens ───────────────────────────────────────────
+    # One login per token lifetime for the whole deployment: concurrent callers share
+    # one in-flight login and the token is stored in service_tokens for every worker.
+    ROUTEMOBILE_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Refresh in the background this long before expiry
+    ROUTEMOBILE_TOKEN_DEFAULT_TTL_SECONDS: int = 3300  # When the login response has no expires_in
+    ROUTEMOBILE_TOKEN_LEASE_SECONDS: float = 20.0  # How long other workers wait on the worker logging in
+    ROUTEMOBILE_TOKEN_FAILURE_BACKOFF_SECONDS: float = 10.0  # Failed logins aren't retried sooner than this
+
+    # ─── Notification Fan-out ───────────────────────────────────────────────
+    # Post-payment vendor notifications go out concurrently, one message per vendor and
+    # channel; the caps are per worker and shared by all bookings being notified.
+    NOTIFY_WHATSAPP_CONCURRENCY: int = 8
+    NOTIFY_EMAIL_CONCURRENCY: int = 4  # Each email holds a thread for its SMTP session
+    NOTIFY_SEND_TIMEOUT_SECONDS: float = 30.0  # Per send, excluding time queued for a slot
+
+    # ─── Notification Writes ────────────────────────────────────────────────
+    # In-app notification rows are group-committed as multi-row INSERTs: per request
+    # for recipient loops, and per worker for fire-and-forget notifications.
+    NOTIFICATION_WRITE_BATCH_SIZE: int = 200  # Rows per INSERT batch / pending rows that trigger a flush
+    NOTIFICATION_WRITE_FLUSH_SECONDS: float = 0.5  # Max delay before queued rows are written
+
+    # ─── Instrumentation ────────────────────────────────────────────────────
+    # Route latency histograms, per-request SQL counts, N+1 detection and pool
+    # wait times, exposed in Prometheus text format at /metrics.
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None  # If set, /metrics requires "Authorization: Bearer <token>"
+    METRICS_N_PLUS_ONE_THRESHOLD: int = 10  # Same statement this many times in one request => N+1 warning
+    METRICS_SERVER_TIMING: bool = False  # Add a Server-Timing header (db time / query count) to responses
     
     # ─── Pydantic Configuration ─────────────────────────────────────────────
     model_config = SettingsConfigDict(
@@ -33,7 +33,8 @@ async def get_invoice_data(
     Returns:
         Dictionary containing all invoice data
     """
-    from app.models import Booking, User, Space, Venue, Payment, InvoiceEdit
+    from app.models import Booking, User, Payment, InvoiceEdit
+    from app.services.space_cache import get_space, get_venue
     
     # Check for saved invoice edit first (unless custom_data is provided or use_saved_edit is False)
     saved_edit_data = None
@@ -57,22 +58,22 @@ async def get_invoice_data(
     # Use custom_data if provided, otherwise use saved_edit_data
     effective_custom_data = custom_data if custom_data else saved_edit_data
     
-    # Get booking with joins
+    # Get booking with its user; space and venue come from the shared cache
     stmt = (
-        select(Booking, User, Space, Venue)
+        select(Booking, User)
         .join(User, User.id == Booking.user_id)
-        .join(Space, Space.id == Booking.space_id)
-        .join(Venue, Venue.id == Booking.venue_id)
         .where(Booking.id == booking_id)
     )
     
     rs = await session.execute(stmt)
     row = rs.first()
+    space = await get_space(session, row[0].space_id) if row else None
+    venue = await get_venue(session, row[0].venue_id) if row else None
     
-    if not row:
+    if not row or not space or not venue:
         raise ValueError(f'Booking {booking_id} not found')
     
-    booking, user, space, venue = row
+    booking, user = row
     
     # Get booking items
     sql_query = text("""
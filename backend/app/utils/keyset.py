@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is fetched with `WHERE (sort_key, id) < (last_sort_key, last_id) ORDER BY sort_key DESC,
+id DESC LIMIT n + 1` instead of OFFSET, so every page costs the same index range scan
+however deep the client scrolls. The cursor handed to clients is the last row's key,
+encoded as opaque URL-safe base64; clients only echo it back.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for a row key (datetimes, dates, numbers, strings)."""
+    raw = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Row key from a cursor, converted to `types`. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    out: List[Any] = []
+    try:
+        for value, kind in zip(values, types):
+            if value is None:
+                out.append(None)
+            elif kind is datetime:
+                out.append(datetime.fromisoformat(value))
+            elif kind is date:
+                out.append(date.fromisoformat(value))
+            else:
+                out.append(kind(value))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    return out
+
+
+def keyset_before(columns: Sequence[Any], values: Sequence[Any]):
+    """Rows after the cursor in (columns) DESC order: a row-value comparison indexes can use."""
+    return tuple_(*columns) < tuple_(*values)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], bool]:
+    """Rows fetched with LIMIT limit + 1 -> (page, has_next)."""
+    return list(rows[:limit]), len(rows) > limit
+
+
+def next_cursor(page: Sequence[Any], has_next: bool, key) -> Optional[str]:
+    """Cursor for the page after `page`, or None on the last page; `key(row)` returns the row key."""
+    if not has_next or not page:
+        return None
+    return encode_cursor(key(page[-1]))
@@ -0,0 +1,18 @@
+"""
+Benchmark Suite
+
+Seeds a local database at a configurable scale and drives scripted scenarios against the
+ASGI app in-process (no server, no network), reporting p50/p95/p99 latency and SQL
+queries per request. Results are saved as JSON so a change can be compared with a
+baseline before deploying.
+
+Usage (from backend/):
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale large --label before-change
+    python -m benchmarks.run --scale large --compare benchmarks/results/before-change.json
+
+`python -m benchmarks.plans` EXPLAINs the hot booking queries against the same seeded
+database and fails when one of them scans a large table sequentially.
+
+See `python -m benchmarks.run --help` for all options.
+"""
@@ -0,0 +1,133 @@
+"""
+Benchmark scenarios.
+
+Each scenario is a list of steps; a step builds one HTTP request for iteration `i`.
+Steps are measured separately and reported as "<scenario>:<step>".
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BenchContext:
+    """IDs and auth headers of the seeded dataset, shared by all scenarios."""
+
+    def __init__(self, admin_headers: Dict[str, str], customer_headers: Dict[str, str], vendor_headers: Dict[str, str],
+                 space_ids: List[int], customer_booking_ids: List[int]):
+        self.admin_headers = admin_headers
+        self.customer_headers = customer_headers
+        self.vendor_headers = vendor_headers
+        self.space_ids = space_ids
+        self.customer_booking_ids = customer_booking_ids
+        self.today = datetime.utcnow().date()
+        # Checkout creates bookings far beyond the seeded range so they never conflict
+        self.checkout_anchor = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=400)
+
+    def space(self, i: int) -> int:
+        return self.space_ids[i % len(self.space_ids)]
+
+
+class Request:
+    __slots__ = ("method", "url", "headers", "json", "params")
+
+    def __init__(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                 json: Any = None, params: Optional[Dict[str, Any]] = None):
+        self.method = method
+        self.url = url
+        self.headers = headers or {}
+        self.json = json
+        self.params = params
+
+
+Step = Callable[[BenchContext, int], Request]
+
+
+class Scenario:
+    def __init__(self, name: str, description: str, steps: Dict[str, Step], concurrency: Optional[int] = None):
+        self.name = name
+        self.description = description
+        self.steps = steps
+        self.concurrency = concurrency  # Overrides --concurrency (e.g. webhook bursts)
+
+
+def _checkout_payload(ctx: BenchContext, i: int) -> Dict[str, Any]:
+    start = ctx.checkout_anchor + timedelta(hours=3 * (i // len(ctx.space_ids)))
+    return {
+        "space_id": ctx.space(i),
+        "start_datetime": start.isoformat(),
+        "end_datetime": (start + timedelta(hours=2)).isoformat(),
+        "attendees": 50,
+        "event_type": "Birthday Party",
+        "booking_type": "one_day",
+        "customer_note": f"benchmark checkout {i}",
+    }
+
+
+def _webhook_payload(ctx: BenchContext, i: int) -> Dict[str, Any]:
+    return {
+        "messages": [{
+            "from": f"91{7500000000 + (i % 500)}",
+            "message_id": f"bench-webhook-{datetime.utcnow().timestamp()}-{i}",
+            "timestamp": str(int(datetime.utcnow().timestamp())),
+            "text": {"body": "status of my booking"},
+        }]
+    }
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "slot_browsing": Scenario(
+        "slot_browsing",
+        "Public space listing/detail and slot availability for a date",
+        {
+            "spaces": lambda ctx, i: Request("GET", "/api/venues/spaces"),
+            "space_detail": lambda ctx, i: Request("GET", f"/api/venues/spaces/{ctx.space(i)}"),
+            "available_slots": lambda ctx, i: Request(
+                "GET", f"/api/time-slots/available/{ctx.space(i)}",
+                params={"selected_date": (ctx.today + timedelta(days=i % 30)).isoformat(), "duration_hours": 2}),
+            "calendar": lambda ctx, i: Request(
+                "GET", f"/api/time-slots/calendar/{ctx.space(i)}",
+                params={"start_date": ctx.today.isoformat(), "end_date": (ctx.today + timedelta(days=30)).isoformat()}),
+            "items": lambda ctx, i: Request("GET", "/api/items"),
+        },
+    ),
+    "checkout": Scenario(
+        "checkout",
+        "Price quote followed by booking creation",
+        {
+            "price_quote": lambda ctx, i: Request("POST", "/api/bookings/price-quote", json=_checkout_payload(ctx, i)),
+            "create_booking": lambda ctx, i: Request("POST", "/api/bookings", headers=ctx.customer_headers, json=_checkout_payload(ctx, i)),
+            "my_bookings": lambda ctx, i: Request("GET", "/api/bookings", headers=ctx.customer_headers),
+        },
+    ),
+    "admin_lists": Scenario(
+        "admin_lists",
+        "Admin list pages (bookings, refunds, invoices, WhatsApp) and vendor orders",
+        {
+            "bookings": lambda ctx, i: Request("GET", "/api/admin/bookings", headers=ctx.admin_headers,
+                                               params={"page": 1 + i % 5, "page_size": 50}),
+            "refunds": lambda ctx, i: Request("GET", "/api/admin/refunds", headers=ctx.admin_headers, params={"page": 1 + i % 3}),
+            "invoices": lambda ctx, i: Request("GET", "/api/admin/invoices", headers=ctx.admin_headers,
+                                               params={"from_date": (ctx.today - timedelta(days=30)).isoformat(),
+                                                       "to_date": ctx.today.isoformat()}),
+            "whatsapp_conversations": lambda ctx, i: Request("GET", "/api/admin/whatsapp/conversations", headers=ctx.admin_headers),
+            "whatsapp_stats": lambda ctx, i: Request("GET", "/api/admin/whatsapp/stats", headers=ctx.admin_headers),
+            "vendor_orders": lambda ctx, i: Request("GET", "/api/vendor/orders", headers=ctx.vendor_headers),
+        },
+    ),
+    "invoice_download": Scenario(
+        "invoice_download",
+        "Customer invoice PDF download",
+        {
+            "invoice": lambda ctx, i: Request(
+                "GET", f"/api/bookings/{ctx.customer_booking_ids[i % len(ctx.customer_booking_ids)]}/invoice",
+                headers=ctx.customer_headers),
+        },
+    ),
+    "webhook_burst": Scenario(
+        "webhook_burst",
+        "Burst of inbound WhatsApp webhook callbacks",
+        {
+            "callback": lambda ctx, i: Request("POST", "/api/whatsapp/callback", json=_webhook_payload(ctx, i)),
+        },
+        concurrency=50,
+    ),
+}
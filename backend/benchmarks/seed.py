@@ -0,0 +1,184 @@
+"""
+Deterministic benchmark dataset.
+
+Creates venues, spaces, users (admin, customers, vendors), catalog items, bookings with
+items, payments and refunds, and WhatsApp conversations/messages using bulk INSERTs.
+The same scale and seed always produce the same data, so runs are comparable.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import Base
+from app.services.whatsapp_stats import rebuild_daily_stats
+from app.services.whatsapp_summary import backfill_conversation_summaries
+from app.models import (
+    Booking,
+    BookingItem,
+    Item,
+    Payment,
+    Refund,
+    Space,
+    User,
+    VendorProfile,
+    Venue,
+    WhatsAppConversation,
+    WhatsAppMessage,
+)
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"venues": 2, "spaces": 6, "customers": 200, "vendors": 10, "items": 100, "bookings": 2_000, "wa_conversations": 200, "wa_messages": 2_000},
+    "medium": {"venues": 3, "spaces": 12, "customers": 2_000, "vendors": 40, "items": 400, "bookings": 20_000, "wa_conversations": 2_000, "wa_messages": 20_000},
+    "large": {"venues": 5, "spaces": 20, "customers": 10_000, "vendors": 100, "items": 1_000, "bookings": 100_000, "wa_conversations": 10_000, "wa_messages": 100_000},
+}
+
+# Placeholder hash; benchmark users authenticate with JWTs minted by the runner
+BENCH_PASSWORD_HASH = "$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchmark"
+
+BOOKING_STATUSES = ["approved", "approved", "approved", "pending", "completed", "cancelled", "confirmed"]
+EVENT_TYPES = ["Birthday Party", "Wedding", "Corporate Event", "Conference", "Yoga", "Live Show"]
+SLOT_HOURS = 3  # Seeded bookings are 2 hours long, one every 3 hours per space (no overlaps)
+CHUNK_SIZE = 5_000
+
+
+async def _bulk_insert(session: AsyncSession, model, rows: List[Dict[str, Any]]) -> None:
+    for i in range(0, len(rows), CHUNK_SIZE):
+        await session.execute(insert(model), rows[i:i + CHUNK_SIZE])
+
+
+async def _ids(session: AsyncSession, model, **filters) -> List[int]:
+    stmt = select(model.id).order_by(model.id)
+    for name, value in filters.items():
+        stmt = stmt.where(getattr(model, name) == value)
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def is_seeded(session_factory: async_sessionmaker) -> bool:
+    async with session_factory() as session:
+        try:
+            count = (await session.execute(select(func.count(User.id)).where(User.username == "bench-admin"))).scalar()
+        except Exception:
+            return False
+        return bool(count)
+
+
+async def seed_database(engine, session_factory: async_sessionmaker, scale: Dict[str, int], seed: int = 42) -> None:
+    """Create all tables and insert the benchmark dataset."""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with session_factory() as session:
+        # Users
+        users = [{"username": "bench-admin", "password_hash": BENCH_PASSWORD_HASH, "role": "admin", "first_name": "Bench", "last_name": "Admin"}]
+        users += [
+            {"username": f"customer{i}@bench.local", "password_hash": BENCH_PASSWORD_HASH, "role": "customer",
+             "first_name": f"Customer{i}", "last_name": "Bench", "mobile": f"9{i:09d}"}
+            for i in range(scale["customers"])
+        ]
+        users += [
+            {"username": f"vendor{i}@bench.local", "password_hash": BENCH_PASSWORD_HASH, "role": "vendor", "first_name": f"Vendor{i}"}
+            for i in range(scale["vendors"])
+        ]
+        await _bulk_insert(session, User, users)
+        customer_ids = await _ids(session, User, role="customer")
+        vendor_user_ids = await _ids(session, User, role="vendor")
+
+        await _bulk_insert(session, VendorProfile, [
+            {"user_id": uid, "company_name": f"Vendor Co {i}", "contact_phone": f"8{i:09d}"}
+            for i, uid in enumerate(vendor_user_ids)
+        ])
+        vendor_ids = list((await session.execute(select(VendorProfile.id).order_by(VendorProfile.id))).scalars().all())
+
+        # Venues, spaces, catalog
+        await _bulk_insert(session, Venue, [{"name": f"Bench Venue {i}", "city": "Kasaragod"} for i in range(scale["venues"])])
+        venue_ids = await _ids(session, Venue)
+        await _bulk_insert(session, Space, [
+            {"venue_id": venue_ids[i % len(venue_ids)], "name": f"Hall {i}", "capacity": 50 + 25 * (i % 8),
+             "price_per_hour": float(500 + 250 * (i % 6)), "active": True,
+             "features": [{"id": "sound", "label": "Sound System", "paid": False}]}
+            for i in range(scale["spaces"])
+        ])
+        spaces = (await session.execute(select(Space.id, Space.venue_id, Space.price_per_hour).order_by(Space.id))).all()
+
+        await _bulk_insert(session, Item, [
+            {"name": f"Item {i}", "price": float(100 + (i % 50) * 20), "main_category": ["food", "decor", "entertainment"][i % 3],
+             "category": f"cat{i % 10}", "vendor_id": vendor_ids[i % len(vendor_ids)], "available": True,
+             "description": "Benchmark catalog item"}
+            for i in range(scale["items"])
+        ])
+        item_rows = (await session.execute(select(Item.id, Item.price, Item.vendor_id).order_by(Item.id))).all()
+
+        # Bookings: one 2h slot every SLOT_HOURS per space; the last ~60 days are in the future
+        n_bookings = scale["bookings"]
+        per_space = n_bookings // len(spaces) + 1
+        anchor = now + timedelta(days=60) - timedelta(hours=SLOT_HOURS * per_space)
+        bookings = []
+        for k in range(n_bookings):
+            space_id, venue_id, price = spaces[k % len(spaces)]
+            start = anchor + timedelta(hours=SLOT_HOURS * (k // len(spaces)))
+            bookings.append({
+                "booking_reference": f"BENCH-{k:07d}",
+                "user_id": customer_ids[rng.randrange(len(customer_ids))],
+                "venue_id": venue_id,
+                "space_id": space_id,
+                "start_datetime": start,
+                "end_datetime": start + timedelta(hours=2),
+                "attendees": rng.randint(10, 300),
+                "status": rng.choice(BOOKING_STATUSES),
+                "total_amount": float(price) * 2,
+                "booking_type": "one_day",
+                "event_type": rng.choice(EVENT_TYPES),
+                "created_at": start - timedelta(days=rng.randint(1, 30)),
+            })
+        await _bulk_insert(session, Booking, bookings)
+        booking_rows = (await session.execute(
+            select(Booking.id, Booking.status, Booking.total_amount, Booking.start_datetime).order_by(Booking.id)
+        )).all()
+
+        booking_items, payments, refunds = [], [], []
+        for booking_id, status, total, start in booking_rows:
+            for _ in range(rng.randint(0, 3)):
+                item_id, item_price, item_vendor = item_rows[rng.randrange(len(item_rows))]
+                qty = rng.randint(1, 5)
+                booking_items.append({
+                    "booking_id": booking_id, "item_id": item_id, "vendor_id": item_vendor, "quantity": qty,
+                    "unit_price": float(item_price), "total_price": float(item_price) * qty,
+                    "event_date": start.date(), "booking_status": status,
+                })
+            if status != "pending":
+                payments.append({
+                    "booking_id": booking_id, "amount": float(total), "currency": "INR", "provider": "razorpay",
+                    "status": "success", "paid_at": start - timedelta(days=1),
+                })
+            if status == "cancelled":
+                refunds.append({
+                    "booking_id": booking_id, "amount": float(total) * 0.5,
+                    "status": rng.choice(["pending", "processing", "completed"]), "refund_type": "cancellation",
+                })
+        await _bulk_insert(session, BookingItem, booking_items)
+        await _bulk_insert(session, Payment, payments)
+        await _bulk_insert(session, Refund, refunds)
+
+        # WhatsApp conversations/messages over the last 30 days
+        await _bulk_insert(session, WhatsAppConversation, [
+            {"phone_number": f"91{7000000000 + i}", "status": "active", "last_message_at": now - timedelta(minutes=i)}
+            for i in range(scale["wa_conversations"])
+        ])
+        conversation_ids = await _ids(session, WhatsAppConversation)
+        await _bulk_insert(session, WhatsAppMessage, [
+            {"conversation_id": conversation_ids[i % len(conversation_ids)], "direction": "inbound" if i % 2 == 0 else "outbound",
+             "text_content": f"Benchmark message {i}", "provider_message_id": f"bench-{i}", "status": "delivered",
+             "created_at": now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))}
+            for i in range(scale["wa_messages"])
+        ])
+        await session.commit()
+
+        # Bulk inserts bypass the per-message summary and stats updates; fill both in one pass
+        await backfill_conversation_summaries(session)
+        await rebuild_daily_stats(session, (now - timedelta(days=366)).date())